@@ -0,0 +1,334 @@
+"""
+Front dispatcher for pre-fork mode with several workers (python -m api.prefork).
+
+Each worker holds its own jobs, analysis store and response cache, so a job
+polled on another worker than the one that queued it is not found, and with
+--route-by-prompt, repeats of a prompt landing on random workers would mostly
+miss. Every worker listens on its own Unix socket and this dispatcher, a
+process of its own, accepts the public connections and forwards each HTTP
+request:
+
+- with --route-by-prompt, POST /api/analyze and /api/analyze-with-claude go to
+  the worker that owns the prompt's analysis ID on a consistent-hash ring with
+  bounded load (orchestrator/routing.py), so repeats are cache hits;
+- POST /api/analyze/diff goes to the worker that served its base: the one that
+  returned base_analysis_id (X-Analysis-Id responses are remembered), or, with
+  --route-by-prompt, the owner of base_prompt;
+- /api/jobs/{job_id} requests go to the worker that queued the job, whose
+  index starts the job ID (see job_id_prefix), so they still find it after
+  the dispatcher restarts;
+- everything else goes to the least loaded worker. WebSocket upgrades and
+  chunked request bodies are tunnelled to it for the rest of the connection.
+
+Request bodies are read before forwarding (the prompt decides the worker);
+responses are streamed back as they arrive.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
+from typing import Optional
+
+from orchestrator.cache import LRUCache, analysis_id, cache_size_from_env
+from orchestrator.routing import HashRing, load_factor_from_env
+
+
+# Largest request or response head accepted
+MAX_HEAD_BYTES = 64 * 1024
+# Larger request bodies are streamed to the least loaded worker without routing
+MAX_ROUTED_BODY_BYTES = 4 * 1024 * 1024
+
+ANALYZE_PATHS = ("/api/analyze", "/api/analyze-with-claude")
+DIFF_PATH = "/api/analyze/diff"
+JOBS_PREFIX = "/api/jobs/"
+
+# Seconds between heartbeats to the pre-fork master
+HEARTBEAT_INTERVAL = 0.5
+
+
+def job_id_prefix(node: int) -> str:
+    """Start of the IDs of the jobs a worker queues (its JOB_ID_PREFIX)."""
+    return f"{node}-"
+
+
+def job_node(job_id: str, workers: int) -> Optional[int]:
+    """Worker that queued a job, from its ID; None for IDs without a valid worker index."""
+    node, sep, _ = job_id.partition("-")
+    if sep and node.isdigit() and int(node) < workers:
+        return int(node)
+    return None
+
+
+def routing_key(method: str, path: str, body: bytes) -> tuple:
+    """
+    Key to route a request by.
+
+    Returns:
+        (key, sticky): the key is the request's analysis ID, "job:<job ID>"
+        for job requests, or None; sticky tells whether the request must reach
+        the worker that stored that analysis or job rather than the key's
+        place on the ring
+    """
+    if path.startswith(JOBS_PREFIX):
+        return "job:" + path[len(JOBS_PREFIX):].split("/", 1)[0], True
+    if method != "POST" or (path not in ANALYZE_PATHS and path != DIFF_PATH):
+        return None, False
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None, False
+    if not isinstance(data, dict):
+        return None, False
+    if path == DIFF_PATH:
+        if isinstance(data.get("base_analysis_id"), str):
+            return data["base_analysis_id"], True
+        prompt = data.get("base_prompt")
+    else:
+        prompt = data.get("prompt")
+    if not isinstance(prompt, str):
+        return None, False
+    return analysis_id(prompt), False
+
+
+def parse_head(head: bytes) -> tuple:
+    """
+    Split an HTTP/1.x message head.
+
+    Returns:
+        (start line fields, {lowercase header name: value})
+
+    Raises:
+        ValueError: If the head is malformed
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    start = lines[0].split(" ", 2)
+    if len(start) < 2:
+        raise ValueError(f"Malformed start line {lines[0]!r}")
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError(f"Malformed header {line!r}")
+        headers[name.strip().lower()] = value.strip()
+    return start, headers
+
+
+def _without_header(head: bytes, name: bytes) -> bytes:
+    lines = head.split(b"\r\n")
+    return b"\r\n".join(line for line in lines if not line.lower().startswith(name + b":"))
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Next message head, or None if the peer closed between messages."""
+    try:
+        return await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed in a message head")
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Message head too large")
+
+
+async def _copy_exact(reader, writer, length: int) -> None:
+    while length:
+        data = await reader.read(min(length, 65536))
+        if not data:
+            raise ConnectionError("Connection closed in a message body")
+        writer.write(data)
+        await writer.drain()
+        length -= len(data)
+
+
+async def _copy_chunked(reader, writer) -> None:
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        writer.write(line)
+        size = int(line.split(b";", 1)[0], 16)
+        if size == 0:
+            break
+        await _copy_exact(reader, writer, size + 2)
+    # Trailers, up to the empty line
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        writer.write(line)
+        if line == b"\r\n":
+            break
+    await writer.drain()
+
+
+async def _copy_until_eof(reader, writer) -> None:
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            break
+        writer.write(data)
+        await writer.drain()
+
+
+async def _tunnel(client_reader, client_writer, backend_reader, backend_writer) -> None:
+    """Relay bytes both ways until either side closes."""
+    tasks = [
+        asyncio.ensure_future(_copy_until_eof(client_reader, backend_writer)),
+        asyncio.ensure_future(_copy_until_eof(backend_reader, client_writer)),
+    ]
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class Dispatcher:
+    """Routes HTTP requests from the public socket to the workers' Unix sockets."""
+
+    def __init__(
+        self,
+        worker_paths: list,
+        route_by_prompt: bool = True,
+        load_factor: Optional[float] = None,
+        heartbeats=None,
+        slot: Optional[int] = None
+    ):
+        self.worker_paths = worker_paths
+        self.route_by_prompt = route_by_prompt
+        self.ring = HashRing(range(len(worker_paths)), load_factor=load_factor or load_factor_from_env())
+        # Worker that returned each recent analysis ID, for diffs against it; each worker's
+        # analysis store holds the last cache_size_from_env() of them
+        self.placement = LRUCache(cache_size_from_env() * len(worker_paths))
+        self.heartbeats = heartbeats
+        self.slot = slot
+        # Constructed in the forked child; a different parent means the master died
+        self.master_pid = os.getppid()
+        self.connections: set = set()
+        # Writers of connections waiting for their next request
+        self.idle: set = set()
+        self.stopping: Optional[asyncio.Event] = None
+
+    def pick(self, key: Optional[str], sticky: bool) -> int:
+        if sticky:
+            if key.startswith("job:"):
+                node = job_node(key[len("job:"):], len(self.worker_paths))
+            else:
+                node = self.placement.get(key)
+            if node is not None:
+                return node
+        elif not self.route_by_prompt:
+            key = None
+        return self.ring.choose(key)
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        self.connections.add(asyncio.current_task())
+        try:
+            while await self.forward_request(client_reader, client_writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, OSError):
+            pass
+        finally:
+            self.idle.discard(client_writer)
+            self.connections.discard(asyncio.current_task())
+            client_writer.close()
+
+    async def forward_request(self, client_reader, client_writer) -> bool:
+        """Forward one request and its response; False once the connection is done."""
+        self.idle.add(client_writer)
+        head = await _read_head(client_reader)
+        self.idle.discard(client_writer)
+        if head is None:
+            return False
+        (method, target, *rest), headers = parse_head(head)
+        version = rest[0] if rest else "HTTP/1.0"
+        connection = headers.get("connection", "").lower()
+        tunnel = "upgrade" in headers or "chunked" in headers.get("transfer-encoding", "").lower()
+
+        if headers.get("expect", "").lower() == "100-continue":
+            # Answer it here: the body is read before a worker is picked
+            head = _without_header(head, b"expect")
+            client_writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        length = 0 if tunnel else int(headers.get("content-length", "0"))
+        body = b""
+        key, sticky = None, False
+        if not tunnel and length <= MAX_ROUTED_BODY_BYTES:
+            body = await client_reader.readexactly(length)
+            key, sticky = routing_key(method, target.split("?", 1)[0], body)
+
+        node = self.pick(key, sticky)
+        self.ring.acquire(node)
+        try:
+            backend_reader, backend_writer = await asyncio.open_unix_connection(self.worker_paths[node], limit=MAX_HEAD_BYTES)
+            try:
+                backend_writer.write(head + body)
+                if len(body) < length:
+                    await _copy_exact(client_reader, backend_writer, length)
+                await backend_writer.drain()
+                if tunnel:
+                    await _tunnel(client_reader, client_writer, backend_reader, backend_writer)
+                    return False
+                keep_alive = await self.relay_response(method, node, backend_reader, client_writer)
+            finally:
+                backend_writer.close()
+        finally:
+            self.ring.release(node)
+
+        if version == "HTTP/1.0":
+            keep_alive = keep_alive and connection == "keep-alive"
+        return keep_alive and connection != "close" and not self.stopping.is_set()
+
+    async def relay_response(self, method: str, node: int, reader, writer) -> bool:
+        """Stream one response back; False if it is delimited by closing the connection."""
+        while True:
+            head = await _read_head(reader)
+            if head is None:
+                raise ConnectionError("Worker closed the connection")
+            (_, status, *_), headers = parse_head(head)
+            writer.write(head)
+            # Interim responses precede the final one
+            if not 100 <= int(status) < 200:
+                break
+
+        if "x-analysis-id" in headers:
+            self.placement.put(headers["x-analysis-id"], node)
+        if method == "HEAD" or status in ("204", "304"):
+            await writer.drain()
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            await _copy_chunked(reader, writer)
+        elif "content-length" in headers:
+            await _copy_exact(reader, writer, int(headers["content-length"]))
+        else:
+            await _copy_until_eof(reader, writer)
+            return False
+        return headers.get("connection", "").lower() != "close"
+
+    async def heartbeat(self) -> None:
+        while True:
+            if os.getppid() != self.master_pid:
+                self.stopping.set()
+                return
+            if self.heartbeats is not None and self.slot is not None:
+                self.heartbeats[self.slot] = time.monotonic()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def serve(self, sock) -> None:
+        """Serve on a listening socket until SIGTERM, SIGINT or the master dies, then drain."""
+        loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stopping.set)
+        heartbeat = asyncio.ensure_future(self.heartbeat())
+
+        server = await asyncio.start_server(self.handle, sock=sock, limit=MAX_HEAD_BYTES)
+        await self.stopping.wait()
+        server.close()
+        # Connections between requests are closed now, the others after their response
+        while self.connections:
+            for writer in list(self.idle):
+                writer.close()
+            await asyncio.sleep(0.05)
+        heartbeat.cancel()
+
+
+def run_dispatcher(sock, worker_paths: list, route_by_prompt: bool = True, heartbeats=None, slot: Optional[int] = None) -> None:
+    """Process entry point used by the pre-fork master."""
+    asyncio.run(Dispatcher(worker_paths, route_by_prompt, heartbeats=heartbeats, slot=slot).serve(sock))
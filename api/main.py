@@ -6,22 +6,70 @@ This API provides endpoints to:
 - Generate guidance and constraints
 - Produce curated prompts for safe code generation
 """
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from orchestrator.models import PromptRequest, AnalysisResponse
-from orchestrator.pipeline import analyze_prompt
+from orchestrator.models import (
+    PromptRequest, AnalysisResponse, JobRequest, JobStatusResponse, DiffRequest, DiffResponse
+)
+from orchestrator.pipeline import run_analysis
+from orchestrator.records import select_fields
+from orchestrator.scoring_profiles import ScoringPlan, get_plan
+from orchestrator.cache import LRUCache, AnalysisStore, analysis_cache_key, analysis_id, cache_size_from_env
+from orchestrator.jobs import JobManager
+from orchestrator.cancellation import AnalysisCancelled, CancellationToken
+from orchestrator.live import DEFAULT_DEBOUNCE_MS, MAX_DEBOUNCE_MS, LiveSession
+from orchestrator.delta import DIFF_FIELDS, covers_diff, diff_analyses
+from orchestrator.feature_store import FeatureStore
+from orchestrator.similarity import SimilarityIndex, index_size_from_env
+from orchestrator.warmup import WarmupState, corpus_from_env, start_warmup
+
+# Progress of the startup warm-up (reported by /ready)
+warmup_state = WarmupState()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the job queue, open the feature store and warm up in the background
+    at startup; /ready succeeds once warm-up is done. Stop the queue and close
+    the feature store at shutdown.
+
+    Both are created here, in the process that serves requests: a pre-fork
+    master warming up never holds their files, thread pool or recovered jobs
+    for the workers to inherit.
+    """
+    global feature_store, job_manager
+    job_manager = JobManager.from_env()
+    feature_store = FeatureStore.from_env()
+    start_warmup(warmup_state, warm_up_prompt, corpus_from_env())
+    try:
+        yield
+    finally:
+        job_manager.shutdown()
+        job_manager = None
+        if feature_store is not None:
+            feature_store.close()
+            feature_store = None
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SpecAlign",
     description="Orchestrates security analysis and prompt curation for AI-assisted development",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for browser access
@@ -43,7 +91,11 @@ async def root():
         "status": "operational",
         "endpoints": {
             "analyze": "/api/analyze - Analyze a developer prompt for security issues",
-            "health": "/health - Health check endpoint"
+            "diff": "/api/analyze/diff - Compare the findings of a revised prompt against a base prompt",
+            "jobs": "/api/jobs - Queue long or bulk analyses and poll for results",
+            "live": "/ws/analyze - WebSocket for live analysis while editing",
+            "health": "/health - Health check endpoint",
+            "ready": "/ready - Readiness check (succeeds once warm-up has finished)"
         }
     }
 
@@ -57,8 +109,142 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check: 200 once the startup warm-up has finished, 503 before
+    (or if it failed), with the warm-up progress in the body.
+    """
+    return JSONResponse(warmup_state.as_dict(), status_code=200 if warmup_state.ready else 503)
+
+
+FIELDS_QUERY = Query(None, description="Comma-separated response fields to return, e.g. risk_level,devspec_findings")
+PROFILE_QUERY = Query(None, description="Named field set: 'summary' or 'full'")
+SCORING_QUERY = Query(None, description="Scoring profile for spec_quality_score, e.g. a tenant's (see SCORING_PROFILE_DIR)")
+
+
+def resolve_fields(fields: Optional[str], profile: Optional[str]) -> Optional[frozenset]:
+    """Resolve the fields/profile query parameters, rejecting unknown names with 400."""
+    try:
+        return select_fields(fields, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def resolve_scoring(scoring_profile: Optional[str]) -> Optional[ScoringPlan]:
+    """Resolve the scoring_profile query parameter, rejecting unknown or invalid profiles with 400."""
+    if scoring_profile is None:
+        return None
+    try:
+        return get_plan(scoring_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Encoded response bodies keyed by prompt, options and rule digest (ANALYSIS_CACHE_SIZE=0 disables)
+response_cache = LRUCache(cache_size_from_env())
+# Recent analysis results by analysis ID (returned as X-Analysis-Id), used as diff bases
+analysis_store = AnalysisStore(cache_size_from_env())
+# Recent prompts for near-duplicate detection and rule output reuse (SIMILARITY_INDEX_SIZE=0 disables)
+similarity_index = SimilarityIndex(index_size_from_env())
+# Analyzed prompts and their features, for offline re-scoring (FEATURE_STORE_PATH; off when unset),
+# opened by the lifespan
+feature_store: Optional[FeatureStore] = None
+
+
+def analyze_to_json(
+    request: PromptRequest,
+    selected: Optional[frozenset],
+    call_claude_api: bool,
+    cancel: Optional[CancellationToken] = None,
+    scoring: Optional[ScoringPlan] = None
+) -> Response:
+    """
+    Run the analysis and return it as pre-encoded JSON bytes.
+    
+    The result is validated once and encoded straight to bytes, bypassing the
+    response_model re-validation and jsonable_encoder pass. Encoded bodies are
+    cached, so a repeated request is served as raw bytes. The X-Analysis-Id
+    header identifies the analysis for later diffs.
+    
+    When the prompt matches a recent one, X-Analysis-Reused-From names the
+    analysis whose rule output was reused (same text up to letter case and
+    newlines), or X-Analysis-Similar-To names a near-duplicate analysis.
+    
+    scoring is the request's scoring plan (default: the SCORING_PROFILE one).
+    """
+    if scoring is None:
+        scoring = get_plan()
+    key = analysis_cache_key(request.prompt, call_claude_api, request.compact_prompt, selected, scoring.digest)
+    body = response_cache.get(key)
+    cache_status = "hit"
+    if body is None:
+        result = run_analysis(
+            prompt=request.prompt,
+            call_claude_api=call_claude_api,
+            compact_prompt=request.compact_prompt,
+            fields=selected,
+            cancel=cancel,
+            similar=similarity_index,
+            scoring=scoring,
+            features=feature_store
+        )
+        body = result.to_json(selected)
+        response_cache.put(key, body)
+        analysis_store.put(result)
+        cache_status = "miss"
+    
+    headers = {"X-Analysis-Cache": cache_status, "X-Analysis-Id": analysis_id(request.prompt)}
+    if cache_status == "miss" and result.similarity is not None:
+        match = result.similarity
+        if match.reused:
+            headers["X-Analysis-Reused-From"] = match.analysis_id
+        else:
+            headers["X-Analysis-Similar-To"] = f"{match.analysis_id}; distance={match.distance}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def warm_up_prompt(prompt: str) -> None:
+    """Analyze a prompt as a default /api/analyze request would, filling the caches."""
+    analyze_to_json(PromptRequest(prompt=prompt), None, False)
+
+
+# How often a running analysis checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.05
+# Status recorded for requests abandoned by their client (nothing is sent)
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def analyze_until_disconnected(http_request: Request, *args, **kwargs) -> Response:
+    """
+    Run analyze_to_json in the threadpool, cancelling it if the client disconnects.
+    
+    A disconnect (e.g. the UI aborting a superseded request) cancels the
+    request's token, which kills the rule script and skips the remaining stages.
+    """
+    cancel = CancellationToken()
+    task = asyncio.ensure_future(run_in_threadpool(analyze_to_json, *args, cancel=cancel, **kwargs))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            cancel.cancel("client disconnected")
+            try:
+                await task
+            except AnalysisCancelled:
+                pass
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+
 @app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_endpoint(request: PromptRequest):
+async def analyze_endpoint(
+    request: PromptRequest,
+    http_request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    profile: Optional[str] = PROFILE_QUERY,
+    scoring_profile: Optional[str] = SCORING_QUERY
+):
     """
     Analyze a developer prompt for security issues and generate guidance.
     
@@ -67,20 +253,25 @@ async def analyze_endpoint(request: PromptRequest):
     2. Generates additional guidance
     3. Produces a curated prompt with security constraints
     
+    Use ?fields=... or ?profile=summary for a lean response; stages that only
+    feed unrequested fields (e.g. the curated prompt) are skipped. If the client
+    disconnects before the analysis finishes, the analysis is cancelled.
+    
     Args:
         request: PromptRequest containing the prompt to analyze
+        http_request: The incoming HTTP request (watched for client disconnects)
+        fields: Optional comma-separated list of response fields
+        profile: Optional named field set
+        scoring_profile: Optional scoring profile name
         
     Returns:
-        AnalysisResponse with complete analysis results
+        AnalysisResponse with complete analysis results (or the selected fields)
     """
+    selected = resolve_fields(fields, profile)
+    scoring = resolve_scoring(scoring_profile)
     try:
-        # Run the analysis pipeline
-        result = analyze_prompt(
-            prompt=request.prompt,
-            call_claude_api=False  # For now, keep Claude stub disabled
-        )
-        
-        return result
+        # Run the analysis pipeline (Claude stub disabled for now)
+        return await analyze_until_disconnected(http_request, request, selected, False, scoring=scoring)
         
     except FileNotFoundError as e:
         raise HTTPException(
@@ -95,7 +286,13 @@ async def analyze_endpoint(request: PromptRequest):
 
 
 @app.post("/api/analyze-with-claude", response_model=AnalysisResponse)
-async def analyze_with_claude_endpoint(request: PromptRequest):
+async def analyze_with_claude_endpoint(
+    request: PromptRequest,
+    http_request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    profile: Optional[str] = PROFILE_QUERY,
+    scoring_profile: Optional[str] = SCORING_QUERY
+):
     """
     Analyze a prompt and include Claude stub output.
     
@@ -104,26 +301,251 @@ async def analyze_with_claude_endpoint(request: PromptRequest):
     
     Args:
         request: PromptRequest containing the prompt to analyze
+        http_request: The incoming HTTP request (watched for client disconnects)
+        fields: Optional comma-separated list of response fields
+        profile: Optional named field set
+        scoring_profile: Optional scoring profile name
         
     Returns:
-        AnalysisResponse including claude_output field
+        AnalysisResponse including claude_output field (or the selected fields)
     """
+    selected = resolve_fields(fields, profile)
+    scoring = resolve_scoring(scoring_profile)
     try:
         # Run the analysis pipeline with Claude enabled
-        result = analyze_prompt(
-            prompt=request.prompt,
-            call_claude_api=True  # Enable Claude stub
-        )
+        return await analyze_until_disconnected(http_request, request, selected, True, scoring=scoring)
         
-        return result
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+
+def analysis_for_diff(prompt: str):
+    """
+    Return (analysis ID, result) for prompt, reusing a stored analysis when it
+    has the fields a diff needs and running one (diff stages only) otherwise.
+    """
+    result_id = analysis_id(prompt)
+    result = analysis_store.get(result_id)
+    if result is None or not covers_diff(result):
+        result = run_analysis(prompt, fields=DIFF_FIELDS, similar=similarity_index)
+        analysis_store.put(result)
+    return result_id, result
+
+
+@app.post("/api/analyze/diff", response_model=DiffResponse)
+async def analyze_diff_endpoint(request: DiffRequest, response: Response):
+    """
+    Compare a revised prompt against a base prompt.
+    
+    The base is given as a prompt or as the analysis ID of an earlier analysis
+    (X-Analysis-Id of /api/analyze, or analysis_id of a previous diff). Stored
+    analyses are reused, an unchanged prompt is not analyzed again, and only the
+    stages behind findings, risk level and score are run. X-Analysis-Id
+    carries the revised prompt's analysis ID, like /api/analyze.
+    
+    Args:
+        request: DiffRequest with the revised prompt and the base
+        response: The outgoing response (for the X-Analysis-Id header)
         
+    Returns:
+        DiffResponse with added, removed and unchanged findings and the
+        risk-level and score change
+    """
+    base_prompt = request.base_prompt
+    if base_prompt is None:
+        stored = analysis_store.get(request.base_analysis_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f"Analysis not found (it may have expired): {request.base_analysis_id}")
+        base_prompt = stored.original_prompt
+    
+    try:
+        if base_prompt == request.prompt:
+            base = revised = await run_in_threadpool(analysis_for_diff, request.prompt)
+        else:
+            base, revised = await asyncio.gather(
+                run_in_threadpool(analysis_for_diff, base_prompt),
+                run_in_threadpool(analysis_for_diff, request.prompt)
+            )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
+    
+    (base_id, base_result), (revised_id, revised_result) = base, revised
+    response.headers["X-Analysis-Id"] = revised_id
+    return {
+        "analysis_id": revised_id,
+        "base_analysis_id": base_id,
+        **diff_analyses(base_result, revised_result).as_dict(),
+    }
+
+
+@app.websocket("/ws/analyze")
+async def live_analysis_endpoint(
+    websocket: WebSocket,
+    debounce_ms: int = Query(DEFAULT_DEBOUNCE_MS, ge=0, le=MAX_DEBOUNCE_MS)
+):
+    """
+    Live analysis while the user types.
+    
+    The client sends {"type": "replace", "prompt": ...} or {"type": "edit",
+    "start": ..., "end": ..., "text": ...} messages. Once no edit has arrived for
+    debounce_ms, the latest text is analyzed and the server sends an "analysis"
+    message with the risk level, score, and the findings added or removed since
+    the previous analysis message. A new edit cancels an analysis in flight.
+    """
+    await websocket.accept()
+    session = LiveSession()
+    pending = None
+    
+    async def analyze_when_idle():
+        await asyncio.sleep(debounce_ms / 1000)
+        try:
+            analysis = await run_in_threadpool(session.analyze)
+        except AnalysisCancelled:
+            return
+        except Exception as e:
+            await websocket.send_json({"type": "error", "detail": f"Analysis failed: {str(e)}"})
+            return
+        await websocket.send_json(session.update_message(analysis))
+    
+    try:
+        while True:
+            raw_message = await websocket.receive_text()
+            try:
+                session.apply(json.loads(raw_message))
+            except (AttributeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            if pending is not None:
+                pending.cancel()
+                session.cancel()
+            pending = asyncio.create_task(analyze_when_idle())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if pending is not None:
+            pending.cancel()
+        session.cancel()
+
+
+# Queue of asynchronous analysis jobs (JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_STORE_PATH),
+# started by the lifespan
+job_manager: Optional[JobManager] = None
+
+# Longest a status request may wait for a job to finish
+MAX_JOB_WAIT_SECONDS = 60
+# Interval between keep-alive comments on an idle event stream
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+
+def job_response(body: bytes, status_code: int = 200) -> Response:
+    return Response(content=body, media_type="application/json", status_code=status_code)
+
+
+@app.post("/api/jobs", status_code=202, response_model=JobStatusResponse)
+async def submit_job_endpoint(
+    request: JobRequest,
+    fields: Optional[str] = FIELDS_QUERY,
+    profile: Optional[str] = PROFILE_QUERY,
+    scoring_profile: Optional[str] = SCORING_QUERY
+):
+    """
+    Queue an analysis of one prompt or a batch of prompts.
+    
+    Returns immediately with the job ID; poll GET /api/jobs/{job_id} (optionally
+    with ?wait=) or follow GET /api/jobs/{job_id}/events for progress and results.
+    
+    Args:
+        request: JobRequest with a prompt or a list of prompts
+        fields: Optional comma-separated list of response fields for each result
+        profile: Optional named field set for each result
+        scoring_profile: Optional scoring profile name for each result
+        
+    Returns:
+        JobStatusResponse for the queued job (HTTP 202)
+    """
+    selected = resolve_fields(fields, profile)
+    resolve_scoring(scoring_profile)
+    job = job_manager.submit(
+        request.prompt_list(), compact_prompt=request.compact_prompt, fields=selected, scoring_profile=scoring_profile
+    )
+    response = job_response(job_manager.view(job.id).body, status_code=202)
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return response
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def job_status_endpoint(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_JOB_WAIT_SECONDS, description="Seconds to wait for the job to finish (long-poll)")
+):
+    """
+    Get the status, stage progress and (once finished) the results of a job.
+    
+    Args:
+        job_id: ID returned by POST /api/jobs
+        wait: Hold the request up to this many seconds until the job finishes
+        
+    Returns:
+        JobStatusResponse
+    """
+    view = await run_in_threadpool(job_manager.view, job_id, wait)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job_response(view.body)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str):
+    """
+    Stream job progress as Server-Sent Events.
+    
+    A 'progress' event is sent whenever the job changes stage, and a final
+    'done' event carries the finished job status with its results.
+    """
+    view = job_manager.view(job_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    async def events():
+        current = view
+        while True:
+            if current.finished:
+                yield b"event: done\ndata: " + current.body + b"\n\n"
+                return
+            yield b"event: progress\ndata: " + current.body + b"\n\n"
+            version = current.version
+            while current.version == version and not current.finished:
+                current = await run_in_threadpool(job_manager.view, job_id, JOB_EVENTS_KEEPALIVE_SECONDS, version)
+                if current is None:
+                    return
+                if current.version == version:
+                    yield b": keep-alive\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancel a job. A queued job is cancelled at once; a running job stops before
+    its next pipeline stage. Cancelling a finished job has no effect.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job_response(job_manager.view(job_id).body)
 
 
 if __name__ == "__main__":
+    # Several workers (--workers N or API_WORKERS) run in pre-fork mode (api/prefork.py)
+    if "--workers" in sys.argv or os.getenv("API_WORKERS"):
+        from api.prefork import main as prefork_main
+        sys.exit(prefork_main())
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,400 @@
+"""
+Pre-fork serving mode for the API.
+
+A single uvicorn process serves requests on one core and, after a restart,
+warms up again before it is ready. In pre-fork mode a master process imports
+the application, warms it up (rules compiled, regex and serializer caches
+filled, response caches primed with the corpora) and binds the listening
+socket, then forks the workers. The workers inherit all of that warm state
+copy-on-write and accept connections on the shared socket; gc.freeze() before
+forking keeps the collector from writing to, and so copying, the shared objects.
+
+The master supervises the workers:
+- a worker that exits is replaced (with a growing delay while workers keep
+  dying right after they start);
+- a worker whose event loop has not ticked for WORKER_TIMEOUT seconds is
+  killed and replaced;
+- SIGHUP, or a change of the rule script, reloads: the master warms up again
+  with the new rules, forks a new generation of workers and gracefully stops
+  the old one, so no request is refused during the switch;
+- SIGTERM or SIGINT stops the workers gracefully, then the master exits.
+
+Caches, the analysis store, similarity index and jobs live in each worker,
+so a job or a diff base created on one worker is unknown to the others. With
+more than one worker a dispatcher process (api/dispatcher.py) therefore
+accepts the connections and sends requests for a job or an analysis ID to
+the worker that created it; the workers listen on private Unix sockets. With
+--route-by-prompt the dispatcher also sends each prompt to the same worker,
+so the per-worker caches stay hot; otherwise it picks the least loaded one.
+JOB_STORE_PATH and FEATURE_STORE_PATH cannot be used with more than one
+worker; the single worker opens those stores and starts the job queue itself
+after the fork, so the master's warm-up never touches them.
+
+Run with:
+    python -m api.prefork [--workers N] [--host HOST] [--port PORT] [--route-by-prompt]
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing import RawArray
+from typing import Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from api.dispatcher import job_id_prefix, run_dispatcher
+from orchestrator.bulk import default_workers
+from orchestrator.rules import load_rule_source
+from orchestrator.warmup import READY, corpus_from_env, warm_up, warmup_enabled
+
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+
+# Seconds without an event loop tick before a worker is killed
+DEFAULT_WORKER_TIMEOUT = 30.0
+# Seconds a stopping worker gets to finish its requests before it is killed
+DEFAULT_GRACEFUL_TIMEOUT = 30.0
+
+# Seconds between checks of the rule script for changes
+RULE_CHECK_INTERVAL = 2.0
+# A worker that dies sooner than this after it started counts as crashing
+CRASH_WINDOW = 5.0
+MAX_RESPAWN_DELAY = 30.0
+# Seconds between two rounds of supervision in the master
+SUPERVISE_INTERVAL = 0.2
+
+# Node of the dispatcher process in routing mode (workers are nodes 0..N-1)
+DISPATCHER = "dispatcher"
+
+
+def _float_from_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def workers_from_env() -> int:
+    """Worker count from API_WORKERS (default: the available CPU cores)."""
+    try:
+        return max(1, int(os.getenv("API_WORKERS", "")))
+    except ValueError:
+        return default_workers()
+
+
+def route_by_prompt_from_env() -> bool:
+    """True when ROUTE_BY_PROMPT is true/1/yes."""
+    return os.getenv("ROUTE_BY_PROMPT", "").lower() in ("true", "1", "yes")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class HeartbeatServer(uvicorn.Server):
+    """uvicorn server that reports every event loop tick to the master.
+
+    Built in the forked child, so the parent PID recorded here is the master's;
+    if it changes the master has died and the worker shuts down instead of
+    serving on as an orphan.
+    """
+
+    def __init__(self, config: uvicorn.Config, heartbeats, slot: Optional[int]):
+        super().__init__(config)
+        self.heartbeats = heartbeats
+        self.slot = slot
+        self.master_pid = os.getppid()
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.slot is not None:
+            self.heartbeats[self.slot] = time.monotonic()
+        if os.getppid() != self.master_pid:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+@dataclass
+class Worker:
+    pid: int
+    # Worker index, or DISPATCHER
+    node: object
+    generation: int
+    slot: Optional[int]
+    started: float
+    # monotonic() deadline after which a stopping worker is killed
+    kill_at: Optional[float] = None
+
+
+class Master:
+    """Forks and supervises the API workers."""
+
+    def __init__(
+        self,
+        app_module,
+        sock: socket.socket,
+        workers: int,
+        worker_timeout: float = DEFAULT_WORKER_TIMEOUT,
+        graceful_timeout: float = DEFAULT_GRACEFUL_TIMEOUT,
+        log_level: str = "info",
+        route_by_prompt: bool = False
+    ):
+        self.app_module = app_module
+        self.sock = sock
+        self.workers = workers
+        self.worker_timeout = worker_timeout
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.route_by_prompt = route_by_prompt
+        # Several workers cannot share jobs and diff bases, so the dispatcher places requests for them
+        self.dispatch = route_by_prompt or workers > 1
+        self.nodes = list(range(workers)) + ([DISPATCHER] if self.dispatch else [])
+        # Listening Unix sockets of the workers behind the dispatcher
+        self.socket_dir: Optional[str] = None
+        self.worker_socks: list = []
+        self.children: dict[int, Worker] = {}
+        self.generation = 0
+        # Heartbeat slots (monotonic time of the last tick), written by the workers;
+        # room for a draining generation next to the current one
+        self.heartbeats = RawArray("d", 4 * len(self.nodes))
+        self.free_slots = list(range(4 * len(self.nodes)))
+        self.rule_digest: Optional[str] = None
+        self.next_rule_check = 0.0
+        self.crashes = 0
+        self.next_spawn = 0.0
+        self.reload_requested = False
+        self.stopping = False
+
+    def log(self, message: str) -> None:
+        print(f"[prefork {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+    def warm(self) -> bool:
+        """Warm up the application in the master; False if warm-up failed."""
+        state = self.app_module.warmup_state
+        self.rule_digest = load_rule_source().digest
+        if warmup_enabled():
+            warm_up(state, self.app_module.warm_up_prompt, corpus_from_env())
+        else:
+            state._set(status=READY)
+        gc.collect()
+        gc.freeze()
+        return state.ready
+
+    def bind_worker_sockets(self) -> None:
+        """One private listening socket per worker, kept across worker restarts."""
+        self.socket_dir = tempfile.mkdtemp(prefix="ai-safety-orchestrator-workers-")
+        for node in range(self.workers):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(os.path.join(self.socket_dir, f"worker-{node}.sock"))
+            sock.listen(2048)
+            self.worker_socks.append(sock)
+
+    def spawn(self, node) -> None:
+        slot = self.free_slots.pop() if self.free_slots else None
+        if slot is not None:
+            # Startup counts against the timeout from here
+            self.heartbeats[slot] = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                for signum in (signal.SIGTERM, signal.SIGINT):
+                    signal.signal(signum, signal.SIG_DFL)
+                # Reloads are the master's business
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+                if node == DISPATCHER:
+                    run_dispatcher(
+                        self.sock, [sock.getsockname() for sock in self.worker_socks],
+                        self.route_by_prompt, self.heartbeats, slot
+                    )
+                else:
+                    self.run_worker(node, slot)
+                status = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        self.children[pid] = Worker(pid, node, self.generation, slot, time.monotonic())
+
+    def run_worker(self, node: int, slot: Optional[int]) -> None:
+        if self.dispatch:
+            # Job IDs name their worker for the dispatcher (see job_node)
+            os.environ["JOB_ID_PREFIX"] = job_id_prefix(node)
+        config = uvicorn.Config(
+            self.app_module.app,
+            log_level=self.log_level,
+            timeout_graceful_shutdown=self.graceful_timeout
+        )
+        sock = self.worker_socks[node] if self.dispatch else self.sock
+        HeartbeatServer(config, self.heartbeats, slot).run(sockets=[sock])
+
+    def current(self) -> list:
+        return [w for w in self.children.values() if w.generation == self.generation and w.kill_at is None]
+
+    def stop_worker(self, worker: Worker, signum: int = signal.SIGTERM) -> None:
+        if worker.kill_at is None:
+            worker.kill_at = time.monotonic() + self.graceful_timeout + 5
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.children.pop(pid, None)
+            if worker is None:
+                continue
+            if worker.slot is not None:
+                self.free_slots.append(worker.slot)
+            if worker.kill_at is not None or self.stopping:
+                continue
+            uptime = time.monotonic() - worker.started
+            self.log(f"worker {pid} exited with status {os.waitstatus_to_exitcode(status)} after {uptime:.1f}s")
+            if uptime < CRASH_WINDOW:
+                self.crashes += 1
+                self.next_spawn = time.monotonic() + min(MAX_RESPAWN_DELAY, 0.5 * 2 ** (self.crashes - 1))
+            else:
+                self.crashes = 0
+
+    def check_workers(self) -> None:
+        now = time.monotonic()
+        for worker in list(self.children.values()):
+            if worker.kill_at is not None:
+                if now > worker.kill_at:
+                    self.log(f"worker {worker.pid} did not stop in time; killing it")
+                    worker.kill_at = float("inf")
+                    self.stop_worker(worker, signal.SIGKILL)
+            elif worker.slot is not None and now - self.heartbeats[worker.slot] > self.worker_timeout:
+                self.log(f"worker {worker.pid} unresponsive for {self.worker_timeout:.0f}s; killing it")
+                worker.kill_at = float("inf")
+                self.stop_worker(worker, signal.SIGKILL)
+        running = {worker.node for worker in self.current()}
+        if now >= self.next_spawn and not self.stopping:
+            for node in self.nodes:
+                if node not in running:
+                    self.spawn(node)
+
+    def rules_changed(self) -> bool:
+        now = time.monotonic()
+        if now < self.next_rule_check:
+            return False
+        self.next_rule_check = now + RULE_CHECK_INTERVAL
+        try:
+            return load_rule_source().digest != self.rule_digest
+        except OSError:
+            return False
+
+    def reload(self) -> None:
+        """Warm up again and replace every worker with one forked from the new state."""
+        self.reload_requested = False
+        self.log("reloading")
+        gc.unfreeze()
+        if not self.warm():
+            self.log("warm-up failed; keeping the current workers")
+            return
+        old = self.current()
+        self.generation += 1
+        self.crashes = 0
+        self.next_spawn = 0.0
+        for node in self.nodes:
+            self.spawn(node)
+        for worker in old:
+            self.stop_worker(worker)
+
+    def _request_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+
+    def _request_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> int:
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        if not self.warm():
+            self.log("warm-up failed; workers will report not ready")
+        if self.dispatch:
+            self.bind_worker_sockets()
+        routing = ", routing by prompt" if self.route_by_prompt else ", dispatching" if self.dispatch else ""
+        self.log(f"serving on {self.sock.getsockname()} with {self.workers} workers{routing}")
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested or self.rules_changed():
+                self.reload()
+            self.check_workers()
+            time.sleep(SUPERVISE_INTERVAL)
+        return self.shutdown()
+
+    def shutdown(self) -> int:
+        self.log("stopping workers")
+        for worker in self.children.values():
+            self.stop_worker(worker)
+        while self.children:
+            self.reap()
+            self.check_workers()
+            time.sleep(SUPERVISE_INTERVAL)
+        self.sock.close()
+        for sock in self.worker_socks:
+            sock.close()
+        if self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+        return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m api.prefork", description="Serve the API with pre-forked workers")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: API_WORKERS or the CPU cores)")
+    parser.add_argument("--timeout", type=float, default=_float_from_env("WORKER_TIMEOUT", DEFAULT_WORKER_TIMEOUT),
+                        help="Seconds without a heartbeat before a worker is killed")
+    parser.add_argument("--graceful-timeout", type=float, default=_float_from_env("GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT),
+                        help="Seconds a stopping worker gets to finish its requests")
+    parser.add_argument("--route-by-prompt", action="store_true", default=route_by_prompt_from_env(),
+                        help="Send each prompt to the same worker through a dispatcher (ROUTE_BY_PROMPT)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    workers = args.workers if args.workers is not None else workers_from_env()
+    if workers < 1:
+        parser.error("--workers must be at least 1")
+    for name in ("JOB_STORE_PATH", "FEATURE_STORE_PATH"):
+        if workers > 1 and os.getenv(name):
+            print(f"error: {name} cannot be shared by several workers", file=sys.stderr)
+            return 1
+    try:
+        sock = bind_socket(args.host, args.port)
+    except OSError as e:
+        print(f"error: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+
+    from api import main as app_module
+    master = Master(app_module, sock, workers, args.timeout, args.graceful_timeout, args.log_level, args.route_by_prompt)
+    return master.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Ask the resident rule-check daemon to check a prompt file.
+
+Usage: python3 -I -S daemon_client.py SOCKET SCRIPT PROMPT_FILE LOCALE
+
+Prints the rule script's output and exits with its status. Exits with 75
+without printing anything when the daemon cannot answer (not running, timed
+out, or asking for the script to be run), so the caller runs the script itself.
+Standard library only; -I -S keeps interpreter startup short.
+"""
+import os
+import socket
+import sys
+
+FALLBACK = 75
+TIMEOUT_SECONDS = 5.0
+
+
+def main(argv):
+    if len(argv) != 5:
+        return FALLBACK
+    socket_path, script, prompt_file, locale = argv[1:]
+    try:
+        with open(prompt_file, "rb") as f:
+            data = f.read()
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(TIMEOUT_SECONDS)
+        client.connect(socket_path)
+        header = os.path.abspath(script).encode("utf-8", "surrogateescape") + b"\n" + locale.encode("utf-8", "surrogateescape") + b"\n"
+        client.sendall(header + data)
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        client.close()
+    except (OSError, ValueError):
+        return FALLBACK
+
+    status, _, output = b"".join(chunks).partition(b"\n")
+    if not status.isdigit():
+        return FALLBACK
+    sys.stdout.buffer.write(output)
+    sys.stdout.buffer.flush()
+    return int(status)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
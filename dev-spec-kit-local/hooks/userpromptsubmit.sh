@@ -2,11 +2,50 @@
 # UserPromptSubmit hook handler for security check
 # This script is called by hooks.json before Claude processes a user prompt.
 # It runs security-check.sh and prints warnings if any risks are detected.
+#
+# If the rule-check daemon is running (python -m orchestrator.daemon), the check
+# is answered by it instead of starting the script: through socat when it is
+# installed (a few milliseconds), otherwise through daemon_client.py. When the
+# daemon cannot answer, the script is run as before. Set PROMPT_CHECK_PYTHON to
+# an interpreter path to skip version-manager shims for the Python client.
 
 SCRIPT_DIR="$(dirname "$0")/../scripts"
 SECURITY_CHECK="$SCRIPT_DIR/security-check.sh"
 PROMPT_FILE="$1"
+CHECK_PYTHON="${PROMPT_CHECK_PYTHON:-python3}"
+CHECK_SOCKET="${PROMPT_CHECK_SOCKET:-${XDG_RUNTIME_DIR:-/tmp}/ai-safety-orchestrator-$UID.sock}"
+# Status meaning "the daemon could not answer, run the script"
+FALLBACK=75
+
+# Ask the daemon; prints the script's output and returns its exit status, or
+# returns FALLBACK without printing anything
+check_with_daemon() {
+  local script="$SECURITY_CHECK" locale="${LC_ALL:-${LC_CTYPE:-${LANG:-}}}" response status
+  [[ "$script" == /* ]] || script="$PWD/$script"
+
+  if command -v socat >/dev/null 2>&1; then
+    response=$({ printf '%s\n%s\n' "$script" "$locale"; cat "$PROMPT_FILE"; } \
+      | socat -t5 - "UNIX-CONNECT:$CHECK_SOCKET" 2>/dev/null) || return $FALLBACK
+    status="${response%%$'\n'*}"
+    case "$status" in
+      ''|*[!0-9]*) return $FALLBACK ;;
+    esac
+    # The output always ends with one newline, which $(...) strips
+    printf '%s\n' "${response#*$'\n'}"
+    return "$status"
+  fi
+
+  command -v "$CHECK_PYTHON" >/dev/null 2>&1 || return $FALLBACK
+  "$CHECK_PYTHON" -I -S "$(dirname "$0")/daemon_client.py" "$CHECK_SOCKET" "$script" "$PROMPT_FILE" "$locale"
+}
 
 if [ -f "$SECURITY_CHECK" ]; then
+  if [ -S "$CHECK_SOCKET" ] && [ -f "$PROMPT_FILE" ]; then
+    check_with_daemon
+    STATUS=$?
+    if [ "$STATUS" -ne $FALLBACK ]; then
+      exit "$STATUS"
+    fi
+  fi
   bash "$SECURITY_CHECK" "$PROMPT_FILE"
 fi
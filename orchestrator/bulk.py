@@ -0,0 +1,296 @@
+"""
+Bulk analysis of many prompts across a process pool.
+
+Prompts come from files, directories (searched recursively for PROMPT_SUFFIXES),
+glob patterns, or JSONL streams. Each result is written as one JSON line, in
+completion order or input order, while throughput and ETA are reported on stderr.
+"""
+import glob
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from pydantic_core import to_json
+
+from .records import RESPONSE_PROFILES
+
+
+# File extensions picked up when a directory is given
+PROMPT_SUFFIXES = (".txt", ".md")
+
+# Response fields written per prompt unless others are requested
+DEFAULT_BULK_FIELDS = RESPONSE_PROFILES["summary"]
+
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class PromptSource(NamedTuple):
+    """One prompt to analyze: read from path, or given inline (JSONL)."""
+    index: int
+    name: str
+    path: Optional[str] = None
+    prompt: Optional[str] = None
+
+
+class BulkResult(NamedTuple):
+    """Outcome of one prompt, with its result already encoded as a JSON line."""
+    index: int
+    line: bytes
+    risk_level: Optional[str]
+    failed: bool
+    # The encoded analysis result alone (None if the analysis failed)
+    result: Optional[bytes] = None
+
+
+class BulkSummary(NamedTuple):
+    """Totals for a bulk run."""
+    total: int
+    failed: int
+    risk_counts: dict
+    elapsed: float
+
+
+def default_workers() -> int:
+    """Number of CPU cores available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def expand_paths(inputs: Iterable[str]) -> Iterator[str]:
+    """
+    Expand files, directories and glob patterns into prompt file paths.
+
+    Directories are walked recursively for PROMPT_SUFFIXES files, in sorted
+    order; explicitly named files are used whatever their extension.
+
+    Raises:
+        FileNotFoundError: If an input is neither a path nor a matching glob
+    """
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(PROMPT_SUFFIXES):
+                        yield os.path.join(root, name)
+        elif os.path.exists(entry):
+            yield entry
+        elif glob.has_magic(entry):
+            matches = sorted(path for path in glob.glob(entry, recursive=True) if os.path.isfile(path))
+            if not matches:
+                raise FileNotFoundError(f"No files match '{entry}'")
+            yield from matches
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{entry}'")
+
+
+def read_jsonl(stream: TextIO, name: str) -> Iterator[tuple]:
+    """
+    Read prompts from a JSONL stream.
+
+    Each line is either a JSON string or an object with a "prompt" key and an
+    optional "id" used as the source name. Blank lines are skipped.
+
+    Yields:
+        (source name, prompt) pairs
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no prompt
+    """
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{name}:{number}: invalid JSON ({e.msg})") from None
+        if isinstance(record, dict) and isinstance(record.get("prompt"), str):
+            yield str(record.get("id", f"{name}:{number}")), record["prompt"]
+        elif isinstance(record, str):
+            yield f"{name}:{number}", record
+        else:
+            raise ValueError(f"{name}:{number}: expected a string or an object with a 'prompt' string")
+
+
+def iter_sources(paths: Iterable[str] = (), jsonl: Iterable[str] = ()) -> Iterator[PromptSource]:
+    """
+    Enumerate prompts from paths/globs and JSONL files ("-" for stdin).
+
+    Args:
+        paths: Files, directories or glob patterns
+        jsonl: JSONL files of prompts
+
+    Yields:
+        PromptSource for each prompt, numbered in input order
+    """
+    index = 0
+    for path in expand_paths(paths):
+        yield PromptSource(index, path, path=path)
+        index += 1
+    for jsonl_path in jsonl:
+        if jsonl_path == "-":
+            records = read_jsonl(sys.stdin, "<stdin>")
+        else:
+            records = _read_jsonl_file(jsonl_path)
+        for name, prompt in records:
+            yield PromptSource(index, name, prompt=prompt)
+            index += 1
+
+
+def _read_jsonl_file(path: str) -> Iterator[tuple]:
+    with open(path, "r", encoding="utf-8") as f:
+        yield from read_jsonl(f, path)
+
+
+def analyze_source(source: PromptSource, fields: Optional[frozenset] = DEFAULT_BULK_FIELDS) -> BulkResult:
+    """
+    Analyze one prompt and encode it as a JSON line.
+
+    Errors (an unreadable file, a failing analysis) are reported in the line's
+    "error" field instead of being raised, so one bad input doesn't stop a run.
+    """
+    from .pipeline import run_analysis
+
+    started = time.perf_counter()
+    header = {"index": source.index, "source": source.name}
+    try:
+        if source.prompt is None:
+            with open(source.path, "r", encoding="utf-8") as f:
+                prompt = f.read()
+        else:
+            prompt = source.prompt
+        result = run_analysis(prompt, fields=fields)
+    except Exception as e:
+        header["error"] = f"{type(e).__name__}: {e}"
+        return BulkResult(source.index, to_json(header) + b"\n", None, True)
+
+    header["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    header["risk_level"] = result.risk_level
+    body = result.to_json(fields)
+    # Splice the encoded result into the header object
+    line = to_json(header)[:-1] + b',"result":' + body + b"}\n"
+    return BulkResult(source.index, line, result.risk_level, False, body)
+
+
+def _analyze_with_fields(args: tuple) -> BulkResult:
+    return analyze_source(*args)
+
+
+def analyze_parallel(
+    sources: Iterable[PromptSource],
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    fields: Optional[frozenset] = DEFAULT_BULK_FIELDS
+) -> Iterator[BulkResult]:
+    """
+    Analyze prompts across a process pool.
+
+    Args:
+        sources: Prompts to analyze (consumed lazily)
+        workers: Worker processes (default: available cores); 1 runs in-process
+        ordered: Yield results in input order instead of completion order
+        fields: Response fields to include in each result (None: full response)
+
+    Yields:
+        BulkResult per source
+    """
+    workers = workers or default_workers()
+    tasks = ((source, fields) for source in sources)
+    if workers == 1:
+        yield from map(_analyze_with_fields, tasks)
+        return
+
+    pool = Pool(workers)
+    try:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        yield from mapper(_analyze_with_fields, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class ProgressReporter:
+    """Prints processed count, throughput and ETA to a stream at most once per interval."""
+
+    def __init__(self, total: Optional[int], stream: TextIO = sys.stderr, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, done: int) -> None:
+        self.done = done
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._write(now)
+
+    def finish(self) -> None:
+        self._write(time.perf_counter())
+
+    def _write(self, now: float) -> None:
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        message = f"{self.done}"
+        if self.total is not None:
+            message += f"/{self.total}"
+        message += f" prompts  {rate:.1f}/s  elapsed {elapsed:.0f}s"
+        if self.total is not None and rate > 0 and self.done < self.total:
+            message += f"  ETA {(self.total - self.done) / rate:.0f}s"
+        print(message, file=self.stream, flush=True)
+
+
+def run_bulk(
+    sources: Iterable[PromptSource],
+    output,
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    fields: Optional[frozenset] = DEFAULT_BULK_FIELDS,
+    total: Optional[int] = None,
+    progress: Optional[ProgressReporter] = None
+) -> BulkSummary:
+    """
+    Analyze prompts in parallel and write one JSON line per prompt.
+
+    Args:
+        sources: Prompts to analyze (consumed lazily)
+        output: Binary stream the JSON lines are written to
+        workers: Worker processes (default: available cores); 1 runs in-process
+        ordered: Write results in input order instead of completion order
+        fields: Response fields to include in each result (None: full response)
+        total: Number of sources, if known (for the ETA)
+        progress: Optional progress reporter
+
+    Returns:
+        BulkSummary with per-risk-level counts
+    """
+    started = time.perf_counter()
+    risk_counts: dict = {}
+    failed = 0
+    done = 0
+
+    results = analyze_parallel(sources, workers, ordered, fields)
+    try:
+        for result in results:
+            output.write(result.line)
+            output.flush()
+            done += 1
+            if result.failed:
+                failed += 1
+            else:
+                risk_counts[result.risk_level] = risk_counts.get(result.risk_level, 0) + 1
+            if progress is not None:
+                progress.update(done)
+    finally:
+        results.close()
+
+    if progress is not None:
+        progress.finish()
+    return BulkSummary(done, failed, risk_counts, time.perf_counter() - started)
@@ -0,0 +1,117 @@
+"""
+In-memory result caching for the analysis pipeline.
+
+Cache keys include the rule script digest and the USE_SPEC_KIT mode, so a cached
+result is never served after the rules or the pipeline configuration change.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .rules import load_rule_source
+
+
+# Default number of cached responses (set ANALYSIS_CACHE_SIZE=0 to disable caching)
+DEFAULT_CACHE_SIZE = 256
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used cache."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        """Store a value, evicting the least recently used entries beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def prompt_digest(prompt: str) -> str:
+    """SHA-256 hex digest of a prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def analysis_cache_key(prompt: str, *options) -> tuple:
+    """
+    Build a cache key for an analysis of prompt under the given options.
+
+    The key also covers the rule script digest and the USE_SPEC_KIT mode,
+    which change the analysis output without changing the request.
+
+    Args:
+        prompt: The raw prompt
+        options: Any request options that affect the output (hashable)
+
+    Returns:
+        Hashable cache key
+    """
+    from .spec_kit_adapter import should_use_spec_kit
+    return (prompt_digest(prompt), load_rule_source().digest, should_use_spec_kit()) + tuple(options)
+
+
+def analysis_id(prompt: str) -> str:
+    """
+    Stable ID for the analysis of prompt under the current rules and mode.
+
+    The same prompt gets the same ID until the rule script or USE_SPEC_KIT changes.
+    """
+    key = analysis_cache_key(prompt)
+    return hashlib.sha256("\0".join(map(str, key)).encode("utf-8")).hexdigest()[:32]
+
+
+class AnalysisStore:
+    """Recent analysis results by analysis ID, for requests that refer back to them."""
+
+    def __init__(self, max_entries: int):
+        self._results = LRUCache(max_entries)
+
+    def put(self, result) -> str:
+        """Store an AnalysisResult and return its analysis ID."""
+        result_id = analysis_id(result.original_prompt)
+        self._results.put(result_id, result)
+        return result_id
+
+    def get(self, result_id: str):
+        """The stored AnalysisResult for an ID, or None if unknown or evicted."""
+        return self._results.get(result_id)
+
+
+def cache_size_from_env() -> int:
+    """Configured cache size from ANALYSIS_CACHE_SIZE (default DEFAULT_CACHE_SIZE)."""
+    try:
+        return max(0, int(os.getenv("ANALYSIS_CACHE_SIZE", DEFAULT_CACHE_SIZE)))
+    except ValueError:
+        return DEFAULT_CACHE_SIZE
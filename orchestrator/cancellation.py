@@ -0,0 +1,66 @@
+"""
+Request-scoped cancellation for the analysis pipeline.
+
+A CancellationToken is passed down through run_analysis. Cancelling it kills any
+subprocess registered with the token, and the pipeline skips its remaining stages
+by raising AnalysisCancelled at the next stage boundary.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class AnalysisCancelled(Exception):
+    """Raised when an analysis is abandoned because its token was cancelled."""
+
+
+class CancellationToken:
+    """A thread-safe, one-shot cancellation flag with cancel callbacks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancel the token and run its registered callbacks (only the first call has an effect)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]):
+        """
+        Run callback if the token is cancelled while the block is running
+        (immediately, if it already is).
+        """
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            callback()
+        try:
+            yield self
+        finally:
+            if registered:
+                with self._lock:
+                    if callback in self._callbacks:
+                        self._callbacks.remove(callback)
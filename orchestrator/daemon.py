@@ -0,0 +1,167 @@
+"""
+Resident rule-check daemon for the prompt-submit hook.
+
+The daemon listens on a Unix domain socket and answers rule checks with the
+compiled rule engine (see rule_engine.py), so the hook does not start bash and
+a grep per rule for every prompt. Compiled rules are kept per script and
+rebuilt when a script changes.
+
+Protocol (one request per connection):
+    request:  <absolute rule script path>\\n<caller's LC_ALL, else LC_CTYPE, else LANG>\\n
+              <prompt bytes>   (then shut down writing)
+    response: <exit code>\\n<output exactly as the script prints it>
+          or: !<reason>\\n   when the caller must run the script itself
+              (a script or input the engine does not reproduce exactly)
+
+Run it with:
+    python -m orchestrator.daemon [--socket PATH]
+"""
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from typing import Optional
+
+from .rule_engine import RuleCompileError, is_byte_locale, load_rule_engine
+from .rules import get_rule_script_path
+
+
+# Largest prompt the daemon accepts; bigger prompts go to the script
+MAX_PROMPT_BYTES = 4 * 1024 * 1024
+
+
+def default_socket_path() -> str:
+    """PROMPT_CHECK_SOCKET, or a per-user socket in XDG_RUNTIME_DIR (or /tmp)."""
+    path = os.getenv("PROMPT_CHECK_SOCKET")
+    if path:
+        return path
+    return os.path.join(os.getenv("XDG_RUNTIME_DIR") or "/tmp", f"ai-safety-orchestrator-{os.getuid()}.sock")
+
+
+def check_prompt(script_path: str, data: bytes, locale: str = "") -> bytes:
+    """
+    Answer one rule check.
+
+    Args:
+        script_path: Rule script the caller would run
+        data: Prompt bytes (the content the script would read)
+        locale: Locale the script would run under (the caller's environment)
+
+    Returns:
+        The encoded response (see the module docstring)
+    """
+    if not os.path.isabs(script_path) or not os.path.isfile(script_path):
+        return b"!unknown rule script\n"
+    if len(data) > MAX_PROMPT_BYTES:
+        return b"!prompt too large\n"
+    try:
+        engine = load_rule_engine(os.path.realpath(script_path))
+    except RuleCompileError as e:
+        return f"!{e}\n".encode("utf-8", "replace")
+    result = engine.evaluate_bytes(data, is_byte_locale(locale))
+    if result is None:
+        return b"!input needs the script\n"
+    raw_output, _, exit_code = result
+    return f"{exit_code}\n{raw_output}".encode("utf-8")
+
+
+class _CheckHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        script_path = self.rfile.readline(4096).rstrip(b"\n").decode("utf-8", "surrogateescape")
+        locale = self.rfile.readline(256).rstrip(b"\n").decode("utf-8", "replace")
+        data = self.rfile.read(MAX_PROMPT_BYTES + 1)
+        try:
+            response = check_prompt(script_path, data, locale)
+        except Exception as e:
+            response = f"!{type(e).__name__}: {e}\n".encode("utf-8", "replace")
+        self.wfile.write(response)
+
+
+class CheckServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server answering rule checks."""
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        _remove_stale_socket(path)
+        # Only the owner may connect
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(path, _CheckHandler)
+        finally:
+            os.umask(old_umask)
+        self.path = path
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove a socket left by a dead daemon; refuse to replace a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def serve(path: Optional[str] = None, scripts: Optional[list] = None) -> None:
+    """
+    Compile the rule scripts and serve checks until SIGTERM or SIGINT.
+
+    Args:
+        path: Socket path (default: default_socket_path())
+        scripts: Rule scripts to compile up front (default: the active script)
+    """
+    path = path or default_socket_path()
+    for script in scripts or [get_rule_script_path()]:
+        try:
+            engine = load_rule_engine(os.path.realpath(script))
+            print(f"Compiled {len(engine.patterns)} patterns from {script}", file=sys.stderr)
+        except RuleCompileError as e:
+            print(f"WARNING: {script} is not compiled ({e}); checks for it fall back to the script", file=sys.stderr)
+
+    server = CheckServer(path)
+    stop = threading.Event()
+
+    def shutdown(signum, frame) -> None:
+        if not stop.is_set():
+            stop.set()
+            threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    print(f"Listening on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m orchestrator.daemon", description="Resident rule-check daemon for the prompt hook")
+    parser.add_argument("--socket", default=None, help="Socket path (default: PROMPT_CHECK_SOCKET or $XDG_RUNTIME_DIR/ai-safety-orchestrator-UID.sock)")
+    parser.add_argument("--rules", action="append", default=None, metavar="SCRIPT", help="Rule script to compile at startup; may be repeated")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.socket, args.rules)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
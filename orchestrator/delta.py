@@ -0,0 +1,108 @@
+"""
+Differences between two analyses of a prompt.
+
+Findings are matched by (category, severity, code): each rule reports at most
+once per run, so a finding is either added, removed, or unchanged between runs.
+"""
+from typing import NamedTuple, Optional
+
+from .records import AnalysisResult, Finding
+
+
+# Response fields a diff needs from each side
+DIFF_FIELDS = frozenset({"devspec_findings", "risk_level", "spec_quality_score"})
+
+
+class FindingDelta(NamedTuple):
+    """Findings added, removed, and unchanged between two analyses (in report order)."""
+    added: list
+    removed: list
+    unchanged: list
+
+
+def finding_key(finding: Finding) -> tuple:
+    return (finding.category, finding.severity, finding.code)
+
+
+def diff_findings(before: list, after: list) -> FindingDelta:
+    """
+    Split two finding lists into added, removed and unchanged findings.
+
+    Args:
+        before: Findings of the earlier analysis
+        after: Findings of the later analysis
+
+    Returns:
+        FindingDelta; unchanged findings are taken from the later analysis
+    """
+    before_keys = {finding_key(f) for f in before}
+    after_keys = {finding_key(f) for f in after}
+    return FindingDelta(
+        added=[f for f in after if finding_key(f) not in before_keys],
+        removed=[f for f in before if finding_key(f) not in after_keys],
+        unchanged=[f for f in after if finding_key(f) in before_keys],
+    )
+
+
+class AnalysisDelta(NamedTuple):
+    """Finding, risk-level and score changes from one analysis to the next."""
+    findings: FindingDelta
+    risk_before: Optional[str]
+    risk_after: str
+    score_before: Optional[int]
+    score_after: Optional[int]
+
+    @property
+    def risk_changed(self) -> bool:
+        return self.risk_before != self.risk_after
+
+    @property
+    def score_change(self) -> Optional[int]:
+        if self.score_before is None or self.score_after is None:
+            return None
+        return self.score_after - self.score_before
+
+    def as_dict(self, full_unchanged: bool = True) -> dict:
+        """
+        Plain-data form of the delta.
+
+        Args:
+            full_unchanged: List unchanged findings in full (default) or by code only
+        """
+        unchanged = self.findings.unchanged
+        return {
+            "added": [f.as_dict() for f in self.findings.added],
+            "removed": [f.as_dict() for f in self.findings.removed],
+            "unchanged": [f.as_dict() for f in unchanged] if full_unchanged else [f.code for f in unchanged],
+            "risk_level_before": self.risk_before,
+            "risk_level_after": self.risk_after,
+            "risk_level_changed": self.risk_changed,
+            "score_before": self.score_before,
+            "score_after": self.score_after,
+            "score_change": self.score_change,
+        }
+
+
+def diff_analyses(before: Optional[AnalysisResult], after: AnalysisResult) -> AnalysisDelta:
+    """
+    Compare two analyses; with no earlier analysis every finding counts as added.
+
+    Args:
+        before: The earlier analysis (or None)
+        after: The later analysis
+
+    Returns:
+        AnalysisDelta
+    """
+    return AnalysisDelta(
+        findings=diff_findings(before.devspec_findings if before else [], after.devspec_findings),
+        risk_before=before.risk_level if before else None,
+        risk_after=after.risk_level,
+        score_before=before.spec_quality_score if before else None,
+        score_after=after.spec_quality_score,
+    )
+
+
+def covers_diff(result: AnalysisResult) -> bool:
+    """Whether an analysis has everything a diff needs (the spec-quality stage ran)."""
+    return result.spec_kit_structure is not None
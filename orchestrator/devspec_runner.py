@@ -3,65 +3,122 @@ Wrapper module for calling dev-spec-kit shell scripts and parsing their output.
 """
 import subprocess
 import os
+import signal
 import re
-from typing import Tuple
-from .models import DevSpecFinding
+from typing import Optional, Tuple
+from .cancellation import AnalysisCancelled, CancellationToken
+from .records import Finding, make_finding
+from .rules import get_rule_script_path
 
 
-def run_dev_spec_kit(prompt: str) -> Tuple[str, list[DevSpecFinding], int]:
+# Seconds before a rule script run is abandoned
+SCRIPT_TIMEOUT_SECONDS = 30
+
+
+def use_in_process_rules() -> bool:
+    """
+    Whether rules are evaluated in-process instead of by running the script.
+
+    Opt-in via IN_PROCESS_RULES=true. Results are identical; prompts or
+    scripts the in-process engine does not reproduce still run the script.
+    """
+    return os.getenv("IN_PROCESS_RULES", "").lower() in ("true", "1", "yes")
+
+
+def _evaluate_in_process(script_path: str, prompt: str) -> Optional[Tuple[str, list[Finding], int]]:
+    from .rule_engine import RuleCompileError, load_rule_engine
+
+    try:
+        return load_rule_engine(script_path).evaluate(prompt)
+    except RuleCompileError:
+        return None
+
+
+def run_dev_spec_kit(
+    prompt: str,
+    cancel: Optional[CancellationToken] = None,
+    script_path: Optional[str] = None
+) -> Tuple[str, list[Finding], int]:
     """
     Run the dev-spec-kit security checker on the given prompt.
     
     Args:
         prompt: The developer prompt to analyze
+        cancel: Optional cancellation token; cancelling it kills the script
+        script_path: Rule script to run (default: the active dev-spec-kit script)
         
     Returns:
         Tuple of (raw_output, parsed_findings, exit_code)
+        
+    Raises:
+        AnalysisCancelled: If the token was cancelled before the script finished
     """
-    # Determine the path to the security-check script
-    # Assuming we're running from repo root
-    script_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "dev-spec-kit",
-        "scripts",
-        "security-check.new.sh"
-    )
-    
-    if not os.path.exists(script_path):
-        # Fall back to security-check.sh if .new.sh doesn't exist
-        script_path = script_path.replace("security-check.new.sh", "security-check.sh")
+    if script_path is None:
+        script_path = get_rule_script_path()
     
-    if not os.path.exists(script_path):
-        raise FileNotFoundError(f"Dev-spec-kit script not found at {script_path}")
+    if use_in_process_rules():
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        result = _evaluate_in_process(script_path, prompt)
+        if result is not None:
+            return result
     
     # Make sure script is executable
     os.chmod(script_path, 0o755)
     
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    
     try:
         # Run the script with prompt as stdin
-        result = subprocess.run(
+        process = subprocess.Popen(
             [script_path],
-            input=prompt,
-            capture_output=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=30
+            # Own process group, so a kill also reaches the script's child processes
+            start_new_session=True
         )
-        
-        raw_output = result.stdout
-        exit_code = result.returncode
-        
-        # Parse the output into findings
-        findings = parse_devspec_output(raw_output)
-        
-        return raw_output, findings, exit_code
-        
+    except Exception as e:
+        return f"ERROR: {str(e)}", [], -1
+    
+    def kill() -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    
+    try:
+        if cancel is None:
+            raw_output, _ = process.communicate(prompt, timeout=SCRIPT_TIMEOUT_SECONDS)
+        else:
+            with cancel.on_cancel(kill):
+                raw_output, _ = process.communicate(prompt, timeout=SCRIPT_TIMEOUT_SECONDS)
     except subprocess.TimeoutExpired:
+        kill()
+        process.communicate()
         return "ERROR: Script execution timed out", [], -1
     except Exception as e:
+        kill()
+        process.wait()
+        if cancel is not None and cancel.cancelled:
+            raise AnalysisCancelled(cancel.reason)
         return f"ERROR: {str(e)}", [], -1
+    
+    if cancel is not None and cancel.cancelled:
+        # The script was killed (or finished just as the request went away)
+        raise AnalysisCancelled(cancel.reason)
+    
+    exit_code = process.returncode
+    
+    # Parse the output into findings
+    findings = parse_devspec_output(raw_output)
+    
+    return raw_output, findings, exit_code
 
 
-def parse_devspec_output(output: str) -> list[DevSpecFinding]:
+def parse_devspec_output(output: str) -> list[Finding]:
     """
     Parse the output from dev-spec-kit into structured findings.
     
@@ -74,7 +131,7 @@ def parse_devspec_output(output: str) -> list[DevSpecFinding]:
         output: Raw text output from the script
         
     Returns:
-        List of DevSpecFinding objects
+        List of Finding records
     """
     findings = []
     lines = output.strip().split('\n')
@@ -104,7 +161,7 @@ def parse_devspec_output(output: str) -> list[DevSpecFinding]:
             if i < len(lines) and lines[i].strip().startswith("Suggestion:"):
                 suggestion = lines[i].strip().replace("Suggestion:", "").strip()
             
-            finding = DevSpecFinding(
+            finding = make_finding(
                 category=category,
                 severity=severity,
                 code=code,
@@ -0,0 +1,615 @@
+"""
+Persistent per-prompt feature store.
+
+Analyzed prompts are kept in a SQLite file with the features that spec
+scoring and risk classification are computed from, stored column by column
+rather than prompt by prompt:
+
+- the spec-quality feature columns: the BASE_COLUMNS counts, then one hit
+  column per scoring-profile term, named as in ScoringPlan.columns;
+- "grep:i:<pattern>" and "grep:s:<pattern>": whether each ignore-case or
+  case-sensitive grep test of the rule script matches the prompt;
+- "suppress:<CODE>": whether filter_false_positives drops a finding with
+  that code for the prompt (its decision depends only on the code and text);
+- "rules:exact": whether the rule engine reproduces the script on the prompt.
+
+Count columns are int64 arrays and the others bitsets with one bit per
+prompt. Prompts are keyed by the SHA-256 of their normalized text, which is
+kept (compressed) along with the extracted spec structure.
+
+Each prompt is committed as it is added, so the API never holds the file's
+write lock between analyses and the command line can work on the store the
+API is filling; columns are written every DEFAULT_FLUSH_EVERY prompts, with
+the number of rows they cover. Rows a column does not cover yet, after a
+crash or rows added by another process, are computed from the stored text.
+
+A changed scoring profile is re-scored from the columns (rescore) and a
+changed rule script re-classified from the predicate bits (reclassify). Only
+columns the store does not have yet, such as the grep tests of new or edited
+rules, are computed from the stored text, once per prompt.
+
+The API adds each prompt it analyzes when FEATURE_STORE_PATH is set. Fill and
+query a store with:
+    python -m orchestrator.feature_store STORE add PATH ... [--jsonl FILE]
+    python -m orchestrator.feature_store STORE reclassify [--rules SCRIPT]
+    python -m orchestrator.feature_store STORE info
+and re-score it with python -m orchestrator.spec_scoring --features STORE.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from .cache import prompt_digest
+from .records import Finding, SpecStructure
+from .risk import classify_risk, summarize_findings
+from .rule_engine import CompiledRules, c_locale, prompt_line, required_literals, translate_ere
+from .scoring_profiles import BASE_COLUMNS, DEFAULT_PLAN, ScoringPlan, compile_plan, get_plan, term_check, term_found
+from .spec_kit_adapter import extract_lowered_record
+from .spec_scoring import feature_row, rescore_features
+
+
+EXACT_COLUMN = "rules:exact"
+# Prompts added between writes of the in-memory columns
+DEFAULT_FLUSH_EVERY = 64
+# Seconds to wait for another process's write to the file
+LOCK_TIMEOUT = 30.0
+
+_SQLITE_HEADER = b"SQLite format 3\0"
+# Plan without terms, for the BASE_COLUMNS of a prompt
+_BASE_PLAN = compile_plan({"vague_patterns": [], "tech_keywords": [], "quality_indicators": []}, "base")
+_TERM_KINDS = {"vague": True, "tech": False, "indicator": True}
+
+
+class StoredPrompt(NamedTuple):
+    """A stored prompt: normalized text and extracted spec structure (as a dict)."""
+    digest: str
+    text: str
+    structure: dict
+
+
+class StoredRisk(NamedTuple):
+    """Rule findings and risk of a stored prompt under some rules (see FeatureStore.reclassify)."""
+    digest: str
+    # Findings after filter_false_positives, and the rule script's exit code
+    findings: list
+    exit_code: int
+    risk_level: str
+
+
+def grep_column(pattern: str, ignore_case: bool) -> str:
+    return f"grep:{'i' if ignore_case else 's'}:{pattern}"
+
+
+def suppress_column(code: str) -> str:
+    return f"suppress:{code}"
+
+
+def rule_columns(rules: CompiledRules) -> list:
+    """Predicate and suppression columns reclassify(rules) reads."""
+    codes = dict.fromkeys(warning.code for warning in _rule_warnings(rules))
+    return list(dict.fromkeys(
+        [grep_column(pattern, ignore_case) for pattern, ignore_case in rules.patterns]
+        + [suppress_column(code) for code in codes]
+    ))
+
+
+def _rule_warnings(rules: CompiledRules) -> Iterator:
+    for branches, otherwise in rules.blocks:
+        for _, body in branches:
+            yield from body
+        yield from otherwise or ()
+
+
+def is_store_file(path: str) -> bool:
+    """Whether path is a SQLite file (a feature store, not a JSON feature file)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    except OSError:
+        return False
+
+
+class _Prompt:
+    """A prompt being added, with the forms columns are computed from."""
+
+    def __init__(self, text: str, structure: Optional[SpecStructure] = None):
+        self.text = text
+        self.lowered = text.lower()
+        self.structure = structure if structure is not None else extract_lowered_record(self.lowered)
+        self._line = False
+        self._line_lower = None
+
+    @property
+    def line(self) -> Optional[bytes]:
+        """The rule script's grep input (None where the rule engine cannot reproduce the script)."""
+        if self._line is False:
+            if not self.text.isascii() and not c_locale():
+                self._line = None
+            else:
+                self._line = prompt_line(self.text.encode("utf-8", "surrogateescape"))
+        return self._line
+
+    def grep(self, check: tuple) -> bool:
+        """Whether a grep column's check matches the grep input (never for inputs left to the script)."""
+        line = self.line
+        if line is None:
+            return False
+        regex, literals, ignore_case = check
+        if literals is not None:
+            if ignore_case and self._line_lower is None:
+                self._line_lower = line.lower()
+            text = self._line_lower if ignore_case else line
+            if not any(literal in text for literal in literals):
+                return False
+        return regex.search(line) is not None
+
+
+class FeatureStore:
+    """Columnar SQLite store of analyzed prompts and their features."""
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._db = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Column name -> bitset (int) or int64 counts (array)
+        self._columns: dict = {}
+        self._dirty: set = set()
+        self._pending = 0
+        # grep and term column name -> compiled check
+        self._checks: dict = {}
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS prompts ("
+                "row INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL, text BLOB NOT NULL, structure TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS columns (name TEXT PRIMARY KEY, data BLOB NOT NULL, rows INTEGER NOT NULL)"
+            )
+            self._digests = [digest for digest, in self._db.execute("SELECT hash FROM prompts ORDER BY row")]
+            self._rows = {digest: row for row, digest in enumerate(self._digests)}
+            # Columns written before the last prompts were committed are completed from the stored text
+            stale: dict = {}
+            for name, data, rows in self._db.execute("SELECT name, data, rows FROM columns"):
+                column = _decode(name, data)
+                if rows < len(self._digests):
+                    stale.setdefault(rows, {})[name] = column
+                else:
+                    self._columns[name] = column
+            for rows, columns in stale.items():
+                self._fill(columns, rows)
+                self._columns.update(columns)
+                self._dirty.update(columns)
+        if not self._columns:
+            self.ensure_columns(default_columns())
+
+    @classmethod
+    def from_env(cls) -> Optional["FeatureStore"]:
+        """The store at FEATURE_STORE_PATH, or None if it is not set."""
+        path = os.getenv("FEATURE_STORE_PATH")
+        return cls(path) if path else None
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def __contains__(self, prompt: str) -> bool:
+        return prompt_digest(prompt.strip()) in self._rows
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    def digests(self) -> list:
+        """Prompt hashes, in row order."""
+        return list(self._digests)
+
+    def get(self, digest: str) -> Optional[StoredPrompt]:
+        with self._lock:
+            row = self._db.execute("SELECT text, structure FROM prompts WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        return StoredPrompt(digest, _decompress(row[0]), json.loads(row[1]))
+
+    def add(self, prompt: str, structure: Optional[SpecStructure] = None) -> bool:
+        """
+        Store a prompt and compute every stored column for it.
+
+        Args:
+            prompt: The prompt (normalized as run_analysis does)
+            structure: Its spec structure, if already extracted
+
+        Returns:
+            False if the prompt was already stored
+        """
+        text = prompt.strip()
+        digest = prompt_digest(text)
+        if digest in self._rows:
+            return False
+        item = _Prompt(text, structure)
+        with self._lock:
+            with self._db:
+                # Take the write lock first, so rows other processes added are seen
+                self._db.execute("BEGIN IMMEDIATE")
+                self._catch_up()
+                if digest in self._rows:
+                    return False
+                values = self._values(list(self._columns), item)
+                self._db.execute(
+                    "INSERT INTO prompts (row, hash, text, structure) VALUES (?, ?, ?, ?)",
+                    (len(self._digests), digest, _compress(text), json.dumps(item.structure.as_dict()))
+                )
+            self._append(digest, values)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush()
+        return True
+
+    def ensure_columns(self, names: Iterable[str]) -> int:
+        """
+        Compute the given columns for every stored prompt, if not stored yet.
+
+        Returns:
+            Number of columns computed from the stored text
+
+        Raises:
+            ValueError: If a name is not a feature column
+        """
+        with self._lock:
+            missing = [name for name in dict.fromkeys(names) if name not in self._columns]
+            if not missing:
+                return 0
+            for name in missing:
+                self._check(name)
+            self._catch_up()
+            columns = {name: _empty(name) for name in missing}
+            self._fill(columns, 0)
+            self._columns.update(columns)
+            self._dirty.update(missing)
+            self._flush()
+            return len(missing)
+
+    def column(self, name: str) -> list:
+        """Values of a column, one int per prompt (computed first if needed)."""
+        self.ensure_columns([name])
+        with self._lock:
+            return _expand(self._columns[name], len(self._digests))
+
+    def bits(self, name: str) -> int:
+        """A bitset column as an int, bit i for the prompt in row i (computed first if needed)."""
+        if name in BASE_COLUMNS:
+            raise ValueError(f"Feature column {name!r} holds counts, not bits")
+        self.ensure_columns([name])
+        with self._lock:
+            return self._columns[name]
+
+    def table(self, names: Iterable[str]) -> list:
+        """Rows of the given columns, one tuple per prompt (computed first if needed)."""
+        names = list(names)
+        self.ensure_columns(names)
+        with self._lock:
+            count = len(self._digests)
+            columns = [_expand(self._columns[name], count) for name in names]
+        return list(zip(*columns)) if columns else [()] * count
+
+    def rescore(self, plan: ScoringPlan, use_numpy: Optional[bool] = None) -> tuple:
+        """
+        Spec-quality warnings and scores of every stored prompt under a plan.
+
+        Returns:
+            (list of warning lists, list of int scores), as score_matrix
+        """
+        return rescore_features(plan.columns, self.table(plan.columns), plan, use_numpy)
+
+    def reclassify(self, rules: CompiledRules) -> list:
+        """
+        Rule findings and risk level of every stored prompt under the given rules.
+
+        Results equal run_analysis's devspec_findings, exit_code and risk_level
+        with these rules. The rules are evaluated from the stored predicate
+        bits, once per distinct combination of grep results; only grep tests
+        the store has not seen are run against the stored text.
+
+        Returns:
+            StoredRisk per prompt, in row order; None for prompts the rule
+            engine cannot reproduce the script on
+        """
+        names = rule_columns(rules)
+        self.ensure_columns(names + [EXACT_COLUMN, "word_count"])
+        with self._lock:
+            count = len(self._digests)
+            predicates = [0] * count
+            for index, (pattern, ignore_case) in enumerate(rules.patterns):
+                bit = 1 << index
+                for row in iter_bits(self._columns[grep_column(pattern, ignore_case)]):
+                    predicates[row] |= bit
+            suppressed = [set() for _ in range(count)]
+            for name in names:
+                if name.startswith("suppress:"):
+                    code = name[len("suppress:"):]
+                    for row in iter_bits(self._columns[name]):
+                        suppressed[row].add(code)
+            exact = self._columns[EXACT_COLUMN]
+            word_counts = self._columns["word_count"]
+            digests = list(self._digests)
+
+        outputs: dict = {}
+        results = []
+        for row, digest in enumerate(digests):
+            if not exact >> row & 1:
+                results.append(None)
+                continue
+            bits = predicates[row]
+            output = outputs.get(bits)
+            if output is None:
+                output = outputs[bits] = rules.evaluate_predicates(bits)
+            findings = [finding for finding in output[1] if finding.code not in suppressed[row]]
+            risk_level = classify_risk(summarize_findings(findings), word_counts[row])
+            results.append(StoredRisk(digest, findings, output[2], risk_level))
+        return results
+
+    def flush(self) -> None:
+        """Write changed columns to the file."""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+    def _flush(self) -> None:
+        count = len(self._digests)
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO columns (name, data, rows) VALUES (?, ?, ?)",
+                [(name, _encode(self._columns[name], count), count) for name in self._dirty]
+            )
+        self._dirty.clear()
+        self._pending = 0
+
+    def _stored(self, start: int) -> Iterator[tuple]:
+        """(digest, _Prompt) of the stored prompts from row start on, in row order."""
+        query = self._db.execute("SELECT hash, text, structure FROM prompts WHERE row >= ? ORDER BY row", (start,))
+        for digest, text, structure in query:
+            yield digest, _Prompt(_decompress(text), SpecStructure(**json.loads(structure)))
+
+    def _fill(self, columns: dict, start: int) -> None:
+        """Compute columns (covering rows up to start) for the known prompts from row start on."""
+        names = list(columns)
+        for row, (_, item) in enumerate(self._stored(start), start):
+            if row >= len(self._digests):
+                break
+            for name, value in self._values(names, item).items():
+                if isinstance(columns[name], array):
+                    columns[name].append(value)
+                elif value:
+                    columns[name] |= 1 << row
+
+    def _catch_up(self) -> None:
+        """Take in the prompts other processes added to the file since it was read."""
+        for digest, item in self._stored(len(self._digests)):
+            self._append(digest, self._values(list(self._columns), item))
+
+    def _append(self, digest: str, values: dict) -> None:
+        row = len(self._digests)
+        for name, value in values.items():
+            column = self._columns[name]
+            if isinstance(column, array):
+                column.append(value)
+            elif value:
+                self._columns[name] = column | 1 << row
+        self._digests.append(digest)
+        self._rows[digest] = row
+        self._dirty.update(values)
+
+    def _check(self, name: str):
+        """Compiled check of a grep or term column (None for other known columns)."""
+        if name in self._checks:
+            return self._checks[name]
+        kind, _, rest = name.partition(":")
+        if name in BASE_COLUMNS or name == EXACT_COLUMN or kind == "suppress":
+            check = None
+        elif kind == "grep" and rest[:2] in ("i:", "s:") and rest[2:].isascii():
+            ignore_case = rest[0] == "i"
+            source = translate_ere(rest[2:]).encode("ascii")
+            try:
+                regex = re.compile(source, re.IGNORECASE if ignore_case else 0)
+            except re.error as e:
+                raise ValueError(f"Feature column {name!r} does not translate: {e}") from None
+            check = (regex, required_literals(source, ignore_case), ignore_case)
+        elif kind in _TERM_KINDS and rest:
+            try:
+                check = term_check(rest, regex=_TERM_KINDS[kind])
+            except re.error as e:
+                raise ValueError(f"Feature column {name!r} is not a valid pattern: {e}") from None
+        else:
+            raise ValueError(f"Unknown feature column {name!r}")
+        self._checks[name] = check
+        return check
+
+    def _values(self, names: list, item: _Prompt) -> dict:
+        """Values of the named columns for one prompt."""
+        values = {}
+        base = None
+        codes = []
+        for name in names:
+            kind = name.partition(":")[0]
+            if name in BASE_COLUMNS:
+                if base is None:
+                    base = dict(zip(BASE_COLUMNS, feature_row(item.structure, item.text, item.lowered, _BASE_PLAN)))
+                values[name] = base[name]
+            elif name == EXACT_COLUMN:
+                values[name] = int(item.line is not None)
+            elif kind == "suppress":
+                codes.append(name[len("suppress:"):])
+            elif kind == "grep":
+                values[name] = int(item.grep(self._check(name)))
+            else:
+                values[name] = int(term_found(self._check(name), item.lowered))
+        if codes:
+            from .pipeline import filter_false_positives
+
+            kept = {finding.code for finding in filter_false_positives(item.text, [Finding("", "", code) for code in codes])}
+            values.update((suppress_column(code), int(code not in kept)) for code in codes)
+        return values
+
+
+def default_columns() -> list:
+    """Columns of a new store: the default and SCORING_PROFILE plans', the active rules', and rules:exact."""
+    from .rule_engine import RuleCompileError, load_rule_engine
+
+    names = list(DEFAULT_PLAN.columns)
+    try:
+        names += get_plan().columns
+    except ValueError:
+        pass  # An unknown SCORING_PROFILE fails where it is used
+    try:
+        names += rule_columns(load_rule_engine())
+    except (OSError, RuleCompileError):
+        pass  # Rules the engine cannot compile are re-classified by the script
+    return list(dict.fromkeys(names + [EXACT_COLUMN]))
+
+
+def _empty(name: str):
+    return array("q") if name in BASE_COLUMNS else 0
+
+
+def _encode(column, count: int) -> bytes:
+    if isinstance(column, array):
+        if sys.byteorder != "little":
+            column = array("q", column)
+            column.byteswap()
+        return column.tobytes()
+    return column.to_bytes((count + 7) // 8, "little")
+
+
+def _decode(name: str, data: bytes):
+    if name in BASE_COLUMNS:
+        column = array("q", data)
+        if sys.byteorder != "little":
+            column.byteswap()
+        return column
+    return int.from_bytes(data, "little")
+
+
+def _expand(column, count: int) -> list:
+    if isinstance(column, array):
+        return column.tolist()
+    return [int(bit) for bit in format(column, "b")[::-1].ljust(count, "0")[:count]] if count else []
+
+
+def iter_bits(column: int) -> Iterator[int]:
+    """Rows set in a bitset, in order."""
+    bits = format(column, "b")[::-1]
+    row = bits.find("1")
+    while row >= 0:
+        yield row
+        row = bits.find("1", row + 1)
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8", "surrogateescape"))
+
+
+def _decompress(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8", "surrogateescape")
+
+
+def _add(store: FeatureStore, paths: list, jsonl: list) -> int:
+    from .bulk import iter_sources
+
+    added = total = 0
+    started = time.perf_counter()
+    try:
+        for source in iter_sources(paths, jsonl):
+            if source.prompt is None:
+                with open(source.path, "r", encoding="utf-8") as f:
+                    prompt = f.read()
+            else:
+                prompt = source.prompt
+            added += store.add(prompt)
+            total += 1
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    print(f"Stored {added} new prompts ({total - added} already stored) in {elapsed:.1f} s; {len(store)} in {store.path}",
+          file=sys.stderr)
+    return 0
+
+
+def _reclassify(store: FeatureStore, script: Optional[str]) -> int:
+    from .rule_engine import RuleCompileError, load_rule_engine
+
+    try:
+        rules = load_rule_engine(script)
+    except (OSError, RuleCompileError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    computed = store.ensure_columns(rule_columns(rules) + [EXACT_COLUMN, "word_count"])
+    results = store.reclassify(rules)
+    elapsed = time.perf_counter() - started
+
+    for index, result in enumerate(results):
+        if result is not None:
+            print(json.dumps({
+                "index": index,
+                "hash": result.digest,
+                "risk_level": result.risk_level,
+                "exit_code": result.exit_code,
+                "codes": [finding.code for finding in result.findings],
+            }))
+    skipped = sum(1 for result in results if result is None)
+    print(
+        f"Re-classified {len(results) - skipped} prompts in {elapsed * 1000:.0f} ms "
+        f"({computed} columns computed from text, {skipped} prompts need the rule script)",
+        file=sys.stderr
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m orchestrator.feature_store", description="Fill and query a prompt feature store")
+    parser.add_argument("store", help="Feature store file (created if missing)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Store prompts and their features")
+    add.add_argument("inputs", nargs="*", help="Prompt files, directories or glob patterns")
+    add.add_argument("--jsonl", action="append", default=[], metavar="FILE", help="JSONL file of prompts ('-' for stdin)")
+    reclassify = commands.add_parser("reclassify", help="Findings and risk level of every stored prompt (JSON lines)")
+    reclassify.add_argument("--rules", metavar="SCRIPT", help="Rule script (default: the active dev-spec-kit script)")
+    commands.add_parser("info", help="Describe the store")
+    args = parser.parse_args(argv)
+
+    try:
+        store = FeatureStore(args.store)
+    except sqlite3.Error as e:
+        print(f"error: {args.store}: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "add":
+            return _add(store, args.inputs, args.jsonl)
+        if args.command == "reclassify":
+            return _reclassify(store, args.rules)
+        kinds = {}
+        for name in store.columns:
+            kind = "count" if name in BASE_COLUMNS else name.partition(":")[0]
+            kinds[kind] = kinds.get(kind, 0) + 1
+        print(f"{args.store}: {len(store)} prompts, {os.path.getsize(args.store)} bytes")
+        for kind, count in sorted(kinds.items()):
+            print(f"  {kind}: {count} columns")
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Changed-specs-only scanning for pre-commit hooks and CI.
+
+The specs changed in a revision range (or staged in the index) are found with
+git plumbing (diff-tree / diff-index). Their new content is read straight from
+the object database by blob SHA with `git cat-file --batch`. Because the
+scanner's result cache is keyed by the same blob SHAs, specs whose content was
+seen before, in any path or commit, are answered from the cache. Only new blobs
+are read and analyzed, so the cost is proportional to the change, not to the
+repository size.
+"""
+import subprocess
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from .scanner import (
+    DEFAULT_MAX_FILE_BYTES, SCAN_SUFFIXES, SKIP_TOO_LARGE, ScanCache, ScanReport,
+    analyze_blobs, build_report, decode_spec, scan_context,
+)
+
+
+# Object ID of git's empty tree, used as the base when there is no HEAD yet
+EMPTY_TREE = "4b825dc642cb6eb9a060af6bf0edfdf3aeba5f3f"
+
+# Regular files only (no symlinks or submodules)
+_FILE_MODES = frozenset({"100644", "100755"})
+
+# Added, copied, modified, renamed or type-changed entries have new content
+_CHANGED_STATUSES = frozenset("ACMRT")
+
+
+class GitError(RuntimeError):
+    """A git command failed (not a repository, unknown revision, ...)."""
+
+
+class ChangedFile(NamedTuple):
+    """A file whose content changed: its path and new blob SHA."""
+    path: str
+    blob: str
+
+
+def _git(repo: str, *args: str, input: Optional[bytes] = None) -> bytes:
+    result = subprocess.run(["git", "-C", repo, *args], input=input, capture_output=True)
+    if result.returncode != 0:
+        raise GitError(result.stderr.decode("utf-8", "replace").strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def repo_root(repo: str = ".") -> str:
+    """Top-level directory of the git work tree containing repo."""
+    return _git(repo, "rev-parse", "--show-toplevel").decode("utf-8").strip()
+
+
+def parse_raw_diff(output: bytes) -> list:
+    """
+    Parse `git diff-* -r -z` raw output into changed files.
+
+    Deleted files, symlinks and submodules are left out; renames and copies
+    are reported under their new path.
+    """
+    fields = output.split(b"\0")
+    changed = []
+    position = 0
+    while position < len(fields) - 1:
+        header = fields[position].decode("utf-8")
+        # ":old_mode new_mode old_sha new_sha status[score]"
+        _, new_mode, _, new_blob, status = header[1:].split(" ")
+        position += 1
+        if status[0] in "RC":
+            position += 1  # skip the source path
+        path = fields[position].decode("utf-8", "surrogateescape")
+        position += 1
+        if status[0] in _CHANGED_STATUSES and new_mode in _FILE_MODES:
+            changed.append(ChangedFile(path, new_blob))
+    return changed
+
+
+def changed_files(repo: str, rev_range: Optional[str] = None, staged: bool = False) -> list:
+    """
+    List files with new content in a revision range or in the index.
+
+    Args:
+        repo: Path inside the repository
+        rev_range: "A..B", "A...B" (changes on B since the merge base), or a
+            single revision compared against HEAD
+        staged: Compare the index with HEAD instead (pre-commit)
+
+    Returns:
+        ChangedFile list in path order
+
+    Raises:
+        GitError: If a revision cannot be resolved
+    """
+    if staged:
+        try:
+            base = _git(repo, "rev-parse", "--verify", "-q", "HEAD").decode().strip()
+        except GitError:
+            base = EMPTY_TREE
+        output = _git(repo, "diff-index", "--cached", "-r", "-z", "-M", "--no-ext-diff", base)
+    else:
+        if not rev_range:
+            raise ValueError("A revision range or staged=True is required")
+        if "..." in rev_range:
+            left, right = rev_range.split("...", 1)
+            right = right or "HEAD"
+            left = _git(repo, "merge-base", left or "HEAD", right).decode().strip()
+        elif ".." in rev_range:
+            left, right = rev_range.split("..", 1)
+            left, right = left or "HEAD", right or "HEAD"
+        else:
+            left, right = rev_range, "HEAD"
+        output = _git(repo, "diff-tree", "-r", "-z", "-M", left, right)
+    return sorted(parse_raw_diff(output))
+
+
+def blob_sizes(repo: str, blobs: Iterable[str]) -> dict:
+    """Size in bytes of each blob (`git cat-file --batch-check`)."""
+    blobs = list(blobs)
+    if not blobs:
+        return {}
+    output = _git(repo, "cat-file", "--batch-check", input="\n".join(blobs).encode() + b"\n")
+    sizes = {}
+    for line in output.decode().splitlines():
+        blob, kind, size = line.split(" ")
+        sizes[blob] = int(size)
+    return sizes
+
+
+def read_blobs(repo: str, blobs: Iterable[str]) -> dict:
+    """Content of each blob, read in one `git cat-file --batch` call."""
+    blobs = list(blobs)
+    if not blobs:
+        return {}
+    output = _git(repo, "cat-file", "--batch", input="\n".join(blobs).encode() + b"\n")
+    contents = {}
+    position = 0
+    while position < len(output):
+        header_end = output.index(b"\n", position)
+        blob, _, size = output[position:header_end].decode().split(" ")
+        start = header_end + 1
+        contents[blob] = output[start:start + int(size)]
+        position = start + int(size) + 1
+    return contents
+
+
+def scan_git_changes(
+    repo: str = ".",
+    rev_range: Optional[str] = None,
+    staged: bool = False,
+    cache: Optional[ScanCache] = None,
+    max_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    workers: Optional[int] = None,
+    suffixes: tuple = SCAN_SUFFIXES
+) -> ScanReport:
+    """
+    Scan only the specs changed in a revision range or staged for commit.
+
+    Args:
+        repo: Path inside the repository
+        rev_range: Revision range (see changed_files)
+        staged: Scan the staged changes instead
+        cache: Persistent result cache shared with the tree scanner
+        max_bytes: Skip blobs larger than this
+        workers: Analysis worker processes (default: available cores)
+        suffixes: File extensions to scan
+
+    Returns:
+        ScanReport of the changed specs, with paths relative to the repository root
+    """
+    started = time.perf_counter()
+    root = repo_root(repo)
+    context = scan_context()
+    changed = [f for f in changed_files(root, rev_range, staged) if f.path.endswith(suffixes)]
+    blobs = {f.blob for f in changed}
+    cached = cache.get_results(blobs, context) if cache is not None else {}
+
+    # Read only the new blobs that are small enough to analyze
+    sizes = blob_sizes(root, blobs.difference(cached))
+    too_large = {blob for blob, size in sizes.items() if size > max_bytes}
+    contents = read_blobs(root, set(sizes).difference(too_large))
+
+    texts = {}
+    skipped = [(f.path, SKIP_TOO_LARGE) for f in changed if f.blob in too_large]
+    for f in changed:
+        if f.blob in contents and f.blob not in texts:
+            text, reason = decode_spec(contents[f.blob])
+            if text is None:
+                skipped.append((f.path, reason))
+            else:
+                texts[f.blob] = (f.path, text)
+    analyzed = analyze_blobs(texts, cached, cache, context, workers)
+
+    found = [(f.path, f.blob) for f in changed if f.blob in cached or f.blob in analyzed]
+    return build_report(root, found, skipped, cached, analyzed, started)
@@ -2,15 +2,169 @@
 Guidance engine that adds additional constraints and refines prompts
 based on dev-spec-kit findings.
 """
-from typing import Tuple
-from .models import DevSpecFinding, GuidanceItem
+import threading
+from typing import NamedTuple, Tuple
+from .records import Finding, Guidance, Severity
+from .rules import load_rule_source
+
+
+# Constraint catalog: each entry matches finding codes that contain ANY of the
+# first keywords and ALL of the second keywords, and contributes constraints
+# (for the curated prompt) and guidance items (title, detail).
+CONSTRAINT_CATALOG = [
+    (("UNAUTH", "NO_AUTH"), (), (
+        "Require proper authentication and authorization for all endpoints",
+    ), ()),
+    (("TLS", "HTTPS", "HTTP"), (), (
+        "Use HTTPS/TLS for all network communication, especially authentication flows",
+    ), ()),
+    (("SECRET", "HARDCODED"), (), (
+        "Never hardcode secrets, tokens, or credentials in code or config files",
+        "Use environment variables or secure secret management systems",
+    ), ()),
+    ((), ("PASSWORD", "PLAINTEXT"), (
+        "Never store passwords in plain text; use bcrypt, Argon2, or PBKDF2 for password hashing",
+    ), ()),
+    (("ADMIN", "BACKDOOR"), (), (
+        "Never auto-create admin accounts or backdoors",
+        "Implement secure admin account creation with strong authentication",
+    ), ()),
+    (("DB_WIPE", "DROP"), (), (
+        "Never automatically wipe or recreate production data",
+        "Require explicit admin action for destructive operations",
+    ), ()),
+    (("TMP",), (), (
+        "Store uploads in secure, persistent locations, not temporary directories",
+    ), ()),
+    (("STACKTRACE", "DEBUG"), (), (
+        "Never expose stack traces, debug info, or environment variables to clients",
+        "Log sensitive errors securely on the server side only",
+    ), ()),
+    ((), ("DOCKER", "ROOT"), (
+        "Run Docker containers as non-root users for security",
+    ), ()),
+    (("VALIDATION", "SKIP"), (), (
+        "Implement strict input validation on all external inputs",
+    ), ()),
+    (("MD5", "WEAK_HASH"), (), (
+        "Use strong hashing algorithms (SHA-256 or better) instead of MD5 or SHA-1",
+    ), ()),
+    ((), ("GET", "AUTH"), (
+        "Use POST requests for authentication, not GET (to avoid credentials in URLs/logs)",
+    ), ()),
+    (("FINANCIAL", "BALANCE", "PAYMENT"), (), (
+        "Implement strict authentication and authorization for all financial operations",
+        "Validate and audit all balance adjustments and transactions",
+    ), ()),
+    (("PHI", "PATIENT"), (), (
+        "Encrypt all Protected Health Information (PHI) at rest and in transit",
+        "Implement HIPAA-compliant access controls",
+    ), ()),
+    # Architecture warnings - add to guidance but not constraints
+    (("CONFLICTING", "VAGUE"), ("ARCH_",), (), (
+        ("Clarify Technology Stack",
+         "Choose a single, consistent technology stack. Avoid mixing incompatible frameworks."),
+    )),
+]
+
+
+class ConstraintEntry(NamedTuple):
+    """Constraints and guidance resolved for a single finding code."""
+    constraints: tuple
+    guidance: tuple
+
+
+_index_lock = threading.Lock()
+_index_digest = None
+_constraint_index: dict = {}
+
+
+def resolve_constraints(code: str) -> ConstraintEntry:
+    """
+    Resolve the constraint catalog for a finding code.
+    
+    Args:
+        code: Finding code (e.g. SEC_UNAUTH_DELETE)
+        
+    Returns:
+        ConstraintEntry with de-duplicated constraints and guidance in catalog order
+    """
+    constraints = {}
+    guidance = {}
+    for any_of, all_of, entry_constraints, entry_guidance in CONSTRAINT_CATALOG:
+        if any_of and not any(keyword in code for keyword in any_of):
+            continue
+        if all_of and not all(keyword in code for keyword in all_of):
+            continue
+        constraints.update(dict.fromkeys(entry_constraints))
+        guidance.update(dict.fromkeys(entry_guidance))
+    return ConstraintEntry(tuple(constraints), tuple(guidance))
+
+
+def build_constraint_index(codes) -> dict:
+    """
+    Precompute the constraint catalog for every known rule code.
+    
+    Args:
+        codes: Rule codes declared by the rule engine
+        
+    Returns:
+        Dict mapping code to ConstraintEntry
+    """
+    return {code: resolve_constraints(code) for code in codes}
+
+
+def get_constraint_index() -> dict:
+    """
+    Return the code-to-constraint index for the currently loaded rules.
+    
+    The index is rebuilt whenever the rule script changes, so hot-reloaded
+    rules never see entries resolved against an older rule set.
+    """
+    global _index_digest, _constraint_index
+    
+    try:
+        source = load_rule_source()
+    except FileNotFoundError:
+        return _constraint_index
+    
+    if source.digest != _index_digest:
+        with _index_lock:
+            if source.digest != _index_digest:
+                _constraint_index = build_constraint_index(source.codes)
+                _index_digest = source.digest
+    return _constraint_index
+
+
+def lookup_constraints(code: str, index: dict = None) -> ConstraintEntry:
+    """
+    Look up the constraints for a finding code, resolving unknown codes once.
+    
+    Args:
+        code: Finding code
+        index: Index to use (default: the index for the current rules)
+        
+    Returns:
+        ConstraintEntry for the code
+    """
+    if index is None:
+        index = get_constraint_index()
+    entry = index.get(code)
+    if entry is None:
+        entry = resolve_constraints(code)
+        # Inserted under the lock that builds the index; the first resolution wins
+        with _index_lock:
+            entry = index.setdefault(code, entry)
+    return entry
 
 
 def build_guidance(
     prompt: str, 
-    findings: list[DevSpecFinding],
-    risk_level: str
-) -> Tuple[list[GuidanceItem], str]:
+    findings: list[Finding],
+    risk_level: str,
+    compact: bool = False,
+    curate: bool = True
+) -> Tuple[list[Guidance], str]:
     """
     Generate guidance items and a curated prompt based on security findings.
     
@@ -18,6 +172,8 @@ def build_guidance(
         prompt: The original developer prompt
         findings: List of findings from dev-spec-kit
         risk_level: Computed risk level (Low, Medium, High)
+        compact: Build the curated prompt in compact mode
+        curate: Build the curated prompt at all (an empty string is returned when False)
         
     Returns:
         Tuple of (guidance_items, final_curated_prompt)
@@ -26,27 +182,26 @@ def build_guidance(
     constraints = set()  # Use set to avoid duplicates
     
     # Categorize findings by severity
-    blockers = [f for f in findings if f.severity.upper() == "BLOCKER"]
-    errors = [f for f in findings if f.severity.upper() == "ERROR"]
-    warnings = [f for f in findings if f.severity.upper() == "WARNING"]
+    buckets = bucket_findings(findings)
+    blockers, errors, warnings = buckets
     
     # Generate guidance based on findings
     if blockers:
-        guidance_items.append(GuidanceItem(
+        guidance_items.append(Guidance(
             title="Critical Security Issues Detected",
             detail=f"Found {len(blockers)} BLOCKER-level security issues that must be addressed. "
                    f"These represent serious vulnerabilities that could lead to data breaches or system compromise."
         ))
         
     if errors:
-        guidance_items.append(GuidanceItem(
+        guidance_items.append(Guidance(
             title="Security Errors Found",
             detail=f"Found {len(errors)} ERROR-level security issues. "
                    f"These should be fixed to meet security best practices."
         ))
     
     if warnings:
-        guidance_items.append(GuidanceItem(
+        guidance_items.append(Guidance(
             title="Security Warnings",
             detail=f"Found {len(warnings)} WARNING-level issues. "
                    f"Consider addressing these to improve security posture."
@@ -54,81 +209,36 @@ def build_guidance(
     
     # Only build constraints for Medium and High risk
     if risk_level in ["Medium", "High"]:
-        # Build constraints based on specific finding codes
+        index = get_constraint_index()
+        extra_guidance = {}
         for finding in findings:
-            # Map finding codes to specific constraints
-            if "UNAUTH" in finding.code or "NO_AUTH" in finding.code:
-                constraints.add("Require proper authentication and authorization for all endpoints")
-                
-            if "TLS" in finding.code or "HTTPS" in finding.code or "HTTP" in finding.code:
-                constraints.add("Use HTTPS/TLS for all network communication, especially authentication flows")
-                
-            if "SECRET" in finding.code or "HARDCODED" in finding.code:
-                constraints.add("Never hardcode secrets, tokens, or credentials in code or config files")
-                constraints.add("Use environment variables or secure secret management systems")
-                
-            if "PASSWORD" in finding.code and "PLAINTEXT" in finding.code:
-                constraints.add("Never store passwords in plain text; use bcrypt, Argon2, or PBKDF2 for password hashing")
-                
-            if "ADMIN" in finding.code or "BACKDOOR" in finding.code:
-                constraints.add("Never auto-create admin accounts or backdoors")
-                constraints.add("Implement secure admin account creation with strong authentication")
-                
-            if "DB_WIPE" in finding.code or "DROP" in finding.code:
-                constraints.add("Never automatically wipe or recreate production data")
-                constraints.add("Require explicit admin action for destructive operations")
-                
-            if "TMP" in finding.code:
-                constraints.add("Store uploads in secure, persistent locations, not temporary directories")
-                
-            if "STACKTRACE" in finding.code or "DEBUG" in finding.code:
-                constraints.add("Never expose stack traces, debug info, or environment variables to clients")
-                constraints.add("Log sensitive errors securely on the server side only")
-                
-            if "DOCKER" in finding.code and "ROOT" in finding.code:
-                constraints.add("Run Docker containers as non-root users for security")
-                
-            if "VALIDATION" in finding.code or "SKIP" in finding.code:
-                constraints.add("Implement strict input validation on all external inputs")
-                
-            if "MD5" in finding.code or "WEAK_HASH" in finding.code:
-                constraints.add("Use strong hashing algorithms (SHA-256 or better) instead of MD5 or SHA-1")
-                
-            if "GET" in finding.code and "AUTH" in finding.code:
-                constraints.add("Use POST requests for authentication, not GET (to avoid credentials in URLs/logs)")
-                
-            if "FINANCIAL" in finding.code or "BALANCE" in finding.code or "PAYMENT" in finding.code:
-                constraints.add("Implement strict authentication and authorization for all financial operations")
-                constraints.add("Validate and audit all balance adjustments and transactions")
-                
-            if "PHI" in finding.code or "PATIENT" in finding.code:
-                constraints.add("Encrypt all Protected Health Information (PHI) at rest and in transit")
-                constraints.add("Implement HIPAA-compliant access controls")
-                
-            if "ARCH_" in finding.code:
-                # Architecture warnings - add to guidance but not constraints
-                if "CONFLICTING" in finding.code or "VAGUE" in finding.code:
-                    guidance_items.append(GuidanceItem(
-                        title="Clarify Technology Stack",
-                        detail="Choose a single, consistent technology stack. Avoid mixing incompatible frameworks."
-                    ))
+            entry = lookup_constraints(finding.code, index)
+            constraints.update(entry.constraints)
+            extra_guidance.update(dict.fromkeys(entry.guidance))
+        
+        for title, detail in extra_guidance:
+            guidance_items.append(Guidance(title=title, detail=detail))
     
     # Convert constraints set to sorted list for consistent output
     constraints_list = sorted(list(constraints))
     
     # Build the final curated prompt with findings for context
-    final_curated_prompt = build_curated_prompt(prompt, constraints_list, risk_level, findings)
+    final_curated_prompt = ""
+    if curate:
+        final_curated_prompt = build_curated_prompt(
+            prompt, constraints_list, risk_level, findings, buckets=buckets, compact=compact
+        )
     
     # Add summary guidance
     if findings:
-        guidance_items.insert(0, GuidanceItem(
+        guidance_items.insert(0, Guidance(
             title="Security Analysis Summary",
             detail=f"Analyzed prompt and found {len(findings)} total issues: "
                    f"{len(blockers)} blockers, {len(errors)} errors, {len(warnings)} warnings. "
                    f"Risk Level: {risk_level}."
         ))
     else:
-        guidance_items.append(GuidanceItem(
+        guidance_items.append(Guidance(
             title="No Security Issues Detected",
             detail="The prompt passed all security checks. Proceed with implementation following best practices."
         ))
@@ -136,7 +246,155 @@ def build_guidance(
     return guidance_items, final_curated_prompt
 
 
-def build_curated_prompt(original_prompt: str, constraints: list[str], risk_level: str, findings: list[DevSpecFinding] = None) -> str:
+# Curated prompt templates, one per risk branch. Placeholders are filled with
+# pre-rendered note sections, so each branch is a single format call.
+CURATED_PROMPT_TEMPLATES = {
+    "low_clean": """{prompt}
+
+---
+SECURITY ANALYSIS: Low Risk
+✅ No significant security issues detected. Follow standard secure development practices.""",
+
+    "low_notes": """{prompt}
+
+---
+Notes:
+{warning_notes}
+
+SECURITY ANALYSIS: Low Risk""",
+
+    "high": """{prompt}
+
+---
+⚠️ CRITICAL SECURITY ISSUES ⚠️
+
+The following issues are UNACCEPTABLE for production and must be fixed:
+
+{blocker_notes}{additional_notes}
+
+These are critical vulnerabilities that could lead to data breaches, system compromise,
+or unauthorized access. Do NOT proceed with implementation until these are resolved.
+
+SECURITY ANALYSIS: High Risk""",
+
+    "medium_warnings": """{prompt}
+
+---
+Quality and Design Concerns:
+
+This specification has structural and planning gaps that elevate it to Medium risk:
+
+{concern_notes}
+
+While no critical vulnerabilities were identified, the accumulation of missing details
+and deferred decisions increases the risk of security issues during implementation.
+Address these concerns to ensure a robust, maintainable system.
+
+SECURITY ANALYSIS: Medium Risk""",
+
+    "medium_errors": """{prompt}
+
+---
+Security Issues Detected:
+
+{error_notes}{additional_warnings}
+
+These issues should be addressed to meet security best practices and prevent
+potential vulnerabilities in production.
+
+SECURITY ANALYSIS: Medium Risk""",
+
+    "medium_fallback": """{prompt}
+
+---
+Security and Quality Issues:
+
+{all_notes}
+
+SECURITY ANALYSIS: Medium Risk""",
+
+    "default": """{prompt}
+
+---
+SECURITY ANALYSIS: {risk_level} Risk
+Review the detailed findings and address issues during implementation.
+""",
+}
+
+# Compact mode: a minimal constraint block for downstream LLM calls
+COMPACT_PROMPT_TEMPLATE = """{prompt}
+
+---
+{block}"""
+
+
+class SeverityBuckets(NamedTuple):
+    """Findings split by severity, in their original order."""
+    blockers: list
+    errors: list
+    warnings: list
+
+
+def bucket_findings(findings: list[Finding]) -> SeverityBuckets:
+    """
+    Split findings into blocker, error and warning buckets in a single pass.
+    
+    Args:
+        findings: List of findings from dev-spec-kit
+        
+    Returns:
+        SeverityBuckets with the findings of each severity
+    """
+    buckets = SeverityBuckets([], [], [])
+    targets = {Severity.BLOCKER: buckets.blockers, Severity.ERROR: buckets.errors, Severity.WARNING: buckets.warnings}
+    for finding in findings:
+        level = getattr(finding, "level", None)
+        if level is None:
+            level = Severity.from_label(finding.severity)
+        target = targets.get(level)
+        if target is not None:
+            target.append(finding)
+    return buckets
+
+
+def _code_notes(findings: list, indent: str = "") -> str:
+    return "\n".join(f"{indent}• {f.code}: {f.message}" for f in findings)
+
+
+def _message_notes(findings: list, indent: str = "") -> str:
+    return "\n".join(f"{indent}• {f.message}" for f in findings)
+
+
+def build_compact_block(constraints: list[str], risk_level: str, buckets: SeverityBuckets) -> str:
+    """
+    Build a minimal-token constraint block for a curated prompt.
+    
+    Args:
+        constraints: List of constraint strings
+        risk_level: The computed risk level (Low, Medium, High)
+        buckets: Findings bucketed by severity
+        
+    Returns:
+        Compact block listing risk, finding codes and constraints
+    """
+    lines = [f"RISK: {risk_level}"]
+    for label, bucket in (("BLOCKER", buckets.blockers), ("ERROR", buckets.errors), ("WARNING", buckets.warnings)):
+        if bucket:
+            lines.append(f"{label}: " + ", ".join(dict.fromkeys(f.code for f in bucket)))
+    if constraints:
+        lines.append("MUST:")
+        lines.extend(f"- {c}" for c in constraints)
+    return "\n".join(lines)
+
+
+def build_curated_prompt(
+    original_prompt: str,
+    constraints: list[str],
+    risk_level: str,
+    findings: list[Finding] = None,
+    buckets: SeverityBuckets = None,
+    compact: bool = False
+) -> str:
     """
     Build a curated prompt by adding security constraints to the original.
     
@@ -145,147 +403,87 @@ def build_curated_prompt(original_prompt: str, constraints: list[str], risk_leve
         constraints: List of constraint strings to add
         risk_level: The computed risk level (Low, Medium, High)
         findings: List of findings to generate detailed notes
+        buckets: Findings already bucketed by severity (computed from findings if omitted)
+        compact: Emit a minimal constraint block instead of the verbose notes
         
     Returns:
         Curated prompt with security constraints
     """
     findings = findings or []
+    if buckets is None:
+        buckets = bucket_findings(findings)
+    blockers, errors, warnings = buckets
     
-    # Categorize findings
-    blockers = [f for f in findings if f.severity.upper() == "BLOCKER"]
-    errors = [f for f in findings if f.severity.upper() == "ERROR"]
-    warnings = [f for f in findings if f.severity.upper() == "WARNING"]
+    if compact:
+        return COMPACT_PROMPT_TEMPLATE.format(
+            prompt=original_prompt,
+            block=build_compact_block(constraints, risk_level, buckets)
+        )
     
     # For Low risk with no/few warnings: minimal notes
     if risk_level == "Low" and len(warnings) <= 2:
         if not warnings:
-            return f"""{original_prompt}
-
----
-SECURITY ANALYSIS: Low Risk
-✅ No significant security issues detected. Follow standard secure development practices."""
-        else:
-            # Low risk with 1-2 warnings: add brief notes
-            warning_notes = "\n".join([f"• {f.message}" for f in warnings])
-            return f"""{original_prompt}
-
----
-Notes:
-{warning_notes}
-
-SECURITY ANALYSIS: Low Risk"""
+            return CURATED_PROMPT_TEMPLATES["low_clean"].format(prompt=original_prompt)
+        # Low risk with 1-2 warnings: add brief notes
+        return CURATED_PROMPT_TEMPLATES["low_notes"].format(
+            prompt=original_prompt,
+            warning_notes=_message_notes(warnings)
+        )
     
     # For High risk: Critical Security Issues section
     if risk_level == "High" and blockers:
-        blocker_notes = []
-        for b in blockers:
-            blocker_notes.append(f"• {b.code}: {b.message}")
-        
-        blocker_section = "\n".join(blocker_notes)
-        
         # Also include error notes if present
         additional_notes = ""
         if errors:
-            error_notes = "\n".join([f"• {e.code}: {e.message}" for e in errors])
-            additional_notes = f"\n\nAdditional Security Concerns:\n{error_notes}"
+            additional_notes = f"\n\nAdditional Security Concerns:\n{_code_notes(errors)}"
         
-        return f"""{original_prompt}
-
----
-⚠️ CRITICAL SECURITY ISSUES ⚠️
-
-The following issues are UNACCEPTABLE for production and must be fixed:
-
-{blocker_section}{additional_notes}
-
-These are critical vulnerabilities that could lead to data breaches, system compromise,
-or unauthorized access. Do NOT proceed with implementation until these are resolved.
-
-SECURITY ANALYSIS: High Risk"""
+        return CURATED_PROMPT_TEMPLATES["high"].format(
+            prompt=original_prompt,
+            blocker_notes=_code_notes(blockers),
+            additional_notes=additional_notes
+        )
     
     # For Medium risk from warnings (no blockers, no/few errors): Quality and Design Concerns
     if risk_level == "Medium" and not blockers and len(warnings) >= 3:
         concern_notes = []
         
         # Group warnings by category
-        quality_warnings = [w for w in warnings if w.code.startswith("QUAL_")]
         security_warnings = [w for w in warnings if w.code.startswith("SEC_")]
+        quality_warnings = [w for w in warnings if w.code.startswith("QUAL_")]
         arch_warnings = [w for w in warnings if w.code.startswith("ARCH_")]
         
         if security_warnings:
-            concern_notes.append("Security Concerns:")
-            for w in security_warnings:
-                concern_notes.append(f"  • {w.message}")
+            concern_notes.append("Security Concerns:\n" + _message_notes(security_warnings, "  "))
         
         if quality_warnings:
-            concern_notes.append("\nQuality Concerns:")
-            for w in quality_warnings:
-                concern_notes.append(f"  • {w.message}")
+            concern_notes.append("\nQuality Concerns:\n" + _message_notes(quality_warnings, "  "))
         
         if arch_warnings:
-            concern_notes.append("\nArchitecture/Design Concerns:")
-            for w in arch_warnings:
-                concern_notes.append(f"  • {w.message}")
-        
-        concern_section = "\n".join(concern_notes)
+            concern_notes.append("\nArchitecture/Design Concerns:\n" + _message_notes(arch_warnings, "  "))
         
-        return f"""{original_prompt}
-
----
-Quality and Design Concerns:
-
-This specification has structural and planning gaps that elevate it to Medium risk:
-
-{concern_section}
-
-While no critical vulnerabilities were identified, the accumulation of missing details
-and deferred decisions increases the risk of security issues during implementation.
-Address these concerns to ensure a robust, maintainable system.
-
-SECURITY ANALYSIS: Medium Risk"""
+        return CURATED_PROMPT_TEMPLATES["medium_warnings"].format(
+            prompt=original_prompt,
+            concern_notes="\n".join(concern_notes)
+        )
     
     # For Medium risk from errors: Standard medium handling
     if risk_level == "Medium" and errors:
-        error_notes = "\n".join([f"• {e.code}: {e.message}" for e in errors])
-        
         additional_warnings = ""
         if warnings:
-            warning_notes = "\n".join([f"  • {w.message}" for w in warnings])
-            additional_warnings = f"\n\nAdditional Warnings:\n{warning_notes}"
+            additional_warnings = f"\n\nAdditional Warnings:\n{_message_notes(warnings, '  ')}"
         
-        return f"""{original_prompt}
-
----
-Security Issues Detected:
-
-{error_notes}{additional_warnings}
-
-These issues should be addressed to meet security best practices and prevent
-potential vulnerabilities in production.
-
-SECURITY ANALYSIS: Medium Risk"""
+        return CURATED_PROMPT_TEMPLATES["medium_errors"].format(
+            prompt=original_prompt,
+            error_notes=_code_notes(errors),
+            additional_warnings=additional_warnings
+        )
     
     # Fallback for other Medium risk cases
     if risk_level == "Medium":
-        all_notes = []
-        for f in findings:
-            all_notes.append(f"• {f.code}: {f.message}")
-        
-        notes_section = "\n".join(all_notes)
-        
-        return f"""{original_prompt}
-
----
-Security and Quality Issues:
-
-{notes_section}
-
-SECURITY ANALYSIS: Medium Risk"""
+        return CURATED_PROMPT_TEMPLATES["medium_fallback"].format(
+            prompt=original_prompt,
+            all_notes=_code_notes(findings)
+        )
     
     # Default fallback
-    return f"""{original_prompt}
-
----
-SECURITY ANALYSIS: {risk_level} Risk
-Review the detailed findings and address issues during implementation.
-"""
+    return CURATED_PROMPT_TEMPLATES["default"].format(prompt=original_prompt, risk_level=risk_level)
@@ -0,0 +1,369 @@
+"""
+Asynchronous analysis jobs.
+
+Long or bulk analyses are submitted as jobs instead of holding a request open.
+Jobs wait in a local in-memory queue and are run by a worker thread pool; each
+job reports which pipeline stage it is in and how long each stage took.
+
+Set JOB_STORE_PATH to keep jobs in a SQLite database as well, so finished
+results survive a restart and unfinished jobs are queued again on startup.
+Finished jobs are dropped after JOB_RETENTION_SECONDS. Job IDs start with
+JOB_ID_PREFIX, which the pre-fork master sets to each worker's index so the
+dispatcher can send a job's requests to the worker that queued it.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional
+
+from pydantic_core import to_json
+
+from .cancellation import AnalysisCancelled, CancellationToken
+from .pipeline import run_analysis
+from .scoring_profiles import get_plan
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_RETENTION_SECONDS = 3600
+
+
+@dataclass(slots=True)
+class Job:
+    """A queued or finished analysis job."""
+    id: str
+    prompts: list
+    compact_prompt: bool = False
+    fields: Optional[frozenset] = None
+    # Scoring profile name (None: SCORING_PROFILE when the job runs)
+    scoring_profile: Optional[str] = None
+    status: str = QUEUED
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage: Optional[str] = None
+    completed: int = 0
+    stage_seconds: dict = field(default_factory=dict)
+    error: Optional[str] = None
+    # JSON array of the encoded analysis results, once succeeded
+    results: Optional[bytes] = None
+    # Bumped on every change so waiters can tell when there is news
+    version: int = 0
+    cancel_token: CancellationToken = field(default_factory=CancellationToken)
+    stage_started: Optional[float] = None
+    future: object = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def as_dict(self) -> dict:
+        """Public job status (without results)."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "completed": self.completed,
+                "total": len(self.prompts),
+                "stage": self.stage,
+                "stage_seconds": {name: round(secs, 4) for name, secs in self.stage_seconds.items()},
+            },
+            "error": self.error,
+        }
+
+    def to_json(self, include_results: bool = True) -> bytes:
+        """Encode the job status, splicing in the already-encoded results."""
+        body = to_json(self.as_dict())
+        if include_results and self.results is not None:
+            body = body[:-1] + b',"results":' + self.results + b"}"
+        return body
+
+
+class JobView(NamedTuple):
+    """A consistent snapshot of a job for the API."""
+    body: bytes
+    version: int
+    finished: bool
+
+
+class JobStore:
+    """SQLite persistence for jobs (one row per job)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, created_at REAL NOT NULL, record TEXT NOT NULL, results BLOB)"
+            )
+
+    def save(self, job: Job) -> None:
+        record = job.as_dict()
+        record["prompts"] = job.prompts
+        record["compact_prompt"] = job.compact_prompt
+        record["fields"] = sorted(job.fields) if job.fields is not None else None
+        record["scoring_profile"] = job.scoring_profile
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, created_at, record, results) VALUES (?, ?, ?, ?)",
+                (job.id, job.created_at, json.dumps(record), job.results)
+            )
+
+    def delete(self, job_ids: list) -> None:
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def load_all(self) -> list[Job]:
+        """Load every stored job, oldest first."""
+        with self._lock:
+            rows = self._db.execute("SELECT record, results FROM jobs ORDER BY created_at").fetchall()
+        jobs = []
+        for record_text, results in rows:
+            record = json.loads(record_text)
+            progress = record["progress"]
+            jobs.append(Job(
+                id=record["job_id"],
+                prompts=record["prompts"],
+                compact_prompt=record["compact_prompt"],
+                fields=frozenset(record["fields"]) if record["fields"] is not None else None,
+                scoring_profile=record.get("scoring_profile"),
+                status=record["status"],
+                created_at=record["created_at"],
+                started_at=record["started_at"],
+                finished_at=record["finished_at"],
+                stage=progress["stage"],
+                completed=progress["completed"],
+                stage_seconds=progress["stage_seconds"],
+                error=record["error"],
+                results=results,
+            ))
+        return jobs
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JobManager:
+    """Queue of analysis jobs run by a pool of worker threads."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_JOB_WORKERS,
+        retention_seconds: float = DEFAULT_JOB_RETENTION_SECONDS,
+        store: Optional[JobStore] = None,
+        id_prefix: str = ""
+    ):
+        self.retention_seconds = retention_seconds
+        self.store = store
+        self.id_prefix = id_prefix
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="analysis-job")
+        if store is not None:
+            self._recover()
+
+    @classmethod
+    def from_env(cls) -> "JobManager":
+        """Build a manager from JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_STORE_PATH and JOB_ID_PREFIX."""
+        workers = _int_from_env("JOB_WORKERS", DEFAULT_JOB_WORKERS)
+        retention = _int_from_env("JOB_RETENTION_SECONDS", DEFAULT_JOB_RETENTION_SECONDS)
+        store_path = os.getenv("JOB_STORE_PATH")
+        return cls(workers, retention, JobStore(store_path) if store_path else None, os.getenv("JOB_ID_PREFIX", ""))
+
+    def submit(
+        self,
+        prompts: list,
+        compact_prompt: bool = False,
+        fields: Optional[frozenset] = None,
+        scoring_profile: Optional[str] = None
+    ) -> Job:
+        """
+        Queue an analysis of one or more prompts.
+
+        Args:
+            prompts: Prompts to analyze, in order
+            compact_prompt: Emit curated prompts as compact constraint blocks
+            fields: Response fields to keep in each result (default: all)
+            scoring_profile: Scoring profile name (default: SCORING_PROFILE)
+
+        Returns:
+            The queued Job
+        """
+        self.purge_expired()
+        job = Job(
+            id=self.id_prefix + uuid.uuid4().hex,
+            prompts=list(prompts),
+            compact_prompt=compact_prompt,
+            fields=fields,
+            scoring_profile=scoring_profile,
+            created_at=time.time()
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def view(self, job_id: str, wait: float = 0.0, after_version: Optional[int] = None) -> Optional[JobView]:
+        """
+        Snapshot a job, optionally waiting for news first.
+
+        Args:
+            job_id: The job to look at
+            wait: Seconds to wait for the job to finish (or, with after_version,
+                for any change) before returning
+            after_version: Return as soon as the job version differs from this
+
+        Returns:
+            JobView, or None if the job does not exist
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._changed:
+            if wait > 0:
+                if after_version is None:
+                    self._changed.wait_for(lambda: job.finished, wait)
+                else:
+                    self._changed.wait_for(lambda: job.finished or job.version != after_version, wait)
+            return JobView(job.to_json(), job.version, job.finished)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. Queued jobs are cancelled immediately; running jobs have
+        their rule script killed and skip their remaining stages. Finished jobs
+        are left as they are.
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_token.cancel("job cancelled")
+        if job.future is not None and job.future.cancel():
+            with self._changed:
+                self._finish(job, CANCELLED)
+            self._persist(job)
+        return job
+
+    def purge_expired(self) -> int:
+        """Drop finished jobs older than the retention period; returns how many were dropped."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at is not None and job.finished_at <= cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired and self.store is not None:
+            self.store.delete(expired)
+        return len(expired)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.store is not None:
+            self.store.close()
+
+    def _recover(self) -> None:
+        """Reload stored jobs and queue again any that had not finished."""
+        for job in self.store.load_all():
+            self._jobs[job.id] = job
+            if not job.finished:
+                job.status, job.started_at, job.stage, job.completed = QUEUED, None, None, 0
+                job.stage_seconds = {}
+                self._enqueue(job)
+        self.purge_expired()
+
+    def _enqueue(self, job: Job) -> None:
+        job.future = self._executor.submit(self._run, job)
+
+    def _run(self, job: Job) -> None:
+        with self._changed:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._touch(job)
+        self._persist(job)
+
+        def on_stage(stage: str) -> None:
+            with self._changed:
+                self._enter_stage(job, stage)
+
+        try:
+            scoring = get_plan(job.scoring_profile)
+            bodies = []
+            for prompt in job.prompts:
+                job.cancel_token.raise_if_cancelled()
+                result = run_analysis(
+                    prompt, compact_prompt=job.compact_prompt, fields=job.fields,
+                    progress=on_stage, cancel=job.cancel_token, scoring=scoring
+                )
+                bodies.append(result.to_json(job.fields))
+                with self._changed:
+                    self._enter_stage(job, None)
+                    job.completed += 1
+                    self._touch(job)
+            job.results = b"[" + b",".join(bodies) + b"]"
+            status, error = SUCCEEDED, None
+        except AnalysisCancelled:
+            status, error = CANCELLED, None
+        except Exception as e:
+            status, error = FAILED, f"Analysis failed: {e}"
+
+        with self._changed:
+            job.error = error
+            self._finish(job, status)
+        self._persist(job)
+
+    def _enter_stage(self, job: Job, stage: Optional[str]) -> None:
+        """Close the timer of the current stage and start the next one (lock held)."""
+        now = time.perf_counter()
+        if job.stage is not None and job.stage_started is not None:
+            job.stage_seconds[job.stage] = job.stage_seconds.get(job.stage, 0.0) + (now - job.stage_started)
+        job.stage = stage
+        job.stage_started = now if stage is not None else None
+        self._touch(job)
+
+    def _finish(self, job: Job, status: str) -> None:
+        """Mark a job finished (lock held)."""
+        self._enter_stage(job, None)
+        job.status = status
+        job.finished_at = time.time()
+        self._touch(job)
+
+    def _touch(self, job: Job) -> None:
+        job.version += 1
+        self._changed.notify_all()
+
+    def _persist(self, job: Job) -> None:
+        if self.store is not None:
+            self.store.save(job)
+
+
+def _int_from_env(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except ValueError:
+        return default
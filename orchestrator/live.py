@@ -0,0 +1,141 @@
+"""
+Live (as-you-type) analysis sessions.
+
+A LiveSession holds the prompt text of one editor connection and applies the
+edits the client sends. Once edits pause, the latest text is analyzed and the
+client gets the findings that were added or removed since the previous update,
+together with the risk level and score.
+
+The rules match across the whole normalized prompt, so an edit anywhere can
+change any finding and the rules always run on the full text. A session keeps
+the work per update small instead: superseded analyses are cancelled, only the
+stages behind the live fields run, and texts seen before in the session (undo,
+redo, re-typing) are served from a per-session memo.
+"""
+import time
+from typing import NamedTuple, Optional
+
+from .cache import LRUCache, analysis_cache_key
+from .cancellation import CancellationToken
+from .delta import diff_analyses
+from .pipeline import run_analysis
+from .records import AnalysisResult
+
+
+DEFAULT_DEBOUNCE_MS = 150
+MAX_DEBOUNCE_MS = 2000
+
+# Response fields the live view needs (guidance and the curated prompt are skipped)
+LIVE_FIELDS = frozenset({
+    "devspec_findings", "risk_level", "has_blockers", "has_errors",
+    "spec_quality_score", "spec_quality_warnings",
+})
+
+# Analyses remembered per session, keyed by text
+SESSION_MEMO_SIZE = 32
+
+
+class LiveAnalysis(NamedTuple):
+    """An analysis of one revision of the session text."""
+    revision: int
+    result: AnalysisResult
+    reused: bool
+    elapsed_ms: float
+
+
+class LiveSession:
+    """Editor state and analysis history for one live connection."""
+
+    def __init__(self, memo_size: int = SESSION_MEMO_SIZE):
+        self.text = ""
+        self.revision = 0
+        self.last_result: Optional[AnalysisResult] = None
+        self._memo = LRUCache(memo_size)
+        self._inflight: Optional[CancellationToken] = None
+
+    def apply(self, message: dict) -> int:
+        """
+        Apply a client message to the session text.
+
+        Messages are {"type": "replace", "prompt": str} for the whole text, or
+        {"type": "edit", "start": int, "end": int, "text": str} to replace the
+        characters [start, end) with text.
+
+        Args:
+            message: Decoded client message
+
+        Returns:
+            The new revision number
+
+        Raises:
+            ValueError: If the message is malformed or the edit is out of range
+        """
+        kind = message.get("type")
+        if kind == "replace":
+            prompt = message.get("prompt")
+            if not isinstance(prompt, str):
+                raise ValueError("'replace' needs a string 'prompt'")
+            self.text = prompt
+        elif kind == "edit":
+            start, end, text = message.get("start"), message.get("end"), message.get("text", "")
+            if not (isinstance(start, int) and isinstance(end, int) and isinstance(text, str)):
+                raise ValueError("'edit' needs integer 'start' and 'end' and a string 'text'")
+            if not 0 <= start <= end <= len(self.text):
+                raise ValueError(f"Edit range [{start}, {end}) is outside the text (length {len(self.text)})")
+            self.text = self.text[:start] + text + self.text[end:]
+        else:
+            raise ValueError(f"Unknown message type: {kind!r}")
+        self.revision += 1
+        return self.revision
+
+    def cancel(self) -> None:
+        """Cancel the analysis in flight, if any (killing its rule script)."""
+        token = self._inflight
+        if token is not None:
+            token.cancel("superseded")
+
+    def analyze(self) -> LiveAnalysis:
+        """
+        Analyze the current text (blocking; run it off the event loop).
+
+        Raises:
+            AnalysisCancelled: If cancel() was called while the analysis ran
+        """
+        revision, text = self.revision, self.text
+        started = time.perf_counter()
+        key = analysis_cache_key(text, LIVE_FIELDS)
+        result = self._memo.get(key)
+        reused = result is not None
+        if result is None:
+            token = CancellationToken()
+            self._inflight = token
+            try:
+                result = run_analysis(text, fields=LIVE_FIELDS, cancel=token)
+            finally:
+                if self._inflight is token:
+                    self._inflight = None
+            self._memo.put(key, result)
+        return LiveAnalysis(revision, result, reused, (time.perf_counter() - started) * 1000)
+
+    def update_message(self, analysis: LiveAnalysis) -> dict:
+        """
+        Build the update for the client and remember the analysis as delivered.
+
+        Deltas are relative to the last update sent, so only call this for an
+        analysis that is about to be sent.
+        """
+        delta = diff_analyses(self.last_result, analysis.result)
+        self.last_result = analysis.result
+        result = analysis.result
+        return {
+            "type": "analysis",
+            "revision": analysis.revision,
+            "risk_level": result.risk_level,
+            "has_blockers": result.has_blockers,
+            "has_errors": result.has_errors,
+            "spec_quality_score": result.spec_quality_score,
+            "spec_quality_warnings": list(result.spec_quality_warnings),
+            **delta.as_dict(full_unchanged=False),
+            "reused": analysis.reused,
+            "elapsed_ms": round(analysis.elapsed_ms, 2),
+        }
@@ -13,19 +13,139 @@ To run the API server:
     
 Or use uvicorn directly:
     uvicorn api.main:app --reload --host 0.0.0.0 --port 8000
+
+Bulk mode analyzes many prompts in parallel and writes JSONL results:
+    python -m orchestrator.main specs/ 'docs/**/*.md' --jsonl prompts.jsonl
+
+The pipeline is imported only once the arguments are parsed, so --help and
+argument errors stay fast; --profile-startup reports where startup time goes.
 """
-from .pipeline import analyze_prompt
+import argparse
+import importlib
+import os
 import sys
+import time
+
+# Taken when the CLI module is first loaded (the interpreter itself is not included)
+_STARTED = time.perf_counter()
+
+
+# Exit codes of bulk mode
+EXIT_HIGH_RISK = 1
+EXIT_ERROR = 2
+
+# Modules loaded for an analysis, in dependency order (timed by --profile-startup)
+STARTUP_MODULES = ("records", "rules", "devspec_runner", "guidance_engine", "spec_kit_adapter", "pipeline")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m orchestrator.main",
+        description="Analyze a prompt (report mode) or many prompts in parallel (bulk mode, JSONL output)."
+    )
+    parser.add_argument("inputs", nargs="*", help="Prompt files, directories or glob patterns")
+    parser.add_argument("--jsonl", action="append", default=[], metavar="FILE",
+                        help="Read prompts from a JSONL file ('-' for stdin); may be repeated")
+    parser.add_argument("--bulk", action="store_true", help="Use bulk mode even for a single file")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Worker processes in bulk mode (default: available cores)")
+    parser.add_argument("--order", choices=("completion", "input"), default="completion",
+                        help="Order of bulk results (default: completion)")
+    parser.add_argument("--fields", default=None,
+                        help="Comma-separated result fields in bulk mode (default: summary profile)")
+    parser.add_argument("--profile", default=None, help="Result field profile in bulk mode (e.g. full)")
+    parser.add_argument("-o", "--output", default=None, help="Write bulk results to FILE instead of stdout")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No progress output in bulk mode")
+    parser.add_argument("--in-process-rules", action="store_true",
+                        help="Evaluate the rule script in-process instead of running it (same as IN_PROCESS_RULES=true)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report module import, rule loading and analysis times on stderr (report mode)")
+    return parser
+
+
+class StartupProfile:
+    """Wall-clock timings of the startup phases of one CLI run."""
+
+    def __init__(self):
+        self.timings = [("cli module and argument parsing", time.perf_counter() - _STARTED)]
+
+    def measure(self, label: str, func, *args):
+        """Call func(*args), record how long it took under label, and return its result."""
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings.append((label, time.perf_counter() - started))
+
+    def report(self, stream=sys.stderr) -> None:
+        width = max(len(label) for label, _ in self.timings)
+        print("\nStartup profile (ms):", file=stream)
+        for label, seconds in self.timings:
+            print(f"  {label:<{width}}  {seconds * 1000:8.1f}", file=stream)
+        print(f"  {'total since cli import':<{width}}  {(time.perf_counter() - _STARTED) * 1000:8.1f}", file=stream)
+
+
+def load_pipeline(profile=None):
+    """
+    Import the analysis pipeline and, with in-process rules, compile the rule script.
 
+    Args:
+        profile: Optional StartupProfile timing each module import
 
-def main():
+    Returns:
+        The run_analysis function
+    """
+    if profile is not None:
+        for name in STARTUP_MODULES:
+            # Each module is charged for the dependencies not loaded before it
+            profile.measure(f"import {name}", importlib.import_module, f".{name}", __package__)
+    from .devspec_runner import use_in_process_rules
+    from .pipeline import run_analysis
+    
+    if use_in_process_rules():
+        if profile is not None:
+            profile.measure("import rule_engine", importlib.import_module, ".rule_engine", __package__)
+        from .rule_engine import RuleCompileError, load_rule_engine
+        try:
+            if profile is not None:
+                profile.measure("load rules", load_rule_engine)
+            else:
+                load_rule_engine()
+        except RuleCompileError as e:
+            print(f"WARNING: rules run by the script ({e})", file=sys.stderr)
+    return run_analysis
+
+
+def is_bulk(args: argparse.Namespace) -> bool:
+    """Bulk mode unless a single prompt file (or stdin) is given."""
+    return bool(
+        args.bulk or args.jsonl or len(args.inputs) > 1
+        or any(not os.path.isfile(entry) for entry in args.inputs)
+    )
+
+
+def main(argv=None):
     """
     Command-line interface for the orchestrator.
-    Reads prompt from stdin or file and outputs analysis.
+    
+    Report mode reads a prompt from a file or stdin and prints a human-readable
+    analysis. Bulk mode (directories, globs, several files or --jsonl) writes
+    one JSON line per prompt and exits with EXIT_HIGH_RISK if any prompt is
+    High risk, or EXIT_ERROR if any prompt could not be analyzed.
     """
-    if len(sys.argv) > 1:
+    args = build_parser().parse_args(argv)
+    if args.in_process_rules:
+        # Through the environment, so bulk-mode workers use it too
+        os.environ["IN_PROCESS_RULES"] = "true"
+    if is_bulk(args):
+        return run_bulk_cli(args)
+    
+    profile = StartupProfile() if args.profile_startup else None
+    run_analysis = load_pipeline(profile)
+    
+    if args.inputs:
         # Read from file
-        with open(sys.argv[1], 'r') as f:
+        with open(args.inputs[0], 'r') as f:
             prompt = f.read()
     else:
         # Read from stdin
@@ -33,7 +153,10 @@ def main():
         prompt = sys.stdin.read()
     
     # Run analysis
-    result = analyze_prompt(prompt)
+    if profile is not None:
+        result = profile.measure("analysis", run_analysis, prompt)
+    else:
+        result = run_analysis(prompt)
     
     # Print results
     print("\n" + "="*80)
@@ -55,7 +178,64 @@ def main():
     print("="*80)
     print(result.final_curated_prompt)
     print("="*80)
+    if profile is not None:
+        profile.report()
+    return 0
+
+
+def run_bulk_cli(args: argparse.Namespace) -> int:
+    """Run bulk mode for parsed arguments and return the exit code."""
+    from .bulk import DEFAULT_BULK_FIELDS, ProgressReporter, iter_sources, run_bulk
+    from .records import select_fields
+    
+    try:
+        fields = select_fields(args.fields, args.profile) if (args.fields or args.profile) else DEFAULT_BULK_FIELDS
+        if fields is not None:
+            # The exit code needs the risk level of every prompt
+            fields = fields | {"risk_level"}
+        sources = iter_sources(args.inputs, args.jsonl)
+        total = None
+        if "-" not in args.jsonl:
+            # Everything but stdin can be enumerated up front for the ETA
+            sources = list(sources)
+            total = len(sources)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    progress = None if args.quiet else ProgressReporter(total)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        summary = run_bulk(
+            sources, output,
+            workers=args.workers,
+            ordered=args.order == "input",
+            fields=fields,
+            total=total,
+            progress=progress
+        )
+    except ValueError as e:
+        # Invalid JSONL on stdin surfaces while streaming
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if args.output:
+            output.close()
+    
+    if not args.quiet:
+        counts = ", ".join(f"{level}: {count}" for level, count in sorted(summary.risk_counts.items()))
+        print(
+            f"Analyzed {summary.total} prompts in {summary.elapsed:.1f}s"
+            f" ({counts or 'none'}; failed: {summary.failed})",
+            file=sys.stderr
+        )
+    
+    if summary.failed:
+        return EXIT_ERROR
+    if summary.risk_counts.get("High"):
+        return EXIT_HIGH_RISK
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
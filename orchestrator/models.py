@@ -1,13 +1,36 @@
 """
 Pydantic models for request/response validation and data structures.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 
 
 class PromptRequest(BaseModel):
     """Request model for analyzing a developer prompt."""
     prompt: str = Field(..., description="The raw developer prompt to analyze")
+    compact_prompt: bool = Field(default=False, description="Return the curated prompt as a compact constraint block")
+
+
+# Largest number of prompts accepted in one job
+MAX_JOB_PROMPTS = 1000
+
+
+class JobRequest(BaseModel):
+    """Request model for queueing an asynchronous analysis job."""
+    prompt: Optional[str] = Field(default=None, description="A single prompt to analyze")
+    prompts: Optional[list[str]] = Field(default=None, max_length=MAX_JOB_PROMPTS, description="Several prompts to analyze in one job")
+    compact_prompt: bool = Field(default=False, description="Return curated prompts as compact constraint blocks")
+
+    @model_validator(mode="after")
+    def check_prompts(self):
+        if (self.prompt is None) == (self.prompts is None):
+            raise ValueError("Provide exactly one of 'prompt' or 'prompts'")
+        if self.prompts is not None and not self.prompts:
+            raise ValueError("'prompts' must not be empty")
+        return self
+
+    def prompt_list(self) -> list[str]:
+        return [self.prompt] if self.prompt is not None else self.prompts
 
 
 class DevSpecFinding(BaseModel):
@@ -61,3 +84,51 @@ class AnalysisResponse(BaseModel):
     spec_quality_warnings: list[str] = Field(default_factory=list, description="Warnings about missing or weak spec areas")
     spec_quality_score: Optional[int] = Field(default=None, ge=0, le=100, description="Spec quality score 0-100 (None if spec-kit not used)")
 
+
+
+class JobProgress(BaseModel):
+    """Progress of an analysis job."""
+    completed: int = Field(..., description="Prompts analyzed so far")
+    total: int = Field(..., description="Prompts in the job")
+    stage: Optional[str] = Field(None, description="Pipeline stage currently running")
+    stage_seconds: dict[str, float] = Field(default_factory=dict, description="Seconds spent in each stage so far")
+
+
+class JobStatusResponse(BaseModel):
+    """Status of an analysis job, with its results once it has succeeded."""
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="queued, running, succeeded, failed, or cancelled")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(None, description="Start time (Unix seconds)")
+    finished_at: Optional[float] = Field(None, description="Finish time (Unix seconds)")
+    progress: JobProgress
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    results: Optional[list[dict]] = Field(None, description="One analysis per prompt, in order (subject to ?fields/?profile)")
+
+
+class DiffRequest(BaseModel):
+    """Request model for comparing a revised prompt against a base prompt."""
+    prompt: str = Field(..., description="The revised prompt")
+    base_prompt: Optional[str] = Field(default=None, description="The base prompt to compare against")
+    base_analysis_id: Optional[str] = Field(default=None, description="Analysis ID of an earlier analysis to use as the base (from X-Analysis-Id or a previous diff)")
+
+    @model_validator(mode="after")
+    def check_base(self):
+        if (self.base_prompt is None) == (self.base_analysis_id is None):
+            raise ValueError("Provide exactly one of 'base_prompt' or 'base_analysis_id'")
+        return self
+
+
+class DiffResponse(BaseModel):
+    """Finding, risk-level and score changes from a base prompt to a revised prompt."""
+    analysis_id: str = Field(..., description="Analysis ID of the revised prompt (usable as the next base)")
+    base_analysis_id: str = Field(..., description="Analysis ID of the base prompt")
+    added: list[DevSpecFinding] = Field(default_factory=list, description="Findings only in the revised prompt")
+    removed: list[DevSpecFinding] = Field(default_factory=list, description="Findings only in the base prompt")
+    unchanged: list[DevSpecFinding] = Field(default_factory=list, description="Findings in both prompts")
+    risk_level_before: Optional[str] = Field(None, description="Risk level of the base prompt")
+    risk_level_after: str = Field(..., description="Risk level of the revised prompt")
+    risk_level_changed: bool = Field(..., description="Whether the risk level changed")
+    score_before: Optional[int] = Field(None, description="Spec quality score of the base prompt")
+    score_after: Optional[int] = Field(None, description="Spec quality score of the revised prompt")
+    score_change: Optional[int] = Field(None, description="score_after - score_before")
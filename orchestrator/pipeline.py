@@ -2,13 +2,28 @@
 Main orchestration pipeline that coordinates all components.
 """
 import re
-from .models import AnalysisResponse, DevSpecFinding, SpecKitStructure
+from typing import TYPE_CHECKING, Callable, Optional
+from .cache import analysis_id
+from .cancellation import CancellationToken
+from .records import AnalysisResult, Finding, Severity, SpecStructure
+from .risk import classify_risk, summarize_findings
 from .devspec_runner import run_dev_spec_kit
 from .guidance_engine import build_guidance
 from .claude_client import call_claude
+from .similarity import SimilarityIndex
+from .spec_kit_adapter import get_adapter, should_use_spec_kit
+from .scoring_profiles import CRITICAL_CATEGORIES, IMPORTANT_CATEGORIES, QUALITY_INDICATORS, TECH_KEYWORDS, VAGUE_PATTERNS, ScoringPlan
+from .spec_scoring import (
+    AUTH_FLOW_WARNING, MISSING_AREA_WARNINGS, STORAGE_CONFIG_WARNING, VAGUE_FEATURES_WARNING, assess_spec_quality,
+)
 
+if TYPE_CHECKING:
+    # Pydantic models are built on first use (to_response), not at import
+    from .models import AnalysisResponse
+    from .feature_store import FeatureStore
 
-def detect_missing_spec_areas(structure: SpecKitStructure) -> list[str]:
+
+def detect_missing_spec_areas(structure: SpecStructure) -> list[str]:
     """
     Detect missing or weak areas in the spec structure.
     
@@ -24,51 +39,32 @@ def detect_missing_spec_areas(structure: SpecKitStructure) -> list[str]:
     """
     warnings = []
     
-    # Check for missing features
-    if not structure.features or len(structure.features) == 0:
-        warnings.append("No features or requirements explicitly defined. Consider specifying what the system should do.")
-    
-    # Check for missing entities
-    if not structure.entities or len(structure.entities) == 0:
-        warnings.append("No data models or entities identified. Consider defining what data structures are needed.")
-    
-    # Check for missing flows
-    if not structure.flows or len(structure.flows) == 0:
-        warnings.append("No user flows or workflows identified. Consider describing how users interact with the system.")
-    
-    # Check for missing error handling
-    if not structure.error_handling or len(structure.error_handling) == 0:
-        warnings.append("No error handling strategy mentioned. Consider how the system handles failures and edge cases.")
-    
-    # Check for missing testing strategy
-    if not structure.testing or len(structure.testing) == 0:
-        warnings.append("No testing strategy mentioned. Consider adding test plans, unit tests, or integration tests.")
-    
-    # Check for missing logging/monitoring
-    if not structure.logging or len(structure.logging) == 0:
-        warnings.append("No logging or monitoring mentioned. Consider how you'll track system behavior and debug issues.")
+    # Check for missing features, entities, flows, error handling, testing strategy and logging/monitoring
+    for name, message in MISSING_AREA_WARNINGS.items():
+        if not getattr(structure, name):
+            warnings.append(message)
     
     # Check for authentication without proper definition
     if structure.authentication and len(structure.authentication) > 0:
         # Authentication mentioned but flows might be missing
         if not structure.flows or not any('login' in f or 'auth' in f for f in structure.flows):
-            warnings.append("Authentication mentioned but login/auth flow not clearly defined.")
+            warnings.append(AUTH_FLOW_WARNING)
     
     # Check for data storage without configuration
     if structure.data_storage and len(structure.data_storage) > 0:
         if not structure.configuration or len(structure.configuration) == 0:
-            warnings.append("Data storage mentioned but configuration details (connection strings, env vars) not specified.")
+            warnings.append(STORAGE_CONFIG_WARNING)
     
     # Weak features (too vague)
     if structure.features and len(structure.features) > 0:
         vague_features = [f for f in structure.features if len(f.split()) < 3]
         if len(vague_features) > len(structure.features) / 2:
-            warnings.append("Some features are vaguely defined. Consider adding more detail about what each feature should do.")
+            warnings.append(VAGUE_FEATURES_WARNING)
     
     return warnings
 
 
-def compute_spec_quality_score(structure: SpecKitStructure, warnings: list[str], prompt_text: str = "") -> int:
+def compute_spec_quality_score(structure: SpecStructure, warnings: list[str], prompt_text: str = "") -> int:
     """
     Compute a spec quality score from 0-100 based on completeness.
     
@@ -87,25 +83,14 @@ def compute_spec_quality_score(structure: SpecKitStructure, warnings: list[str],
     score = 44  # Slightly higher base to help edge cases
     
     # Add points for each populated critical category (7 points each)
-    critical_categories = [
-        ('features', structure.features),
-        ('entities', structure.entities),
-        ('flows', structure.flows),
-        ('error_handling', structure.error_handling),
-        ('testing', structure.testing)
-    ]
+    critical_categories = [(name, getattr(structure, name)) for name in CRITICAL_CATEGORIES]
     
     for name, category in critical_categories:
         if category and len(category) > 0:
             score += 7
     
     # Add points for each populated important category (4 points each)
-    important_categories = [
-        ('configuration', structure.configuration),
-        ('logging', structure.logging),
-        ('authentication', structure.authentication),
-        ('data_storage', structure.data_storage)
-    ]
+    important_categories = [(name, getattr(structure, name)) for name in IMPORTANT_CATEGORIES]
     
     for name, category in important_categories:
         if category and len(category) > 0:
@@ -118,15 +103,7 @@ def compute_spec_quality_score(structure: SpecKitStructure, warnings: list[str],
     # Deduct points for vagueness/deferral language (indicates underspecified spec)
     if prompt_text:
         prompt_lower = prompt_text.lower()
-        vague_patterns = [
-            r'(will|can|might|maybe|probably|either|whichever).*(add|decide|choose|implement).*later',
-            r'(decide|choose|determine|specify).*(later|during implementation|at runtime)',
-            r'no (concrete )?plan (yet )?for',
-            r'(tbd|todo|not sure|whatever|any.*fine)',
-            r'(could be|either.*or).*(postgres|mongo|mysql)',
-            r'will add.*(authentication|auth|logging|tests?).*(later|after)',
-        ]
-        vague_count = sum(1 for pattern in vague_patterns if re.search(pattern, prompt_lower))
+        vague_count = sum(1 for pattern in VAGUE_PATTERNS if re.search(pattern, prompt_lower))
         
         # Heavy penalty for vagueness (18 points per vague phrase, max 54)
         vagueness_penalty = min(vague_count * 18, 54)
@@ -156,16 +133,7 @@ def compute_spec_quality_score(structure: SpecKitStructure, warnings: list[str],
     # Technology/framework specificity bonus
     if prompt_text:
         prompt_lower = prompt_text.lower()
-        tech_keywords = [
-            'openid connect', 'oauth',  # Auth protocols (specific ones)
-            'postgresql', 'mysql', 'mongodb',  # Databases
-            's3', 'gcs',  # Cloud storage
-            'kafka', 'rabbitmq',  # Messaging
-            'kubernetes', 'terraform',  # Infrastructure
-            'graphql', 'grpc',  # API styles (specific)
-        ]
-        
-        tech_count = sum(1 for keyword in tech_keywords if keyword in prompt_lower)
+        tech_count = sum(1 for keyword in TECH_KEYWORDS if keyword in prompt_lower)
         
         if tech_count >= 4:
             score += 18  # Increased
@@ -174,25 +142,17 @@ def compute_spec_quality_score(structure: SpecKitStructure, warnings: list[str],
         elif tech_count >= 2:
             score += 6  # Increased
         
-        # Minimal quality indicators (only strong signals)
-        # Detailed test suite mentioned
-        if re.search(r'test suite that covers|comprehensive test|test.*cover.*(login|token|profile)', prompt_lower):
-            score += 6
-        
-        # Detailed logging mentioned (not minimal)
-        if re.search(r'log request method.*path.*status|logging includes.*method.*path|error logging with request', prompt_lower):
-            score += 4
-        
-        # Explicit error handling or edge cases
-        if re.search(r'error handling|handle.*edge case', prompt_lower):
-            score += 3
+        # Minimal quality indicators: detailed tests, detailed logging, explicit error handling
+        for pattern, points in QUALITY_INDICATORS:
+            if re.search(pattern, prompt_lower):
+                score += points
     
     # Clamp to 0-100 range, but cap at 95 to avoid perfect scores for typical specs
     # (Reserve 95-100 for exceptionally detailed production-ready specifications)
     return max(0, min(95, score))
 
 
-def filter_false_positives(prompt: str, findings: list[DevSpecFinding]) -> list[DevSpecFinding]:
+def filter_false_positives(prompt: str, findings: list[Finding]) -> list[Finding]:
     """
     Filter out likely false positives based on context analysis.
     
@@ -324,7 +284,39 @@ def filter_false_positives(prompt: str, findings: list[DevSpecFinding]) -> list[
     return filtered_findings
 
 
-def analyze_prompt(prompt: str, call_claude_api: bool = False) -> AnalysisResponse:
+def analyze_prompt(prompt: str, call_claude_api: bool = False, compact_prompt: bool = False) -> "AnalysisResponse":
+    """
+    Run the complete analysis pipeline and return the API response model.
+    
+    Args:
+        prompt: The raw developer prompt to analyze
+        call_claude_api: Whether to actually call Claude (default: False for stub)
+        compact_prompt: Emit the curated prompt as a minimal constraint block
+        
+    Returns:
+        AnalysisResponse with complete analysis results
+    """
+    return run_analysis(prompt, call_claude_api, compact_prompt).to_response()
+
+
+# Response fields produced by the spec-quality stage
+SPEC_QUALITY_FIELDS = frozenset({"spec_kit_structure", "spec_quality_warnings", "spec_quality_score"})
+
+# Stage names reported to run_analysis progress callbacks, in pipeline order
+PIPELINE_STAGES = ("structure", "workflow", "rules", "guidance", "claude")
+
+
+def run_analysis(
+    prompt: str,
+    call_claude_api: bool = False,
+    compact_prompt: bool = False,
+    fields: Optional[frozenset] = None,
+    progress: Optional[Callable[[str], None]] = None,
+    cancel: Optional[CancellationToken] = None,
+    similar: Optional[SimilarityIndex] = None,
+    scoring: Optional[ScoringPlan] = None,
+    features: Optional["FeatureStore"] = None
+) -> AnalysisResult:
     """
     Run the complete analysis pipeline on a developer prompt.
     
@@ -338,20 +330,45 @@ def analyze_prompt(prompt: str, call_claude_api: bool = False) -> AnalysisRespon
     Args:
         prompt: The raw developer prompt to analyze
         call_claude_api: Whether to actually call Claude (default: False for stub)
+        compact_prompt: Emit the curated prompt as a minimal constraint block
+        fields: Response fields the caller needs (default: all). Stages that only
+            feed unrequested fields are skipped and those fields keep their defaults.
+        progress: Optional callback invoked with the name of each stage (see
+            PIPELINE_STAGES) as it starts. An exception raised by the callback
+            aborts the analysis before that stage.
+        cancel: Optional cancellation token. Once cancelled, the rule script is
+            killed and the remaining stages are skipped.
+        similar: Optional index of recent prompts. A prompt with the same rule
+            input as an indexed one (differing only in letter case or newlines)
+            reuses its rule output instead of running the rule script; the
+            match is recorded in AnalysisResult.similarity.
+        scoring: Scoring plan for spec_quality_score (default: the
+            SCORING_PROFILE profile, see scoring_profiles.get_plan)
+        features: Optional feature store the prompt is added to, for
+            re-scoring and re-classification without re-analysis
         
     Returns:
-        AnalysisResponse with complete analysis results
+        AnalysisResult with complete analysis results (internal records, not validated)
+        
+    Raises:
+        AnalysisCancelled: If the token was cancelled before the analysis finished
     """
-    # Import spec-kit adapter (only needed if enabled)
-    from .spec_kit_adapter import should_use_spec_kit, get_adapter
+    need_spec_quality = fields is None or not SPEC_QUALITY_FIELDS.isdisjoint(fields)
+    need_claude = call_claude_api and (fields is None or "claude_output" in fields)
+    need_curated_prompt = need_claude or fields is None or "final_curated_prompt" in fields
+    need_guidance = need_curated_prompt or "guidance" in fields
+    
+    def report_stage(stage: str) -> None:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        if progress is not None:
+            progress(stage)
     
     # Normalize the prompt (basic cleanup)
     normalized_prompt = prompt.strip()
     
     # Step 0: Always extract spec structure and compute quality score
     # This provides valuable feedback even without spec-kit CLI integration
-    from .spec_kit_adapter import extract_spec_structure
-    
     spec_kit_enabled = should_use_spec_kit()
     spec_kit_success = None
     spec_kit_raw_output = None
@@ -360,24 +377,21 @@ def analyze_prompt(prompt: str, call_claude_api: bool = False) -> AnalysisRespon
     spec_quality_warnings = []
     spec_quality_score = None
     
-    # Always extract spec structure and compute quality score
-    try:
-        structure = extract_spec_structure(normalized_prompt, "")
-        if structure:
-            spec_kit_structure = structure.model_dump()
-            
-            # Detect missing or weak spec areas
-            spec_quality_warnings = detect_missing_spec_areas(structure)
-            
-            # Compute spec quality score
-            spec_quality_score = compute_spec_quality_score(structure, spec_quality_warnings, normalized_prompt)
-    except Exception as e:
-        # Log but don't fail
-        import sys
-        print(f"WARNING: spec structure extraction failed: {e}", file=sys.stderr)
+    # Always extract spec structure and compute quality score (unless no spec-quality field is requested)
+    if need_spec_quality:
+        report_stage("structure")
+        try:
+            # Structure, missing/weak spec areas and quality score in one pass over the prompt
+            # (the same results as detect_missing_spec_areas and compute_spec_quality_score)
+            spec_kit_structure, spec_quality_warnings, spec_quality_score = assess_spec_quality(normalized_prompt, scoring)
+        except Exception as e:
+            # Log but don't fail
+            import sys
+            print(f"WARNING: spec structure extraction failed: {e}", file=sys.stderr)
     
     # Optionally run spec-kit CLI (if enabled)
     if spec_kit_enabled:
+        report_stage("workflow")
         try:
             spec_adapter = get_adapter()
             if spec_adapter:
@@ -401,55 +415,50 @@ def analyze_prompt(prompt: str, call_claude_api: bool = False) -> AnalysisRespon
             print(f"WARNING: spec-kit failed: {e}", file=sys.stderr)
     
     # Step 1: Run dev-spec-kit security checks (ALWAYS runs, regardless of spec-kit)
-    devspec_raw_output, devspec_findings, exit_code = run_dev_spec_kit(normalized_prompt)
+    report_stage("rules")
+    similarity, rule_output = similar.lookup(normalized_prompt) if similar is not None else (None, None)
+    if rule_output is None:
+        rule_output = run_dev_spec_kit(normalized_prompt, cancel=cancel)
+    if similar is not None and rule_output[2] >= 0:
+        similar.add(analysis_id(prompt), normalized_prompt, rule_output)
+    devspec_raw_output, devspec_findings, exit_code = rule_output
+    if features is not None:
+        try:
+            features.add(normalized_prompt, spec_kit_structure)
+        except Exception as e:
+            # Log but don't fail
+            import sys
+            print(f"WARNING: feature store update failed: {e}", file=sys.stderr)
     
     # Step 1.5: Filter false positives based on context
     filtered_findings = filter_false_positives(normalized_prompt, devspec_findings)
     
-    # Determine risk level based on finding severities
-    has_blockers = any(f.severity.upper() == "BLOCKER" for f in filtered_findings)
-    has_errors = any(f.severity.upper() == "ERROR" for f in filtered_findings)
-    has_warnings = any(f.severity.upper() == "WARNING" for f in filtered_findings)
-    
-    # Count findings by severity for threshold-based escalation
-    blocker_count = sum(1 for f in filtered_findings if f.severity.upper() == "BLOCKER")
-    error_count = sum(1 for f in filtered_findings if f.severity.upper() == "ERROR")
-    warning_count = sum(1 for f in filtered_findings if f.severity.upper() == "WARNING")
-    info_count = sum(1 for f in filtered_findings if f.severity.upper() == "INFO")
+    # Determine risk level from a single-pass severity histogram
+    severity_histogram = summarize_findings(filtered_findings)
+    has_blockers = severity_histogram.has(Severity.BLOCKER)
+    has_errors = severity_histogram.has(Severity.ERROR)
     
     # Calculate spec length to avoid escalating very minimal/tiny specs on warnings alone
     word_count = len(normalized_prompt.split())
-    is_minimal_spec = word_count < 55  # Very short, deliberately underspecified specs (e.g., P4)
-    
-    # Calculate risk level with threshold-based escalation:
-    # - Any BLOCKER → High Risk (critical issues)
-    # - Any ERROR → Medium Risk (significant security issues)
-    # - Multiple WARNINGs (3+) → Medium Risk (accumulation of concerns)
-    #   BUT: Don't escalate minimal specs (< 50 words) on warnings alone
-    # - Few WARNINGs (1-2) → Low Risk (minor concerns)
-    # - INFO only or no findings → Low Risk
-    if has_blockers:
-        risk_level = "High"
-    elif has_errors:
-        risk_level = "Medium"
-    elif warning_count >= 3 and not is_minimal_spec:
-        # Escalate to Medium when there are multiple warnings (but not for tiny specs)
-        risk_level = "Medium"
-    elif has_warnings:
-        risk_level = "Low"
-    else:
-        risk_level = "Low"
+    risk_level = classify_risk(severity_histogram, word_count)
     
     # Step 2: Generate guidance and curated prompt
-    guidance_items, final_curated_prompt = build_guidance(normalized_prompt, filtered_findings, risk_level)
+    guidance_items, final_curated_prompt = [], ""
+    if need_guidance:
+        report_stage("guidance")
+        guidance_items, final_curated_prompt = build_guidance(
+            normalized_prompt, filtered_findings, risk_level,
+            compact=compact_prompt, curate=need_curated_prompt
+        )
     
     # Step 3: Optionally call Claude
     claude_output = None
-    if call_claude_api:
+    if need_claude:
+        report_stage("claude")
         claude_output = call_claude(final_curated_prompt)
     
     # Build the complete response (use filtered findings for stats, but keep original devspec output for transparency)
-    response = AnalysisResponse(
+    result = AnalysisResult(
         original_prompt=prompt,
         normalized_prompt=normalized_prompt,
         devspec_raw_output=devspec_raw_output,
@@ -469,7 +478,9 @@ def analyze_prompt(prompt: str, call_claude_api: bool = False) -> AnalysisRespon
         # New spec quality fields
         spec_kit_structure=spec_kit_structure,
         spec_quality_warnings=spec_quality_warnings,
-        spec_quality_score=spec_quality_score
+        spec_quality_score=spec_quality_score,
+        severity_histogram=severity_histogram,
+        similarity=similarity
     )
     
-    return response
+    return result
@@ -0,0 +1,242 @@
+"""
+Lightweight internal records used while a prompt moves through the pipeline.
+
+The Pydantic models in models.py validate data at the API boundary. Inside the
+pipeline the same data is carried in slotted dataclasses, and is converted to
+Pydantic once by AnalysisResult.to_response().
+"""
+import sys
+from dataclasses import dataclass, field
+from enum import IntFlag
+from typing import NamedTuple, Optional
+
+
+class Severity(IntFlag):
+    """Finding severity as a bit flag, so a set of severities fits in one int."""
+    UNKNOWN = 0
+    INFO = 1
+    WARNING = 2
+    ERROR = 4
+    BLOCKER = 8
+
+    @classmethod
+    def from_label(cls, label: str) -> "Severity":
+        """Map a severity label (any case) to its flag, UNKNOWN if unrecognized."""
+        return _SEVERITY_BY_LABEL.get(label.upper(), cls.UNKNOWN)
+
+
+_SEVERITY_BY_LABEL = {s.name: s for s in Severity if s}
+
+
+@dataclass(slots=True, frozen=True)
+class Finding:
+    """A single finding from the dev-spec-kit security checker."""
+    category: str
+    severity: str
+    code: str
+    message: str = ""
+    suggestion: str = ""
+    level: Severity = Severity.UNKNOWN
+
+    def as_dict(self) -> dict:
+        """Fields of the public DevSpecFinding model."""
+        return {
+            "category": self.category,
+            "severity": self.severity,
+            "code": self.code,
+            "message": self.message,
+            "suggestion": self.suggestion,
+        }
+
+
+def make_finding(category: str, severity: str, code: str, message: str = "", suggestion: str = "") -> Finding:
+    """
+    Build a Finding with interned labels and a precomputed severity flag.
+
+    Args:
+        category: Category like SECURITY or ARCH
+        severity: Severity label (INFO, WARNING, ERROR, BLOCKER)
+        code: Rule code that triggered
+        message: Description of the issue
+        suggestion: Recommendation to fix the issue
+
+    Returns:
+        Finding record
+    """
+    return Finding(
+        category=sys.intern(category),
+        severity=sys.intern(severity),
+        code=sys.intern(code),
+        message=message,
+        suggestion=suggestion,
+        level=Severity.from_label(severity)
+    )
+
+
+class Guidance(NamedTuple):
+    """Additional guidance generated on top of dev-spec-kit findings."""
+    title: str
+    detail: str
+
+
+STRUCTURE_FIELDS = (
+    "features", "entities", "flows", "configuration", "error_handling",
+    "testing", "logging", "authentication", "data_storage",
+)
+
+
+@dataclass(slots=True)
+class SpecStructure:
+    """Spec elements extracted from a prompt, one list per category."""
+    features: list = field(default_factory=list)
+    entities: list = field(default_factory=list)
+    flows: list = field(default_factory=list)
+    configuration: list = field(default_factory=list)
+    error_handling: list = field(default_factory=list)
+    testing: list = field(default_factory=list)
+    logging: list = field(default_factory=list)
+    authentication: list = field(default_factory=list)
+    data_storage: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        """Fields of the public structure model, as plain lists."""
+        return {name: list(getattr(self, name)) for name in STRUCTURE_FIELDS}
+
+
+# Response fields in schema order
+RESPONSE_FIELDS = (
+    "original_prompt", "normalized_prompt", "devspec_raw_output", "devspec_findings",
+    "guidance", "final_curated_prompt", "claude_output", "exit_code", "has_blockers",
+    "has_errors", "risk_level", "spec_kit_enabled", "spec_kit_success", "spec_kit_raw_output",
+    "spec_kit_summary", "spec_kit_structure", "spec_quality_warnings", "spec_quality_score",
+)
+
+# Named field sets for lean responses ("full" returns every field)
+RESPONSE_PROFILES = {
+    "full": None,
+    "summary": frozenset({
+        "risk_level", "has_blockers", "has_errors", "exit_code",
+        "devspec_findings", "spec_quality_score",
+    }),
+}
+
+
+def select_fields(fields: Optional[str] = None, profile: Optional[str] = None) -> Optional[frozenset]:
+    """
+    Resolve a field selection for a lean response.
+
+    Args:
+        fields: Comma-separated response field names (e.g. "risk_level,devspec_findings")
+        profile: Name of a field profile in RESPONSE_PROFILES
+
+    Returns:
+        Frozenset of selected field names, or None for the full response
+
+    Raises:
+        ValueError: If the profile or a field name is unknown
+    """
+    if profile and profile not in RESPONSE_PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'. Available: {', '.join(RESPONSE_PROFILES)}")
+
+    selected = RESPONSE_PROFILES.get(profile) if profile else None
+    if fields:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(names.difference(RESPONSE_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown response field(s): {', '.join(unknown)}")
+        selected = frozenset(names) | (selected or frozenset())
+
+    return selected
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Complete pipeline output, mirroring the AnalysisResponse fields."""
+    original_prompt: str
+    normalized_prompt: Optional[str]
+    devspec_raw_output: str
+    devspec_findings: list
+    guidance: list
+    final_curated_prompt: str
+    claude_output: Optional[str] = None
+    exit_code: int = 0
+    has_blockers: bool = False
+    has_errors: bool = False
+    risk_level: str = "Low"
+    spec_kit_enabled: bool = False
+    spec_kit_success: Optional[bool] = None
+    spec_kit_raw_output: Optional[str] = None
+    spec_kit_summary: Optional[str] = None
+    spec_kit_structure: Optional[SpecStructure] = None
+    spec_quality_warnings: list = field(default_factory=list)
+    spec_quality_score: Optional[int] = None
+    # Internal only (not part of the response): SeverityHistogram of the findings
+    severity_histogram: Optional[tuple] = None
+    # Internal only: SimilarityMatch with an earlier analysis, if one was found
+    similarity: Optional[tuple] = None
+
+    def as_dict(self, fields: Optional[frozenset] = None) -> dict:
+        """
+        Plain-data form of the result, matching the AnalysisResponse schema.
+
+        Args:
+            fields: Only include these fields (default: all fields)
+        """
+        if fields is not None:
+            return {name: _FIELD_GETTERS[name](self) for name in RESPONSE_FIELDS if name in fields}
+        return {
+            "original_prompt": self.original_prompt,
+            "normalized_prompt": self.normalized_prompt,
+            "devspec_raw_output": self.devspec_raw_output,
+            "devspec_findings": [f.as_dict() for f in self.devspec_findings],
+            "guidance": [g._asdict() for g in self.guidance],
+            "final_curated_prompt": self.final_curated_prompt,
+            "claude_output": self.claude_output,
+            "exit_code": self.exit_code,
+            "has_blockers": self.has_blockers,
+            "has_errors": self.has_errors,
+            "risk_level": self.risk_level,
+            "spec_kit_enabled": self.spec_kit_enabled,
+            "spec_kit_success": self.spec_kit_success,
+            "spec_kit_raw_output": self.spec_kit_raw_output,
+            "spec_kit_summary": self.spec_kit_summary,
+            "spec_kit_structure": self.spec_kit_structure.as_dict() if self.spec_kit_structure else None,
+            "spec_quality_warnings": list(self.spec_quality_warnings),
+            "spec_quality_score": self.spec_quality_score,
+        }
+
+    def to_response(self):
+        """
+        Convert to the Pydantic AnalysisResponse used at the API boundary.
+
+        This is the only place the pipeline output is validated by Pydantic.
+        """
+        from .models import AnalysisResponse
+        return AnalysisResponse.model_validate(self.as_dict())
+
+    def to_json(self, fields: Optional[frozenset] = None) -> bytes:
+        """
+        Encode the result as JSON bytes in one step.
+
+        The full response is validated once and serialized directly by its
+        Pydantic serializer; partial responses are plain data and skip Pydantic.
+
+        Args:
+            fields: Only include these fields (default: the full AnalysisResponse)
+        """
+        if fields is None:
+            response = self.to_response()
+            return response.__pydantic_serializer__.to_json(response)
+        # Imported here so that loading the records doesn't load pydantic_core
+        from pydantic_core import to_json
+        return to_json(self.as_dict(fields))
+
+
+# Per-field converters used for partial responses
+_FIELD_GETTERS = {name: (lambda result, name=name: getattr(result, name)) for name in RESPONSE_FIELDS}
+_FIELD_GETTERS.update({
+    "devspec_findings": lambda result: [f.as_dict() for f in result.devspec_findings],
+    "guidance": lambda result: [g._asdict() for g in result.guidance],
+    "spec_kit_structure": lambda result: result.spec_kit_structure.as_dict() if result.spec_kit_structure else None,
+    "spec_quality_warnings": lambda result: list(result.spec_quality_warnings),
+})
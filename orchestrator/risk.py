@@ -0,0 +1,88 @@
+"""
+Severity aggregation and risk classification.
+
+Findings are summarized once into a severity histogram with a bitmask of the
+severities present; risk classification only looks at that summary, so it can
+be re-applied cheaply to cached or batch results without the findings.
+"""
+from typing import NamedTuple
+from .records import Severity
+
+
+# Specs shorter than this are not escalated on warnings alone (e.g. tiny demo prompts)
+MINIMAL_SPEC_WORDS = 55
+
+# Number of WARNING findings that escalates a spec to Medium risk
+WARNING_ESCALATION_THRESHOLD = 3
+
+
+class SeverityHistogram(NamedTuple):
+    """Finding counts per severity plus a bitmask of the severities present."""
+    info: int = 0
+    warning: int = 0
+    error: int = 0
+    blocker: int = 0
+    mask: int = 0
+
+    def has(self, severity: Severity) -> bool:
+        """Whether any finding of the given severity is present."""
+        return bool(self.mask & severity)
+
+    @property
+    def total(self) -> int:
+        return self.info + self.warning + self.error + self.blocker
+
+
+# Histogram slot for each severity flag (UNKNOWN findings are not counted)
+_SLOT = {Severity.INFO: 0, Severity.WARNING: 1, Severity.ERROR: 2, Severity.BLOCKER: 3}
+
+
+def summarize_findings(findings) -> SeverityHistogram:
+    """
+    Build the severity histogram and bitmask in a single pass.
+
+    Args:
+        findings: Finding records (or any objects with a severity label)
+
+    Returns:
+        SeverityHistogram for the findings
+    """
+    counts = [0, 0, 0, 0]
+    mask = 0
+    for finding in findings:
+        level = getattr(finding, "level", None)
+        if level is None:
+            level = Severity.from_label(finding.severity)
+        slot = _SLOT.get(level)
+        if slot is not None:
+            counts[slot] += 1
+            mask |= level
+    return SeverityHistogram(counts[0], counts[1], counts[2], counts[3], mask)
+
+
+def classify_risk(histogram: SeverityHistogram, word_count: int) -> str:
+    """
+    Classify overall risk from a severity histogram.
+
+    Threshold-based escalation:
+    - Any BLOCKER → High Risk (critical issues)
+    - Any ERROR → Medium Risk (significant security issues)
+    - Multiple WARNINGs (3+) → Medium Risk (accumulation of concerns),
+      except for minimal specs (< 55 words)
+    - Few WARNINGs (1-2), INFO only or no findings → Low Risk
+
+    Args:
+        histogram: Severity histogram of the (filtered) findings
+        word_count: Number of words in the normalized prompt
+
+    Returns:
+        Risk level: "Low", "Medium", or "High"
+    """
+    mask = histogram.mask
+    if mask & Severity.BLOCKER:
+        return "High"
+    if mask & Severity.ERROR:
+        return "Medium"
+    if histogram.warning >= WARNING_ESCALATION_THRESHOLD and word_count >= MINIMAL_SPEC_WORDS:
+        return "Medium"
+    return "Low"
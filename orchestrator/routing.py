@@ -0,0 +1,108 @@
+"""
+Consistent hashing with bounded loads, for routing prompts to API workers.
+
+Every API worker keeps its own response cache and analysis store, so repeats
+of a prompt should reach the worker that analyzed it first. A hash ring maps
+each key to a worker such that adding or removing one of N workers moves only
+about 1/N of the keys. The load bound (Mirrokni, Thorup and Zadimoghaddam,
+"Consistent Hashing with Bounded Loads") keeps a hot prompt from piling
+requests onto one worker: a worker already holding its share of the in-flight
+requests times the load factor is passed over for the next one on the ring.
+"""
+import bisect
+import hashlib
+import math
+import os
+from typing import Hashable, Iterable, Optional
+
+
+# Virtual points per node on the ring (smooths the key distribution)
+DEFAULT_REPLICAS = 100
+# Most in-flight requests a node may hold, as a multiple of the average
+DEFAULT_LOAD_FACTOR = 1.25
+
+
+def load_factor_from_env() -> float:
+    """Configured load factor from ROUTING_LOAD_FACTOR (at least 1, default DEFAULT_LOAD_FACTOR)."""
+    try:
+        return max(1.0, float(os.getenv("ROUTING_LOAD_FACTOR", DEFAULT_LOAD_FACTOR)))
+    except ValueError:
+        return DEFAULT_LOAD_FACTOR
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Hash ring of nodes with per-node in-flight request counts.
+
+    Not thread-safe: meant for a single event loop.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = DEFAULT_REPLICAS, load_factor: float = DEFAULT_LOAD_FACTOR):
+        if load_factor < 1:
+            raise ValueError("load_factor must be at least 1")
+        self.replicas = replicas
+        self.load_factor = load_factor
+        self.loads: dict = {}
+        self._hashes: list = []
+        self._nodes: list = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Hashable) -> None:
+        if node in self.loads:
+            return
+        self.loads[node] = 0
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._hashes, point)
+            self._hashes.insert(index, point)
+            self._nodes.insert(index, node)
+
+    def remove(self, node: Hashable) -> None:
+        if self.loads.pop(node, None) is None:
+            return
+        points = [(point, owner) for point, owner in zip(self._hashes, self._nodes) if owner != node]
+        self._hashes = [point for point, _ in points]
+        self._nodes = [owner for _, owner in points]
+
+    def capacity(self) -> int:
+        """Most in-flight requests a node may hold once one more request is placed."""
+        total = sum(self.loads.values()) + 1
+        return math.ceil(self.load_factor * total / len(self.loads))
+
+    def home(self, key: str) -> Hashable:
+        """The node key hashes to, regardless of load."""
+        if not self._nodes:
+            raise LookupError("The ring has no nodes")
+        return self._nodes[bisect.bisect(self._hashes, _hash(key)) % len(self._nodes)]
+
+    def choose(self, key: Optional[str] = None) -> Hashable:
+        """
+        Node for the next request with key.
+
+        The key's home node unless it is at capacity, else the next node on the
+        ring below capacity. Without a key, the least loaded node.
+        """
+        if not self._nodes:
+            raise LookupError("The ring has no nodes")
+        if key is None:
+            return min(self.loads, key=self.loads.get)
+        limit = self.capacity()
+        start = bisect.bisect(self._hashes, _hash(key))
+        for offset in range(len(self._nodes)):
+            node = self._nodes[(start + offset) % len(self._nodes)]
+            if self.loads[node] < limit:
+                return node
+        # Unreachable: with load_factor >= 1 some node is below capacity
+        return min(self.loads, key=self.loads.get)
+
+    def acquire(self, node: Hashable) -> None:
+        self.loads[node] += 1
+
+    def release(self, node: Hashable) -> None:
+        if self.loads.get(node, 0) > 0:
+            self.loads[node] -= 1
@@ -0,0 +1,251 @@
+"""
+Precompiled rule bundles for the in-process rule engine.
+
+Compiling the rule script (tokenizing, parsing the conditions, translating
+every GNU pattern and checking it compiles) costs tens of milliseconds, paid by
+every worker and CLI run. A bundle stores the result: the parsed condition
+trees and warnings, the translated regex sources and their literal prefilters.
+Loading one is a JSON parse and a structural check; regexes are compiled
+lazily by CompiledRules, and most are never needed for a given prompt.
+
+Bundles are named after the rule script's SHA-256, so a changed script never
+loads a stale bundle, and record the bundle format and the engine version, so a
+changed translator never does either. Scripts the engine does not support are
+bundled as such, so they are not parsed again on every start.
+
+Build bundles ahead of time (e.g. in an image build) with:
+    python -m orchestrator.rule_bundle [SCRIPT ...] [--dir DIR]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from . import rule_engine
+from .rule_engine import SEVERITIES, CompiledRules, RuleCompileError, _Warning, compile_rule_script
+from .rules import RULE_SCRIPT_NAMES, RULE_SCRIPTS_DIR, load_rule_source
+
+
+# Bumped when the bundle layout changes
+BUNDLE_VERSION = 1
+
+_CONDITION_ARITY = {"grep": 1, "not": 1, "and": 2, "or": 2}
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version() -> str:
+    """Digest of the rule engine's source; bundles from another engine version are ignored."""
+    with open(rule_engine.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def default_bundle_dir() -> Optional[str]:
+    """
+    Directory of rule bundles.
+
+    RULE_BUNDLE_DIR if set ("off" disables bundles), else
+    $XDG_CACHE_HOME/ai-safety-orchestrator/rule-bundles (~/.cache by default).
+    """
+    directory = os.getenv("RULE_BUNDLE_DIR")
+    if directory:
+        return None if directory.lower() == "off" else directory
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "ai-safety-orchestrator", "rule-bundles")
+
+
+def bundle_path(directory: str, digest: str) -> str:
+    """Path of the bundle for a rule script digest."""
+    return os.path.join(directory, f"rules-{digest}.json")
+
+
+def _condition_to_json(node) -> list:
+    if node[0] == "grep":
+        return list(node)
+    return [node[0], *(_condition_to_json(child) for child in node[1:])]
+
+
+def _condition_from_json(node, pattern_count: int) -> tuple:
+    if not isinstance(node, list) or not node or _CONDITION_ARITY.get(node[0]) != len(node) - 1:
+        raise ValueError(f"Invalid condition {node!r}")
+    if node[0] == "grep":
+        index = node[1]
+        if not isinstance(index, int) or not 0 <= index < pattern_count:
+            raise ValueError(f"Invalid pattern index {index!r}")
+        return ("grep", index)
+    return (node[0], *(_condition_from_json(child, pattern_count) for child in node[1:]))
+
+
+def _warnings_from_json(items) -> tuple:
+    warnings = []
+    for item in items:
+        warning = _Warning(*item)
+        if warning.severity not in SEVERITIES or not all(isinstance(value, str) for value in warning):
+            raise ValueError(f"Invalid warning {item!r}")
+        warnings.append(warning)
+    return tuple(warnings)
+
+
+def dump_bundle(rules: CompiledRules) -> dict:
+    """Serializable form of compiled rules."""
+    return {
+        "version": BUNDLE_VERSION,
+        "engine": engine_version(),
+        "digest": rules.digest,
+        "patterns": [
+            {
+                "grep": pattern,
+                "ignore_case": ignore_case,
+                "source": source.decode("latin-1"),
+                "prefilter": None if prefilter is None else [literal.decode("latin-1") for literal in prefilter],
+            }
+            for (pattern, ignore_case), source, prefilter in zip(rules.patterns, rules.sources, rules.prefilters)
+        ],
+        "blocks": [
+            {
+                "branches": [[_condition_to_json(condition), [list(w) for w in body]] for condition, body in branches],
+                "else": [list(w) for w in otherwise] if otherwise else [],
+            }
+            for branches, otherwise in rules.blocks
+        ],
+    }
+
+
+def _check_header(data, digest: str) -> None:
+    if not isinstance(data, dict):
+        raise ValueError("Bundle is not an object")
+    if data.get("version") != BUNDLE_VERSION or data.get("engine") != engine_version():
+        raise ValueError("Bundle is from another format or engine version")
+    if data.get("digest") != digest:
+        raise ValueError("Bundle is for another rule script")
+
+
+def rules_from_bundle(data: dict, digest: str) -> CompiledRules:
+    """
+    Rebuild compiled rules from a bundle, checking its structure.
+
+    Raises:
+        ValueError: If the bundle is malformed, stale, or for another script
+        RuleCompileError: If the bundle records that the script is unsupported
+    """
+    _check_header(data, digest)
+    if "error" in data:
+        raise RuleCompileError(str(data["error"]))
+    patterns, sources, prefilters = [], [], []
+    for entry in data["patterns"]:
+        if not isinstance(entry["grep"], str) or not isinstance(entry["ignore_case"], bool):
+            raise ValueError(f"Invalid pattern {entry!r}")
+        patterns.append((entry["grep"], entry["ignore_case"]))
+        sources.append(entry["source"].encode("latin-1"))
+        prefilter = entry["prefilter"]
+        prefilters.append(None if prefilter is None else tuple(literal.encode("latin-1") for literal in prefilter))
+    # Same shape as the parser's: tuples, and None for a missing else
+    blocks = []
+    for block in data["blocks"]:
+        branches = tuple(
+            (_condition_from_json(condition, len(patterns)), _warnings_from_json(body))
+            for condition, body in block["branches"]
+        )
+        blocks.append((branches, _warnings_from_json(block["else"]) or None))
+    return CompiledRules(digest, blocks, patterns, sources, prefilters)
+
+
+def save_bundle(directory: str, digest: str, rules: Optional[CompiledRules] = None, error: Optional[str] = None) -> str:
+    """
+    Write the bundle for a rule script (atomically).
+
+    Args:
+        directory: Bundle directory (created if missing)
+        digest: Rule script digest
+        rules: The compiled rules, or
+        error: Why the script is not supported
+
+    Returns:
+        Path of the bundle
+    """
+    if rules is not None:
+        data = dump_bundle(rules)
+    else:
+        data = {"version": BUNDLE_VERSION, "engine": engine_version(), "digest": digest, "error": error}
+    os.makedirs(directory, exist_ok=True)
+    path = bundle_path(directory, digest)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return path
+
+
+def load_bundle(directory: str, digest: str) -> Optional[CompiledRules]:
+    """
+    Load the bundle for a rule script digest.
+
+    Returns:
+        The compiled rules, or None if there is no valid bundle
+
+    Raises:
+        RuleCompileError: If the bundle records that the script is unsupported
+    """
+    try:
+        with open(bundle_path(directory, digest), "rb") as f:
+            data = json.loads(f.read())
+        return rules_from_bundle(data, digest)
+    except RuleCompileError:
+        raise
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def build_bundle(path: str, directory: str) -> tuple:
+    """
+    Compile a rule script and write its bundle.
+
+    Returns:
+        (bundle path, CompiledRules or None, error message or None)
+    """
+    source = load_rule_source(path)
+    with open(source.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        text = f.read()
+    try:
+        rules = compile_rule_script(text, source.digest)
+    except RuleCompileError as e:
+        return save_bundle(directory, source.digest, error=str(e)), None, str(e)
+    return save_bundle(directory, source.digest, rules), rules, None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m orchestrator.rule_bundle", description="Build precompiled rule bundles")
+    parser.add_argument("scripts", nargs="*", help="Rule scripts (default: all known dev-spec-kit scripts)")
+    parser.add_argument("--dir", default=None, help="Bundle directory (default: RULE_BUNDLE_DIR or the user cache)")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or default_bundle_dir()
+    if directory is None:
+        print("error: rule bundles are disabled (RULE_BUNDLE_DIR=off)", file=sys.stderr)
+        return 1
+    scripts = args.scripts or [
+        os.path.join(RULE_SCRIPTS_DIR, name) for name in RULE_SCRIPT_NAMES
+        if os.path.exists(os.path.join(RULE_SCRIPTS_DIR, name))
+    ]
+    for script in scripts:
+        try:
+            path, rules, error = build_bundle(script, directory)
+        except OSError as e:
+            print(f"error: {script}: {e}", file=sys.stderr)
+            return 1
+        if error:
+            print(f"{script}: not supported in-process ({error}); bundle {path}")
+        else:
+            print(f"{script}: {len(rules.patterns)} patterns in {len(rules.blocks)} rules; bundle {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
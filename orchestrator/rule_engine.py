@@ -0,0 +1,796 @@
+"""
+In-process evaluation of the dev-spec-kit rule script.
+
+The rule script is a fixed bash template: read the prompt, flatten newlines,
+run a series of `if grep -iqE '...' <<< "$NORMALIZED_PROMPT" ...; then
+add_warning ...; fi` blocks, then print the warnings and exit 2/1/0. This module
+compiles such a script into Python: it checks that the prelude and output
+sections match the known template, parses each rule's condition (grep tests
+combined with !, &&, || and parentheses), and translates the GNU extended
+regular expressions into Python byte patterns with the same match semantics.
+
+Scripts using anything else (other commands, variables, backreferences,
+escape sequences in messages, ...) raise RuleCompileError, and callers keep
+running the script. evaluate() likewise returns None for inputs where bash
+and grep behaviour is not reproduced exactly (NUL bytes, non-ASCII text under
+a non-C locale, a prompt that echo would take as an option); the caller then
+falls back to the script.
+"""
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+try:
+    from re import _constants as _sre, _parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants as _sre
+    import sre_parse as _sre_parse
+
+from .rules import load_rule_source
+
+
+class RuleCompileError(ValueError):
+    """The rule script uses a construct the in-process engine does not reproduce."""
+
+
+# Script sections outside the rules, compared line by line (comments and blank
+# lines ignored, whitespace-trimmed)
+_PRELUDE = """
+#!/usr/bin/env bash
+set -euo pipefail
+PROMPT=""
+if [[ $# -gt 0 ]]; then
+PROMPT=$(cat "$1")
+else
+PROMPT=$(cat)
+fi
+NORMALIZED_PROMPT=$(echo "$PROMPT" | tr '\\n' ' ')
+declare -A SEVERITY_COUNTS=([INFO]=0 [WARNING]=0 [ERROR]=0 [BLOCKER]=0)
+WARNINGS=()
+add_warning() {
+local category="$1" severity="$2" code="$3" message="$4" suggestion="$5"
+SEVERITY_COUNTS[$severity]=$((SEVERITY_COUNTS[$severity]+1))
+WARNINGS+=("[$category][$severity][$code]\\n$message\\nSuggestion: $suggestion\\n")
+}
+"""
+
+_EPILOGUE = """
+TOTAL=${#WARNINGS[@]}
+INFO=${SEVERITY_COUNTS[INFO]:-0}
+WARNING=${SEVERITY_COUNTS[WARNING]:-0}
+ERROR=${SEVERITY_COUNTS[ERROR]:-0}
+BLOCKER=${SEVERITY_COUNTS[BLOCKER]:-0}
+for warning in "${WARNINGS[@]}"; do
+echo -e "$warning"
+done
+echo "Total warnings: $TOTAL (INFO: $INFO, WARNING: $WARNING, ERROR: $ERROR, BLOCKER: $BLOCKER)"
+if (( BLOCKER > 0 )); then
+exit 2
+elif (( ERROR > 0 )); then
+exit 1
+else
+exit 0
+fi
+"""
+
+_RULES_MARKER = "# --- RULES ---"
+_OUTPUT_MARKER = "# --- Output ---"
+
+SEVERITIES = ("INFO", "WARNING", "ERROR", "BLOCKER")
+
+# The only word a grep test may read from
+_PROMPT_WORD = "$NORMALIZED_PROMPT"
+
+# Named classes of POSIX bracket expressions (C locale)
+_POSIX_CLASSES = {
+    "alpha": "a-zA-Z", "digit": "0-9", "alnum": "a-zA-Z0-9", "upper": "A-Z", "lower": "a-z",
+    "space": " \\t\\n\\r\\f\\v", "blank": " \\t", "punct": re.escape("!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"),
+    "xdigit": "0-9A-Fa-f", "cntrl": "\\x00-\\x1f\\x7f", "print": "\\x20-\\x7e", "graph": "\\x21-\\x7e",
+}
+
+# Escapes with a meaning in GNU regular expressions, and their Python form
+_GNU_ESCAPES = {"w": "\\w", "W": "\\W", "s": "\\s", "S": "\\S", "b": "\\b", "B": "\\B",
+                "<": "\\b(?=\\w)", ">": "\\b(?<=\\w)"}
+
+_INTERVAL_RE = re.compile(r"\{(\d+(,\d*)?|,\d+)\}")
+
+# Whole prompts that bash's echo takes as options instead of printing
+_ECHO_OPTION_RE = re.compile(rb"-[neE]+")
+
+# Repetition opcodes of the parsed regex tree
+_REPEATS = tuple(getattr(_sre, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") if hasattr(_sre, name))
+
+
+def translate_ere(pattern: str) -> str:
+    """
+    Translate a GNU grep -E pattern into Python regex source for byte strings.
+
+    Follows GNU behaviour in the C locale: backslashes inside brackets are
+    literal, repetition operators with nothing to repeat are literal characters,
+    an invalid interval is a literal '{', and stacked repetitions (a+?) repeat
+    the whole preceding item instead of becoming lazy or possessive.
+
+    Raises:
+        RuleCompileError: For backreferences, collating elements and unbalanced parentheses
+    """
+    translator = _EreTranslator(pattern)
+    source = translator.alternation()
+    if translator.position != len(pattern):
+        raise RuleCompileError(f"Unbalanced ')' in pattern {pattern!r}")
+    return source
+
+
+class _EreTranslator:
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.position = 0
+
+    def alternation(self) -> str:
+        branches = [self.sequence()]
+        while self.position < len(self.pattern) and self.pattern[self.position] == "|":
+            self.position += 1
+            branches.append(self.sequence())
+        return "|".join(branches)
+
+    def sequence(self) -> str:
+        # Each item is [python source, repeatable, already repeated]
+        items = []
+        pattern = self.pattern
+        while self.position < len(pattern):
+            char = pattern[self.position]
+            if char in "|)":
+                break
+            self.position += 1
+            if char in "*+?{":
+                operator = char
+                if char == "{":
+                    interval = _INTERVAL_RE.match(pattern, self.position - 1)
+                    if interval is None:
+                        items.append(["\\{", True, False])
+                        continue
+                    self.position = interval.end()
+                    operator = interval.group(0)
+                if not items or not items[-1][1]:
+                    # Nothing to repeat: GNU takes the operator literally
+                    items.append([re.escape(operator), True, False])
+                    continue
+                if items[-1][2]:
+                    items[-1][0] = f"(?:{items[-1][0]})"
+                items[-1][0] += operator
+                items[-1][2] = True
+            elif char == "(":
+                inner = self.alternation()
+                if self.position >= len(pattern) or pattern[self.position] != ")":
+                    raise RuleCompileError(f"Unbalanced '(' in pattern {pattern!r}")
+                self.position += 1
+                items.append([f"(?:{inner})", True, False])
+            elif char == "[":
+                items.append([self.bracket(), True, False])
+            elif char == "\\":
+                if self.position >= len(pattern):
+                    raise RuleCompileError(f"Trailing backslash in pattern {pattern!r}")
+                escaped = pattern[self.position]
+                self.position += 1
+                if escaped.isdigit() or escaped in "`'":
+                    raise RuleCompileError(f"Backreference or buffer anchor in pattern {pattern!r}")
+                if escaped in _GNU_ESCAPES:
+                    items.append([_GNU_ESCAPES[escaped], escaped not in "bB<>", False])
+                else:
+                    items.append([re.escape(escaped), True, False])
+            elif char == "^":
+                items.append(["^", False, False])
+            elif char == "$":
+                items.append(["$", False, False])
+            elif char == ".":
+                items.append([".", True, False])
+            else:
+                items.append([re.escape(char), True, False])
+        return "".join(item[0] for item in items)
+
+    def bracket(self) -> str:
+        pattern = self.pattern
+        negate = pattern.startswith("^", self.position)
+        if negate:
+            self.position += 1
+        parts = []
+        first = True
+        while True:
+            if self.position >= len(pattern):
+                raise RuleCompileError(f"Unterminated bracket expression in pattern {pattern!r}")
+            char = pattern[self.position]
+            if char == "]" and not first:
+                self.position += 1
+                break
+            first = False
+            if char == "[" and pattern.startswith(("[:", "[=", "[."), self.position):
+                kind = pattern[self.position + 1]
+                end = pattern.find(kind + "]", self.position + 2)
+                name = pattern[self.position + 2:end] if end != -1 else None
+                if kind != ":" or name not in _POSIX_CLASSES:
+                    raise RuleCompileError(f"Unsupported bracket item in pattern {pattern!r}")
+                parts.append(_POSIX_CLASSES[name])
+                self.position = end + 2
+                continue
+            # A range a-z (a '-' first, last, or after a range is literal)
+            if (self.position + 2 < len(pattern) and pattern[self.position + 1] == "-"
+                    and pattern[self.position + 2] != "]"):
+                low, high = char, pattern[self.position + 2]
+                if high == "[":
+                    raise RuleCompileError(f"Unsupported range in pattern {pattern!r}")
+                parts.append(f"{_class_char(low)}-{_class_char(high)}")
+                self.position += 3
+                continue
+            parts.append(_class_char(char))
+            self.position += 1
+        return "[" + ("^" if negate else "") + "".join(parts) + "]"
+
+
+def _class_char(char: str) -> str:
+    """A literal character inside a Python character class."""
+    return "\\" + char if char in "\\]^-[" else char
+
+
+class _Word(NamedTuple):
+    """A shell word after quote removal; dynamic if it contains an expansion."""
+    text: str
+    dynamic: bool = False
+    quoted: bool = False
+
+
+_OPERATORS = ("<<<", "&&", "||", ";", "(", ")", "|", "&", "<", ">", "\n")
+
+
+def _tokenize(text: str) -> list:
+    """Split shell source into words and operators (newlines kept as tokens)."""
+    tokens = []
+    position = 0
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if char == "\\" and text.startswith("\\\n", position):
+            position += 2
+            continue
+        if char in " \t":
+            position += 1
+            continue
+        if char == "#":
+            while position < length and text[position] != "\n":
+                position += 1
+            continue
+        operator = next((op for op in _OPERATORS if text.startswith(op, position)), None)
+        if operator is not None:
+            tokens.append(operator)
+            position += len(operator)
+            continue
+
+        parts = []
+        dynamic = quoted = False
+        while position < length and text[position] not in " \t\n;&|()<>":
+            char = text[position]
+            if char == "'":
+                end = text.find("'", position + 1)
+                if end == -1:
+                    raise RuleCompileError("Unterminated single quote")
+                parts.append(text[position + 1:end])
+                position = end + 1
+                quoted = True
+            elif char == '"':
+                position += 1
+                while True:
+                    if position >= length:
+                        raise RuleCompileError("Unterminated double quote")
+                    char = text[position]
+                    if char == '"':
+                        position += 1
+                        break
+                    if char == "\\" and position + 1 < length and text[position + 1] in '$`"\\\n':
+                        if text[position + 1] != "\n":
+                            parts.append(text[position + 1])
+                        position += 2
+                        continue
+                    if char in "$`":
+                        dynamic = True
+                    parts.append(char)
+                    position += 1
+                quoted = True
+            elif char == "\\":
+                if position + 1 < length and text[position + 1] != "\n":
+                    parts.append(text[position + 1])
+                position += 2
+            else:
+                if char in "$`*?[{~":
+                    dynamic = True
+                parts.append(char)
+                position += 1
+        tokens.append(_Word("".join(parts), dynamic, quoted))
+    return tokens
+
+
+class _Warning(NamedTuple):
+    category: str
+    severity: str
+    code: str
+    message: str
+    suggestion: str
+
+
+class _RuleParser:
+    """Parses the rules section into if/elif/else blocks of conditions and warnings."""
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+        # Distinct (pattern, ignore_case) pairs, in first-use order
+        self.patterns: list = []
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise RuleCompileError("Unexpected end of rules")
+        self.position += 1
+        return token
+
+    def skip_separators(self) -> None:
+        while self.peek() in ("\n", ";"):
+            self.position += 1
+
+    def keyword(self, token, name: str) -> bool:
+        return isinstance(token, _Word) and not token.quoted and token.text == name
+
+    def blocks(self) -> list:
+        blocks = []
+        self.skip_separators()
+        while self.peek() is not None:
+            token = self.next()
+            if not self.keyword(token, "if"):
+                raise RuleCompileError(f"Unsupported statement in rules: {token!r}")
+            blocks.append(self.block())
+            self.skip_separators()
+        return blocks
+
+    def block(self) -> tuple:
+        branches = []
+        otherwise = None
+        condition = self.condition()
+        while True:
+            self.expect_then()
+            body, terminator = self.body()
+            branches.append((condition, body))
+            if terminator == "elif":
+                condition = self.condition()
+                continue
+            if terminator == "else":
+                otherwise, terminator = self.body()
+                if terminator != "fi":
+                    raise RuleCompileError("Expected 'fi' after 'else'")
+            return tuple(branches), otherwise
+
+    def expect_then(self) -> None:
+        if self.peek() not in ("\n", ";"):
+            raise RuleCompileError("Expected ';' before 'then'")
+        self.skip_separators()
+        if not self.keyword(self.next(), "then"):
+            raise RuleCompileError("Expected 'then'")
+
+    def body(self) -> tuple:
+        warnings = []
+        while True:
+            self.skip_separators()
+            token = self.next()
+            if any(self.keyword(token, name) for name in ("elif", "else", "fi")):
+                return tuple(warnings), token.text
+            if not self.keyword(token, "add_warning"):
+                raise RuleCompileError(f"Unsupported command in rule body: {token!r}")
+            args = []
+            while isinstance(self.peek(), _Word):
+                args.append(self.next())
+            if len(args) != 5 or any(arg.dynamic or "\\" in arg.text for arg in args):
+                raise RuleCompileError("add_warning needs 5 literal arguments without escapes")
+            warning = _Warning(*(arg.text for arg in args))
+            if warning.severity not in SEVERITIES:
+                raise RuleCompileError(f"Unknown severity {warning.severity!r}")
+            warnings.append(warning)
+
+    def condition(self):
+        """and_or := pipeline (('&&' | '||') newline* pipeline)*, left-associative."""
+        node = self.pipeline()
+        while self.peek() in ("&&", "||"):
+            operator = "and" if self.next() == "&&" else "or"
+            while self.peek() == "\n":
+                self.position += 1
+            node = (operator, node, self.pipeline())
+        return node
+
+    def pipeline(self):
+        token = self.peek()
+        if self.keyword(token, "!"):
+            self.position += 1
+            return ("not", self.pipeline())
+        if token == "(":
+            self.position += 1
+            while self.peek() == "\n":
+                self.position += 1
+            node = self.condition()
+            while self.peek() == "\n":
+                self.position += 1
+            if self.next() != ")":
+                raise RuleCompileError("Expected ')'")
+            return node
+        return self.grep()
+
+    def grep(self):
+        words = []
+        while isinstance(self.peek(), _Word):
+            words.append(self.next())
+        if (len(words) != 3 or words[0].text != "grep" or words[0].quoted
+                or not words[1].text.startswith("-") or words[2].dynamic):
+            raise RuleCompileError(f"Unsupported test: {' '.join(w.text for w in words)!r}")
+        options = set(words[1].text[1:])
+        if not {"q", "E"} <= options or not options <= {"q", "E", "i"}:
+            raise RuleCompileError(f"Unsupported grep options {words[1].text!r}")
+        if self.next() != "<<<":
+            raise RuleCompileError("grep must read the prompt from a here-string")
+        source = self.next()
+        if not isinstance(source, _Word) or source.text != _PROMPT_WORD or not source.quoted:
+            raise RuleCompileError("grep must read \"$NORMALIZED_PROMPT\"")
+        key = (words[2].text, "i" in options)
+        if key not in self.patterns:
+            self.patterns.append(key)
+        return ("grep", self.patterns.index(key))
+
+
+def _template_lines(text: str) -> list:
+    """Code lines of a script section, trimmed, without comments and blank lines (the shebang is kept)."""
+    lines = (line.strip() for line in text.splitlines())
+    return [line for line in lines if line and (not line.startswith("#") or line.startswith("#!"))]
+
+
+def required_literals(source: bytes, ignore_case: bool = False) -> Optional[tuple]:
+    """
+    Literals one of which every match of a regex must contain.
+
+    Derived from the parsed regex: a run of literal characters, a group, a
+    repetition of at least one, or an alternation whose branches all have
+    required literals; the most selective candidate (longest shortest literal)
+    is kept.
+
+    Args:
+        source: Python regex source (bytes)
+        ignore_case: Lower-case the literals (the text is lower-cased to match)
+
+    Returns:
+        Tuple of byte strings, or None if no literal is required
+    """
+    try:
+        tree = _sre_parse.parse(source.decode("latin-1"))
+    except re.error:
+        return None
+    literals = _required(tree)
+    if not literals:
+        return None
+    if ignore_case:
+        literals = {literal.lower() for literal in literals}
+    return tuple(sorted(literals))
+
+
+def _required(items) -> Optional[set]:
+    best = None
+
+    def consider(candidates: Optional[set]) -> None:
+        nonlocal best
+        if not candidates:
+            return
+        score = (min(map(len, candidates)), -len(candidates))
+        if best is None or score > (min(map(len, best)), -len(best)):
+            best = candidates
+
+    run = bytearray()
+    for op, value in items:
+        if op is _sre.LITERAL:
+            run.append(value)
+            continue
+        if run:
+            consider({bytes(run)})
+            run = bytearray()
+        if op is _sre.SUBPATTERN:
+            _, add_flags, del_flags, subpattern = value
+            if not add_flags and not del_flags:
+                consider(_required(subpattern))
+        elif op is _sre.BRANCH:
+            branches = [_required(branch) for branch in value[1]]
+            if all(branches):
+                consider(set().union(*branches))
+        elif op in _REPEATS:
+            minimum, _, subpattern = value
+            if minimum >= 1:
+                consider(_required(subpattern))
+        elif op is getattr(_sre, "ATOMIC_GROUP", None):
+            consider(_required(value))
+        # Anything else (classes, anchors, ...) just ends the literal run
+    if run:
+        consider({bytes(run)})
+    return best
+
+
+class CompiledRules:
+    """
+    A rule script compiled for in-process evaluation.
+
+    Regexes are compiled on first use. A pattern with a prefilter is only
+    searched (and compiled) when one of its required literals occurs in the
+    prompt, since it cannot match otherwise.
+    """
+
+    def __init__(self, digest: str, blocks: list, patterns: list, sources: list, prefilters: list, regexes: Optional[list] = None):
+        self.digest = digest
+        self.blocks = blocks
+        # (grep pattern, ignore case) per pattern index
+        self.patterns = patterns
+        # Translated regex source per pattern, and the literals one of which any
+        # match contains (lower-case for ignore-case patterns; None: no prefilter)
+        self.sources = sources
+        self.prefilters = prefilters
+        self._regexes = list(regexes) if regexes is not None else [None] * len(patterns)
+
+    def regex(self, index: int) -> "re.Pattern":
+        """Compiled regex of a pattern."""
+        regex = self._regexes[index]
+        if regex is None:
+            regex = re.compile(self.sources[index], re.IGNORECASE if self.patterns[index][1] else 0)
+            self._regexes[index] = regex
+        return regex
+
+    def compile_all(self) -> None:
+        """Compile every regex now (e.g. before serving), instead of on first use."""
+        for index in range(len(self.patterns)):
+            self.regex(index)
+
+    def evaluate(self, prompt: str) -> Optional[tuple]:
+        """
+        Evaluate the rules on a prompt as the script would on the same stdin.
+
+        Returns:
+            (raw_output, findings, exit_code) like run_dev_spec_kit, or None if
+            this input has to go through the script
+        """
+        if not prompt.isascii() and not c_locale():
+            return None
+        return self.evaluate_bytes(prompt.encode("utf-8", "surrogateescape"))
+
+    def evaluate_bytes(self, data: bytes, byte_locale: Optional[bool] = None) -> Optional[tuple]:
+        """
+        evaluate() for raw prompt bytes (e.g. a prompt file).
+
+        Args:
+            data: Prompt bytes
+            byte_locale: Whether the script would run under the C/POSIX locale
+                (default: c_locale() for this process's environment)
+        """
+        line = prompt_line(data, byte_locale)
+        if line is None:
+            return None
+        grep = self._grep(line)
+        results = [None] * len(self.patterns)
+
+        def matched(index: int) -> bool:
+            if results[index] is None:
+                results[index] = grep(index)
+            return results[index]
+
+        return self._output(matched)
+
+    def predicates(self, prompt: str) -> Optional[int]:
+        """
+        Result of every grep test on a prompt, for evaluate_predicates.
+
+        Returns:
+            Bitmask with bit i set if pattern i matches, or None where
+            evaluate() returns None
+        """
+        if not prompt.isascii() and not c_locale():
+            return None
+        line = prompt_line(prompt.encode("utf-8", "surrogateescape"))
+        if line is None:
+            return None
+        grep = self._grep(line)
+        return sum(1 << index for index in range(len(self.patterns)) if grep(index))
+
+    def evaluate_predicates(self, bits: int) -> tuple:
+        """evaluate() for a prompt whose grep tests gave bits (see predicates), without its text."""
+        return self._output(lambda index: bool(bits >> index & 1))
+
+    def _grep(self, line: bytes):
+        """grep(index) -> whether pattern index matches line, checking prefilters first."""
+        lowered = line.lower()
+        present: dict = {}
+
+        def grep(index: int) -> bool:
+            ignore_case = self.patterns[index][1]
+            literals = self.prefilters[index]
+            if literals is not None:
+                text = lowered if ignore_case else line
+                for literal in literals:
+                    key = (literal, ignore_case)
+                    found = present.get(key)
+                    if found is None:
+                        found = present[key] = literal in text
+                    if found:
+                        break
+                else:
+                    return False
+            return self.regex(index).search(line) is not None
+
+        return grep
+
+    def _output(self, matched) -> tuple:
+        """Run the rule blocks with matched(index) as the grep tests; (raw_output, findings, exit_code)."""
+        from .devspec_runner import parse_devspec_output
+
+        def test(node) -> bool:
+            kind = node[0]
+            if kind == "grep":
+                return matched(node[1])
+            if kind == "not":
+                return not test(node[1])
+            if kind == "and":
+                return test(node[1]) and test(node[2])
+            return test(node[1]) or test(node[2])
+
+        warnings = []
+        for branches, otherwise in self.blocks:
+            for condition, body in branches:
+                if test(condition):
+                    warnings.extend(body)
+                    break
+            else:
+                if otherwise:
+                    warnings.extend(otherwise)
+
+        counts = dict.fromkeys(SEVERITIES, 0)
+        parts = []
+        for warning in warnings:
+            counts[warning.severity] += 1
+            parts.append(
+                f"[{warning.category}][{warning.severity}][{warning.code}]\n"
+                f"{warning.message}\nSuggestion: {warning.suggestion}\n\n"
+            )
+        parts.append(
+            f"Total warnings: {len(warnings)} (INFO: {counts['INFO']}, WARNING: {counts['WARNING']}, "
+            f"ERROR: {counts['ERROR']}, BLOCKER: {counts['BLOCKER']})\n"
+        )
+        raw_output = "".join(parts)
+        exit_code = 2 if counts["BLOCKER"] else 1 if counts["ERROR"] else 0
+        return raw_output, parse_devspec_output(raw_output), exit_code
+
+
+def prompt_line(data: bytes, byte_locale: Optional[bool] = None) -> Optional[bytes]:
+    """
+    The line the rule script's grep tests read for prompt bytes on stdin.
+
+    Returns:
+        The newline-flattened prompt, or None for inputs whose bash and grep
+        behaviour is not reproduced (see evaluate_bytes)
+    """
+    if byte_locale is None:
+        byte_locale = c_locale()
+    if b"\0" in data or (not data.isascii() and not byte_locale):
+        return None
+    # PROMPT=$(cat) drops trailing newlines; echo | tr flattens the rest
+    data = data.rstrip(b"\n")
+    if _ECHO_OPTION_RE.fullmatch(data):
+        return None
+    return data.replace(b"\n", b" ") + b" "
+
+
+def c_locale() -> bool:
+    """Whether the rule script would run under the C/POSIX locale (byte semantics)."""
+    value = os.environ.get("LC_ALL") or os.environ.get("LC_CTYPE") or os.environ.get("LANG") or ""
+    return is_byte_locale(value)
+
+
+def is_byte_locale(value: str) -> bool:
+    """Whether an effective LC_CTYPE value (LC_ALL, else LC_CTYPE, else LANG) selects the C locale."""
+    return value in ("", "C", "POSIX")
+
+
+def compile_rule_script(text: str, digest: str = "") -> CompiledRules:
+    """
+    Compile rule script source.
+
+    Args:
+        text: Contents of the rule script
+        digest: Digest of the script, recorded on the result
+
+    Raises:
+        RuleCompileError: If the script departs from the supported template
+    """
+    try:
+        rules_start = text.index(_RULES_MARKER)
+        output_start = text.index(_OUTPUT_MARKER)
+    except ValueError:
+        raise RuleCompileError("Rule script has no RULES or Output section") from None
+    if _template_lines(text[:rules_start]) != _template_lines(_PRELUDE):
+        raise RuleCompileError("Rule script prelude differs from the supported template")
+    if _template_lines(text[output_start:]) != _template_lines(_EPILOGUE):
+        raise RuleCompileError("Rule script output section differs from the supported template")
+
+    parser = _RuleParser(_tokenize(text[rules_start:output_start]))
+    blocks = parser.blocks()
+    if not all(pattern.isascii() for pattern, _ in parser.patterns):
+        raise RuleCompileError("Non-ASCII grep patterns are not supported")
+    sources, prefilters, regexes = [], [], []
+    for pattern, ignore_case in parser.patterns:
+        source = translate_ere(pattern).encode("ascii")
+        try:
+            regexes.append(re.compile(source, re.IGNORECASE if ignore_case else 0))
+        except re.error as e:
+            raise RuleCompileError(f"Pattern does not translate: {e}") from None
+        sources.append(source)
+        prefilters.append(required_literals(source, ignore_case))
+    return CompiledRules(digest, blocks, parser.patterns, sources, prefilters, regexes)
+
+
+_lock = threading.Lock()
+# Rule script path -> (digest, CompiledRules or the RuleCompileError message)
+_compiled: dict = {}
+
+
+def _load_or_compile(source) -> CompiledRules:
+    """Load the script's precompiled bundle, or compile the script and write one."""
+    from .rule_bundle import default_bundle_dir, load_bundle, save_bundle
+
+    directory = default_bundle_dir()
+    if directory is not None:
+        rules = load_bundle(directory, source.digest)
+        if rules is not None:
+            return rules
+    with open(source.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        text = f.read()
+    try:
+        rules = compile_rule_script(text, source.digest)
+    except RuleCompileError as e:
+        error = str(e)
+        rules = None
+    if directory is not None:
+        try:
+            save_bundle(directory, source.digest, rules, None if rules else error)
+        except OSError:
+            pass  # A read-only cache only costs the compile next time
+    if rules is None:
+        raise RuleCompileError(error)
+    return rules
+
+
+def load_rule_engine(path: Optional[str] = None) -> CompiledRules:
+    """
+    Compile the rule script, reusing the compiled rules while it is unchanged.
+
+    Within a process the result is kept per script version; across processes
+    it is loaded from a precompiled bundle (see rule_bundle.py) when one exists
+    for this exact script, and a bundle is written after compiling.
+
+    Args:
+        path: Rule script (default: the active dev-spec-kit script)
+
+    Raises:
+        RuleCompileError: If the script cannot be compiled
+    """
+    source = load_rule_source(path)
+    entry = _compiled.get(source.path)
+    if entry is None or entry[0] != source.digest:
+        with _lock:
+            entry = _compiled.get(source.path)
+            if entry is None or entry[0] != source.digest:
+                # Failures are kept too, so an unsupported script is parsed once per version
+                try:
+                    entry = (source.digest, _load_or_compile(source))
+                except RuleCompileError as e:
+                    entry = (source.digest, str(e))
+                _compiled[source.path] = entry
+    if isinstance(entry[1], str):
+        raise RuleCompileError(entry[1])
+    return entry[1]
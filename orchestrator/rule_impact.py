@@ -0,0 +1,380 @@
+"""
+Rule-change impact analysis over a prompt corpus.
+
+A proposed rule script usually changes a few blocks (if/elif/else statements)
+of the active one. The rule output of a prompt is the concatenation of what
+each block emits, so a prompt's findings can only change if a changed block
+emits a warning for it under the old or the new rules. Blocks are matched by
+content (conditions over pattern text, and warnings), so reordering or
+renumbering patterns changes nothing.
+
+Which prompts a changed block emits for is computed over the whole corpus at
+once, as bitsets with one bit per prompt, from an inverted index:
+
+- grep predicates: pattern -> prompts it matches, taken from a feature store
+  (feature_store.py) or computed on first use;
+- rule literals: literal -> prompts containing it. A new pattern is only
+  searched in the prompts containing one of its required literals.
+
+Only the prompts that could be affected are then re-evaluated under both
+scripts, in a process pool, and their finding deltas reported. Prompts the
+rule engine cannot reproduce the script on are always re-evaluated (by the
+scripts).
+
+Run with:
+    python -m orchestrator.rule_impact PROPOSED_SCRIPT [PATH ...] [--jsonl FILE] [--store STORE] [--base SCRIPT]
+(the corpus defaults to test_prompts/ and prompts/).
+"""
+import argparse
+import difflib
+import json
+import sys
+import time
+from multiprocessing import Pool
+from typing import Iterable, NamedTuple, Optional
+
+from .delta import FindingDelta, diff_findings, finding_key
+from .feature_store import EXACT_COLUMN, FeatureStore, iter_bits
+from .rule_engine import CompiledRules, RuleCompileError, c_locale, load_rule_engine, prompt_line
+from .rules import get_rule_script_path
+
+
+class RuleImpact(NamedTuple):
+    """Prompts a rule change could affect."""
+    # Corpus indices, in order
+    candidates: list
+    # Blocks only in the old rules, and only in the new rules
+    removed_blocks: int
+    added_blocks: int
+    # Patterns not in the index, and prompts they were searched in
+    new_patterns: int
+    searched: int
+
+
+class PromptDelta(NamedTuple):
+    """A prompt whose rule results differ between two scripts."""
+    index: int
+    name: str
+    findings: FindingDelta
+    # Codes reported under both scripts with other messages or suggestions, or another number of times
+    changed: list
+    exit_before: int
+    exit_after: int
+    risk_before: str
+    risk_after: str
+
+    def as_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "source": self.name,
+            "risk_before": self.risk_before,
+            "risk_after": self.risk_after,
+            "exit_before": self.exit_before,
+            "exit_after": self.exit_after,
+            "added": [finding.code for finding in self.findings.added],
+            "removed": [finding.code for finding in self.findings.removed],
+            "changed": self.changed,
+        }
+
+
+class CorpusIndex:
+    """A prompt corpus with inverted indexes from grep predicates and rule literals to prompts."""
+
+    def __init__(self, names: Iterable[str], prompts: Iterable[str], predicates: Optional[dict] = None):
+        """
+        Args:
+            names: Name of each prompt
+            prompts: The prompts
+            predicates: Known grep results, (pattern, ignore case) -> bitset of
+                matching prompts (e.g. from a feature store)
+        """
+        self.names = list(names)
+        self.texts = [prompt.strip() for prompt in prompts]
+        byte_locale = c_locale()
+        self.lines = [
+            prompt_line(text.encode("utf-8", "surrogateescape"), byte_locale) if text.isascii() or byte_locale else None
+            for text in self.texts
+        ]
+        # Prompts the rule engine evaluates like the script
+        self.exact = sum(1 << row for row, line in enumerate(self.lines) if line is not None)
+        self._predicates = dict(predicates or {})
+        self._literals: dict = {}
+        self._lowered = None
+        # Predicates computed here so far, and prompts searched for them
+        self.computed = 0
+        self.searched = 0
+
+    @classmethod
+    def from_store(cls, store: FeatureStore) -> "CorpusIndex":
+        """Index of a feature store's prompts, with its stored grep predicates."""
+        digests = store.digests()
+        texts = [store.get(digest).text for digest in digests]
+        predicates = {}
+        for name in store.columns:
+            kind, _, rest = name.partition(":")
+            if kind == "grep":
+                predicates[(rest[2:], rest[0] == "i")] = store.bits(name)
+        index = cls(digests, texts, predicates)
+        # Stored predicates hold for the rows the store could evaluate
+        index.exact &= store.bits(EXACT_COLUMN)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def literal(self, literal: bytes, ignore_case: bool) -> int:
+        """Bitset of the exact prompts whose grep input contains literal (lower-case for ignore_case)."""
+        key = (literal, ignore_case)
+        bits = self._literals.get(key)
+        if bits is None:
+            if ignore_case and self._lowered is None:
+                self._lowered = [line.lower() if line is not None else None for line in self.lines]
+            lines = self._lowered if ignore_case else self.lines
+            bits = sum(1 << row for row in iter_bits(self.exact) if literal in lines[row])
+            self._literals[key] = bits
+        return bits
+
+    def predicate(self, rules: CompiledRules, index: int) -> int:
+        """Bitset of the exact prompts pattern index of rules matches."""
+        key = rules.patterns[index]
+        bits = self._predicates.get(key)
+        if bits is None:
+            literals = rules.prefilters[index]
+            if literals is None:
+                candidates = self.exact
+            else:
+                candidates = 0
+                for literal in literals:
+                    candidates |= self.literal(literal, key[1])
+            regex = rules.regex(index)
+            self.computed += 1
+            bits = 0
+            for row in iter_bits(candidates):
+                self.searched += 1
+                if regex.search(self.lines[row]) is not None:
+                    bits |= 1 << row
+            self._predicates[key] = bits
+        return bits
+
+    def emitting(self, rules: CompiledRules, block) -> int:
+        """Bitset of the exact prompts a rule block emits warnings for."""
+        branches, otherwise = block
+        remaining, emitting = self.exact, 0
+        for condition, body in branches:
+            taken = remaining & self._condition(rules, condition)
+            if body:
+                emitting |= taken
+            remaining &= ~taken
+        if otherwise:
+            emitting |= remaining
+        return emitting
+
+    def _condition(self, rules: CompiledRules, node) -> int:
+        kind = node[0]
+        if kind == "grep":
+            return self.predicate(rules, node[1])
+        if kind == "not":
+            return self.exact & ~self._condition(rules, node[1])
+        if kind == "and":
+            return self._condition(rules, node[1]) & self._condition(rules, node[2])
+        return self._condition(rules, node[1]) | self._condition(rules, node[2])
+
+
+def block_key(rules: CompiledRules, block) -> tuple:
+    """A rule block with pattern indices replaced by the patterns, for comparison across scripts."""
+    def node(item) -> tuple:
+        if item[0] == "grep":
+            return ("grep", rules.patterns[item[1]])
+        return (item[0], *(node(child) for child in item[1:]))
+
+    branches, otherwise = block
+    return tuple((node(condition), tuple(body)) for condition, body in branches), tuple(otherwise or ())
+
+
+def affected_prompts(corpus: CorpusIndex, before: Optional[CompiledRules], after: Optional[CompiledRules]) -> RuleImpact:
+    """
+    Prompts whose rule results could differ between two rule sets.
+
+    Args:
+        corpus: The indexed corpus
+        before: Current rules (None if the engine cannot compile them)
+        after: Proposed rules (likewise)
+
+    Returns:
+        RuleImpact; without both compiled rule sets every prompt is a candidate
+    """
+    computed, searched = corpus.computed, corpus.searched
+    if before is None or after is None:
+        return RuleImpact(list(range(len(corpus))), 0, 0, 0, 0)
+
+    old_keys = [block_key(before, block) for block in before.blocks]
+    new_keys = [block_key(after, block) for block in after.blocks]
+    removed, added = [], []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed.extend(before.blocks[i1:i2])
+            added.extend(after.blocks[j1:j2])
+
+    affected = 0
+    for block in removed:
+        affected |= corpus.emitting(before, block)
+    for block in added:
+        affected |= corpus.emitting(after, block)
+    if removed or added:
+        # Prompts the engine cannot evaluate could change in any way
+        affected |= ((1 << len(corpus)) - 1) & ~corpus.exact
+    return RuleImpact(
+        list(iter_bits(affected)), len(removed), len(added),
+        corpus.computed - computed, corpus.searched - searched
+    )
+
+
+def rule_results(script: str, prompt: str) -> tuple:
+    """(findings after filter_false_positives, exit code, risk level) of a prompt under a rule script, as run_analysis reports them."""
+    from .devspec_runner import run_dev_spec_kit
+    from .pipeline import filter_false_positives
+    from .risk import classify_risk, summarize_findings
+
+    text = prompt.strip()
+    try:
+        output = load_rule_engine(script).evaluate(text)
+    except RuleCompileError:
+        output = None
+    if output is None:
+        output = run_dev_spec_kit(text, script_path=script)
+    _, findings, exit_code = output
+    findings = filter_false_positives(text, findings)
+    return findings, exit_code, classify_risk(summarize_findings(findings), len(text.split()))
+
+
+def changed_codes(before: list, after: list) -> list:
+    """Codes of findings in both lists whose texts or multiplicity differ, in the order of after."""
+    messages: dict = {}
+    for side, findings in enumerate((before, after)):
+        for finding in findings:
+            messages.setdefault(finding_key(finding), ([], []))[side].append((finding.message, finding.suggestion))
+    changed = []
+    for finding in after:
+        old, new = messages[finding_key(finding)]
+        if old and sorted(old) != sorted(new) and finding.code not in changed:
+            changed.append(finding.code)
+    return changed
+
+
+def _results_pair(args: tuple) -> tuple:
+    before, after, prompt = args
+    return rule_results(before, prompt), rule_results(after, prompt)
+
+
+def reevaluate(
+    corpus: CorpusIndex,
+    indices: list,
+    before: str,
+    after: str,
+    workers: Optional[int] = None
+) -> list:
+    """
+    Evaluate prompts under two rule scripts across a process pool.
+
+    Args:
+        corpus: The corpus
+        indices: Corpus indices of the prompts to evaluate
+        before: Current rule script
+        after: Proposed rule script
+        workers: Worker processes (default: available cores); 1 runs in-process
+
+    Returns:
+        PromptDelta of each prompt whose findings, exit code or risk level
+        differ (not just the order of its findings), in corpus order
+    """
+    from .bulk import default_workers
+
+    tasks = [(before, after, corpus.texts[index]) for index in indices]
+    workers = min(workers or default_workers(), len(tasks))
+    if workers <= 1:
+        results = list(map(_results_pair, tasks))
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_results_pair, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+
+    deltas = []
+    for index, (old, new) in zip(indices, results):
+        if old == new:
+            continue
+        delta = PromptDelta(
+            index, corpus.names[index], diff_findings(old[0], new[0]), changed_codes(old[0], new[0]),
+            old[1], new[1], old[2], new[2]
+        )
+        # Findings that only moved within the report are not a change
+        if delta.findings.added or delta.findings.removed or delta.changed or old[1:] != new[1:]:
+            deltas.append(delta)
+    return deltas
+
+
+def _compiled(script: str) -> Optional[CompiledRules]:
+    try:
+        return load_rule_engine(script)
+    except RuleCompileError as e:
+        print(f"WARNING: {script} is not compiled ({e}); every prompt is re-evaluated by the script", file=sys.stderr)
+        return None
+
+
+def main(argv=None) -> int:
+    from .bulk import iter_sources
+
+    parser = argparse.ArgumentParser(
+        prog="python -m orchestrator.rule_impact",
+        description="Report which corpus prompts a rule script change affects, and how"
+    )
+    parser.add_argument("script", help="Proposed rule script")
+    parser.add_argument("inputs", nargs="*", help="Prompt files, directories or glob patterns (default: test_prompts/ and prompts/)")
+    parser.add_argument("--jsonl", action="append", default=[], metavar="FILE", help="JSONL file of prompts ('-' for stdin)")
+    parser.add_argument("--store", metavar="STORE", help="Use the prompts and grep predicates of a feature store as the corpus")
+    parser.add_argument("--base", metavar="SCRIPT", help="Current rule script (default: the active dev-spec-kit script)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for re-evaluation (default: CPU cores)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        base = args.base or get_rule_script_path()
+        if args.store:
+            store = FeatureStore(args.store)
+            try:
+                corpus = CorpusIndex.from_store(store)
+            finally:
+                store.close()
+        else:
+            if not args.inputs and not args.jsonl:
+                from .warmup import DEFAULT_CORPUS
+                args.inputs = list(DEFAULT_CORPUS)
+            names, prompts = [], []
+            for source in iter_sources(args.inputs, args.jsonl):
+                if source.prompt is None:
+                    with open(source.path, "r", encoding="utf-8") as f:
+                        prompts.append(f.read())
+                else:
+                    prompts.append(source.prompt)
+                names.append(source.name)
+            corpus = CorpusIndex(names, prompts)
+        impact = affected_prompts(corpus, _compiled(base), _compiled(args.script))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    indexed = time.perf_counter()
+
+    deltas = reevaluate(corpus, impact.candidates, base, args.script, args.workers)
+    for delta in deltas:
+        print(json.dumps(delta.as_dict()))
+    finished = time.perf_counter()
+    print(
+        f"{len(corpus)} prompts: {len(impact.candidates)} could be affected by {impact.removed_blocks} removed and "
+        f"{impact.added_blocks} added rule blocks ({impact.new_patterns} patterns searched in {impact.searched} prompts, "
+        f"{(indexed - started) * 1000:.0f} ms); {len(deltas)} changed ({(finished - indexed) * 1000:.0f} ms re-evaluating)",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
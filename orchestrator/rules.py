@@ -0,0 +1,137 @@
+"""
+Rule source discovery for the dev-spec-kit rule engine.
+
+The security rules live in the dev-spec-kit shell script. This module locates
+that script and keeps a cached snapshot of the rules it declares, so other
+stages can precompute per-rule data once and rebuild it when the script changes.
+"""
+import hashlib
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+
+RULE_SCRIPTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "dev-spec-kit",
+    "scripts"
+)
+
+# Preferred script first; security-check.sh is the legacy fallback
+RULE_SCRIPT_NAMES = ("security-check.new.sh", "security-check.sh")
+
+# Matches add_warning "CATEGORY" "SEVERITY" "CODE" calls in the rule script
+_ADD_WARNING_RE = re.compile(r'add_warning\s+"([A-Z]+)"\s+"([A-Z]+)"\s+"([A-Z_0-9]+)"')
+
+# Matches the option cluster of each grep call (e.g. -iqE)
+_GREP_OPTIONS_RE = re.compile(r'\bgrep\s+-([A-Za-z]+)')
+
+
+class RuleDef(NamedTuple):
+    """A rule declared in the rule script."""
+    category: str
+    severity: str
+    code: str
+
+
+class RuleSource(NamedTuple):
+    """Snapshot of a loaded rule script."""
+    path: str
+    digest: str
+    rules: tuple
+    # True when every pattern match in the script ignores case (grep -i only)
+    case_insensitive: bool = False
+
+    @property
+    def codes(self) -> tuple:
+        """Rule codes in declaration order."""
+        return tuple(rule.code for rule in self.rules)
+
+
+_lock = threading.Lock()
+_cache: dict = {}
+
+
+def get_rule_script_path() -> str:
+    """
+    Locate the dev-spec-kit security-check script.
+
+    Returns:
+        Absolute path to the rule script
+
+    Raises:
+        FileNotFoundError: If no rule script exists
+    """
+    for name in RULE_SCRIPT_NAMES:
+        script_path = os.path.join(RULE_SCRIPTS_DIR, name)
+        if os.path.exists(script_path):
+            return script_path
+
+    raise FileNotFoundError(f"Dev-spec-kit script not found at {script_path}")
+
+
+def parse_rule_script(text: str) -> tuple:
+    """
+    Extract the rules declared in a rule script.
+
+    Args:
+        text: Contents of the rule script
+
+    Returns:
+        Tuple of RuleDef in declaration order
+    """
+    return tuple(RuleDef(*match.groups()) for match in _ADD_WARNING_RE.finditer(text))
+
+
+def matches_ignore_case(text: str) -> bool:
+    """
+    Whether every pattern match in a rule script is case-insensitive.
+
+    True only if the script matches through grep alone and every grep call
+    has the -i option, so the rule output cannot depend on letter case.
+    """
+    option_clusters = _GREP_OPTIONS_RE.findall(text)
+    if not option_clusters or "=~" in text:
+        return False
+    return len(option_clusters) == len(re.findall(r'\bgrep\b', text)) and all("i" in opts for opts in option_clusters)
+
+
+def load_rule_source(path: Optional[str] = None) -> RuleSource:
+    """
+    Load the rule script, reusing the cached snapshot while it is unchanged.
+
+    The file is re-read whenever its mtime or size changes, so edits to the
+    rule script are picked up without restarting the process.
+
+    Args:
+        path: Rule script to load (default: the active dev-spec-kit script)
+
+    Returns:
+        RuleSource snapshot for the script
+    """
+    path = path or get_rule_script_path()
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        text = data.decode('utf-8', errors='replace')
+        source = RuleSource(
+            path=path,
+            digest=hashlib.sha256(data).hexdigest(),
+            rules=parse_rule_script(text),
+            case_insensitive=matches_ignore_case(text)
+        )
+        _cache[path] = (stamp, source)
+        return source
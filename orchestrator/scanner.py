@@ -0,0 +1,518 @@
+"""
+Repository-scale scanner for markdown and text specs.
+
+A tree is walked with a thread pool, and candidate files are read through mmap.
+Binary, non-UTF-8, empty and oversized files are skipped. Each spec is
+identified by its git blob SHA (the same ID as `git hash-object`), and results
+are kept in a persistent SQLite cache keyed by that SHA and the active rules.
+Unchanged files are never re-analyzed, even after a rename or copy. The
+size/mtime of each path is remembered too, so unchanged files are not even
+re-read on the next scan. New specs are analyzed across a process pool (see
+bulk.py), and results are aggregated per directory.
+
+Usage:
+    python -m orchestrator.scanner path/to/repo [--json] [--cache FILE]
+    python -m orchestrator.scanner --staged               # pre-commit
+    python -m orchestrator.scanner --changed origin/main...HEAD   # CI
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, NamedTuple, Optional
+
+from .bulk import DEFAULT_BULK_FIELDS, PromptSource, analyze_parallel, default_workers
+
+
+# Spec file extensions picked up by the scanner
+SCAN_SUFFIXES = (".md", ".markdown", ".txt")
+
+# Directories never descended into
+SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox", ".pytest_cache", ".mypy_cache",
+})
+
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+
+# A NUL byte in the first BINARY_SNIFF_BYTES marks a file as binary
+BINARY_SNIFF_BYTES = 8192
+
+# Result fields kept per spec (risk_level is always included)
+SCAN_FIELDS = DEFAULT_BULK_FIELDS | {"risk_level"}
+
+# Bump when the stored result format changes
+SCAN_CACHE_VERSION = 1
+
+RISK_LEVELS = ("Low", "Medium", "High")
+
+# Skip reasons
+SKIP_TOO_LARGE = "too_large"
+SKIP_BINARY = "binary"
+SKIP_EMPTY = "empty"
+SKIP_UNREADABLE = "unreadable"
+
+
+class FileEntry(NamedTuple):
+    """A candidate spec file found by the walk."""
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class FileScan(NamedTuple):
+    """Scan result of one spec file."""
+    path: str
+    blob: str
+    risk_level: Optional[str]
+    # Decoded analysis result (SCAN_FIELDS), or None if the analysis failed
+    result: Optional[dict]
+    cached: bool
+    error: Optional[str] = None
+
+
+class DirectorySummary(NamedTuple):
+    """Aggregated risk of all specs below a directory."""
+    files: int
+    risk_level: Optional[str]
+    risk_counts: dict
+    failed: int
+
+
+class ScanReport(NamedTuple):
+    """Everything a scan found."""
+    root: str
+    files: list
+    # (path, reason) of files that were not analyzed
+    skipped: list
+    directories: dict
+    stats: dict
+
+    def as_dict(self) -> dict:
+        return {
+            "root": self.root,
+            "stats": self.stats,
+            "directories": {path: summary._asdict() for path, summary in self.directories.items()},
+            "files": [
+                {"path": f.path, "blob": f.blob, "risk_level": f.risk_level, "cached": f.cached,
+                 "result": f.result, "error": f.error}
+                for f in self.files
+            ],
+            "skipped": [{"path": path, "reason": reason} for path, reason in self.skipped],
+        }
+
+
+def git_blob_sha(data) -> str:
+    """Git blob SHA-1 of a bytes-like object (same as `git hash-object`)."""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def scan_context() -> str:
+    """
+    Identify what a cached result depends on besides the content.
+
+    Results are only reused under the same rule script, USE_SPEC_KIT mode and
+    cache format.
+    """
+    from .rules import load_rule_source
+    from .spec_kit_adapter import should_use_spec_kit
+    return f"v{SCAN_CACHE_VERSION}:{load_rule_source().digest}:{int(should_use_spec_kit())}"
+
+
+def default_cache_path() -> str:
+    """SCAN_CACHE_PATH, or scan-cache.sqlite in the user's cache directory."""
+    path = os.getenv("SCAN_CACHE_PATH")
+    if path:
+        return path
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "ai-safety-orchestrator", "scan-cache.sqlite")
+
+
+class ScanCache:
+    """
+    Persistent SQLite cache of spec results by blob SHA and scan context,
+    plus the last seen size/mtime/blob of each scanned path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "blob TEXT NOT NULL, context TEXT NOT NULL, risk_level TEXT, result BLOB NOT NULL, "
+                "PRIMARY KEY (blob, context))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, blob TEXT NOT NULL)"
+            )
+
+    def get_results(self, blobs: Iterable[str], context: str) -> dict:
+        """Cached (risk_level, encoded result) per blob SHA, for the blobs that have one."""
+        found = {}
+        blobs = list(blobs)
+        with self._lock:
+            for start in range(0, len(blobs), 500):
+                chunk = blobs[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT blob, risk_level, result FROM results WHERE context = ? AND blob IN ({','.join('?' * len(chunk))})",
+                    [context, *chunk]
+                ).fetchall()
+                found.update((blob, (risk_level, result)) for blob, risk_level, result in rows)
+        return found
+
+    def put_results(self, rows: Iterable[tuple], context: str) -> None:
+        """Store (blob, risk_level, encoded result) rows under a scan context."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results (blob, context, risk_level, result) VALUES (?, ?, ?, ?)",
+                [(blob, context, risk_level, result) for blob, risk_level, result in rows]
+            )
+
+    def file_blobs(self) -> dict:
+        """Last seen (size, mtime_ns, blob) per absolute path."""
+        with self._lock:
+            rows = self._db.execute("SELECT path, size, mtime_ns, blob FROM files").fetchall()
+        return {path: (size, mtime_ns, blob) for path, size, mtime_ns, blob in rows}
+
+    def put_file_blobs(self, rows: Iterable[tuple]) -> None:
+        """Remember (path, size, mtime_ns, blob) rows."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, blob) VALUES (?, ?, ?, ?)",
+                list(rows)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def walk_tree(root: str, suffixes: tuple = SCAN_SUFFIXES, workers: int = 8) -> list:
+    """
+    List spec files below root, reading directories in parallel.
+
+    Symlinks are not followed and SKIP_DIRS are pruned.
+
+    Returns:
+        FileEntry list sorted by path
+    """
+    def read_dir(path: str) -> tuple:
+        files, dirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            dirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and entry.name.endswith(suffixes):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append(FileEntry(entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            pass
+        return files, dirs
+
+    found = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-walk") as executor:
+        pending = {executor.submit(read_dir, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                found.extend(files)
+                pending.update(executor.submit(read_dir, path) for path in dirs)
+    found.sort()
+    return found
+
+
+def decode_spec(data) -> tuple:
+    """
+    Decode spec content from a bytes-like object.
+
+    Returns:
+        (text, None), or (None, skip reason) for empty, binary or non-UTF-8 content
+    """
+    if len(data) == 0:
+        return None, SKIP_EMPTY
+    if data.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+        return None, SKIP_BINARY
+    try:
+        return str(data[:], "utf-8"), None
+    except UnicodeDecodeError:
+        return None, SKIP_BINARY
+
+
+def read_spec(path: str) -> tuple:
+    """
+    Read a spec file through mmap.
+
+    Returns:
+        (blob SHA, text) or (None, skip reason) for empty, binary, non-UTF-8 or
+        unreadable files
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None, SKIP_EMPTY
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                text, reason = decode_spec(data)
+                if text is None:
+                    return None, reason
+                blob = git_blob_sha(data)
+    except (OSError, ValueError):
+        return None, SKIP_UNREADABLE
+    return blob, text
+
+
+def aggregate_by_directory(files: Iterable[FileScan]) -> dict:
+    """
+    Aggregate file risk levels into every ancestor directory.
+
+    Args:
+        files: Scanned files with paths relative to the scan root
+
+    Returns:
+        Dict of relative directory path ("." for the root) to DirectorySummary,
+        sorted by path. A directory's risk level is the highest of its files.
+    """
+    totals: dict = {}
+    for scan in files:
+        directory = os.path.dirname(scan.path)
+        ancestors = ["."]
+        while directory:
+            ancestors.append(directory)
+            directory = os.path.dirname(directory)
+        for ancestor in ancestors:
+            counts, failed = totals.setdefault(ancestor, ({}, [0]))
+            if scan.risk_level is None:
+                failed[0] += 1
+            else:
+                counts[scan.risk_level] = counts.get(scan.risk_level, 0) + 1
+
+    summaries = {}
+    for path in sorted(totals):
+        counts, failed = totals[path]
+        levels = [level for level in RISK_LEVELS if counts.get(level)]
+        summaries[path] = DirectorySummary(
+            files=sum(counts.values()) + failed[0],
+            risk_level=levels[-1] if levels else None,
+            risk_counts={level: counts.get(level, 0) for level in RISK_LEVELS},
+            failed=failed[0],
+        )
+    return summaries
+
+
+def scan_tree(
+    root: str,
+    cache: Optional[ScanCache] = None,
+    max_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    workers: Optional[int] = None,
+    suffixes: tuple = SCAN_SUFFIXES
+) -> ScanReport:
+    """
+    Scan a tree for specs and analyze the ones not already in the cache.
+
+    Args:
+        root: Directory to scan
+        cache: Persistent result cache (None: analyze everything)
+        max_bytes: Skip files larger than this
+        workers: Analysis worker processes (default: available cores)
+        suffixes: File extensions to scan
+
+    Returns:
+        ScanReport with paths relative to root
+    """
+    started = time.perf_counter()
+    root = os.path.abspath(root)
+    context = scan_context()
+    entries = walk_tree(root, suffixes)
+    skipped = [(entry.path, SKIP_TOO_LARGE) for entry in entries if entry.size > max_bytes]
+    entries = [entry for entry in entries if entry.size <= max_bytes]
+
+    # Reuse blob SHAs of files whose size and mtime are unchanged since the last scan
+    seen = cache.file_blobs() if cache is not None else {}
+    blobs = {}
+    for entry in entries:
+        previous = seen.get(entry.path)
+        if previous is not None and previous[:2] == (entry.size, entry.mtime_ns):
+            blobs[entry.path] = previous[2]
+    cached = cache.get_results(set(blobs.values()), context) if cache is not None else {}
+
+    # Read files that are new, changed, or whose result is not cached
+    texts = {}
+    to_read = [entry for entry in entries if blobs.get(entry.path) not in cached]
+    with ThreadPoolExecutor(max_workers=min(32, 4 * default_workers()), thread_name_prefix="scan-read") as executor:
+        for entry, (blob, text) in zip(to_read, executor.map(read_spec, (entry.path for entry in to_read))):
+            if blob is None:
+                skipped.append((entry.path, text))
+                blobs.pop(entry.path, None)
+            else:
+                blobs[entry.path] = blob
+                texts.setdefault(blob, (entry.path, text))
+    if cache is not None:
+        cached.update(cache.get_results(set(texts).difference(cached), context))
+    analyzed = analyze_blobs(texts, cached, cache, context, workers)
+    if cache is not None:
+        by_path = {entry.path: entry for entry in entries}
+        cache.put_file_blobs(
+            (path, by_path[path].size, by_path[path].mtime_ns, blob)
+            for path, blob in blobs.items()
+        )
+
+    found = [(os.path.relpath(entry.path, root), blobs[entry.path]) for entry in entries if entry.path in blobs]
+    skipped = [(os.path.relpath(path, root), reason) for path, reason in skipped]
+    return build_report(root, found, skipped, cached, analyzed, started)
+
+
+def analyze_blobs(
+    texts: dict,
+    cached: dict,
+    cache: Optional[ScanCache],
+    context: str,
+    workers: Optional[int] = None
+) -> dict:
+    """
+    Analyze each blob without a cached result once, in parallel, and cache the results.
+
+    Args:
+        texts: (path, text) per blob SHA
+        cached: Cached (risk_level, encoded result) per blob SHA
+        cache: Persistent cache the new results are stored in (optional)
+        context: Scan context of the results (see scan_context)
+        workers: Analysis worker processes (default: available cores)
+
+    Returns:
+        BulkResult per analyzed blob SHA
+    """
+    pending = [blob for blob in texts if blob not in cached]
+    analyzed = {}
+    if pending:
+        sources = [PromptSource(index, texts[blob][0], prompt=texts[blob][1]) for index, blob in enumerate(pending)]
+        for result in analyze_parallel(sources, workers, fields=SCAN_FIELDS):
+            analyzed[pending[result.index]] = result
+    if cache is not None:
+        cache.put_results(
+            ((blob, result.risk_level, result.result) for blob, result in analyzed.items() if not result.failed),
+            context
+        )
+    return analyzed
+
+
+def build_report(
+    root: str,
+    found: list,
+    skipped: list,
+    cached: dict,
+    analyzed: dict,
+    started: float
+) -> ScanReport:
+    """
+    Assemble a ScanReport.
+
+    Args:
+        root: Scan root (absolute)
+        found: (relative path, blob SHA) of every spec, in report order
+        skipped: (relative path, reason) of skipped files
+        cached: Cached (risk_level, encoded result) per blob SHA
+        analyzed: BulkResult per newly analyzed blob SHA
+        started: perf_counter() at the start of the scan
+    """
+    files = []
+    for path, blob in found:
+        if blob in cached:
+            risk_level, body = cached[blob]
+            files.append(FileScan(path, blob, risk_level, json.loads(body), True))
+        else:
+            result = analyzed[blob]
+            if result.failed:
+                error = json.loads(result.line)["error"]
+                files.append(FileScan(path, blob, None, None, False, error))
+            else:
+                files.append(FileScan(path, blob, result.risk_level, json.loads(result.result), False))
+
+    stats = {
+        "files": len(files),
+        "cached": sum(1 for f in files if f.cached),
+        "analyzed": len(analyzed),
+        "failed": sum(1 for f in files if f.error is not None),
+        "skipped": len(skipped),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    return ScanReport(root, files, sorted(skipped), aggregate_by_directory(files), stats)
+
+
+def format_report(report: ScanReport) -> str:
+    """Human-readable per-directory risk table."""
+    lines = [f"{'RISK':<7} {'FILES':>6} {'HIGH':>5} {'MED':>5} {'LOW':>5}  DIRECTORY"]
+    for path, summary in report.directories.items():
+        counts = summary.risk_counts
+        lines.append(
+            f"{summary.risk_level or '-':<7} {summary.files:>6} {counts['High']:>5} "
+            f"{counts['Medium']:>5} {counts['Low']:>5}  {path}"
+        )
+    stats = report.stats
+    lines.append(
+        f"\n{stats['files']} specs ({stats['cached']} cached, {stats['analyzed']} analyzed, "
+        f"{stats['failed']} failed), {stats['skipped']} skipped in {stats['elapsed_seconds']}s"
+    )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    """Scan a tree and print per-directory risk; exit codes match the bulk CLI."""
+    from .main import EXIT_ERROR, EXIT_HIGH_RISK
+
+    parser = argparse.ArgumentParser(prog="python -m orchestrator.scanner", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", nargs="?", default=".", help="Directory to scan (default: current directory)")
+    parser.add_argument("--cache", default=None, help="Result cache file (default: SCAN_CACHE_PATH or the user cache directory)")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every spec without a persistent cache")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_FILE_BYTES, help="Skip files larger than this")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Analysis worker processes (default: available cores)")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    changes = parser.add_mutually_exclusive_group()
+    changes.add_argument("--changed", metavar="RANGE",
+                         help="Only scan specs changed in a git revision range (A..B, A...B, or A for A..HEAD)")
+    changes.add_argument("--staged", action="store_true", help="Only scan specs staged for commit")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        print(f"error: not a directory: '{args.root}'", file=sys.stderr)
+        return EXIT_ERROR
+
+    cache = None if args.no_cache else ScanCache(args.cache or default_cache_path())
+    try:
+        if args.changed or args.staged:
+            from .git_scan import GitError, scan_git_changes
+            try:
+                report = scan_git_changes(args.root, args.changed, args.staged, cache, args.max_bytes, args.workers)
+            except GitError as e:
+                print(f"error: {e}", file=sys.stderr)
+                return EXIT_ERROR
+        else:
+            report = scan_tree(args.root, cache, args.max_bytes, args.workers)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    print(json.dumps(report.as_dict(), indent=2) if args.json else format_report(report))
+    if report.stats["failed"]:
+        return EXIT_ERROR
+    overall = report.directories.get(".")
+    if overall is not None and overall.risk_level == "High":
+        return EXIT_HIGH_RISK
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+Spec-quality scoring profiles and the plans compiled from them.
+
+A scoring profile holds the weights and keyword lists behind
+spec_quality_score: the base score, points per populated category, the
+warning and vagueness penalties, the detail and technology tiers, and the
+vague phrase, technology keyword and quality indicator lists. DEFAULT_PROFILE
+is the built-in calibration (what compute_spec_quality_score in pipeline.py
+implements); a profile file is a JSON object overriding any of its keys.
+
+compile_plan turns a profile into a ScoringPlan: the patterns compiled with
+their literal prefilters, and every weight, cap and tier folded into lookup
+tables indexed by the prompt's features, so scoring a feature row is a few
+table lookups (score_features, or score_columns for a NumPy feature matrix).
+
+Profiles are selected by name:
+- SCORING_PROFILE: profile for requests that name none (a name, or the path
+  of a JSON file; default: the built-in profile, also named "default");
+- SCORING_PROFILE_DIR: directory of named (e.g. per-tenant) profiles, each
+  <name>.json, selected per request with ?scoring_profile=<name>.
+Profile files are re-read when they change.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from .rule_engine import required_literals
+
+
+# Categories worth critical_points and important_points when populated
+CRITICAL_CATEGORIES = ("features", "entities", "flows", "error_handling", "testing")
+IMPORTANT_CATEGORIES = ("configuration", "logging", "authentication", "data_storage")
+CATEGORY_COLUMNS = CRITICAL_CATEGORIES + IMPORTANT_CATEGORIES
+
+# Profile-independent feature columns: the size of each category, then prompt features
+BASE_COLUMNS = CATEGORY_COLUMNS + (
+    "auth_flow",        # 1 if a flow mentions login or auth
+    "short_features",   # features of fewer than 3 words
+    "has_text",         # 1 if the prompt text is not empty
+    "word_count",
+)
+
+# Vagueness/deferral language (matched against the lowercased prompt)
+VAGUE_PATTERNS = (
+    r'(will|can|might|maybe|probably|either|whichever).*(add|decide|choose|implement).*later',
+    r'(decide|choose|determine|specify).*(later|during implementation|at runtime)',
+    r'no (concrete )?plan (yet )?for',
+    r'(tbd|todo|not sure|whatever|any.*fine)',
+    r'(could be|either.*or).*(postgres|mongo|mysql)',
+    r'will add.*(authentication|auth|logging|tests?).*(later|after)',
+)
+TECH_KEYWORDS = (
+    'openid connect', 'oauth',  # Auth protocols (specific ones)
+    'postgresql', 'mysql', 'mongodb',  # Databases
+    's3', 'gcs',  # Cloud storage
+    'kafka', 'rabbitmq',  # Messaging
+    'kubernetes', 'terraform',  # Infrastructure
+    'graphql', 'grpc',  # API styles (specific)
+)
+# Quality indicators (only strong signals) and their bonus points
+QUALITY_INDICATORS = (
+    # Detailed test suite mentioned
+    (r'test suite that covers|comprehensive test|test.*cover.*(login|token|profile)', 6),
+    # Detailed logging mentioned (not minimal)
+    (r'log request method.*path.*status|logging includes.*method.*path|error logging with request', 4),
+    # Explicit error handling or edge cases
+    (r'error handling|handle.*edge case', 3),
+)
+
+DEFAULT_PROFILE_NAME = "default"
+DEFAULT_PROFILE = {
+    "base": 44,
+    "critical_points": 7,            # per populated critical category
+    "important_points": 4,           # per populated important category
+    "complete_bonus": 10,            # all critical categories populated
+    "warning_points": 3,             # per missing-area warning...
+    "warning_cap": 15,               # ...up to this many points
+    "vague_points": 18,              # per vague phrase found...
+    "vague_cap": 54,                 # ...up to this many points
+    "brief_words": 60,               # prompts with fewer words and no vague phrase lose
+    "brief_words_per_point": 8,      # a point per this many missing words
+    "detail_tiers": [[15, 20], [10, 14], [6, 7]],  # [total category items, points]
+    "tech_tiers": [[4, 18], [3, 12], [2, 6]],      # [technology keywords found, points]
+    "max_score": 95,
+    "vague_patterns": list(VAGUE_PATTERNS),
+    "tech_keywords": list(TECH_KEYWORDS),
+    "quality_indicators": [list(indicator) for indicator in QUALITY_INDICATORS],
+}
+
+# Names usable in ?scoring_profile= (file names in SCORING_PROFILE_DIR, no paths)
+_PROFILE_NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+_HAS_TEXT = BASE_COLUMNS.index("has_text")
+_WORD_COUNT = BASE_COLUMNS.index("word_count")
+
+_lock = threading.Lock()
+_cache: dict = {}
+
+
+class ScoringPlan(NamedTuple):
+    """A scoring profile compiled for fast scoring."""
+    name: str
+    digest: str
+    base: int
+    max_score: int
+    # Feature columns: BASE_COLUMNS, then one hit column per term
+    columns: tuple
+    # Per term: (compiled regex or None, literals one of which a hit contains, or None)
+    term_checks: tuple
+    # Term column ranges (start, stop) of vague patterns, tech keywords and indicators
+    vague_terms: tuple
+    tech_terms: tuple
+    indicator_terms: tuple
+    indicator_points: tuple
+    # Lookup tables (see compile_plan)
+    category_points: tuple
+    warning_penalty: tuple
+    vague_penalty: tuple
+    brevity_penalty: tuple
+    detail_bonus: tuple
+    tech_bonus: tuple
+
+    @property
+    def terms(self) -> tuple:
+        """Term column names, e.g. "tech:kafka"."""
+        return self.columns[len(BASE_COLUMNS):]
+
+
+def term_check(pattern: str, regex: bool = True) -> tuple:
+    """(compiled regex or None for a plain substring, literals one of which every match contains, or None)"""
+    if not regex:
+        return None, (pattern,)
+    compiled = re.compile(pattern)
+    # Terms are searched in lower-cased text, so with (?i) the literals are lower-cased too;
+    # only ASCII literals are certain to be found in that text then
+    ignore_case = bool(compiled.flags & re.IGNORECASE)
+    try:
+        literals = required_literals(pattern.encode("latin-1"), ignore_case)
+    except UnicodeEncodeError:
+        literals = None
+    if literals is None or (ignore_case and not all(literal.isascii() for literal in literals)):
+        return compiled, None
+    return compiled, tuple(literal.decode("latin-1") for literal in literals)
+
+
+def term_found(check: tuple, text: str) -> bool:
+    # Most prompts contain none of a pattern's literals, which is much cheaper
+    # to establish than a failed search of the .*-heavy patterns
+    regex, literals = check
+    if literals is not None and not any(literal in text for literal in literals):
+        return False
+    return regex is None or regex.search(text) is not None
+
+
+def _int(profile: dict, key: str, minimum: Optional[int] = 0) -> int:
+    value = profile[key]
+    if isinstance(value, bool) or not isinstance(value, int) or (minimum is not None and value < minimum):
+        bound = "" if minimum is None else f" >= {minimum}"
+        raise ValueError(f"Scoring profile '{key}' must be an integer{bound}, got {value!r}")
+    return value
+
+
+def _tiers(profile: dict, key: str) -> list:
+    """[[threshold, points], ...] sorted by descending threshold."""
+    tiers = profile[key]
+    if not isinstance(tiers, list) or not all(
+        isinstance(tier, list) and len(tier) == 2 and all(isinstance(n, int) and not isinstance(n, bool) for n in tier)
+        for tier in tiers
+    ):
+        raise ValueError(f"Scoring profile '{key}' must be a list of [threshold, points] pairs")
+    return sorted(tiers, key=lambda tier: -tier[0])
+
+
+def _tier_table(tiers: list, size: int) -> tuple:
+    """Points for each value 0..size-1: those of the highest threshold reached."""
+    return tuple(next((points for threshold, points in tiers if value >= threshold), 0) for value in range(size))
+
+
+def _strings(profile: dict, key: str) -> list:
+    values = profile[key]
+    if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+        raise ValueError(f"Scoring profile '{key}' must be a list of non-empty strings")
+    return values
+
+
+def compile_plan(profile: dict, name: str = DEFAULT_PROFILE_NAME) -> ScoringPlan:
+    """
+    Compile a scoring profile.
+
+    Patterns are compiled with their literal prefilters, and the weights become
+    lookup tables: points by bitmask of populated categories (including the
+    completeness bonus), penalties by warning, vague phrase and word count, and
+    bonuses by total category items and technology keyword count.
+
+    Args:
+        profile: Profile keys (missing ones take DEFAULT_PROFILE's values)
+        name: Profile name reported by the plan
+
+    Returns:
+        ScoringPlan
+
+    Raises:
+        ValueError: If the profile has unknown keys or invalid values
+    """
+    unknown = sorted(set(profile) - set(DEFAULT_PROFILE))
+    if unknown:
+        raise ValueError(f"Unknown scoring profile keys: {', '.join(unknown)}")
+    profile = {**DEFAULT_PROFILE, **profile}
+
+    vague_patterns = _strings(profile, "vague_patterns")
+    tech_keywords = _strings(profile, "tech_keywords")
+    indicators = profile["quality_indicators"]
+    if not isinstance(indicators, list) or not all(
+        isinstance(indicator, list) and len(indicator) == 2 and isinstance(indicator[0], str) and indicator[0]
+        and isinstance(indicator[1], int) and not isinstance(indicator[1], bool)
+        for indicator in indicators
+    ):
+        raise ValueError("Scoring profile 'quality_indicators' must be a list of [pattern, points] pairs")
+    try:
+        term_checks = tuple(
+            [term_check(pattern) for pattern in vague_patterns]
+            + [term_check(keyword, regex=False) for keyword in tech_keywords]
+            + [term_check(pattern) for pattern, _ in indicators]
+        )
+    except re.error as e:
+        raise ValueError(f"Invalid pattern in scoring profile: {e}")
+    terms = (
+        tuple(f"vague:{pattern}" for pattern in vague_patterns)
+        + tuple(f"tech:{keyword}" for keyword in tech_keywords)
+        + tuple(f"indicator:{pattern}" for pattern, _ in indicators)
+    )
+    vague_stop = len(vague_patterns)
+    tech_stop = vague_stop + len(tech_keywords)
+
+    critical_points = _int(profile, "critical_points")
+    important_points = _int(profile, "important_points")
+    complete_bonus = _int(profile, "complete_bonus")
+    category_points = []
+    for mask in range(1 << len(CATEGORY_COLUMNS)):
+        critical = sum(1 for i in range(len(CRITICAL_CATEGORIES)) if mask >> i & 1)
+        important = sum(1 for i in range(len(CRITICAL_CATEGORIES), len(CATEGORY_COLUMNS)) if mask >> i & 1)
+        points = critical * critical_points + important * important_points
+        category_points.append(points + (complete_bonus if critical == len(CRITICAL_CATEGORIES) else 0))
+
+    warning_points, warning_cap = _int(profile, "warning_points"), _int(profile, "warning_cap")
+    # Beyond this many warnings the penalty stays at the cap
+    capped_warnings = -(-warning_cap // warning_points) if warning_points else 0
+    vague_points, vague_cap = _int(profile, "vague_points"), _int(profile, "vague_cap")
+    brief_words = _int(profile, "brief_words")
+    per_point = _int(profile, "brief_words_per_point", minimum=1)
+    detail_tiers = _tiers(profile, "detail_tiers")
+    tech_tiers = _tiers(profile, "tech_tiers")
+
+    return ScoringPlan(
+        name=name,
+        digest=hashlib.sha256(json.dumps(profile, sort_keys=True).encode("utf-8")).hexdigest()[:16],
+        base=_int(profile, "base", minimum=None),
+        max_score=_int(profile, "max_score"),
+        columns=BASE_COLUMNS + terms,
+        term_checks=term_checks,
+        vague_terms=(0, vague_stop),
+        tech_terms=(vague_stop, tech_stop),
+        indicator_terms=(tech_stop, len(terms)),
+        indicator_points=tuple(points for _, points in indicators),
+        category_points=tuple(category_points),
+        # Indexed by min(warning count, capped_warnings)
+        warning_penalty=tuple(min(count * warning_points, warning_cap) for count in range(capped_warnings + 1)),
+        vague_penalty=tuple(min(count * vague_points, vague_cap) for count in range(vague_stop + 1)),
+        # Indexed by min(word count, brief_words)
+        brevity_penalty=tuple((brief_words - words) // per_point for words in range(brief_words + 1)),
+        # Indexed by min(total items, highest threshold)
+        detail_bonus=_tier_table(detail_tiers, max([threshold for threshold, _ in detail_tiers] + [0]) + 1),
+        tech_bonus=_tier_table(tech_tiers, len(tech_keywords) + 1),
+    )
+
+
+DEFAULT_PLAN = compile_plan({})
+
+
+def score_features(plan: ScoringPlan, row, warning_count: int) -> int:
+    """
+    Score of one feature row (plan.columns order).
+
+    Args:
+        plan: Compiled scoring plan
+        row: Feature values
+        warning_count: Number of missing-area warnings
+
+    Returns:
+        Score from 0 to plan.max_score
+    """
+    mask = 0
+    total = 0
+    for i in range(len(CATEGORY_COLUMNS)):
+        if row[i]:
+            mask |= 1 << i
+            total += row[i]
+    score = plan.base + plan.category_points[mask] - plan.warning_penalty[min(warning_count, len(plan.warning_penalty) - 1)]
+    score += plan.detail_bonus[min(total, len(plan.detail_bonus) - 1)]
+    if row[_HAS_TEXT]:
+        offset = len(BASE_COLUMNS)
+        vague = sum(row[offset + plan.vague_terms[0]:offset + plan.vague_terms[1]])
+        score -= plan.vague_penalty[vague]
+        if vague == 0:
+            score -= plan.brevity_penalty[min(row[_WORD_COUNT], len(plan.brevity_penalty) - 1)]
+        score += plan.tech_bonus[sum(row[offset + plan.tech_terms[0]:offset + plan.tech_terms[1]])]
+        start = offset + plan.indicator_terms[0]
+        score += sum(points for points, hit in zip(plan.indicator_points, row[start:]) if hit)
+    return max(0, min(plan.max_score, score))
+
+
+def score_columns(plan: ScoringPlan, c: dict, warning_count, np):
+    """score_features over feature matrix columns ({name: NumPy array}), with the NumPy module np."""
+    mask = sum((c[name] > 0).astype(np.int64) << i for i, name in enumerate(CATEGORY_COLUMNS))
+    total = sum(c[name] for name in CATEGORY_COLUMNS)
+    score = plan.base + np.asarray(plan.category_points)[mask]
+    score -= np.asarray(plan.warning_penalty)[np.minimum(warning_count, len(plan.warning_penalty) - 1)]
+    score += np.asarray(plan.detail_bonus)[np.minimum(total, len(plan.detail_bonus) - 1)]
+
+    terms = plan.terms
+    vague = sum((c[name] for name in terms[slice(*plan.vague_terms)]), np.zeros_like(total))
+    tech = sum((c[name] for name in terms[slice(*plan.tech_terms)]), np.zeros_like(total))
+    text_score = -np.asarray(plan.vague_penalty)[vague]
+    brevity = np.asarray(plan.brevity_penalty)[np.minimum(c["word_count"], len(plan.brevity_penalty) - 1)]
+    text_score -= np.where(vague == 0, brevity, 0)
+    text_score += np.asarray(plan.tech_bonus)[tech]
+    for name, points in zip(terms[slice(*plan.indicator_terms)], plan.indicator_points):
+        text_score += points * c[name]
+    score += np.where(c["has_text"] == 1, text_score, 0)
+    return np.clip(score, 0, plan.max_score)
+
+
+def load_profile(path: str) -> ScoringPlan:
+    """
+    Load and compile a profile file, reusing the cached plan while it is unchanged.
+
+    Args:
+        path: JSON file with an object of profile keys
+
+    Returns:
+        ScoringPlan named after the file
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a valid profile
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with _lock:
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                profile = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"Scoring profile {path} is not valid JSON: {e}")
+        if not isinstance(profile, dict):
+            raise ValueError(f"Scoring profile {path} must be a JSON object")
+        name = os.path.splitext(os.path.basename(path))[0]
+        plan = compile_plan(profile, name)
+        _cache[path] = (stamp, plan)
+        return plan
+
+
+def get_plan(name: Optional[str] = None) -> ScoringPlan:
+    """
+    Scoring plan of a named profile.
+
+    Args:
+        name: Profile name in SCORING_PROFILE_DIR, or "default" for the
+            built-in profile (default: SCORING_PROFILE, else the built-in)
+
+    Returns:
+        ScoringPlan
+
+    Raises:
+        ValueError: If the profile does not exist or is invalid
+    """
+    if name is None:
+        name = os.getenv("SCORING_PROFILE", "").strip()
+        if name.endswith(".json") or os.sep in name:
+            return load_profile(name)
+        if not name:
+            return DEFAULT_PLAN
+    if name == DEFAULT_PROFILE_NAME:
+        return DEFAULT_PLAN
+    directory = os.getenv("SCORING_PROFILE_DIR", "").strip()
+    if not _PROFILE_NAME_RE.match(name) or not directory:
+        raise ValueError(f"Unknown scoring profile: {name}")
+    try:
+        return load_profile(os.path.join(directory, name + ".json"))
+    except FileNotFoundError:
+        raise ValueError(f"Unknown scoring profile: {name}")
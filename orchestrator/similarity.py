@@ -0,0 +1,207 @@
+"""
+Near-duplicate detection over recently analyzed prompts.
+
+The rule script sees the prompt with newlines turned into spaces. When every
+rule matches case-insensitively (see RuleSource.case_insensitive), two prompts
+that differ only in ASCII letter case or in newlines versus spaces produce
+identical rule output. Such prompts share a rule-input key, and the rule engine
+output of one can be reused for the other. The remaining pipeline stages still
+run on the new text.
+
+Other near-duplicates are found with a 64-bit SimHash over word shingles and
+reported, so callers can diff against the earlier analysis. They are analyzed
+in full: rules match across the whole prompt (with distance limits such as
+.{0,50}), so a few changed words can change any finding.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import NamedTuple, Optional
+
+from .rules import load_rule_source
+
+
+SIMHASH_BITS = 64
+# SimHash is split into this many bands for candidate lookup; two fingerprints
+# within MAX_NEAR_DISTANCE bits agree on at least one band when bands > distance
+SIMHASH_BANDS = 8
+# A one-word edit of a ~100-word prompt typically moves 4-7 bits; unrelated
+# prompts are ~32 bits apart
+MAX_NEAR_DISTANCE = 7
+SHINGLE_WORDS = 3
+
+DEFAULT_INDEX_SIZE = 1024
+
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Set bit positions of each byte value
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def rule_input_key(normalized_prompt: str, case_insensitive: bool) -> Optional[str]:
+    """
+    Canonical form of the text the rule script matches against.
+
+    Args:
+        normalized_prompt: The stripped prompt passed to the rule script
+        case_insensitive: Whether the active rules ignore letter case
+
+    Returns:
+        The key, or None when equivalence cannot be guaranteed (case-sensitive
+        rules, or a prompt starting with '-', which the script's echo may treat
+        as an option depending on its case)
+    """
+    if not case_insensitive or normalized_prompt.startswith("-"):
+        return None
+    return normalized_prompt.replace("\n", " ").translate(_ASCII_LOWER)
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the lowercased word shingles of text."""
+    words = _WORD_RE.findall(text.translate(_ASCII_LOWER))
+    if len(words) > SHINGLE_WORDS:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    else:
+        shingles = {" ".join(words)}
+
+    # Count set bits column-wise: each byte position of the concatenated 8-byte
+    # hashes is tallied by value, then each distinct value votes for its bits
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    majority = len(shingles) / 2
+    fingerprint = 0
+    for position in range(8):
+        ones = [0] * 8
+        for value, count in Counter(digests[position::8]).items():
+            for bit in _BYTE_BITS[value]:
+                ones[bit] += count
+        for bit in range(8):
+            if ones[bit] > majority:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+class SimilarityMatch(NamedTuple):
+    """An earlier analysis similar to the current prompt."""
+    analysis_id: str
+    distance: int
+    # True when the earlier rule output was reused (identical rule input)
+    reused: bool
+
+
+class _Entry(NamedTuple):
+    analysis_id: str
+    fingerprint: int
+    exact_key: Optional[tuple]
+    rule_output: tuple
+
+
+class SimilarityIndex:
+    """
+    Bounded index of recently analyzed prompts (least recently used evicted).
+
+    Holds each prompt's SimHash, rule-input key and rule engine output
+    (raw output, findings, exit code).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_INDEX_SIZE, max_distance: int = MAX_NEAR_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = min(max_distance, SIMHASH_BANDS - 1)
+        self._entries: OrderedDict = OrderedDict()
+        self._by_key: dict = {}
+        self._bands: list = [dict() for _ in range(SIMHASH_BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, normalized_prompt: str) -> tuple:
+        """
+        Find an earlier analysis that matches the prompt.
+
+        Args:
+            normalized_prompt: The stripped prompt
+
+        Returns:
+            (SimilarityMatch or None, reusable rule output or None). Rule output is
+            only returned for an identical rule input under the current rules.
+        """
+        source = load_rule_source()
+        key = rule_input_key(normalized_prompt, source.case_insensitive)
+        exact_key = (source.digest, key) if key is not None else None
+        with self._lock:
+            entry_id = self._by_key.get(exact_key) if exact_key else None
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                entry = self._entries[entry_id]
+                return SimilarityMatch(entry.analysis_id, 0, True), entry.rule_output
+
+        fingerprint = simhash(normalized_prompt)
+        with self._lock:
+            best = None
+            for band, buckets in enumerate(self._bands):
+                for entry_id in buckets.get(_band(fingerprint, band), ()):
+                    distance = (self._entries[entry_id].fingerprint ^ fingerprint).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best[1]):
+                        best = (entry_id, distance)
+            if best is None:
+                return None, None
+            self._entries.move_to_end(best[0])
+            return SimilarityMatch(self._entries[best[0]].analysis_id, best[1], False), None
+
+    def add(self, analysis_id: str, normalized_prompt: str, rule_output: tuple) -> None:
+        """
+        Remember a prompt's rule engine output under its analysis ID.
+
+        Args:
+            analysis_id: ID of the analysis (see cache.analysis_id)
+            normalized_prompt: The stripped prompt
+            rule_output: (raw_output, findings, exit_code) from the rule engine
+        """
+        if self.max_entries <= 0:
+            return
+        source = load_rule_source()
+        key = rule_input_key(normalized_prompt, source.case_insensitive)
+        entry = _Entry(
+            analysis_id=analysis_id,
+            fingerprint=simhash(normalized_prompt),
+            exact_key=(source.digest, key) if key is not None else None,
+            rule_output=rule_output
+        )
+        with self._lock:
+            if analysis_id in self._entries:
+                self._remove(analysis_id)
+            self._entries[analysis_id] = entry
+            if entry.exact_key is not None:
+                self._by_key[entry.exact_key] = analysis_id
+            for band, buckets in enumerate(self._bands):
+                buckets.setdefault(_band(entry.fingerprint, band), set()).add(analysis_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: str) -> None:
+        """Drop an entry from every structure (lock held)."""
+        entry = self._entries.pop(entry_id)
+        if entry.exact_key is not None and self._by_key.get(entry.exact_key) == entry_id:
+            del self._by_key[entry.exact_key]
+        for band, buckets in enumerate(self._bands):
+            bucket = buckets.get(_band(entry.fingerprint, band))
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del buckets[_band(entry.fingerprint, band)]
+
+
+def _band(fingerprint: int, band: int) -> int:
+    return (fingerprint >> (band * _BAND_BITS)) & _BAND_MASK
+
+
+def index_size_from_env() -> int:
+    """Configured index size from SIMILARITY_INDEX_SIZE (default DEFAULT_INDEX_SIZE, 0 disables)."""
+    try:
+        return max(0, int(os.getenv("SIMILARITY_INDEX_SIZE", DEFAULT_INDEX_SIZE)))
+    except ValueError:
+        return DEFAULT_INDEX_SIZE
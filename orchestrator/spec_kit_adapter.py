@@ -16,11 +16,14 @@ import subprocess
 import os
 import json
 import re
-from typing import Dict, Any, Optional, Tuple
-from .models import DevSpecFinding, SpecKitStructure
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
+from .records import Finding, SpecStructure
 
+if TYPE_CHECKING:
+    from .models import SpecKitStructure
 
-def extract_spec_structure(prompt: str, raw_output: str) -> SpecKitStructure:
+
+def extract_spec_structure(prompt: str, raw_output: str) -> "SpecKitStructure":
     """
     Extract structured spec elements from the prompt and spec-kit output.
     
@@ -34,37 +37,113 @@ def extract_spec_structure(prompt: str, raw_output: str) -> SpecKitStructure:
     Returns:
         SpecKitStructure with categorized elements
     """
-    structure = SpecKitStructure()
-    prompt_lower = prompt.lower()
+    from .models import SpecKitStructure
+    return SpecKitStructure(**extract_spec_record(prompt).as_dict())
+
+
+# Structure extraction patterns, matched against the lowercased prompt
+FEATURE_PATTERNS = tuple(re.compile(pattern, re.MULTILINE) for pattern in (
+    r'implement\s+([^.\n]+)',
+    r'build\s+(?:a|an)\s+([^.\n]+)',
+    r'create\s+(?:a|an)\s+([^.\n]+)',
+    r'add\s+(?:a|an)\s+([^.\n]+)',
+    r'feature[s]?:\s*([^.\n]+)',
+    r'requirement[s]?:\s*([^.\n]+)'
+))
+ENTITY_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'\b(user|admin|account|session|token|profile|dashboard|api|endpoint|database|table|model)\b',
+    r'entity[:\s]+([^.\n]+)',
+    r'model[:\s]+([^.\n]+)'
+))
+FLOW_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'\b(login|logout|sign\s*in|sign\s*out|authentication|authorization|register|signup)\b',
+    r'\b(create|read|update|delete|crud)\b',
+    r'flow[:\s]+([^.\n]+)',
+    r'workflow[:\s]+([^.\n]+)'
+))
+CONFIG_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'(jwt\s+secret|api\s+key|database\s+url|connection\s+string|environment\s+variable)',
+    r'config[uration]*[:\s]+([^.\n]+)',
+    r'\.env|environment\s+variables?',
+    r'secret[s]?|credential[s]?|key[s]?'
+))
+# Categories whose whole matches are collected: (field, patterns, most kept)
+MENTION_PATTERNS = tuple((name, tuple(re.compile(pattern) for pattern in patterns), limit) for name, patterns, limit in (
+    ("error_handling", (
+        r'error\s+handling',
+        r'exception\s+handling',
+        r'fallback',
+        r'retry',
+        r'graceful\s+degradation',
+        r'error\s+response',
+        r'try\s*[/-]\s*catch'
+    ), 5),
+    ("testing", (
+        r'test[ing]*\s+(?:strategy|plan|suite|cases?)',
+        r'unit\s+test',
+        r'integration\s+test',
+        r'e2e\s+test',
+        r'test\s+coverage',
+        r'automated\s+test'
+    ), 5),
+    ("logging", (
+        r'log[ging]*',
+        r'observability',
+        r'monitoring',
+        r'metrics',
+        r'telemetry',
+        r'audit\s+log'
+    ), 5),
+    ("authentication", (
+        r'oauth[2]?',
+        r'jwt|json\s+web\s+token',
+        r'session[s]?',
+        r'authentication',
+        r'authorization',
+        r'sso|single\s+sign[- ]on',
+        r'role[s]?[- ]based',
+        r'rbac'
+    ), 10),
+    ("data_storage", (
+        r'database|postgres|mysql|mongodb',
+        r'redis|cache',
+        r'storage|persist',
+        r'sql|nosql'
+    ), 10),
+))
+
+
+def extract_spec_record(prompt: str) -> SpecStructure:
+    """
+    Extract structured spec elements from the prompt as an internal record.
     
-    # Extract features (things the system should do)
-    feature_patterns = [
-        r'implement\s+([^.\n]+)',
-        r'build\s+(?:a|an)\s+([^.\n]+)',
-        r'create\s+(?:a|an)\s+([^.\n]+)',
-        r'add\s+(?:a|an)\s+([^.\n]+)',
-        r'feature[s]?:\s*([^.\n]+)',
-        r'requirement[s]?:\s*([^.\n]+)'
-    ]
+    This is the pipeline's fast path; extract_spec_structure wraps it in
+    the Pydantic model for callers that need one.
+    
+    Args:
+        prompt: The developer prompt to analyze
+        
+    Returns:
+        SpecStructure with categorized elements
+    """
+    return extract_lowered_record(prompt.lower())
+
+
+def extract_lowered_record(prompt_lower: str) -> SpecStructure:
+    """extract_spec_record for a prompt that is already lowercased."""
+    structure = SpecStructure()
     
-    for pattern in feature_patterns:
-        matches = re.finditer(pattern, prompt_lower, re.MULTILINE)
-        for match in matches:
+    # Extract features (things the system should do)
+    for pattern in FEATURE_PATTERNS:
+        for match in pattern.finditer(prompt_lower):
             feature = match.group(1).strip()
             if len(feature) > 5 and len(feature) < 100:  # Reasonable length
                 structure.features.append(feature)
     
     # Extract entities (data models, objects)
-    entity_patterns = [
-        r'\b(user|admin|account|session|token|profile|dashboard|api|endpoint|database|table|model)\b',
-        r'entity[:\s]+([^.\n]+)',
-        r'model[:\s]+([^.\n]+)'
-    ]
-    
     entities_found = set()
-    for pattern in entity_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
+    for pattern in ENTITY_PATTERNS:
+        for match in pattern.finditer(prompt_lower):
             if match.lastindex and match.lastindex >= 1:
                 entity = match.group(1).strip()
             else:
@@ -75,17 +154,9 @@ def extract_spec_structure(prompt: str, raw_output: str) -> SpecKitStructure:
     structure.entities = sorted(list(entities_found))
     
     # Extract flows (login, logout, workflows)
-    flow_patterns = [
-        r'\b(login|logout|sign\s*in|sign\s*out|authentication|authorization|register|signup)\b',
-        r'\b(create|read|update|delete|crud)\b',
-        r'flow[:\s]+([^.\n]+)',
-        r'workflow[:\s]+([^.\n]+)'
-    ]
-    
     flows_found = set()
-    for pattern in flow_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
+    for pattern in FLOW_PATTERNS:
+        for match in pattern.finditer(prompt_lower):
             if match.lastindex and match.lastindex >= 1:
                 flow = match.group(1).strip()
             else:
@@ -96,16 +167,8 @@ def extract_spec_structure(prompt: str, raw_output: str) -> SpecKitStructure:
     structure.flows = sorted(list(flows_found))
     
     # Extract configuration mentions
-    config_patterns = [
-        r'(jwt\s+secret|api\s+key|database\s+url|connection\s+string|environment\s+variable)',
-        r'config[uration]*[:\s]+([^.\n]+)',
-        r'\.env|environment\s+variables?',
-        r'secret[s]?|credential[s]?|key[s]?'
-    ]
-    
-    for pattern in config_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
+    for pattern in CONFIG_PATTERNS:
+        for match in pattern.finditer(prompt_lower):
             if match.lastindex and match.lastindex >= 1:
                 config = match.group(1).strip()
             else:
@@ -113,90 +176,17 @@ def extract_spec_structure(prompt: str, raw_output: str) -> SpecKitStructure:
             if config and len(config) < 80:
                 structure.configuration.append(config)
     
-    # Extract error handling mentions
-    error_patterns = [
-        r'error\s+handling',
-        r'exception\s+handling',
-        r'fallback',
-        r'retry',
-        r'graceful\s+degradation',
-        r'error\s+response',
-        r'try\s*[/-]\s*catch'
-    ]
-    
-    for pattern in error_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
-            structure.error_handling.append(match.group(0))
-    
-    # Extract testing mentions
-    testing_patterns = [
-        r'test[ing]*\s+(?:strategy|plan|suite|cases?)',
-        r'unit\s+test',
-        r'integration\s+test',
-        r'e2e\s+test',
-        r'test\s+coverage',
-        r'automated\s+test'
-    ]
-    
-    for pattern in testing_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
-            structure.testing.append(match.group(0))
-    
-    # Extract logging mentions
-    logging_patterns = [
-        r'log[ging]*',
-        r'observability',
-        r'monitoring',
-        r'metrics',
-        r'telemetry',
-        r'audit\s+log'
-    ]
-    
-    for pattern in logging_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
-            structure.logging.append(match.group(0))
-    
-    # Extract authentication mentions
-    auth_patterns = [
-        r'oauth[2]?',
-        r'jwt|json\s+web\s+token',
-        r'session[s]?',
-        r'authentication',
-        r'authorization',
-        r'sso|single\s+sign[- ]on',
-        r'role[s]?[- ]based',
-        r'rbac'
-    ]
-    
-    for pattern in auth_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
-            structure.authentication.append(match.group(0))
-    
-    # Extract data storage mentions
-    storage_patterns = [
-        r'database|postgres|mysql|mongodb',
-        r'redis|cache',
-        r'storage|persist',
-        r'sql|nosql'
-    ]
-    
-    for pattern in storage_patterns:
-        matches = re.finditer(pattern, prompt_lower)
-        for match in matches:
-            structure.data_storage.append(match.group(0))
+    # Extract error handling, testing, logging, authentication and data storage mentions
+    for name, patterns, _ in MENTION_PATTERNS:
+        mentions = getattr(structure, name)
+        for pattern in patterns:
+            mentions.extend(pattern.findall(prompt_lower))
     
     # Deduplicate and clean up
     structure.features = list(dict.fromkeys(structure.features))[:10]  # Limit to 10
     structure.configuration = list(dict.fromkeys(structure.configuration))[:10]
-    structure.error_handling = list(dict.fromkeys(structure.error_handling))[:5]
-    structure.testing = list(dict.fromkeys(structure.testing))[:5]
-    structure.logging = list(dict.fromkeys(structure.logging))[:5]
-    structure.authentication = list(dict.fromkeys(structure.authentication))[:10]
-    structure.data_storage = list(dict.fromkeys(structure.data_storage))[:10]
+    for name, _, limit in MENTION_PATTERNS:
+        setattr(structure, name, list(dict.fromkeys(getattr(structure, name)))[:limit])
     
     return structure
 
@@ -301,7 +291,7 @@ class SpecKitAdapter:
                 "findings": []
             }
     
-    def analyze_prompt(self, prompt: str) -> Tuple[str, list[DevSpecFinding], int, Optional[SpecKitStructure]]:
+    def analyze_prompt(self, prompt: str) -> Tuple[str, list[Finding], int, Optional[SpecStructure]]:
         """
         Analyze a developer prompt using spec-kit.
         
@@ -325,7 +315,7 @@ class SpecKitAdapter:
         )
         
         # Extract structured spec elements from the prompt
-        structure = extract_spec_structure(prompt, warning)
+        structure = extract_spec_record(prompt)
         
         return warning, [], 0, structure
 
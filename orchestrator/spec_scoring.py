@@ -0,0 +1,424 @@
+"""
+Spec-quality scoring: the pipeline's fused stage and batch scoring.
+
+detect_missing_spec_areas and compute_spec_quality_score (pipeline.py) score
+one extracted structure at a time, each lowercasing and rescanning the prompt.
+Both paths here compute the same results from one feature row per prompt
+(category sizes, word count and similar prompt features, then a hit column
+per vague phrase, technology keyword and quality indicator of the scoring
+profile), scored by a compiled ScoringPlan (scoring_profiles.py):
+
+- assess_spec_quality, which run_analysis calls, lowercases the prompt once
+  and extracts the structure, the features, the warnings and the score in a
+  single pass;
+- score_batch turns N prompts into a feature matrix, then computes every
+  warning and score column by column: with NumPy array operations
+  (requirements.txt; imported on first use, never by the pipeline), or with
+  the same integer lookups over Python lists where NumPy is missing or
+  use_numpy=False.
+
+check_parity compares both with the scalar functions; tests/test_spec_scoring.py
+runs it over the prompt corpus.
+
+Score a corpus without the rule script (JSON lines on stdout) with:
+    python -m orchestrator.spec_scoring PATH ... [--jsonl FILE] [--scoring-profile NAME|FILE]
+check the parity of test_prompts/ and prompts/ (or PATH ...) with:
+    python -m orchestrator.spec_scoring --check [PATH ...]
+and calibrate a profile by saving the corpus features once, then re-scoring
+them (no extraction) after each change to the profile:
+    python -m orchestrator.spec_scoring PATH ... --save-features corpus.json
+    python -m orchestrator.spec_scoring --features corpus.json --scoring-profile tuned.json
+--features also takes a feature store (feature_store.py), whose term columns
+are computed from the stored prompts when a profile adds terms.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from .records import SpecStructure
+from .scoring_profiles import (
+    BASE_COLUMNS, CATEGORY_COLUMNS, DEFAULT_PLAN, ScoringPlan, get_plan, load_profile,
+    score_columns, score_features, term_found,
+)
+from .spec_kit_adapter import extract_lowered_record
+
+
+# Missing-area warnings, shared with the scalar functions in pipeline.py
+MISSING_AREA_WARNINGS = {
+    "features": "No features or requirements explicitly defined. Consider specifying what the system should do.",
+    "entities": "No data models or entities identified. Consider defining what data structures are needed.",
+    "flows": "No user flows or workflows identified. Consider describing how users interact with the system.",
+    "error_handling": "No error handling strategy mentioned. Consider how the system handles failures and edge cases.",
+    "testing": "No testing strategy mentioned. Consider adding test plans, unit tests, or integration tests.",
+    "logging": "No logging or monitoring mentioned. Consider how you'll track system behavior and debug issues.",
+}
+AUTH_FLOW_WARNING = "Authentication mentioned but login/auth flow not clearly defined."
+STORAGE_CONFIG_WARNING = "Data storage mentioned but configuration details (connection strings, env vars) not specified."
+VAGUE_FEATURES_WARNING = "Some features are vaguely defined. Consider adding more detail about what each feature should do."
+
+# Warnings in detect_missing_spec_areas order
+WARNING_MESSAGES = tuple(MISSING_AREA_WARNINGS.values()) + (AUTH_FLOW_WARNING, STORAGE_CONFIG_WARNING, VAGUE_FEATURES_WARNING)
+
+# Feature matrix columns under the built-in scoring profile
+FEATURE_COLUMNS = DEFAULT_PLAN.columns
+
+
+class SpecScore(NamedTuple):
+    """Spec-quality result of one prompt."""
+    structure: SpecStructure
+    warnings: list
+    score: int
+
+
+_np = None
+
+
+def _numpy():
+    """NumPy, imported on first use, or None if it is not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:  # Not installed with the requirements: the list path gives the same results
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+def numpy_available() -> bool:
+    return _numpy() is not None
+
+
+def feature_row(
+    structure: SpecStructure,
+    prompt_text: str,
+    prompt_lower: Optional[str] = None,
+    plan: ScoringPlan = DEFAULT_PLAN
+) -> tuple:
+    """Features of one prompt, in plan.columns order (prompt_lower: prompt_text.lower(), if at hand)."""
+    if prompt_lower is None:
+        prompt_lower = prompt_text.lower()
+    return (
+        *(len(getattr(structure, name)) for name in CATEGORY_COLUMNS),
+        int(any('login' in f or 'auth' in f for f in structure.flows)),
+        sum(1 for f in structure.features if len(f.split()) < 3),
+        int(bool(prompt_text)),
+        len(prompt_text.split()),
+        *(int(term_found(check, prompt_lower)) for check in plan.term_checks),
+    )
+
+
+def feature_matrix(structures: list, prompts: list, use_numpy: Optional[bool] = None, plan: ScoringPlan = DEFAULT_PLAN):
+    """
+    Feature matrix of N prompts: an (N, len(plan.columns)) int64 array with
+    NumPy (use_numpy, default: if installed), else a list of row tuples.
+    """
+    rows = [feature_row(structure, prompt, plan=plan) for structure, prompt in zip(structures, prompts)]
+    return _matrix(rows, len(plan.columns), use_numpy)
+
+
+def _matrix(rows: list, width: int, use_numpy: Optional[bool]):
+    np = None if use_numpy is False else _numpy()
+    if np is None:
+        return rows
+    return np.array(rows, dtype=np.int64).reshape(len(rows), width)
+
+
+def _warning_flags_numpy(c: dict) -> list:
+    flags = [c[name] == 0 for name in MISSING_AREA_WARNINGS]
+    flags.append((c["authentication"] > 0) & (c["auth_flow"] == 0))
+    flags.append((c["data_storage"] > 0) & (c["configuration"] == 0))
+    # more than half the features are short (compared as 2 * short > total, exactly)
+    flags.append((c["features"] > 0) & (2 * c["short_features"] > c["features"]))
+    return flags
+
+
+def _warning_flags_row(f: dict) -> list:
+    flags = [f[name] == 0 for name in MISSING_AREA_WARNINGS]
+    flags.append(f["authentication"] > 0 and not f["auth_flow"])
+    flags.append(f["data_storage"] > 0 and f["configuration"] == 0)
+    flags.append(f["features"] > 0 and 2 * f["short_features"] > f["features"])
+    return flags
+
+
+def score_matrix(matrix, plan: ScoringPlan = DEFAULT_PLAN) -> tuple:
+    """
+    Warnings and scores for a feature matrix (plan.columns order).
+
+    Returns:
+        (list of warning lists, list of int scores), one entry per row
+    """
+    np = _numpy()
+    if np is not None and isinstance(matrix, np.ndarray):
+        c = {name: matrix[:, i] for i, name in enumerate(plan.columns)}
+        flags = _warning_flags_numpy(c)
+        warning_count = sum(flag.astype(np.int64) for flag in flags)
+        scores = score_columns(plan, c, warning_count, np).tolist()
+        flag_rows = np.stack(flags, axis=1).tolist() if len(matrix) else []
+    else:
+        flag_rows = [_warning_flags_row(dict(zip(BASE_COLUMNS, row))) for row in matrix]
+        scores = [score_features(plan, row, sum(flags)) for row, flags in zip(matrix, flag_rows)]
+    warnings = [[message for message, flag in zip(WARNING_MESSAGES, row) if flag] for row in flag_rows]
+    return warnings, scores
+
+
+def assess_spec_quality(prompt_text: str, plan: Optional[ScoringPlan] = None) -> SpecScore:
+    """
+    Spec structure, missing-area warnings and quality score of one prompt.
+
+    The fused form of extract_spec_record, detect_missing_spec_areas and
+    compute_spec_quality_score, with the same results under the built-in
+    scoring profile.
+
+    Args:
+        prompt_text: The (normalized) developer prompt
+        plan: Scoring plan (default: get_plan(), the SCORING_PROFILE profile)
+
+    Returns:
+        SpecScore of the prompt
+    """
+    if plan is None:
+        plan = get_plan()
+    prompt_lower = prompt_text.lower()
+    structure = extract_lowered_record(prompt_lower)
+    row = feature_row(structure, prompt_text, prompt_lower, plan)
+    flags = _warning_flags_row(dict(zip(BASE_COLUMNS, row)))
+    warnings = [message for message, flag in zip(WARNING_MESSAGES, flags) if flag]
+    return SpecScore(structure, warnings, score_features(plan, row, len(warnings)))
+
+
+def check_parity(prompts: Iterable[str]) -> list:
+    """
+    Compare assess_spec_quality and score_batch with the scalar functions
+    (under the built-in scoring profile).
+
+    Returns:
+        (index, path name, expected, actual) for each prompt that differs,
+        where path name is "fused", "batch" or "batch-numpy" and results are
+        (structure dict, warnings, score)
+    """
+    from .pipeline import compute_spec_quality_score, detect_missing_spec_areas
+    from .spec_kit_adapter import extract_spec_record
+
+    texts = [prompt.strip() for prompt in prompts]
+    paths = {
+        "fused": [assess_spec_quality(text, DEFAULT_PLAN) for text in texts],
+        "batch": score_batch(texts, use_numpy=False),
+    }
+    if numpy_available():
+        paths["batch-numpy"] = score_batch(texts, use_numpy=True)
+
+    mismatches = []
+    for index, text in enumerate(texts):
+        structure = extract_spec_record(text)
+        warnings = detect_missing_spec_areas(structure)
+        expected = (structure.as_dict(), warnings, compute_spec_quality_score(structure, warnings, text))
+        for name, results in paths.items():
+            actual = (results[index].structure.as_dict(), results[index].warnings, results[index].score)
+            if actual != expected:
+                mismatches.append((index, name, expected, actual))
+    return mismatches
+
+
+def score_batch(prompts: Iterable[str], use_numpy: Optional[bool] = None, plan: ScoringPlan = DEFAULT_PLAN) -> list:
+    """
+    Spec-quality structure, warnings and score of many prompts.
+
+    Prompts are normalized as run_analysis does (stripped); each result equals
+    what the pipeline reports for that prompt under the same scoring plan.
+
+    Returns:
+        SpecScore per prompt, in order
+    """
+    texts = [prompt.strip() for prompt in prompts]
+    structures = [extract_lowered_record(text.lower()) for text in texts]
+    warnings, scores = score_matrix(feature_matrix(structures, texts, use_numpy, plan), plan)
+    return [SpecScore(*result) for result in zip(structures, warnings, scores)]
+
+
+def save_features(path: str, sources: list, prompts: Iterable[str], plans: Iterable[ScoringPlan] = (DEFAULT_PLAN,)) -> None:
+    """
+    Save the feature rows of prompts for re-scoring without extraction.
+
+    The file holds the columns of every given plan, so any profile that only
+    reweights them, or uses a subset of their terms, can be scored from it.
+
+    Args:
+        path: Output JSON file
+        sources: Name of each prompt
+        prompts: The prompts
+        plans: Plans whose term columns to include
+    """
+    plans = list(plans)
+    columns = list(dict.fromkeys(column for plan in plans for column in plan.columns))
+    rows = []
+    for prompt in prompts:
+        text = prompt.strip()
+        prompt_lower = text.lower()
+        structure = extract_lowered_record(prompt_lower)
+        values = {}
+        for plan in plans:
+            values.update(zip(plan.columns, feature_row(structure, text, prompt_lower, plan)))
+        rows.append([values[column] for column in columns])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"columns": columns, "sources": list(sources), "rows": rows}, f)
+
+
+def load_features(path: str) -> tuple:
+    """
+    Load a file written by save_features.
+
+    Returns:
+        (sources, columns, rows)
+
+    Raises:
+        ValueError: If the file is not a feature file
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not {"columns", "sources", "rows"} <= set(data):
+        raise ValueError(f"{path} is not a feature file")
+    return data["sources"], data["columns"], data["rows"]
+
+
+def rescore_features(columns: list, rows: list, plan: ScoringPlan, use_numpy: Optional[bool] = None) -> tuple:
+    """
+    Warnings and scores of saved feature rows under a plan, without extraction.
+
+    Returns:
+        (list of warning lists, list of int scores), as score_matrix
+
+    Raises:
+        ValueError: If the plan needs term columns the rows lack
+    """
+    index = {column: i for i, column in enumerate(columns)}
+    missing = [column for column in plan.columns if column not in index]
+    if missing:
+        raise ValueError(
+            f"Saved features lack {len(missing)} column(s) of profile '{plan.name}' "
+            f"(e.g. {missing[0]}); save them again with this profile"
+        )
+    positions = [index[column] for column in plan.columns]
+    matrix = _matrix([tuple(row[i] for i in positions) for row in rows], len(positions), use_numpy)
+    return score_matrix(matrix, plan)
+
+
+def _profile_arg(value: Optional[str]) -> ScoringPlan:
+    """--scoring-profile/--baseline: a profile file, or a name for get_plan."""
+    if value is not None and (value.endswith(".json") or os.sep in value):
+        return load_profile(value)
+    return get_plan(value)
+
+
+def _rescore(path: str, plan: ScoringPlan, baseline: ScoringPlan) -> int:
+    """--features: re-score saved features (or a feature store) under plan and compare with baseline."""
+    from .feature_store import FeatureStore, is_store_file
+
+    started = time.perf_counter()
+    if is_store_file(path):
+        store = FeatureStore(path)
+        try:
+            sources = store.digests()
+            warnings, scores = store.rescore(plan)
+            _, baseline_scores = store.rescore(baseline)
+        finally:
+            store.close()
+    else:
+        sources, columns, rows = load_features(path)
+        warnings, scores = rescore_features(columns, rows, plan)
+        _, baseline_scores = rescore_features(columns, rows, baseline)
+    elapsed = time.perf_counter() - started
+
+    for index, (name, score) in enumerate(zip(sources, scores)):
+        print(json.dumps({
+            "index": index,
+            "source": name,
+            "spec_quality_score": score,
+            "spec_quality_warnings": warnings[index],
+            "baseline_score": baseline_scores[index],
+        }))
+    if scores:
+        changed = sum(1 for score, before in zip(scores, baseline_scores) if score != before)
+        print(
+            f"Re-scored {len(scores)} prompts with profile '{plan.name}' in {elapsed * 1000:.0f} ms: "
+            f"mean score {sum(scores) / len(scores):.1f} (baseline '{baseline.name}' "
+            f"{sum(baseline_scores) / len(baseline_scores):.1f}), {changed} changed",
+            file=sys.stderr
+        )
+    return 0
+
+
+def main(argv=None) -> int:
+    from .bulk import iter_sources
+
+    parser = argparse.ArgumentParser(prog="python -m orchestrator.spec_scoring", description="Score the spec quality of many prompts")
+    parser.add_argument("inputs", nargs="*", help="Prompt files, directories or glob patterns")
+    parser.add_argument("--jsonl", action="append", default=[], metavar="FILE", help="JSONL file of prompts ('-' for stdin)")
+    parser.add_argument("--check", action="store_true",
+                        help="Check that the fused and batch paths match the scalar functions (default: test_prompts/ and prompts/)")
+    parser.add_argument("--scoring-profile", metavar="NAME|FILE",
+                        help="Scoring profile file or name (default: SCORING_PROFILE, else the built-in profile)")
+    parser.add_argument("--save-features", metavar="FILE", help="Also save the prompts' features for re-scoring with --features")
+    parser.add_argument("--features", metavar="FILE",
+                        help="Re-score features saved by --save-features, or a feature store, instead of prompts, "
+                             "reporting each baseline score")
+    parser.add_argument("--baseline", metavar="NAME|FILE", default="default",
+                        help="Profile the --features scores are compared with (default: the built-in profile)")
+    args = parser.parse_args(argv)
+    if args.check and not args.inputs and not args.jsonl:
+        from .warmup import DEFAULT_CORPUS
+        args.inputs = list(DEFAULT_CORPUS)
+
+    try:
+        plan = _profile_arg(args.scoring_profile)
+        if args.features:
+            return _rescore(args.features, plan, _profile_arg(args.baseline))
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    names, prompts = [], []
+    try:
+        for source in iter_sources(args.inputs, args.jsonl):
+            if source.prompt is None:
+                with open(source.path, "r", encoding="utf-8") as f:
+                    prompts.append(f.read())
+            else:
+                prompts.append(source.prompt)
+            names.append(source.name)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    if args.check:
+        mismatches = check_parity(prompts)
+        for index, name, expected, actual in mismatches:
+            print(f"{names[index]}: {name} differs\n  expected: {expected}\n  actual:   {actual}")
+        print(f"Checked {len(prompts)} prompts: {len(mismatches)} mismatches", file=sys.stderr)
+        return 1 if mismatches else 0
+
+    results = score_batch(prompts, plan=plan)
+    for index, (name, result) in enumerate(zip(names, results)):
+        print(json.dumps({
+            "index": index,
+            "source": name,
+            "spec_quality_score": result.score,
+            "spec_quality_warnings": result.warnings,
+        }))
+    if results:
+        mean = sum(result.score for result in results) / len(results)
+        print(f"Scored {len(results)} prompts (mean score {mean:.1f})", file=sys.stderr)
+    if args.save_features:
+        try:
+            save_features(args.save_features, names, prompts, [DEFAULT_PLAN] if plan.digest == DEFAULT_PLAN.digest else [DEFAULT_PLAN, plan])
+        except OSError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Startup warm-up for the API server.
+
+Without it, the first analyze request pays for loading the rule script and the
+constraint index, filling the regex cache, building the Pydantic serializers
+and the first rule script spawn. Warm-up does that work once at startup, then
+primes the response caches by analyzing the bundled prompt corpora, and only
+then reports the server as ready (GET /ready), so load balancers and rolling
+deploys never send traffic to a cold process.
+
+Configuration:
+    WARMUP=off       Skip warm-up; the server is ready at once
+    WARMUP_CORPUS    Comma-separated files/directories to prime the caches
+                     with (default: test_prompts/ and prompts/; empty: none)
+"""
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prompt corpora shipped with the repository
+DEFAULT_CORPUS = (os.path.join(REPO_ROOT, "test_prompts"), os.path.join(REPO_ROOT, "prompts"))
+
+# Prompt analyzed once to exercise the whole pipeline (every stage runs on it)
+SAMPLE_PROMPT = (
+    "Build a REST API with FastAPI and PostgreSQL. Users sign up and log in with a password; "
+    "admins can delete users. Store API keys in environment variables and log all errors."
+)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+def warmup_enabled() -> bool:
+    """False when WARMUP is off/false/0."""
+    return os.getenv("WARMUP", "").lower() not in ("off", "false", "0", "no")
+
+
+def corpus_from_env() -> list:
+    """Corpus paths from WARMUP_CORPUS (default: the bundled corpora that exist)."""
+    value = os.getenv("WARMUP_CORPUS")
+    if value is None:
+        return [path for path in DEFAULT_CORPUS if os.path.exists(path)]
+    return [path.strip() for path in value.split(",") if path.strip()]
+
+
+class WarmupState:
+    """Progress of the warm-up, shared between the warm-up thread and /ready."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = PENDING
+        self.error: Optional[str] = None
+        # Milliseconds per completed step
+        self.steps: dict = {}
+        self.primed = 0
+        self.failed_prompts = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def _set(self, **changes) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+
+    def record_step(self, name: str, started: float) -> None:
+        """Record a step that began at perf_counter() value started."""
+        with self._lock:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            elapsed = None
+            if self.started is not None:
+                elapsed = round(((self.finished or time.monotonic()) - self.started) * 1000, 1)
+            return {
+                "status": self.status,
+                "steps_ms": dict(self.steps),
+                "primed_prompts": self.primed,
+                "failed_prompts": self.failed_prompts,
+                "elapsed_ms": elapsed,
+                "error": self.error,
+            }
+
+
+def warm_rules() -> None:
+    """Load the rule script, the constraint index and (if enabled) the in-process rules."""
+    from .devspec_runner import use_in_process_rules
+    from .guidance_engine import get_constraint_index
+    from .rules import load_rule_source
+
+    load_rule_source()
+    get_constraint_index()
+    if use_in_process_rules():
+        from .rule_engine import RuleCompileError, load_rule_engine
+        try:
+            load_rule_engine().compile_all()
+        except RuleCompileError as e:
+            print(f"WARNING: rules run by the script ({e})", file=sys.stderr)
+
+
+def warm_pipeline() -> None:
+    """Run one full analysis and encode it, without touching any cache."""
+    from .pipeline import run_analysis
+
+    run_analysis(SAMPLE_PROMPT).to_json()
+
+
+def iter_corpus(paths: Iterable[str]):
+    """Prompts of the corpus files (directories are searched like bulk mode)."""
+    from .bulk import expand_paths
+
+    for path in expand_paths(paths):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+
+def warm_up(state: WarmupState, analyze: Callable[[str], object], corpus: Iterable[str] = ()) -> None:
+    """
+    Run the warm-up steps and mark the state ready.
+
+    Args:
+        state: Progress record (updated as steps finish)
+        analyze: Serves one prompt the way a request would, filling the caches
+        corpus: Files or directories of prompts to prime the caches with
+
+    A failing rules or pipeline step marks the state failed (the server never
+    becomes ready); a prompt of the corpus that fails is only counted.
+    """
+    state._set(status=RUNNING, started=time.monotonic())
+    try:
+        for name, step in (("rules", warm_rules), ("pipeline", warm_pipeline)):
+            started = time.perf_counter()
+            step()
+            state.record_step(name, started)
+
+        started = time.perf_counter()
+        for prompt in iter_corpus(corpus):
+            try:
+                analyze(prompt)
+                state._set(primed=state.primed + 1)
+            except Exception:
+                state._set(failed_prompts=state.failed_prompts + 1)
+        state.record_step("corpus", started)
+    except Exception as e:
+        state._set(status=FAILED, error=f"{type(e).__name__}: {e}", finished=time.monotonic())
+        print(f"ERROR: warm-up failed: {e}", file=sys.stderr)
+        return
+    state._set(status=READY, finished=time.monotonic())
+
+
+def start_warmup(state: WarmupState, analyze: Callable[[str], object], corpus: Iterable[str] = ()) -> Optional[threading.Thread]:
+    """
+    Warm up in a background thread, so the server answers /health meanwhile.
+
+    Returns:
+        The thread, or None if warm-up is disabled (the state is ready at once)
+        or already done (e.g. by a pre-fork master before forking this worker)
+    """
+    if state.ready:
+        return None
+    if not warmup_enabled():
+        state._set(status=READY)
+        return None
+    thread = threading.Thread(target=warm_up, args=(state, analyze, list(corpus)), name="warmup", daemon=True)
+    thread.start()
+    return thread
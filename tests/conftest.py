@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_rule_bundles(tmp_path_factory):
+    """Compile rule bundles into a temporary directory instead of the user cache."""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("RULE_BUNDLE_DIR", str(tmp_path_factory.mktemp("rule-bundles")))
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_up_disabled():
+    """
+    Keep `with TestClient(app)` from starting the warm-up and filling the
+    module-level caches; warm-up tests call it directly or re-enable it.
+    """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("WARMUP", "off")
+        yield
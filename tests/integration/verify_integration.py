@@ -158,8 +158,8 @@ def verify_requirement_5():
     from orchestrator import pipeline
     import inspect
     
-    # Get the analyze_prompt function source
-    source = inspect.getsource(pipeline.analyze_prompt)
+    # Get the source of the pipeline body behind analyze_prompt
+    source = inspect.getsource(pipeline.run_analysis)
     
     # Critical checks:
     # 1. dev-spec-kit must be called
@@ -0,0 +1,122 @@
+"""
+Tests for the prompt-diff endpoint (/api/analyze/diff) over the dev progression prompts.
+
+These tests need the server running on localhost:8000 like the other API
+regression tests.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.delta import diff_analyses
+from orchestrator.pipeline import run_analysis
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "test_prompts"
+
+
+@pytest.fixture(scope="module")
+def api_endpoint():
+    """Get the diff API endpoint URL."""
+    return "http://localhost:8000/api/analyze/diff"
+
+
+def call_api(url: str, payload: dict) -> tuple[int, dict]:
+    """Call the API and return (status, body)."""
+    result = subprocess.run(
+        ["curl", "-s", "-w", "\n%{http_code}", "-X", "POST", url,
+         "-H", "Content-Type: application/json",
+         "-d", json.dumps(payload)],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"API call failed: {result.stderr}")
+    body, status = result.stdout.rsplit("\n", 1)
+    return int(status), json.loads(body)
+
+
+def load_prompt(name: str) -> str:
+    return (PROMPTS_DIR / name).read_text()
+
+
+def codes(findings: list) -> list:
+    return sorted(f["code"] for f in findings)
+
+
+def test_diff_matches_two_full_analyses(api_endpoint):
+    """The diff agrees with diffing two full analyses."""
+    base = load_prompt("dev_progress_2_low_lower.txt")
+    revised = load_prompt("dev_progress_3_medium_pii.txt")
+
+    status, body = call_api(api_endpoint, {"base_prompt": base, "prompt": revised})
+    expected = diff_analyses(run_analysis(base), run_analysis(revised)).as_dict()
+
+    assert status == 200
+    assert codes(body["added"]) == codes(expected["added"])
+    assert codes(body["removed"]) == codes(expected["removed"])
+    assert codes(body["unchanged"]) == codes(expected["unchanged"])
+    assert body["risk_level_before"] == expected["risk_level_before"]
+    assert body["risk_level_after"] == expected["risk_level_after"]
+    assert body["score_change"] == expected["score_change"]
+
+
+def test_diff_chain_by_analysis_id(api_endpoint):
+    """Each diff's analysis_id can be the base of the next revision."""
+    revisions = [load_prompt(f"dev_progress_{n}") for n in (
+        "3_medium_pii.txt", "4_medium_hash.txt", "5_high_password.txt"
+    )]
+
+    status, first = call_api(api_endpoint, {"base_prompt": revisions[0], "prompt": revisions[1]})
+    status, second = call_api(api_endpoint, {"base_analysis_id": first["analysis_id"], "prompt": revisions[2]})
+
+    assert status == 200
+    assert second["base_analysis_id"] == first["analysis_id"]
+    assert second["risk_level_before"] == first["risk_level_after"]
+    assert second["risk_level_after"] == "High"
+    assert "SEC_LOGS_PASSWORDS" in codes(second["added"])
+
+
+def test_identical_prompts_have_no_changes(api_endpoint):
+    """Diffing a prompt against itself adds and removes nothing."""
+    prompt = load_prompt("dev_progress_4_medium_hash.txt")
+
+    status, body = call_api(api_endpoint, {"base_prompt": prompt, "prompt": prompt})
+
+    assert status == 200
+    assert body["added"] == [] and body["removed"] == []
+    assert body["score_change"] == 0
+    assert body["analysis_id"] == body["base_analysis_id"]
+
+
+def test_unknown_base_analysis_id(api_endpoint):
+    """An unknown or expired analysis ID is a 404."""
+    status, body = call_api(api_endpoint, {"base_analysis_id": "0" * 32, "prompt": "Build a todo app"})
+
+    assert status == 404
+
+
+def test_analyze_response_id_is_a_diff_base(api_endpoint):
+    """X-Analysis-Id from /api/analyze can be used as the diff base."""
+    base = load_prompt("dev_progress_1_low_high.txt")
+    result = subprocess.run(
+        ["curl", "-s", "-D", "-", "-o", "/dev/null", "-X", "POST", "http://localhost:8000/api/analyze",
+         "-H", "Content-Type: application/json", "-d", json.dumps({"prompt": base})],
+        capture_output=True,
+        text=True
+    )
+    headers = dict(line.split(": ", 1) for line in result.stdout.splitlines()[1:] if ": " in line)
+    base_id = {name.lower(): value for name, value in headers.items()}["x-analysis-id"]
+
+    status, body = call_api(api_endpoint, {"base_analysis_id": base_id, "prompt": load_prompt("dev_progress_2_low_lower.txt")})
+
+    assert status == 200
+    assert body["base_analysis_id"] == base_id
+    assert body["risk_level_before"] == "Low"
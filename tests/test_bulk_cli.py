@@ -0,0 +1,83 @@
+"""
+Tests for bulk analysis (orchestrator.bulk) and the bulk mode of orchestrator.main.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.bulk import PromptSource, expand_paths, iter_sources, read_jsonl, run_bulk
+from orchestrator.main import EXIT_ERROR, EXIT_HIGH_RISK
+
+
+REPO_ROOT = Path(__file__).parent.parent
+PROMPTS_DIR = REPO_ROOT / "test_prompts"
+
+
+def test_expand_paths_walks_directories_and_globs():
+    """Directories yield prompt files recursively; globs match files."""
+    from_dir = list(expand_paths([str(REPO_ROOT / "prompts")]))
+    from_glob = list(expand_paths([str(PROMPTS_DIR / "demo_*.txt")]))
+
+    assert str(REPO_ROOT / "prompts" / "stress" / "high1.txt") in from_dir
+    assert str(REPO_ROOT / "prompts" / "PROMPTS_README.md") in from_dir
+    assert [Path(p).name for p in from_glob] == [f"demo_{n}" for n in (
+        "1_low_good.txt", "2_medium_warnings.txt", "3_high_vulns.txt", "4_low_tiny.txt", "5_high_detailed.txt"
+    )]
+    with pytest.raises(FileNotFoundError):
+        list(expand_paths([str(PROMPTS_DIR / "missing_*.txt")]))
+
+
+def test_read_jsonl_accepts_strings_and_objects():
+    """JSONL lines are prompt strings or objects with prompt and optional id."""
+    stream = io.StringIO('"first"\n\n{"id": "b", "prompt": "second"}\n{"prompt": "third"}\n')
+
+    assert list(read_jsonl(stream, "in")) == [("in:1", "first"), ("b", "second"), ("in:4", "third")]
+    with pytest.raises(ValueError):
+        list(read_jsonl(io.StringIO('{"text": "x"}\n'), "in"))
+
+
+def test_run_bulk_in_input_order(tmp_path):
+    """Ordered bulk runs write one line per prompt in input order, errors included."""
+    jsonl = tmp_path / "prompts.jsonl"
+    jsonl.write_text(json.dumps({"id": "inline", "prompt": "Build a todo list API with Flask."}) + "\n")
+    files = [str(PROMPTS_DIR / "demo_1_low_good.txt"), str(PROMPTS_DIR / "demo_3_high_vulns.txt")]
+    sources = list(iter_sources(files, [str(jsonl)]))
+    sources.append(PromptSource(len(sources), "missing", path=str(tmp_path / "missing.txt")))
+    output = io.BytesIO()
+
+    summary = run_bulk(sources, output, workers=2, ordered=True)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert [line["source"] for line in lines] == files + ["inline", "missing"]
+    assert lines[1]["risk_level"] == lines[1]["result"]["risk_level"] == "High"
+    assert "FileNotFoundError" in lines[3]["error"]
+    assert summary.total == 4 and summary.failed == 1
+    assert summary.risk_counts["High"] == 1
+
+
+def test_cli_exit_codes():
+    """Bulk mode exits non-zero when any prompt is High risk."""
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "-m", "orchestrator.main", *args, "-q"],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+
+    low = run(str(PROMPTS_DIR / "demo_1_low_good.txt"), "--bulk")
+    high = run(str(PROMPTS_DIR / "demo_1_low_good.txt"), str(PROMPTS_DIR / "demo_3_high_vulns.txt"))
+    missing = run(str(PROMPTS_DIR / "missing.txt"))
+
+    assert low.returncode == 0
+    assert json.loads(low.stdout)["risk_level"] == "Low"
+    assert high.returncode == EXIT_HIGH_RISK
+    assert len(high.stdout.splitlines()) == 2
+    assert missing.returncode == EXIT_ERROR
@@ -0,0 +1,92 @@
+"""
+Tests for request-scoped cancellation of analyses.
+
+A slow stand-in rule script is used so the tests can cancel while it runs.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import devspec_runner
+from orchestrator.cancellation import AnalysisCancelled, CancellationToken
+from orchestrator.models import PromptRequest
+from orchestrator.pipeline import run_analysis
+
+
+@pytest.fixture
+def slow_rule_script(tmp_path, monkeypatch):
+    """Point the runner at a rule script that takes 10 seconds."""
+    script = tmp_path / "security-check.sh"
+    script.write_text("#!/bin/bash\ncat > /dev/null\nsleep 10\n")
+    script.chmod(0o755)
+    monkeypatch.setattr(devspec_runner, "get_rule_script_path", lambda: str(script))
+    return script
+
+
+def test_token_runs_callbacks_once():
+    """Callbacks run on the first cancel only, and immediately if already cancelled."""
+    token = CancellationToken()
+    calls = []
+
+    with token.on_cancel(lambda: calls.append("registered")):
+        token.cancel("first")
+        token.cancel("second")
+    with token.on_cancel(lambda: calls.append("late")):
+        pass
+
+    assert calls == ["registered", "late"]
+    assert token.reason == "first"
+    with pytest.raises(AnalysisCancelled):
+        token.raise_if_cancelled()
+
+
+def test_cancel_kills_rule_script(slow_rule_script):
+    """Cancelling the token kills the running rule script."""
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+
+    started = time.perf_counter()
+    with pytest.raises(AnalysisCancelled):
+        devspec_runner.run_dev_spec_kit("Build a todo app", cancel=token)
+
+    assert time.perf_counter() - started < 5
+
+
+def test_cancelled_analysis_skips_remaining_stages():
+    """A cancelled token stops the pipeline before the next stage."""
+    token = CancellationToken()
+    stages = []
+
+    def on_stage(stage):
+        stages.append(stage)
+        if stage == "structure":
+            token.cancel()
+
+    with pytest.raises(AnalysisCancelled):
+        run_analysis("Build a todo app", progress=on_stage, cancel=token)
+
+    assert stages == ["structure"]
+
+
+def test_client_disconnect_cancels_analysis(slow_rule_script):
+    """A disconnected client cancels the analysis and nothing is sent."""
+    from api import main as api_main
+
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    started = time.perf_counter()
+    response = asyncio.run(api_main.analyze_until_disconnected(
+        DisconnectedRequest(), PromptRequest(prompt=f"Build a todo app {time.time()}"), None, False
+    ))
+
+    assert response.status_code == api_main.CLIENT_CLOSED_REQUEST
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,52 @@
+"""
+Tests for the startup path of the orchestrator CLI (orchestrator.main report mode).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+REPO_ROOT = Path(__file__).parent.parent
+PROMPT = REPO_ROOT / "test_prompts" / "demo_3_high_vulns.txt"
+
+
+def _cli(*args, **env):
+    env.setdefault("RULE_BUNDLE_DIR", "off")
+    return subprocess.run(
+        [sys.executable, "-m", "orchestrator.main", *args],
+        capture_output=True, text=True, cwd=REPO_ROOT, env=dict(os.environ, **env)
+    )
+
+
+def test_pipeline_import_skips_pydantic_models():
+    """Loading the pipeline builds no Pydantic models; they load on first use."""
+    code = (
+        "import sys; import orchestrator.main, orchestrator.pipeline; "
+        "print(sorted(m for m in ('orchestrator.models', 'pydantic', 'pydantic_core') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_in_process_rules_report_matches_script():
+    """--in-process-rules prints the same report as running the rule script."""
+    script = _cli(str(PROMPT), IN_PROCESS_RULES="")
+    in_process = _cli("--in-process-rules", str(PROMPT))
+
+    assert script.returncode == in_process.returncode == 0
+    assert "\nFindings: 0\n" not in script.stdout
+    assert in_process.stdout == script.stdout
+
+
+def test_profile_startup_reports_phases():
+    result = _cli("--profile-startup", "--in-process-rules", str(PROMPT))
+
+    assert result.returncode == 0
+    profile = result.stderr.split("Startup profile (ms):", 1)[1]
+    for phase in ("import pipeline", "load rules", "analysis", "total since cli import"):
+        assert phase in profile
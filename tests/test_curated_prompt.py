@@ -0,0 +1,83 @@
+"""
+Tests for template-driven curated prompt rendering and compact mode.
+"""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.guidance_engine import bucket_findings, build_curated_prompt, build_guidance
+from orchestrator.models import DevSpecFinding
+
+
+def make_finding(code: str, severity: str) -> DevSpecFinding:
+    return DevSpecFinding(category=code.split("_")[0], severity=severity, code=code, message=f"{code} message")
+
+
+FINDINGS = [
+    make_finding("SEC_UNAUTH_DELETE", "BLOCKER"),
+    make_finding("SEC_WEAK_HASH_MD5", "ERROR"),
+    make_finding("QUAL_NO_TESTING", "WARNING"),
+    make_finding("QUAL_NO_LOGGING", "warning"),
+    make_finding("X_NOTE", "INFO"),
+]
+
+
+def test_bucket_findings_single_pass():
+    """Buckets keep original order and ignore INFO findings."""
+    buckets = bucket_findings(FINDINGS)
+
+    assert [f.code for f in buckets.blockers] == ["SEC_UNAUTH_DELETE"]
+    assert [f.code for f in buckets.errors] == ["SEC_WEAK_HASH_MD5"]
+    assert [f.code for f in buckets.warnings] == ["QUAL_NO_TESTING", "QUAL_NO_LOGGING"]
+
+
+def test_prebucketed_findings_render_identically():
+    """Passing precomputed buckets gives the same prompt as bucketing internally."""
+    buckets = bucket_findings(FINDINGS)
+
+    for risk in ("Low", "Medium", "High"):
+        assert build_curated_prompt("Build it", [], risk, FINDINGS, buckets=buckets) == \
+            build_curated_prompt("Build it", [], risk, FINDINGS)
+
+
+def test_high_risk_template():
+    """High risk lists blockers with additional error notes."""
+    curated = build_curated_prompt("Build it", [], "High", FINDINGS)
+
+    assert curated.startswith("Build it\n\n---\n⚠️ CRITICAL SECURITY ISSUES ⚠️")
+    assert "• SEC_UNAUTH_DELETE: SEC_UNAUTH_DELETE message" in curated
+    assert "Additional Security Concerns:\n• SEC_WEAK_HASH_MD5: SEC_WEAK_HASH_MD5 message" in curated
+    assert curated.endswith("SECURITY ANALYSIS: High Risk")
+
+
+def test_prompt_with_braces_is_not_formatted():
+    """Prompt text is inserted verbatim even when it contains format braces."""
+    curated = build_curated_prompt("Return {user} as {0}", [], "Low", [])
+
+    assert curated.startswith("Return {user} as {0}\n")
+
+
+def test_compact_mode_emits_constraint_block():
+    """Compact mode emits risk, codes by severity and constraints only."""
+    guidance, curated = build_guidance("Build it", FINDINGS, "High", compact=True)
+
+    block = curated.split("\n---\n", 1)[1]
+    lines = block.split("\n")
+
+    assert lines[0] == "RISK: High"
+    assert "BLOCKER: SEC_UNAUTH_DELETE" in lines
+    assert "ERROR: SEC_WEAK_HASH_MD5" in lines
+    assert "WARNING: QUAL_NO_TESTING, QUAL_NO_LOGGING" in lines
+    assert "MUST:" in lines
+    assert "- Require proper authentication and authorization for all endpoints" in lines
+    assert "message" not in block
+
+
+def test_compact_mode_is_smaller():
+    """The compact curated prompt is shorter than the verbose one."""
+    _, verbose = build_guidance("Build it", FINDINGS, "High")
+    _, compact = build_guidance("Build it", FINDINGS, "High", compact=True)
+
+    assert len(compact) < len(verbose)
@@ -0,0 +1,86 @@
+"""
+Tests for the rule-check daemon (orchestrator.daemon) and the prompt-submit hook client.
+"""
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.daemon import CheckServer
+
+
+ROOT = Path(__file__).parent.parent
+HOOK = ROOT / "dev-spec-kit-local" / "hooks" / "userpromptsubmit.sh"
+SCRIPT = ROOT / "dev-spec-kit-local" / "scripts" / "security-check.sh"
+PROMPTS_DIR = ROOT / "test_prompts"
+
+# Stand-in for socat: copies stdin to the socket and the answer to stdout
+FAKE_SOCAT = """#!{python}
+import socket, sys
+client = socket.socket(socket.AF_UNIX)
+client.connect(sys.argv[-1].split(":", 1)[1])
+client.sendall(sys.stdin.buffer.read())
+client.shutdown(socket.SHUT_WR)
+while True:
+    chunk = client.recv(65536)
+    if not chunk:
+        break
+    sys.stdout.buffer.write(chunk)
+"""
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """A daemon serving on a temporary socket."""
+    server = CheckServer(str(tmp_path / "check.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _run(args, socket_path, path_dirs=()):
+    env = dict(os.environ, PROMPT_CHECK_SOCKET=socket_path, PROMPT_CHECK_PYTHON=sys.executable, LC_ALL="C")
+    env["PATH"] = os.pathsep.join([*path_dirs, env["PATH"]])
+    result = subprocess.run(args, capture_output=True, env=env)
+    return result.stdout, result.returncode
+
+
+@pytest.mark.parametrize("use_socat", [False, True])
+def test_hook_output_matches_script(daemon, tmp_path, use_socat):
+    """The hook answered by the daemon prints and exits exactly like the script."""
+    path_dirs = []
+    if use_socat:
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        socat = bin_dir / "socat"
+        socat.write_text(FAKE_SOCAT.format(python=sys.executable))
+        socat.chmod(0o755)
+        path_dirs.append(str(bin_dir))
+
+    for name in ("demo_1_low_good.txt", "demo_3_high_vulns.txt"):
+        prompt = str(PROMPTS_DIR / name)
+        expected = _run(["bash", str(SCRIPT), prompt], "/nonexistent")
+        assert _run(["bash", str(HOOK), prompt], daemon.path, path_dirs) == expected
+
+
+def test_hook_falls_back_to_script(daemon, tmp_path):
+    """Inputs the daemon declines, and a missing daemon, run the script instead."""
+    prompt = tmp_path / "prompt.txt"
+    prompt.write_bytes(b"-n")
+    expected = _run(["bash", str(SCRIPT), str(prompt)], "/nonexistent")
+
+    assert _run(["bash", str(HOOK), str(prompt)], daemon.path) == expected
+    assert _run(["bash", str(HOOK), str(prompt)], str(tmp_path / "missing.sock")) == expected
+
+
+def test_second_daemon_refuses_live_socket(daemon):
+    with pytest.raises(OSError):
+        CheckServer(daemon.path)
@@ -0,0 +1,201 @@
+"""
+Tests for the persistent per-prompt feature store (orchestrator.feature_store).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.feature_store import EXACT_COLUMN, FeatureStore, grep_column, rule_columns
+from orchestrator.pipeline import run_analysis
+from orchestrator.rule_engine import _EPILOGUE, _PRELUDE, compile_rule_script, load_rule_engine
+from orchestrator.scoring_profiles import DEFAULT_PLAN, compile_plan
+from orchestrator.spec_scoring import score_batch
+
+
+REPO_ROOT = Path(__file__).parent.parent
+PROMPTS = [path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "test_prompts").glob("*.txt"))] + [
+    "",
+    "-n",
+    "Build a todo app with a login. Store the password in plain text.",
+    "Store the JWT in a JSON file. Passwords are hashed with bcrypt.",
+]
+CHANGED_RULES = """
+if grep -qiE 'plain ?text' <<< "$NORMALIZED_PROMPT"; then
+  add_warning "SECURITY" "BLOCKER" "SEC_PLAINTEXT_PASSWORDS" "Plaintext passwords" "Hash them"
+elif grep -qE 'todo' <<< "$NORMALIZED_PROMPT" && ! grep -qiE 'test' <<< "$NORMALIZED_PROMPT"; then
+  add_warning "TESTING" "WARNING" "TEST_MISSING" "No tests" "Add tests"
+fi
+if grep -qiE 'jwt.{0,20}json' <<< "$NORMALIZED_PROMPT"; then
+  add_warning "SECURITY" "ERROR" "SEC_INSECURE_JWT_STORAGE" "JWT in a file" "Use a secret store"
+fi
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(str(tmp_path / "features.db"))
+    for prompt in PROMPTS:
+        store.add(prompt)
+    yield store
+    store.close()
+
+
+def expected_risk(rules, prompt):
+    """What run_analysis reports with these rules, from the engine and the pipeline's own steps."""
+    from orchestrator.pipeline import filter_false_positives
+    from orchestrator.risk import classify_risk, summarize_findings
+
+    text = prompt.strip()
+    _, findings, exit_code = rules.evaluate(text)
+    findings = filter_false_positives(text, findings)
+    return findings, exit_code, classify_risk(summarize_findings(findings), len(text.split()))
+
+
+def test_add_is_keyed_by_normalized_prompt(store):
+    assert len(store) == len(set(prompt.strip() for prompt in PROMPTS))
+    assert not store.add(PROMPTS[0] + "\n")
+    assert PROMPTS[0] in store
+    stored = store.get(store.digests()[0])
+    assert stored.text == PROMPTS[0].strip() and set(stored.structure) >= {"features", "entities"}
+
+
+def test_reclassify_matches_pipeline(store):
+    rules = load_rule_engine()
+    results = store.reclassify(rules)
+    texts = [store.get(digest).text for digest in store.digests()]
+
+    assert results[texts.index("-n")] is None
+    for text, result in zip(texts, results):
+        assert (result is None) == (rules.evaluate(text) is None)
+        if result is not None:
+            assert (result.findings, result.exit_code, result.risk_level) == expected_risk(rules, text)
+
+    # A few through the full pipeline as well
+    for text, result in [(text, result) for text, result in zip(texts, results) if result is not None][:3]:
+        analysis = run_analysis(text, fields=frozenset({"devspec_findings", "risk_level", "exit_code"}))
+        assert (analysis.devspec_findings, analysis.exit_code, analysis.risk_level) == \
+            (result.findings, result.exit_code, result.risk_level)
+
+
+def test_changed_rules_only_compute_new_predicates(store):
+    rules = compile_rule_script(f"{_PRELUDE}\n# --- RULES ---\n{CHANGED_RULES}\n# --- Output ---\n{_EPILOGUE}")
+    new = [name for name in rule_columns(rules) if name not in store.columns]
+
+    assert grep_column("todo", False) in new and grep_column("jwt.{0,20}json", True) in new
+    assert store.ensure_columns(rule_columns(rules)) == len(new)
+    assert store.ensure_columns(rule_columns(rules)) == 0
+
+    texts = [store.get(digest).text for digest in store.digests()]
+    for text, result in zip(texts, store.reclassify(rules)):
+        if result is not None:
+            assert (result.findings, result.exit_code, result.risk_level) == expected_risk(rules, text)
+
+
+def test_rescore_matches_scoring(store):
+    texts = [store.get(digest).text for digest in store.digests()]
+    for plan in (DEFAULT_PLAN, compile_plan({"base": 30, "tech_keywords": ["cobol", "kafka"]}, "tuned")):
+        expected = score_batch(texts, plan=plan)
+        assert store.rescore(plan) == ([r.warnings for r in expected], [r.score for r in expected])
+
+
+def test_store_survives_reopening(tmp_path):
+    path = str(tmp_path / "features.db")
+    store = FeatureStore(path, flush_every=2)
+    for prompt in PROMPTS[:4]:
+        store.add(prompt)
+    store.ensure_columns(["tech:cobol"])
+    store.add(PROMPTS[4])
+    # The fifth prompt is committed but its columns are not flushed yet; after a crash they are recomputed
+    crashed = FeatureStore(path)
+    assert crashed.digests() == store.digests() and "tech:cobol" in crashed.columns
+    assert crashed.table([*DEFAULT_PLAN.columns, "tech:cobol"]) == store.table([*DEFAULT_PLAN.columns, "tech:cobol"])
+    crashed.close()
+    store.close()
+
+    reopened = FeatureStore(path)
+    try:
+        assert reopened.digests() == store.digests()
+        assert reopened.table(DEFAULT_PLAN.columns) == store.table(DEFAULT_PLAN.columns)
+        assert reopened.column(EXACT_COLUMN) == store.column(EXACT_COLUMN)
+        with pytest.raises(ValueError):
+            reopened.ensure_columns(["nonsense"])
+    finally:
+        reopened.close()
+
+
+def test_processes_share_a_store(tmp_path):
+    """A second process can add to the store the API is filling, without waiting for its flush."""
+    path = str(tmp_path / "features.db")
+    server, cli = FeatureStore(path), FeatureStore(path)
+    try:
+        server.add(PROMPTS[0])
+        assert cli.add(PROMPTS[1])
+        assert not cli.add(PROMPTS[0])
+        # Each takes in the other's rows before adding its own
+        server.add(PROMPTS[2])
+        cli.ensure_columns(["tech:cobol"])
+        assert server.digests() == cli.digests() and len(cli) == 3
+        assert server.table(DEFAULT_PLAN.columns) == cli.table(DEFAULT_PLAN.columns)
+    finally:
+        cli.close()
+        server.close()
+
+
+def test_pipeline_adds_prompts(tmp_path):
+    store = FeatureStore(str(tmp_path / "features.db"))
+    try:
+        run_analysis("Build a todo app", fields=frozenset({"risk_level"}), features=store)
+        run_analysis("  Build a todo app\n", features=store)
+        assert len(store) == 1 and "Build a todo app" in store
+    finally:
+        store.close()
+
+
+def test_api_opens_the_store_where_it_serves(tmp_path, monkeypatch):
+    """The store is opened by the app's lifespan, not at import or by a pre-fork master's warm-up."""
+    from fastapi.testclient import TestClient
+    from api import main
+
+    path = tmp_path / "features.db"
+    monkeypatch.setenv("FEATURE_STORE_PATH", str(path))
+    main.warm_up_prompt(f"Build a warm-up app in {tmp_path}")
+    assert not path.exists()
+
+    with TestClient(main.app) as client:
+        assert client.post("/api/analyze", json={"prompt": f"Build a served app in {tmp_path}"}).status_code == 200
+    assert main.feature_store is None
+    store = FeatureStore(str(path))
+    try:
+        assert len(store) == 1 and f"Build a served app in {tmp_path}" in store
+    finally:
+        store.close()
+
+
+def test_cli(tmp_path):
+    path = str(tmp_path / "features.db")
+
+    def cli(module, *args):
+        return subprocess.run([sys.executable, "-m", module, *args], capture_output=True, text=True, cwd=REPO_ROOT)
+
+    added = cli("orchestrator.feature_store", path, "add", "test_prompts")
+    assert added.returncode == 0 and "Stored" in added.stderr
+
+    reclassified = cli("orchestrator.feature_store", path, "reclassify")
+    assert reclassified.returncode == 0
+    lines = [json.loads(line) for line in reclassified.stdout.splitlines()]
+    assert lines and {line["risk_level"] for line in lines} <= {"Low", "Medium", "High"}
+
+    rescored = cli("orchestrator.spec_scoring", "--features", path)
+    assert rescored.returncode == 0
+    scores = [json.loads(line)["spec_quality_score"] for line in rescored.stdout.splitlines()]
+    assert sorted(scores) == sorted(json.loads(line)["spec_quality_score"] for line in cli("orchestrator.spec_scoring", "test_prompts").stdout.splitlines())
+
+    info = cli("orchestrator.feature_store", path, "info")
+    assert info.returncode == 0 and "prompts" in info.stdout
@@ -0,0 +1,83 @@
+"""
+Tests for changed-specs-only scanning from git (orchestrator.git_scan).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import scanner
+from orchestrator.git_scan import ChangedFile, GitError, changed_files, scan_git_changes
+from orchestrator.scanner import ScanCache, git_blob_sha, scan_tree
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "test_prompts"
+LOW_SPEC = (PROMPTS_DIR / "demo_1_low_good.txt").read_text()
+HIGH_SPEC = (PROMPTS_DIR / "demo_3_high_vulns.txt").read_text()
+
+
+def git(repo, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME="t", GIT_AUTHOR_EMAIL="t@example.com",
+               GIT_COMMITTER_NAME="t", GIT_COMMITTER_EMAIL="t@example.com")
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, env=env)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with two commits: the second edits, renames and deletes specs."""
+    root = tmp_path / "repo"
+    (root / "specs").mkdir(parents=True)
+    git(root, "init", "-q")
+    (root / "specs" / "todo.md").write_text(LOW_SPEC)
+    (root / "specs" / "old.md").write_text("Build a notes app with Flask.\n" * 20)
+    (root / "specs" / "gone.md").write_text("Build a chat app.\n")
+    (root / "main.py").write_text("print('hi')\n")
+    git(root, "add", "-A")
+    git(root, "commit", "-q", "-m", "first")
+
+    (root / "specs" / "old.md").rename(root / "specs" / "renamed.md")
+    (root / "specs" / "gone.md").unlink()
+    (root / "specs" / "auth.md").write_text(HIGH_SPEC)
+    (root / "main.py").write_text("print('changed')\n")
+    git(root, "add", "-A")
+    git(root, "commit", "-q", "-m", "second")
+    return root
+
+
+def test_changed_files_in_range(repo):
+    """Added, modified and renamed files are reported with their new blob; deletions are not."""
+    changed = changed_files(str(repo), "HEAD~1..HEAD")
+
+    assert [f.path for f in changed] == ["main.py", "specs/auth.md", "specs/renamed.md"]
+    assert changed[1] == ChangedFile("specs/auth.md", git_blob_sha(HIGH_SPEC.encode()))
+    assert changed_files(str(repo), "HEAD~1") == changed
+    with pytest.raises(GitError):
+        changed_files(str(repo), "no-such-revision..HEAD")
+
+
+def test_staged_scan_analyzes_only_new_blobs(repo, tmp_path, monkeypatch):
+    """Staged specs whose content is already cached (any path) are not analyzed again."""
+    cache = ScanCache(str(tmp_path / "cache.db"))
+    scan_tree(str(repo), cache, workers=1)
+    (repo / "specs" / "copy.md").write_text(HIGH_SPEC)
+    (repo / "specs" / "new.md").write_text(LOW_SPEC + "\nAdd rate limiting to the API.\n")
+    (repo / "specs" / "unstaged.md").write_text("Build a todo app.\n")
+    git(repo, "add", "specs/copy.md", "specs/new.md")
+
+    analyzed = []
+    original = scanner.analyze_parallel
+    def record(sources, *args, **kwargs):
+        analyzed.extend(source.name for source in sources)
+        return original(sources, *args, **kwargs)
+    monkeypatch.setattr(scanner, "analyze_parallel", record)
+    report = scan_git_changes(str(repo), staged=True, cache=cache, workers=1)
+
+    assert [(f.path, f.cached) for f in report.files] == [("specs/copy.md", True), ("specs/new.md", False)]
+    assert analyzed == ["specs/new.md"]
+    assert report.files[0].risk_level == "High"
+    assert report.directories["specs"].risk_level == "High"
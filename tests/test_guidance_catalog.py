@@ -0,0 +1,113 @@
+"""
+Tests for the precomputed code-to-constraint index used by build_guidance.
+
+The index must resolve the same constraints as the original per-finding
+substring checks, de-duplicate guidance with stable ordering, and be rebuilt
+when the rule script changes.
+"""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import guidance_engine
+from orchestrator.guidance_engine import (
+    build_constraint_index,
+    build_guidance,
+    get_constraint_index,
+    resolve_constraints,
+)
+from orchestrator.models import DevSpecFinding
+from orchestrator.rules import load_rule_source, parse_rule_script
+
+
+def make_finding(code: str, severity: str = "WARNING") -> DevSpecFinding:
+    category = code.split("_")[0]
+    return DevSpecFinding(category=category, severity=severity, code=code, message=f"{code} message")
+
+
+def test_rule_source_declares_known_codes():
+    """The rule script snapshot lists the codes the engine can emit."""
+    source = load_rule_source()
+
+    assert "SEC_UNAUTH_DELETE" in source.codes
+    assert "QUAL_NO_TESTING" in source.codes
+    assert len(source.digest) == 64
+
+
+def test_index_covers_every_rule_code():
+    """Every code declared by the rule script is resolved at load time."""
+    source = load_rule_source()
+    index = get_constraint_index()
+
+    assert set(source.codes) <= set(index)
+
+
+def test_resolution_matches_substring_checks():
+    """Catalog resolution keeps the original keyword semantics."""
+    assert resolve_constraints("SEC_PLAINTEXT_PASSWORDS").constraints == (
+        "Never store passwords in plain text; use bcrypt, Argon2, or PBKDF2 for password hashing",
+    )
+    # PASSWORD alone (without PLAINTEXT) does not add the password constraint
+    assert resolve_constraints("SEC_WEAK_PASSWORD_HASH_SHA256").constraints == ()
+    # ARCH guidance needs both the ARCH_ prefix and CONFLICTING/VAGUE
+    assert resolve_constraints("ARCH_VAGUE_DATABASE").guidance
+    assert not resolve_constraints("SEC_VAGUE_THING").guidance
+    assert resolve_constraints("SEC_HTTP_FOR_AUTH").constraints == (
+        "Use HTTPS/TLS for all network communication, especially authentication flows",
+    )
+
+
+def test_arch_guidance_is_deduplicated():
+    """Several ARCH findings produce a single technology-stack guidance item."""
+    findings = [
+        make_finding("ARCH_CONFLICTING_FRAMEWORKS"),
+        make_finding("ARCH_VAGUE_TECH_CHOICE"),
+        make_finding("ARCH_VAGUE_DATABASE"),
+        make_finding("SEC_UNAUTH_DELETE", "BLOCKER"),
+    ]
+
+    guidance, _ = build_guidance("prompt", findings, "High")
+    titles = [item.title for item in guidance]
+
+    assert titles.count("Clarify Technology Stack") == 1
+    assert titles[0] == "Security Analysis Summary"
+
+
+def test_unknown_codes_are_resolved_once():
+    """Codes not declared by the rule script are resolved lazily and memoized."""
+    index = build_constraint_index([])
+
+    entry = guidance_engine.lookup_constraints("SEC_NEW_DEBUG_RULE", index)
+
+    assert index["SEC_NEW_DEBUG_RULE"] is entry
+    assert "Log sensitive errors securely on the server side only" in entry.constraints
+
+
+def test_rule_reload_rebuilds_index(tmp_path):
+    """Editing the rule script invalidates the cached snapshot."""
+    script = tmp_path / "security-check.new.sh"
+    script.write_text('add_warning "SECURITY" "ERROR" "SEC_FIRST_RULE" "msg" "fix"\n')
+    first = load_rule_source(str(script))
+
+    script.write_text(
+        'add_warning "SECURITY" "ERROR" "SEC_FIRST_RULE" "msg" "fix"\n'
+        'add_warning "ARCH" "WARNING" "ARCH_VAGUE_QUEUE" "msg" "fix"\n'
+    )
+    mtime = os.stat(script).st_mtime_ns
+    os.utime(script, ns=(mtime, mtime + 1_000_000))
+    second = load_rule_source(str(script))
+
+    assert first.codes == ("SEC_FIRST_RULE",)
+    assert second.codes == ("SEC_FIRST_RULE", "ARCH_VAGUE_QUEUE")
+    assert first.digest != second.digest
+
+
+def test_parse_rule_script_ignores_function_definition():
+    """Only add_warning calls with literal arguments are parsed as rules."""
+    text = 'add_warning() {\n  local category="$1"\n}\nadd_warning "QUALITY" "WARNING" "QUAL_X" "m" "s"\n'
+
+    rules = parse_rule_script(text)
+
+    assert [(r.category, r.severity, r.code) for r in rules] == [("QUALITY", "WARNING", "QUAL_X")]
@@ -0,0 +1,236 @@
+"""
+Tests for asynchronous analysis jobs.
+
+The JobManager tests run in-process; the API tests need the server running on
+localhost:8000 like the other API regression tests.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import jobs
+from orchestrator.jobs import JobManager, JobStore
+from orchestrator.pipeline import run_analysis
+
+
+PROMPT = "Build an admin API to delete user accounts without authentication. Use Flask and PostgreSQL."
+
+
+@pytest.fixture(scope="module")
+def api_endpoint():
+    """Get the jobs API endpoint URL."""
+    return "http://localhost:8000/api/jobs"
+
+
+def call_api(method: str, url: str, payload: dict = None) -> tuple[int, dict]:
+    """Call the jobs API and return (status, body)."""
+    command = ["curl", "-s", "-w", "\n%{http_code}", "-X", method, url]
+    if payload is not None:
+        command += ["-H", "Content-Type: application/json", "-d", json.dumps(payload)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"API call failed: {result.stderr}")
+    body, status = result.stdout.rsplit("\n", 1)
+    return int(status), json.loads(body)
+
+
+def wait_for(manager: JobManager, job_id: str) -> dict:
+    view = manager.view(job_id, wait=30)
+    assert view.finished
+    return json.loads(view.body)
+
+
+@pytest.fixture
+def blocking_analysis(monkeypatch):
+    """Replace the pipeline with one that blocks in the 'rules' stage until released."""
+    entered, release = threading.Event(), threading.Event()
+
+    def fake_run_analysis(prompt, compact_prompt=False, fields=None, progress=None, cancel=None, scoring=None):
+        progress("structure")
+        entered.set()
+        release.wait(10)
+        cancel.raise_if_cancelled()
+        progress("rules")
+        return run_analysis(prompt, fields=fields, scoring=scoring)
+
+    monkeypatch.setattr(jobs, "run_analysis", fake_run_analysis)
+    yield entered, release
+    release.set()
+
+
+def test_job_runs_all_prompts_in_order():
+    """A batch job returns one result per prompt, in order, with stage timings."""
+    manager = JobManager(workers=2)
+    prompts = [PROMPT, "Build a todo list app with tests and logging."]
+
+    job = manager.submit(prompts, fields=frozenset({"original_prompt", "risk_level"}))
+    status = wait_for(manager, job.id)
+
+    assert status["status"] == "succeeded"
+    assert [r["original_prompt"] for r in status["results"]] == prompts
+    assert status["results"][0]["risk_level"] == "High"
+    assert status["progress"]["completed"] == 2
+    assert "rules" in status["progress"]["stage_seconds"]
+    manager.shutdown()
+
+
+def test_results_match_direct_analysis():
+    """Job results are the same bytes as a direct analysis."""
+    manager = JobManager(workers=1)
+
+    job = manager.submit([PROMPT])
+    status = wait_for(manager, job.id)
+
+    assert status["results"] == [json.loads(run_analysis(PROMPT).to_json())]
+    manager.shutdown()
+
+
+def test_cancel_running_job_skips_remaining_stages(blocking_analysis):
+    """A running job is cancelled at its next stage boundary."""
+    entered, release = blocking_analysis
+    manager = JobManager(workers=1)
+
+    job = manager.submit([PROMPT])
+    assert entered.wait(10)
+    assert json.loads(manager.view(job.id).body)["progress"]["stage"] == "structure"
+
+    manager.cancel(job.id)
+    release.set()
+
+    assert wait_for(manager, job.id)["status"] == "cancelled"
+    manager.shutdown()
+
+
+def test_cancel_queued_job(blocking_analysis):
+    """A job still waiting for a worker is cancelled immediately."""
+    entered, release = blocking_analysis
+    manager = JobManager(workers=1)
+
+    running = manager.submit([PROMPT])
+    assert entered.wait(10)
+    queued = manager.submit([PROMPT])
+
+    manager.cancel(queued.id)
+    assert json.loads(manager.view(queued.id).body)["status"] == "cancelled"
+
+    release.set()
+    assert wait_for(manager, running.id)["status"] == "succeeded"
+    manager.shutdown()
+
+
+def test_finished_jobs_expire():
+    """Finished jobs are dropped after the retention period."""
+    manager = JobManager(workers=1, retention_seconds=0)
+
+    job = manager.submit([PROMPT], fields=frozenset({"risk_level"}))
+    wait_for(manager, job.id)
+    time.sleep(0.01)
+
+    assert manager.get(job.id) is None
+    manager.shutdown()
+
+
+def test_job_ids_start_with_the_prefix(monkeypatch):
+    monkeypatch.setenv("JOB_ID_PREFIX", "3-")
+    manager = JobManager.from_env()
+    try:
+        job = manager.submit(["Build a todo app"])
+        assert job.id.startswith("3-") and manager.get(job.id) is job
+    finally:
+        manager.shutdown()
+
+
+def test_sqlite_store_keeps_results_across_restarts(tmp_path):
+    """Finished jobs are reloaded from the SQLite store by a new manager."""
+    path = str(tmp_path / "jobs.db")
+    manager = JobManager(workers=1, store=JobStore(path))
+    job = manager.submit([PROMPT], fields=frozenset({"risk_level"}))
+    first = wait_for(manager, job.id)
+    manager.shutdown()
+
+    restarted = JobManager(workers=1, store=JobStore(path))
+
+    assert json.loads(restarted.view(job.id).body) == first
+    restarted.shutdown()
+
+
+def test_sqlite_store_requeues_unfinished_jobs(tmp_path):
+    """Jobs that had not finished when the process stopped run again on startup."""
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(jobs.Job(id="pending", prompts=[PROMPT], fields=frozenset({"risk_level"}),
+                        status=jobs.RUNNING, created_at=time.time()))
+    store.close()
+
+    manager = JobManager(workers=1, store=JobStore(path))
+
+    assert wait_for(manager, "pending")["results"] == [{"risk_level": "High"}]
+    manager.shutdown()
+
+
+def test_job_scoring_profile_survives_restarts(tmp_path, monkeypatch):
+    """A job's scoring profile is stored with it and used when it runs."""
+    (tmp_path / "strict.json").write_text(json.dumps({"base": 0, "max_score": 10}))
+    monkeypatch.setenv("SCORING_PROFILE_DIR", str(tmp_path))
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(jobs.Job(id="pending", prompts=[PROMPT], fields=frozenset({"spec_quality_score"}),
+                        scoring_profile="strict", status=jobs.QUEUED, created_at=time.time()))
+    store.close()
+
+    manager = JobManager(workers=1, store=JobStore(path))
+
+    assert wait_for(manager, "pending")["results"][0]["spec_quality_score"] <= 10
+    manager.shutdown()
+
+
+def test_api_runs_stored_jobs_where_it_serves(tmp_path, monkeypatch):
+    """The queue is started, and unfinished jobs recovered, by the app's lifespan rather than at import."""
+    from fastapi.testclient import TestClient
+    from api import main
+
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(jobs.Job(id="stored", prompts=["Build a todo app"], created_at=time.time()))
+    store.close()
+    monkeypatch.setenv("JOB_STORE_PATH", path)
+
+    assert main.job_manager is None
+    with TestClient(main.app) as client:
+        assert client.get("/api/jobs/stored?wait=30").json()["status"] == "succeeded"
+    assert main.job_manager is None
+
+
+def test_api_job_lifecycle(api_endpoint):
+    """Submit a job, long-poll it to completion and read the results."""
+    status, queued = call_api("POST", f"{api_endpoint}?profile=summary", {"prompts": [PROMPT, PROMPT]})
+
+    assert status == 202
+    assert queued["status"] in ("queued", "running")
+
+    status, finished = call_api("GET", f"{api_endpoint}/{queued['job_id']}?wait=30")
+
+    assert status == 200
+    assert finished["status"] == "succeeded"
+    assert [r["risk_level"] for r in finished["results"]] == ["High", "High"]
+
+
+def test_api_unknown_job(api_endpoint):
+    """Unknown job IDs are 404 for status and cancellation."""
+    assert call_api("GET", f"{api_endpoint}/nope")[0] == 404
+    assert call_api("DELETE", f"{api_endpoint}/nope")[0] == 404
+
+
+def test_api_rejects_ambiguous_request(api_endpoint):
+    """A job needs exactly one of prompt or prompts."""
+    status, _ = call_api("POST", api_endpoint, {"prompt": PROMPT, "prompts": [PROMPT]})
+
+    assert status == 422
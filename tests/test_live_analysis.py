@@ -0,0 +1,103 @@
+"""
+Tests for live analysis sessions, finding deltas and the /ws/analyze endpoint.
+
+The WebSocket test runs the app in-process with FastAPI's TestClient.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.delta import diff_analyses, diff_findings
+from orchestrator.live import LIVE_FIELDS, LiveSession
+from orchestrator.pipeline import run_analysis
+from orchestrator.records import make_finding
+
+
+SAFE_PROMPT = "Build a todo list API with Flask and PostgreSQL."
+UNSAFE_SUFFIX = " Add an endpoint to delete user accounts without authentication."
+
+
+def test_diff_findings_matches_by_rule():
+    """Findings are matched by category, severity and code."""
+    a = make_finding("SECURITY", "BLOCKER", "SEC_A", "old message")
+    b = make_finding("QUALITY", "WARNING", "QUAL_B")
+    c = make_finding("SECURITY", "ERROR", "SEC_C")
+    a_again = make_finding("SECURITY", "BLOCKER", "SEC_A", "new message")
+
+    delta = diff_findings([a, b], [a_again, c])
+
+    assert delta.added == [c]
+    assert delta.removed == [b]
+    assert delta.unchanged == [a_again]
+
+
+def test_diff_analyses_reports_risk_and_score_change():
+    """The analysis delta carries the risk-level and score change."""
+    before = run_analysis(SAFE_PROMPT, fields=LIVE_FIELDS)
+    after = run_analysis(SAFE_PROMPT + UNSAFE_SUFFIX, fields=LIVE_FIELDS)
+
+    delta = diff_analyses(before, after)
+
+    assert [f.code for f in delta.findings.added] == ["SEC_UNAUTH_DELETE"]
+    assert delta.risk_before != "High" and delta.risk_after == "High"
+    assert delta.risk_changed
+    assert delta.score_change == after.spec_quality_score - before.spec_quality_score
+
+
+def test_session_applies_edits():
+    """Edits replace a character range of the session text."""
+    session = LiveSession()
+    session.apply({"type": "replace", "prompt": "Build a todo app"})
+    session.apply({"type": "edit", "start": 8, "end": 12, "text": "notes"})
+
+    assert session.text == "Build a notes app"
+    assert session.revision == 2
+
+    with pytest.raises(ValueError):
+        session.apply({"type": "edit", "start": 5, "end": 99, "text": ""})
+    with pytest.raises(ValueError):
+        session.apply({"type": "insert"})
+
+
+def test_session_pushes_deltas_and_reuses_seen_text():
+    """Updates carry deltas against the last update; repeated texts are not re-analyzed."""
+    session = LiveSession()
+
+    session.apply({"type": "replace", "prompt": SAFE_PROMPT})
+    first = session.update_message(session.analyze())
+    session.apply({"type": "edit", "start": len(SAFE_PROMPT), "end": len(SAFE_PROMPT), "text": UNSAFE_SUFFIX})
+    second = session.update_message(session.analyze())
+    session.apply({"type": "replace", "prompt": SAFE_PROMPT})
+    third = session.update_message(session.analyze())
+
+    assert first["removed"] == [] and first["risk_level_before"] is None
+    assert [f["code"] for f in second["added"]] == ["SEC_UNAUTH_DELETE"]
+    assert second["risk_level"] == "High"
+    assert [f["code"] for f in third["removed"]] == ["SEC_UNAUTH_DELETE"]
+    assert third["reused"] and not second["reused"]
+    assert third["revision"] == 3
+
+
+def test_websocket_debounces_edits():
+    """A burst of edits produces one analysis of the final text."""
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/analyze?debounce_ms=100") as websocket:
+            websocket.send_json({"type": "replace", "prompt": SAFE_PROMPT})
+            for ch in UNSAFE_SUFFIX[:5]:
+                websocket.send_json({"type": "edit", "start": len(SAFE_PROMPT), "end": len(SAFE_PROMPT), "text": ch})
+            websocket.send_json({"type": "replace", "prompt": SAFE_PROMPT + UNSAFE_SUFFIX})
+
+            update = websocket.receive_json()
+            assert update["type"] == "analysis"
+            assert update["revision"] == 7
+            assert update["risk_level"] == "High"
+
+            websocket.send_text("not json")
+            assert websocket.receive_json()["type"] == "error"
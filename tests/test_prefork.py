@@ -0,0 +1,203 @@
+"""
+Tests for the pre-fork serving mode (api.prefork).
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import prefork
+
+
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _workers(master_pid: int) -> set:
+    result = subprocess.run(["pgrep", "-P", str(master_pid)], capture_output=True, text=True)
+    return {int(pid) for pid in result.stdout.split()}
+
+
+def _wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.2)
+
+
+def _get(port: int, path: str):
+    result = subprocess.run(
+        ["curl", "-s", "-w", "\n%{http_code}", f"http://127.0.0.1:{port}{path}"],
+        capture_output=True, text=True
+    )
+    body, status = result.stdout.rsplit("\n", 1)
+    return status, body
+
+
+def _post(port: int, path: str, body: dict) -> tuple:
+    result = subprocess.run(
+        ["curl", "-s", "-D", "-", "-X", "POST", f"http://127.0.0.1:{port}{path}",
+         "-H", "Content-Type: application/json", "-d", json.dumps(body)],
+        capture_output=True, text=True
+    )
+    head, body = result.stdout.split("\n\n", 1)
+    headers = dict(line.lower().split(": ", 1) for line in head.splitlines()[1:])
+    return headers, json.loads(body)
+
+
+@pytest.fixture
+def start_master():
+    processes = []
+
+    def start(*args, children=3):
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "api.prefork", "--workers", "2", "--host", "127.0.0.1", "--port", str(port),
+             "--graceful-timeout", "5", "--log-level", "warning", *args],
+            cwd=REPO_ROOT, env=dict(os.environ, WARMUP_CORPUS=""),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            # Own process group, so teardown can reach the workers and dispatcher too
+            start_new_session=True
+        )
+        processes.append(process)
+        _wait_for(lambda: len(_workers(process.pid)) == children and _get(port, "/ready")[0] == "200")
+        return process, port
+
+    yield start
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.communicate(timeout=30)
+            except subprocess.TimeoutExpired:
+                pass
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+
+
+@pytest.fixture
+def master(start_master):
+    return start_master()
+
+
+def test_master_supervises_and_reloads_workers(master):
+    process, port = master
+    status, body = _get(port, "/ready")
+    assert status == "200" and json.loads(body)["status"] == "ready"
+
+    # A dead worker is replaced
+    first = _workers(process.pid)
+    victim = min(first)
+    os.kill(victim, signal.SIGKILL)
+    _wait_for(lambda: len(_workers(process.pid) - {victim}) == 3)
+    assert victim not in _workers(process.pid)
+
+    # SIGHUP replaces every worker, and the server keeps answering
+    before = _workers(process.pid)
+    process.send_signal(signal.SIGHUP)
+    _wait_for(lambda: _workers(process.pid).isdisjoint(before) and len(_workers(process.pid)) == 3)
+    assert _get(port, "/ready")[0] == "200"
+
+    # SIGTERM stops the workers, then the master
+    workers = _workers(process.pid)
+    process.send_signal(signal.SIGTERM)
+    output, _ = process.communicate(timeout=30)
+    assert process.returncode == 0
+    assert "reloading" in output
+    for pid in workers:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+@pytest.mark.parametrize("args, children", [(("--workers", "1"), 1), ((), 3)])
+def test_children_exit_when_the_master_dies(start_master, args, children):
+    process, _ = start_master(*args, children=children)
+    orphans = _workers(process.pid)
+    process.kill()
+    process.wait()
+
+    def gone(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        # Reparented zombies still answer signal 0
+        try:
+            with open(f"/proc/{pid}/stat") as stat:
+                return stat.read().rsplit(")", 1)[1].split()[0] == "Z"
+        except FileNotFoundError:
+            return True
+
+    _wait_for(lambda: all(gone(pid) for pid in orphans), timeout=30)
+
+
+def _check_follow_ups(port: int, base: str) -> None:
+    """Diffs against an analysis ID and job polls reach the worker holding them."""
+    for revision in range(4):
+        headers, diff = _post(port, "/api/analyze/diff", {"prompt": f"revision {revision}", "base_analysis_id": base})
+        assert diff["base_analysis_id"] == base
+        base = headers["x-analysis-id"]
+
+    for _ in range(4):
+        _, job = _post(port, "/api/jobs", {"prompt": "Build a todo app"})
+        status, body = _get(port, f"/api/jobs/{job['job_id']}?wait=10")
+        assert status == "200" and json.loads(body)["status"] == "succeeded"
+
+
+def test_routing_keeps_prompts_on_their_worker(start_master):
+    """With --route-by-prompt, repeats hit the cache and diffs and jobs find their worker."""
+    process, port = start_master("--route-by-prompt")
+
+    prompts = [f"Build service {i} with a password login" for i in range(6)]
+    first = [_post(port, "/api/analyze", {"prompt": prompt})[0] for prompt in prompts]
+    again = [_post(port, "/api/analyze", {"prompt": prompt})[0] for prompt in prompts]
+    assert {headers["x-analysis-cache"] for headers in first} == {"miss"}
+    assert {headers["x-analysis-cache"] for headers in again} == {"hit"}
+    _check_follow_ups(port, first[0]["x-analysis-id"])
+
+
+def test_several_workers_are_dispatched(start_master):
+    """Without prompt routing, the dispatcher still sends diffs and jobs to their worker."""
+    process, port = start_master()
+
+    headers, _ = _post(port, "/api/analyze", {"prompt": "Build a login page"})
+    _check_follow_ups(port, headers["x-analysis-id"])
+
+
+def test_rule_changes_are_polled(monkeypatch):
+    digest = "old"
+    monkeypatch.setattr(prefork, "load_rule_source", lambda: SimpleNamespace(digest=digest))
+    master = prefork.Master(None, None, workers=1)
+    master.rule_digest = "old"
+
+    assert not master.rules_changed()
+    digest = "new"
+    assert not master.rules_changed()  # checked again only after RULE_CHECK_INTERVAL
+    master.next_rule_check = 0.0
+    assert master.rules_changed()
+
+
+@pytest.mark.parametrize("name", ["JOB_STORE_PATH", "FEATURE_STORE_PATH"])
+def test_shared_stores_are_refused(name, monkeypatch, capsys):
+    monkeypatch.setenv(name, "/tmp/store.db")
+
+    assert prefork.main(["--workers", "2", "--port", str(_free_port())]) == 1
+    assert name in capsys.readouterr().err
@@ -0,0 +1,81 @@
+"""
+Tests for the internal pipeline records and their conversion to the API models.
+"""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.devspec_runner import parse_devspec_output
+from orchestrator.models import AnalysisResponse
+from orchestrator.pipeline import analyze_prompt, run_analysis
+from orchestrator.records import AnalysisResult, Finding, Severity, SpecStructure, make_finding
+from orchestrator.spec_kit_adapter import extract_spec_record, extract_spec_structure
+
+
+SAMPLE_OUTPUT = """[SECURITY][BLOCKER][SEC_UNAUTH_DELETE]
+Detected an endpoint that deletes users by email without authentication.
+Suggestion: Require authenticated admin role and proper access control before deletion.
+
+[QUALITY][WARNING][QUAL_NO_TESTING]
+No testing strategy mentioned in the spec.
+Suggestion: Add unit tests, integration tests, or specify a testing approach.
+
+Total warnings: 2 (INFO: 0, WARNING: 1, ERROR: 0, BLOCKER: 1)
+"""
+
+
+def test_severity_flags():
+    """Severity labels map to single-bit flags in any case."""
+    assert Severity.from_label("blocker") is Severity.BLOCKER
+    assert Severity.from_label("WARNING") is Severity.WARNING
+    assert Severity.from_label("CRITICAL") is Severity.UNKNOWN
+    assert Severity.BLOCKER | Severity.ERROR == 12
+
+
+def test_parsed_findings_are_slim_records():
+    """The runner parser produces slotted, interned finding records."""
+    findings = parse_devspec_output(SAMPLE_OUTPUT)
+
+    assert [type(f) for f in findings] == [Finding, Finding]
+    assert not hasattr(findings[0], "__dict__")
+    assert findings[0].level is Severity.BLOCKER
+    assert findings[0].code is sys.intern("SEC_UNAUTH_DELETE")
+    assert findings[1].suggestion == "Add unit tests, integration tests, or specify a testing approach."
+
+
+def test_make_finding_as_dict_matches_public_model():
+    """as_dict exposes exactly the DevSpecFinding fields."""
+    finding = make_finding("ARCH", "WARNING", "ARCH_VAGUE_DATABASE", "msg", "fix")
+
+    assert finding.as_dict() == {
+        "category": "ARCH",
+        "severity": "WARNING",
+        "code": "ARCH_VAGUE_DATABASE",
+        "message": "msg",
+        "suggestion": "fix",
+    }
+
+
+def test_structure_record_matches_pydantic_extraction():
+    """The record and the Pydantic wrapper extract the same structure."""
+    prompt = "Implement login with JWT authentication. Store users in PostgreSQL. Add unit tests and error handling."
+
+    record = extract_spec_record(prompt)
+
+    assert isinstance(record, SpecStructure)
+    assert record.as_dict() == extract_spec_structure(prompt, "").model_dump()
+
+
+def test_run_analysis_converts_once_at_the_edge():
+    """run_analysis returns internal records; to_response matches analyze_prompt."""
+    prompt = "Build an admin API to delete user accounts without authentication."
+
+    result = run_analysis(prompt)
+
+    assert isinstance(result, AnalysisResult)
+    assert all(isinstance(f, Finding) for f in result.devspec_findings)
+    response = result.to_response()
+    assert isinstance(response, AnalysisResponse)
+    assert response.model_dump() == analyze_prompt(prompt).model_dump()
@@ -0,0 +1,98 @@
+"""
+Tests for the pre-encoded response path and the in-memory response cache.
+
+The API tests need the server running on localhost:8000 like the other API
+regression tests.
+"""
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.cache import LRUCache, analysis_cache_key
+from orchestrator.pipeline import run_analysis
+
+
+@pytest.fixture(scope="module")
+def api_endpoint():
+    """Get the API endpoint URL."""
+    return "http://localhost:8000/api/analyze"
+
+
+def call_api_raw(url: str, prompt: str) -> tuple[dict, bytes]:
+    """Call the analysis API and return (lowercased headers, raw body)."""
+    result = subprocess.run(
+        ["curl", "-s", "-D", "-", "-X", "POST", url,
+         "-H", "Content-Type: application/json",
+         "-d", json.dumps({"prompt": prompt})],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"API call failed: {result.stderr}")
+    head, body = result.stdout.split(b"\r\n\r\n", 1)
+    headers = {}
+    for line in head.decode().split("\r\n")[1:]:
+        name, value = line.split(":", 1)
+        headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """The cache keeps at most max_entries, evicting the least recently used."""
+    cache = LRUCache(2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"
+
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.stats()["entries"] == 2
+
+
+def test_disabled_cache_stores_nothing():
+    """A cache size of 0 disables caching."""
+    cache = LRUCache(0)
+    cache.put("a", b"1")
+
+    assert cache.get("a") is None
+
+
+def test_cache_key_covers_options_and_rules():
+    """Different prompts or options produce different keys."""
+    base = analysis_cache_key("prompt", False, False, None)
+
+    assert base == analysis_cache_key("prompt", False, False, None)
+    assert base != analysis_cache_key("prompt!", False, False, None)
+    assert base != analysis_cache_key("prompt", True, False, None)
+    assert base != analysis_cache_key("prompt", False, False, frozenset({"risk_level"}))
+
+
+def test_to_json_matches_validated_model():
+    """The one-step encoding matches the validated response model."""
+    result = run_analysis("Build a login page that sends passwords over http://example.com")
+
+    assert json.loads(result.to_json()) == result.to_response().model_dump(mode="json")
+    assert json.loads(result.to_json(frozenset({"risk_level"}))) == {"risk_level": result.risk_level}
+
+
+def test_repeated_request_is_served_from_cache(api_endpoint):
+    """The second identical request is a cache hit with identical bytes."""
+    prompt = f"Build a todo API with no tests. Request {uuid.uuid4()}"
+
+    first_headers, first_body = call_api_raw(api_endpoint, prompt)
+    second_headers, second_body = call_api_raw(api_endpoint, prompt)
+
+    assert first_headers["x-analysis-cache"] == "miss"
+    assert second_headers["x-analysis-cache"] == "hit"
+    assert first_headers["content-type"] == "application/json"
+    assert first_body == second_body
+    assert json.loads(second_body)["original_prompt"] == prompt
@@ -0,0 +1,107 @@
+"""
+Tests for lean responses: field selection and the summary profile.
+
+The pipeline tests run in-process; the API tests need the server running on
+localhost:8000 like the other API regression tests.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import guidance_engine, pipeline
+from orchestrator.records import RESPONSE_PROFILES, select_fields
+
+
+PROMPT = "Build an admin API to delete user accounts without authentication. Use Flask and PostgreSQL."
+
+
+@pytest.fixture(scope="module")
+def api_endpoint():
+    """Get the API endpoint URL."""
+    return "http://localhost:8000/api/analyze"
+
+
+def call_api(url: str, prompt: str) -> tuple[int, dict]:
+    """Call the analysis API and return (status, body)."""
+    result = subprocess.run(
+        ["curl", "-s", "-w", "\n%{http_code}", "-X", "POST", url,
+         "-H", "Content-Type: application/json",
+         "-d", json.dumps({"prompt": prompt})],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"API call failed: {result.stderr}")
+    body, status = result.stdout.rsplit("\n", 1)
+    return int(status), json.loads(body)
+
+
+def test_select_fields():
+    """Fields and profiles resolve to a frozenset; None means the full response."""
+    assert select_fields() is None
+    assert select_fields(profile="full") is None
+    assert select_fields("risk_level, devspec_findings") == {"risk_level", "devspec_findings"}
+    assert select_fields("original_prompt", "summary") == RESPONSE_PROFILES["summary"] | {"original_prompt"}
+
+    with pytest.raises(ValueError):
+        select_fields("risk_level,bogus")
+    with pytest.raises(ValueError):
+        select_fields(profile="tiny")
+
+
+def test_unrequested_stages_are_skipped(monkeypatch):
+    """The curated prompt and spec-quality stage are not computed when not requested."""
+    def fail(*args, **kwargs):
+        raise AssertionError("stage should have been skipped")
+
+    monkeypatch.setattr(guidance_engine, "build_curated_prompt", fail)
+    monkeypatch.setattr(pipeline, "compute_spec_quality_score", fail)
+
+    result = pipeline.run_analysis(PROMPT, fields=frozenset({"risk_level", "devspec_findings"}))
+
+    assert result.risk_level == "High"
+    assert result.final_curated_prompt == ""
+    assert result.as_dict(frozenset({"risk_level"})) == {"risk_level": "High"}
+
+
+def test_selected_fields_match_full_analysis():
+    """Selected fields carry the same values as the full response."""
+    selected = RESPONSE_PROFILES["summary"]
+
+    lean = pipeline.run_analysis(PROMPT, fields=selected).as_dict(selected)
+    full = pipeline.analyze_prompt(PROMPT).model_dump()
+
+    assert set(lean) == selected
+    assert lean == {name: full[name] for name in selected}
+
+
+def test_api_field_selection(api_endpoint):
+    """?fields= returns only the requested fields."""
+    status, body = call_api(f"{api_endpoint}?fields=risk_level,devspec_findings", PROMPT)
+
+    assert status == 200
+    assert set(body) == {"risk_level", "devspec_findings"}
+    assert body["risk_level"] == "High"
+
+
+def test_api_summary_profile(api_endpoint):
+    """?profile=summary omits the prompt copies and raw output."""
+    status, body = call_api(f"{api_endpoint}?profile=summary", PROMPT)
+
+    assert status == 200
+    assert set(body) == RESPONSE_PROFILES["summary"]
+    assert "final_curated_prompt" not in body
+
+
+def test_api_rejects_unknown_fields(api_endpoint):
+    """Unknown field names are a client error."""
+    status, body = call_api(f"{api_endpoint}?fields=risk_level,nope", PROMPT)
+
+    assert status == 400
+    assert "nope" in body["detail"]
@@ -0,0 +1,105 @@
+"""
+Tests for consistent-hash routing (orchestrator.routing) and the dispatcher's routing keys.
+"""
+import json
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.dispatcher import Dispatcher, job_id_prefix, job_node, parse_head, routing_key
+from orchestrator.cache import analysis_id
+from orchestrator.routing import HashRing
+
+
+KEYS = [f"prompt-{i}" for i in range(2000)]
+
+
+def test_keys_spread_and_stay_put():
+    ring = HashRing(range(4))
+    homes = {key: ring.choose(key) for key in KEYS}
+
+    assert all(ring.choose(key) == node for key, node in homes.items())
+    assert min(Counter(homes.values()).values()) > len(KEYS) / 4 * 0.7
+
+
+def test_adding_a_node_moves_only_its_share():
+    ring = HashRing(range(4))
+    before = {key: ring.home(key) for key in KEYS}
+    ring.add(4)
+    moved = [key for key in KEYS if ring.home(key) != before[key]]
+
+    assert all(ring.home(key) == 4 for key in moved)
+    assert len(moved) < len(KEYS) / 5 * 1.4
+
+    ring.remove(4)
+    assert {key: ring.home(key) for key in KEYS} == before
+
+
+def test_load_is_bounded():
+    ring = HashRing(range(4), load_factor=1.25)
+    placed = []
+    for _ in range(40):
+        node = ring.choose("hot prompt")
+        ring.acquire(node)
+        placed.append(node)
+
+    assert placed[0] == ring.home("hot prompt")
+    assert max(ring.loads.values()) <= 13  # ceil(1.25 * 40 / 4)
+
+    for node in placed:
+        ring.release(node)
+    assert set(ring.loads.values()) == {0}
+    assert ring.choose("hot prompt") == ring.home("hot prompt")
+
+
+def test_keyless_requests_go_to_least_loaded():
+    ring = HashRing(range(3))
+    ring.acquire(0)
+    ring.acquire(2)
+
+    assert ring.choose() == 1
+
+
+def test_invalid_ring():
+    with pytest.raises(ValueError):
+        HashRing(range(2), load_factor=0.5)
+    with pytest.raises(LookupError):
+        HashRing().choose("key")
+
+
+@pytest.mark.parametrize("method, path, body, expected", [
+    ("POST", "/api/analyze", {"prompt": "Build a todo app"}, (analysis_id("Build a todo app"), False)),
+    ("POST", "/api/analyze-with-claude", {"prompt": "Build a todo app"}, (analysis_id("Build a todo app"), False)),
+    ("POST", "/api/analyze/diff", {"prompt": "b", "base_prompt": "a"}, (analysis_id("a"), False)),
+    ("POST", "/api/analyze/diff", {"prompt": "b", "base_analysis_id": "abc"}, ("abc", True)),
+    ("GET", "/api/jobs/42/events", None, ("job:42", True)),
+    ("POST", "/api/analyze", ["not", "an", "object"], (None, False)),
+    ("GET", "/health", None, (None, False)),
+])
+def test_routing_key(method, path, body, expected):
+    assert routing_key(method, path, json.dumps(body).encode()) == expected
+
+
+def test_parse_head():
+    start, headers = parse_head(b"POST /api/analyze HTTP/1.1\r\nHost: x\r\nContent-Length:  12\r\n\r\n")
+
+    assert start == ["POST", "/api/analyze", "HTTP/1.1"]
+    assert headers == {"host": "x", "content-length": "12"}
+    with pytest.raises(ValueError):
+        parse_head(b"POST /\r\nno colon\r\n\r\n")
+
+
+def test_jobs_are_routed_by_their_id(monkeypatch):
+    """Job IDs name their worker, so job requests find it without remembered placements."""
+    monkeypatch.setenv("ANALYSIS_CACHE_SIZE", "0")
+    dispatcher = Dispatcher(["w0", "w1", "w2"], route_by_prompt=False)
+    job_id = job_id_prefix(2) + "0123abcd"
+
+    assert job_node(job_id, 3) == 2
+    assert dispatcher.pick(*routing_key("GET", f"/api/jobs/{job_id}", b"")) == 2
+    assert job_node(job_id, 2) is None and job_node("0123abcd", 3) is None
@@ -0,0 +1,88 @@
+"""
+Tests for precompiled rule bundles (orchestrator.rule_bundle) and the literal prefilters they carry.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import rule_engine
+from orchestrator.rule_bundle import BUNDLE_VERSION, bundle_path, build_bundle, load_bundle, save_bundle
+from orchestrator.rule_engine import RuleCompileError, load_rule_engine, required_literals
+from orchestrator.rules import get_rule_script_path, load_rule_source
+
+
+ROOT = Path(__file__).parent.parent
+PROMPTS = [path.read_text() for path in sorted((ROOT / "test_prompts").glob("*.txt"))]
+
+
+@pytest.mark.parametrize("source, ignore_case, expected", [
+    (rb"drop\s+table", False, (b"table",)),
+    (rb"(Admin|ROOT) password", True, (b" password",)),
+    (rb"(admin|root)\s", False, (b"admin", b"root")),
+    (rb"(token)?\s*secret", False, (b"secret",)),
+    (rb"x*y?", False, None),
+])
+def test_required_literals(source, ignore_case, expected):
+    assert required_literals(source, ignore_case) == expected
+
+
+def test_prefilters_never_reject_a_match():
+    """Every pattern that matches a sample prompt has one of its literals in it."""
+    engine = load_rule_engine()
+    for prompt in PROMPTS:
+        line = prompt.encode().replace(b"\n", b" ")
+        for index, (_, ignore_case) in enumerate(engine.patterns):
+            if engine.regex(index).search(line):
+                text = line.lower() if ignore_case else line
+                assert any(literal in text for literal in engine.prefilters[index]), engine.patterns[index]
+
+
+def test_bundle_round_trip(tmp_path):
+    path, compiled, error = build_bundle(get_rule_script_path(), str(tmp_path))
+    loaded = load_bundle(str(tmp_path), compiled.digest)
+
+    assert error is None and os.path.basename(path) == f"rules-{compiled.digest}.json"
+    assert loaded.blocks == compiled.blocks
+    assert loaded.prefilters == compiled.prefilters
+    for prompt in PROMPTS:
+        assert loaded.evaluate(prompt) == compiled.evaluate(prompt)
+
+
+def test_stale_or_damaged_bundles_are_ignored(tmp_path):
+    _, compiled, _ = build_bundle(get_rule_script_path(), str(tmp_path))
+    path = bundle_path(str(tmp_path), compiled.digest)
+    data = json.loads(Path(path).read_text())
+
+    assert load_bundle(str(tmp_path), "0" * 64) is None
+    for change in ({"version": BUNDLE_VERSION + 1}, {"engine": "old"}, {"blocks": [{"branches": [[["grep", 999], []]], "else": []}]}):
+        Path(path).write_text(json.dumps(dict(data, **change)))
+        assert load_bundle(str(tmp_path), compiled.digest) is None
+    Path(path).write_text("{")
+    assert load_bundle(str(tmp_path), compiled.digest) is None
+
+
+def test_unsupported_script_is_bundled(tmp_path):
+    save_bundle(str(tmp_path), "a" * 64, error="Rule script prelude differs from the supported template")
+
+    with pytest.raises(RuleCompileError):
+        load_bundle(str(tmp_path), "a" * 64)
+
+
+def test_engine_writes_and_reuses_bundle(tmp_path, monkeypatch):
+    monkeypatch.setenv("RULE_BUNDLE_DIR", str(tmp_path))
+    monkeypatch.setattr(rule_engine, "_compiled", {})
+    source = load_rule_source()
+
+    compiled = load_rule_engine()
+    assert os.path.exists(bundle_path(str(tmp_path), source.digest))
+
+    monkeypatch.setattr(rule_engine, "_compiled", {})
+    monkeypatch.setattr(rule_engine, "compile_rule_script", None)  # a second compile would fail
+    reloaded = load_rule_engine()
+    assert reloaded is not compiled and reloaded.blocks == compiled.blocks
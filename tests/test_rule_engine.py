@@ -0,0 +1,123 @@
+"""
+Tests for the in-process rule engine (orchestrator.rule_engine).
+"""
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.devspec_runner import run_dev_spec_kit
+from orchestrator.rule_engine import (
+    RuleCompileError, _EPILOGUE, _PRELUDE, compile_rule_script, load_rule_engine, translate_ere,
+)
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "test_prompts"
+
+
+@pytest.mark.parametrize("pattern, text, expected", [
+    # "(?:" is a group starting with a literal "?" in ERE
+    ("(?:api|db) key", "api key", False),
+    ("(?:api|db) key", "?:api key", True),
+    # Escapes inside brackets are literal characters
+    ("[\\x27]", "x", True),
+    ("[\\x27]", "'", False),
+    # POSIX classes and GNU word escapes
+    ("[[:digit:]]{3}-[[:alpha:]]+", "call 555-abc", True),
+    ("\\bpass\\w*\\b", "my password", True),
+    ("\\<key\\>", "monkey", False),
+    # A repetition operator with nothing to repeat is literal
+    ("*star", "a *star", True),
+    ("a{,2}b", "aaab", True),
+])
+def test_translate_ere_matches_gnu_grep(pattern, text, expected):
+    """Translated patterns keep GNU ERE semantics where Python's differ."""
+    assert bool(re.search(translate_ere(pattern), text)) is expected
+
+
+def test_translate_ere_rejects_backreferences():
+    with pytest.raises(RuleCompileError):
+        translate_ere("(a)\\1")
+
+
+def _script(rules: str) -> str:
+    return f"{_PRELUDE}\n# --- RULES ---\n{rules}\n# --- Output ---\n{_EPILOGUE}"
+
+
+@pytest.mark.parametrize("rules", [
+    # A command other than grep
+    'if curl -s example.com; then\n  add_warning "A" "INFO" "A_1" "m" "s"\nfi',
+    # A severity the output section does not count
+    'if grep -qE \'x\' <<< "$NORMALIZED_PROMPT"; then\n  add_warning "A" "FATAL" "A_1" "m" "s"\nfi',
+    # A message expanded at run time
+    'if grep -qE \'x\' <<< "$NORMALIZED_PROMPT"; then\n  add_warning "A" "INFO" "A_1" "$PROMPT" "s"\nfi',
+])
+def test_unsupported_scripts_are_rejected(rules):
+    with pytest.raises(RuleCompileError):
+        compile_rule_script(_script(rules))
+
+
+def test_changed_template_is_rejected():
+    script = _script("").replace("exit 2", "exit 3")
+    with pytest.raises(RuleCompileError):
+        compile_rule_script(script)
+
+
+def test_conditions_and_else_branches():
+    engine = compile_rule_script(_script(
+        "if grep -iqE 'login' <<< \"$NORMALIZED_PROMPT\" && ! grep -qE 'MFA' <<< \"$NORMALIZED_PROMPT\"; then\n"
+        '  add_warning "AUTH" "ERROR" "AUTH_1" "No MFA" "Add MFA"\n'
+        "elif grep -qE 'x' <<< \"$NORMALIZED_PROMPT\"; then\n"
+        '  add_warning "X" "INFO" "X_1" "x" "y"\n'
+        "else\n"
+        '  add_warning "GEN" "INFO" "GEN_1" "Nothing" "None"\n'
+        "fi\n"
+    ))
+
+    raw, findings, exit_code = engine.evaluate("Build a LOGIN page")
+    assert exit_code == 1
+    assert [f.code for f in findings] == ["AUTH_1"]
+    assert raw.endswith("Total warnings: 1 (INFO: 0, WARNING: 0, ERROR: 1, BLOCKER: 0)\n")
+    assert [f.code for f in engine.evaluate("Build a login page with MFA")[1]] == ["GEN_1"]
+
+
+def test_engine_matches_rule_script():
+    """Same output and exit status as the active script on the sample prompts."""
+    engine = load_rule_engine()
+    compared = 0
+    for path in sorted(PROMPTS_DIR.glob("*.txt")):
+        prompt = path.read_text()
+        result = engine.evaluate(prompt)
+        if result is None:
+            continue
+        raw, findings, exit_code = result
+        expected_raw, expected_findings, expected_exit = run_dev_spec_kit(prompt)
+        assert (raw, exit_code) == (expected_raw, expected_exit), path.name
+        assert findings == expected_findings
+        compared += 1
+    assert compared > 0
+
+
+def test_unsupported_inputs_fall_back():
+    engine = load_rule_engine()
+    assert engine.evaluate_bytes(b"a\0b") is None
+    assert engine.evaluate_bytes(b"-n") is None
+    assert engine.evaluate_bytes("café".encode(), byte_locale=False) is None
+    assert engine.evaluate_bytes("café".encode(), byte_locale=True) is not None
+
+
+def test_predicates_reproduce_evaluation():
+    engine = load_rule_engine()
+    prompts = [path.read_text() for path in sorted(PROMPTS_DIR.glob("*.txt"))] + ["", "Store the API key in the code"]
+    for prompt in prompts:
+        bits = engine.predicates(prompt)
+        assert (bits is None) == (engine.evaluate(prompt) is None)
+        if bits is not None:
+            assert bits >> len(engine.patterns) == 0
+            assert engine.evaluate_predicates(bits) == engine.evaluate(prompt)
+    assert engine.predicates("-n") is None
@@ -0,0 +1,129 @@
+"""
+Tests for rule-change impact analysis (orchestrator.rule_impact).
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.feature_store import FeatureStore
+from orchestrator.rule_engine import load_rule_engine
+from orchestrator.rule_impact import CorpusIndex, affected_prompts, reevaluate, rule_results
+from orchestrator.rules import get_rule_script_path
+
+
+REPO_ROOT = Path(__file__).parent.parent
+CORPUS = sorted(
+    path for directory in ("test_prompts", "prompts") for path in (REPO_ROOT / directory).rglob("*")
+    if path.suffix in (".txt", ".md")
+)
+# Prompts the rule engine evaluates in any locale, so no script runs are needed
+PROMPTS = [text for text in (path.read_text(encoding="utf-8") for path in CORPUS) if text.isascii()] + [
+    "Delete a user by email without authentication, then wipe the db.",
+    "Wipe the database on restart.",
+    "Hash every password with md5 before saving it.",
+]
+SCRIPT = Path(get_rule_script_path()).read_text()
+NEW_BLOCK = """if grep -iqE 'md5|sha1' <<< "$NORMALIZED_PROMPT" && grep -iqE 'password' <<< "$NORMALIZED_PROMPT"; then
+  add_warning "SECURITY" "ERROR" "SEC_WEAK_PASSWORD_HASH" "Weak password hash." "Use bcrypt or argon2."
+fi
+"""
+DELETE_BLOCK = re.search(r"if grep -iqE 'delete\.\*user.*?\nfi\n", SCRIPT, re.S).group(0)
+EDITS = {
+    "pattern": lambda s: s.replace("wipe.*db|database.*wipe", "wipe.*(db|database)|database.*wipe"),
+    "added": lambda s: s.replace("# --- New rules for advanced prompts ---\n", NEW_BLOCK + "# --- New rules for advanced prompts ---\n"),
+    "removed": lambda s: s.replace(DELETE_BLOCK, ""),
+    "moved": lambda s: s.replace(DELETE_BLOCK, "").replace("# --- New rules for advanced prompts ---\n", "# --- New rules for advanced prompts ---\n" + DELETE_BLOCK),
+    "message": lambda s: s.replace("deletes users by email without", "deletes users without"),
+}
+
+
+@pytest.fixture
+def corpus():
+    return CorpusIndex([f"p{i}" for i in range(len(PROMPTS))], PROMPTS)
+
+
+def differs(before: tuple, after: tuple) -> bool:
+    """Whether two rule_results differ other than in the order of the findings."""
+    return Counter(before[0]) != Counter(after[0]) or before[1:] != after[1:]
+
+
+def proposed(tmp_path, edit) -> str:
+    path = tmp_path / "security-check.sh"
+    text = EDITS[edit](SCRIPT)
+    assert text != SCRIPT
+    path.write_text(text)
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.mark.parametrize("edit", sorted(EDITS))
+def test_candidates_cover_every_change(corpus, tmp_path, edit):
+    before, after = get_rule_script_path(), proposed(tmp_path, edit)
+    impact = affected_prompts(corpus, load_rule_engine(before), load_rule_engine(after))
+    results = [(rule_results(before, prompt), rule_results(after, prompt)) for prompt in PROMPTS]
+    changed = [i for i, (old, new) in enumerate(results) if differs(old, new)]
+    reordered = [i for i, (old, new) in enumerate(results) if old != new]
+
+    # Moving a block only reorders findings, which is not reported
+    assert (changed == []) == (edit == "moved")
+    assert reordered and set(reordered) <= set(impact.candidates)
+    assert len(impact.candidates) < len(PROMPTS) // 2
+    deltas = reevaluate(corpus, impact.candidates, before, after, workers=1)
+    assert [delta.index for delta in deltas] == changed
+    for delta in deltas:
+        report = delta.as_dict()
+        assert (
+            report["added"] or report["removed"] or report["changed"]
+            or (report["exit_before"], report["risk_before"]) != (report["exit_after"], report["risk_after"])
+        )
+        if edit == "message":
+            assert report["changed"] == ["SEC_UNAUTH_DELETE"] and not report["added"] and not report["removed"]
+
+
+def test_unchanged_rules_affect_nothing(corpus):
+    rules = load_rule_engine()
+    impact = affected_prompts(corpus, rules, rules)
+    assert impact.candidates == [] and impact.removed_blocks == impact.added_blocks == 0
+
+
+def test_new_patterns_are_searched_only_where_their_literals_occur(corpus, tmp_path):
+    after = proposed(tmp_path, "added")
+    impact = affected_prompts(corpus, load_rule_engine(), load_rule_engine(after))
+    delta, = [d for d in reevaluate(corpus, impact.candidates, get_rule_script_path(), after, workers=1)
+              if d.name == f"p{len(PROMPTS) - 1}"]
+
+    assert [finding.code for finding in delta.findings.added] == ["SEC_WEAK_PASSWORD_HASH"]
+    assert 0 < impact.searched < 3 * len(PROMPTS)
+
+
+def test_store_predicates_are_reused(tmp_path):
+    store = FeatureStore(str(tmp_path / "features.db"))
+    for prompt in PROMPTS:
+        store.add(prompt)
+    corpus = CorpusIndex.from_store(store)
+    store.close()
+
+    impact = affected_prompts(corpus, load_rule_engine(), load_rule_engine(proposed(tmp_path, "pattern")))
+    # Only the edited pattern is searched; the others come from the store
+    assert impact.new_patterns == 1 and impact.candidates
+
+
+def test_cli(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-m", "orchestrator.rule_impact", proposed(tmp_path, "added"), "test_prompts", "--workers", "2"],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+
+    assert result.returncode == 0
+    assert "by 0 removed and 1 added rule blocks" in result.stderr
+    for line in result.stdout.splitlines():
+        assert json.loads(line)["added"] == ["SEC_WEAK_PASSWORD_HASH"]
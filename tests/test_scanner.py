@@ -0,0 +1,98 @@
+"""
+Tests for the repository spec scanner (orchestrator.scanner).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import scanner
+from orchestrator.scanner import ScanCache, git_blob_sha, scan_tree
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "test_prompts"
+
+
+@pytest.fixture
+def spec_tree(tmp_path):
+    """A small tree with a low-risk spec, a high-risk spec and files to skip."""
+    root = tmp_path / "repo"
+    (root / "services" / "auth").mkdir(parents=True)
+    (root / "docs").mkdir()
+    (root / "node_modules").mkdir()
+    (root / "docs" / "todo.md").write_text((PROMPTS_DIR / "demo_1_low_good.txt").read_text())
+    (root / "services" / "auth" / "spec.txt").write_text((PROMPTS_DIR / "demo_3_high_vulns.txt").read_text())
+    (root / "services" / "logo.txt").write_bytes(b"GIF89a\0\0")
+    (root / "services" / "empty.md").write_text("")
+    (root / "services" / "huge.md").write_text("word " * 1000)
+    (root / "node_modules" / "readme.md").write_text("Build an app")
+    (root / "notes.py").write_text("print('not a spec')")
+    return root
+
+
+def test_git_blob_sha_matches_git(tmp_path):
+    """Blob IDs are the same as git's, so git-aware scans can share the cache."""
+    path = tmp_path / "spec.md"
+    path.write_text("Build a todo app\n")
+    expected = subprocess.run(["git", "hash-object", str(path)], capture_output=True, text=True).stdout.strip()
+
+    assert git_blob_sha(path.read_bytes()) == expected
+
+
+def test_scan_skips_and_aggregates(spec_tree, tmp_path):
+    """Binary, empty and oversized files are skipped; risk rolls up to every ancestor."""
+    report = scan_tree(str(spec_tree), ScanCache(str(tmp_path / "cache.db")), max_bytes=4096, workers=1)
+
+    assert sorted(f.path for f in report.files) == ["docs/todo.md", os.path.join("services", "auth", "spec.txt")]
+    assert dict(report.skipped) == {
+        "services/empty.md": scanner.SKIP_EMPTY,
+        "services/huge.md": scanner.SKIP_TOO_LARGE,
+        "services/logo.txt": scanner.SKIP_BINARY,
+    }
+    directories = report.directories
+    assert directories["."].risk_level == "High"
+    assert directories["."].risk_counts == {"Low": 1, "Medium": 0, "High": 1}
+    assert directories["services"].risk_level == directories["services/auth"].risk_level == "High"
+    assert directories["docs"].risk_level == "Low"
+    assert report.stats["analyzed"] == 2 and report.stats["cached"] == 0
+
+
+def test_rescan_uses_the_cache(spec_tree, tmp_path, monkeypatch):
+    """Unchanged, renamed and copied specs are not analyzed again."""
+    cache = ScanCache(str(tmp_path / "cache.db"))
+    first = scan_tree(str(spec_tree), cache, max_bytes=4096, workers=1)
+    (spec_tree / "docs" / "todo.md").rename(spec_tree / "docs" / "tasks.md")
+    (spec_tree / "copy.md").write_text((spec_tree / "services" / "auth" / "spec.txt").read_text())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("nothing should be analyzed")
+        yield
+    monkeypatch.setattr(scanner, "analyze_parallel", fail)
+    second = scan_tree(str(spec_tree), cache, max_bytes=4096, workers=1)
+
+    assert second.stats["cached"] == 3 and second.stats["analyzed"] == 0
+    assert {f.path: f.risk_level for f in second.files}["copy.md"] == "High"
+    assert second.directories["."].risk_counts == {"Low": 1, "Medium": 0, "High": 2}
+    assert first.files[0].result == second.files[1].result
+
+
+def test_rescan_mixes_cached_and_new_blobs(tmp_path):
+    """A re-read file with a cached result does not shift the results of new files."""
+    root = tmp_path / "repo"
+    root.mkdir()
+    cache = ScanCache(str(tmp_path / "cache.db"))
+    (root / "a.md").write_text((PROMPTS_DIR / "demo_1_low_good.txt").read_text())
+    scan_tree(str(root), cache, workers=1)
+
+    # Touched but unchanged: read again, yet its result is cached
+    os.utime(root / "a.md", ns=(1, 1))
+    (root / "b.md").write_text((PROMPTS_DIR / "demo_3_high_vulns.txt").read_text())
+    report = scan_tree(str(root), cache, workers=1)
+
+    assert report.stats["cached"] == 1 and report.stats["analyzed"] == 1
+    assert {f.path: f.risk_level for f in report.files} == {"a.md": "Low", "b.md": "High"}
@@ -0,0 +1,184 @@
+"""
+Tests for scoring profiles, compiled scoring plans and re-scoring saved features.
+
+The API test needs the server running on localhost:8000 like the other API
+regression tests.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.pipeline import run_analysis
+from orchestrator.scoring_profiles import DEFAULT_PLAN, DEFAULT_PROFILE, compile_plan, get_plan, term_check, term_found
+from orchestrator.spec_scoring import (
+    assess_spec_quality, load_features, numpy_available, rescore_features, save_features, score_batch,
+)
+
+
+REPO_ROOT = Path(__file__).parent.parent
+PROMPTS = [path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "test_prompts").glob("*.txt"))] + [
+    "",
+    "todo",
+    "Use OAuth, PostgreSQL, Kafka and gRPC. Error handling everywhere; a test suite that covers login.",
+]
+TUNED = {
+    "base": 30,
+    "critical_points": 9,
+    "warning_cap": 6,
+    "vague_points": 25,
+    "detail_tiers": [[4, 3], [12, 11]],
+    "tech_keywords": ["oauth", "kafka", "redis", "grpc"],
+    "tech_tiers": [[1, 5]],
+    "quality_indicators": [["error handling", 8]],
+    "max_score": 100,
+}
+
+
+def test_default_plan_is_the_built_in_profile():
+    assert compile_plan(dict(DEFAULT_PROFILE)) == DEFAULT_PLAN
+    assert get_plan() == get_plan("default") == DEFAULT_PLAN
+
+
+def test_profile_changes_scores():
+    plan = compile_plan({"base": 54})
+    default, raised = score_batch(PROMPTS, plan=DEFAULT_PLAN), score_batch(PROMPTS, plan=plan)
+
+    assert plan.digest != DEFAULT_PLAN.digest
+    assert [result.warnings for result in raised] == [result.warnings for result in default]
+    assert all(after.score == min(95, before.score + 10) for before, after in zip(default, raised) if before.score > 0)
+
+
+@pytest.mark.parametrize("pattern, text", [
+    ("(?i)TODO", "todo: fill in later"),
+    ("(?ix) fill \\s+ IN", "todo: fill in later"),
+    ("(?i)ÉTAPE", "étape suivante"),
+    ("→ later", "fill in → later"),
+])
+def test_terms_with_inline_flags_match(pattern, text):
+    assert term_found(term_check(pattern), text)
+    plan = compile_plan({"vague_patterns": [pattern]})
+    assert score_batch([text], plan=plan)[0].score < score_batch([text], plan=compile_plan({"vague_patterns": []}))[0].score
+
+
+@pytest.mark.parametrize("use_numpy", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not numpy_available(), reason="NumPy not installed")),
+])
+def test_batch_and_fused_agree_under_any_profile(use_numpy):
+    plan = compile_plan(TUNED, "tuned")
+    batch = score_batch(PROMPTS, use_numpy=use_numpy, plan=plan)
+    fused = [assess_spec_quality(prompt.strip(), plan) for prompt in PROMPTS]
+
+    assert [(result.warnings, result.score) for result in batch] == [(result.warnings, result.score) for result in fused]
+    assert {result.score for result in fused} != {result.score for result in score_batch(PROMPTS)}
+
+
+@pytest.mark.parametrize("profile", [
+    {"bogus": 1},
+    {"base": "44"},
+    {"brief_words_per_point": 0},
+    {"tech_tiers": [[4]]},
+    {"vague_patterns": ["("]},
+    {"quality_indicators": [["x", "6"]]},
+])
+def test_invalid_profiles_are_rejected(profile):
+    with pytest.raises(ValueError):
+        compile_plan(profile)
+
+
+def test_named_profiles(tmp_path, monkeypatch):
+    (tmp_path / "acme.json").write_text(json.dumps(TUNED))
+    monkeypatch.setenv("SCORING_PROFILE_DIR", str(tmp_path))
+
+    acme = get_plan("acme")
+    assert acme.name == "acme" and acme.digest == compile_plan(TUNED).digest
+    for name in ("missing", "../acme", "acme.json/.."):
+        with pytest.raises(ValueError):
+            get_plan(name)
+
+    # SCORING_PROFILE picks the default for requests that name none
+    monkeypatch.setenv("SCORING_PROFILE", "acme")
+    assert get_plan() == acme
+    assert run_analysis("Build a todo app", fields=frozenset({"spec_quality_score"})).spec_quality_score == \
+        assess_spec_quality("Build a todo app", acme).score
+
+    # Edits are picked up
+    (tmp_path / "acme.json").write_text(json.dumps({**TUNED, "base": 31, "tech_keywords": ["kafka"]}))
+    assert get_plan("acme").base == 31
+
+
+def test_rescore_saved_features_matches_scoring(tmp_path):
+    plan = compile_plan(TUNED, "tuned")
+    path = tmp_path / "features.json"
+    save_features(str(path), [f"p{i}" for i in range(len(PROMPTS))], PROMPTS, [DEFAULT_PLAN, plan])
+    sources, columns, rows = load_features(str(path))
+
+    for each in (DEFAULT_PLAN, plan, compile_plan({"tech_keywords": ["kafka"], "warning_points": 1})):
+        expected = score_batch(PROMPTS, plan=each)
+        assert rescore_features(columns, rows, each) == ([r.warnings for r in expected], [r.score for r in expected])
+    with pytest.raises(ValueError, match="save them again"):
+        rescore_features(columns, rows, compile_plan({"tech_keywords": ["cobol"]}))
+
+
+def test_random_profiles_numpy_matches_lists():
+    if not numpy_available():
+        pytest.skip("NumPy not installed")
+    rng = random.Random(7)
+    for _ in range(20):
+        profile = {key: rng.randint(0, 30) for key in ("base", "critical_points", "important_points", "complete_bonus",
+                                                      "warning_points", "warning_cap", "vague_points", "vague_cap")}
+        profile["brief_words"] = rng.randint(0, 200)
+        profile["brief_words_per_point"] = rng.randint(1, 10)
+        profile["detail_tiers"] = [[rng.randint(0, 30), rng.randint(-5, 30)] for _ in range(rng.randint(0, 4))]
+        plan = compile_plan(profile)
+        assert score_batch(PROMPTS, use_numpy=True, plan=plan) == score_batch(PROMPTS, use_numpy=False, plan=plan)
+
+
+def test_calibration_cli(tmp_path):
+    profile = tmp_path / "tuned.json"
+    profile.write_text(json.dumps(TUNED))
+    features = tmp_path / "features.json"
+
+    def cli(*args):
+        return subprocess.run(
+            [sys.executable, "-m", "orchestrator.spec_scoring", *args],
+            capture_output=True, text=True, cwd=REPO_ROOT
+        )
+
+    scored = cli("test_prompts", "--scoring-profile", str(profile), "--save-features", str(features))
+    rescored = cli("--features", str(features), "--scoring-profile", str(profile))
+
+    assert scored.returncode == rescored.returncode == 0
+    lines = [json.loads(line) for line in rescored.stdout.splitlines()]
+    assert [line["spec_quality_score"] for line in lines] == \
+        [json.loads(line)["spec_quality_score"] for line in scored.stdout.splitlines()]
+    default = [json.loads(line)["spec_quality_score"] for line in cli("test_prompts").stdout.splitlines()]
+    assert [line["baseline_score"] for line in lines] == default
+    assert "with profile 'tuned'" in rescored.stderr
+
+    assert cli("--features", str(features), "--scoring-profile", "nope").returncode == 1
+
+
+def test_api_scoring_profile_parameter():
+    def post(query):
+        result = subprocess.run(
+            ["curl", "-s", "-w", "\n%{http_code}", "-X", "POST", f"http://localhost:8000/api/analyze{query}",
+             "-H", "Content-Type: application/json", "-d", json.dumps({"prompt": "Build a todo app with a login"})],
+            capture_output=True, text=True
+        )
+        body, status = result.stdout.rsplit("\n", 1)
+        return status, json.loads(body)
+
+    status, default = post("?profile=summary")
+    assert status == "200"
+    assert post("?profile=summary&scoring_profile=default") == (status, default)
+    status, error = post("?scoring_profile=../etc/passwd")
+    assert status == "400" and "Unknown scoring profile" in error["detail"]
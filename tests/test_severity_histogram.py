@@ -0,0 +1,54 @@
+"""
+Tests for single-pass severity aggregation and histogram-based risk classification.
+"""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.models import DevSpecFinding
+from orchestrator.records import Severity, make_finding
+from orchestrator.risk import SeverityHistogram, classify_risk, summarize_findings
+
+
+def findings_of(*severities):
+    return [make_finding("SECURITY", s, f"SEC_RULE_{i}") for i, s in enumerate(severities)]
+
+
+def test_histogram_counts_and_mask():
+    """One pass yields per-severity counts and the mask of severities present."""
+    histogram = summarize_findings(findings_of("BLOCKER", "WARNING", "WARNING", "INFO", "BOGUS"))
+
+    assert (histogram.info, histogram.warning, histogram.error, histogram.blocker) == (1, 2, 0, 1)
+    assert histogram.mask == Severity.BLOCKER | Severity.WARNING | Severity.INFO
+    assert histogram.has(Severity.BLOCKER)
+    assert not histogram.has(Severity.ERROR)
+    assert histogram.total == 4
+
+
+def test_histogram_accepts_pydantic_findings():
+    """Findings without a precomputed flag are classified from their label."""
+    findings = [DevSpecFinding(severity="error", code="SEC_X"), DevSpecFinding(severity="WARNING", code="QUAL_Y")]
+
+    histogram = summarize_findings(findings)
+
+    assert histogram == SeverityHistogram(info=0, warning=1, error=1, blocker=0, mask=Severity.ERROR | Severity.WARNING)
+
+
+def test_classify_risk_thresholds():
+    """Blockers → High, errors → Medium, 3+ warnings → Medium unless the spec is minimal."""
+    assert classify_risk(summarize_findings(findings_of("BLOCKER", "ERROR")), 10) == "High"
+    assert classify_risk(summarize_findings(findings_of("ERROR")), 10) == "Medium"
+    assert classify_risk(summarize_findings(findings_of("WARNING", "WARNING", "WARNING")), 55) == "Medium"
+    assert classify_risk(summarize_findings(findings_of("WARNING", "WARNING", "WARNING")), 54) == "Low"
+    assert classify_risk(summarize_findings(findings_of("WARNING", "WARNING")), 500) == "Low"
+    assert classify_risk(summarize_findings(findings_of("INFO")), 500) == "Low"
+    assert classify_risk(SeverityHistogram(), 0) == "Low"
+
+
+def test_classify_risk_from_stored_counts():
+    """Risk can be recomputed from stored histogram values without findings."""
+    stored = (0, 4, 0, 0, int(Severity.WARNING))
+
+    assert classify_risk(SeverityHistogram(*stored), 120) == "Medium"
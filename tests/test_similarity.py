@@ -0,0 +1,120 @@
+"""
+Tests for near-duplicate detection and rule output reuse.
+"""
+import json
+import os
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import pipeline
+from orchestrator.rules import matches_ignore_case
+from orchestrator.similarity import SimilarityIndex, rule_input_key, simhash
+
+
+PROMPTS_DIR = Path(__file__).parent.parent / "test_prompts"
+PROMPT = (PROMPTS_DIR / "dev_progress_3_medium_pii.txt").read_text()
+
+
+@pytest.fixture(scope="module")
+def api_endpoint():
+    """Get the API endpoint URL."""
+    return "http://localhost:8000/api/analyze"
+
+
+def call_api_headers(url: str, prompt: str) -> dict:
+    """Call the analysis API and return its (lowercased) response headers."""
+    result = subprocess.run(
+        ["curl", "-s", "-D", "-", "-o", "/dev/null", "-X", "POST", url,
+         "-H", "Content-Type: application/json",
+         "-d", json.dumps({"prompt": prompt})],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"API call failed: {result.stderr}")
+    lines = [line.split(": ", 1) for line in result.stdout.splitlines()[1:] if ": " in line]
+    return {name.lower(): value for name, value in lines}
+
+
+def test_rule_input_key_folds_case_and_newlines():
+    """Case and newline differences share a key only when the rules ignore case."""
+    assert rule_input_key("Build an API\nwith JWT", True) == rule_input_key("build an api with jwt", True)
+    assert rule_input_key("Build an API", False) is None
+    assert rule_input_key("-E flag first", True) is None
+
+
+def test_rule_scripts_are_checked_for_case_sensitivity():
+    """Only scripts whose every grep uses -i count as case-insensitive."""
+    assert matches_ignore_case("grep -iqE 'a' <<< x\ngrep -iq 'b' <<< x")
+    assert not matches_ignore_case("grep -iqE 'a' <<< x\ngrep -qE 'B' <<< x")
+    assert not matches_ignore_case('grep -iq a <<< x; [[ $X =~ B ]]')
+
+
+def test_case_variant_reuses_rule_output(monkeypatch):
+    """A casing/newline variant reuses the earlier rule output and matches a full analysis."""
+    index = SimilarityIndex()
+    first = pipeline.run_analysis(PROMPT, similar=index)
+    variant = PROMPT.upper().replace("\n", " ")
+    expected = pipeline.run_analysis(variant).as_dict()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("rule script should not run")
+    monkeypatch.setattr(pipeline, "run_dev_spec_kit", fail)
+    reused = pipeline.run_analysis(variant, similar=index)
+
+    assert reused.similarity.reused
+    assert reused.as_dict() == expected
+    assert first.similarity is None
+
+
+def test_near_duplicate_is_reported_but_analyzed():
+    """A prompt with a changed word is reported as similar and analyzed in full."""
+    index = SimilarityIndex()
+    pipeline.run_analysis(PROMPT, similar=index)
+    edited = PROMPT.replace("email", "e-mail address", 1)
+
+    result = pipeline.run_analysis(edited, similar=index)
+
+    assert result.similarity is not None
+    assert not result.similarity.reused
+    assert result.similarity.distance <= 7
+    assert result.as_dict() == pipeline.run_analysis(edited).as_dict()
+
+
+def test_simhash_separates_different_prompts():
+    """Unrelated prompts are far apart; a one-word edit is close."""
+    other = (PROMPTS_DIR / "demo_3_high_vulns.txt").read_text()
+
+    assert (simhash(PROMPT) ^ simhash(PROMPT.replace("email", "mail", 1))).bit_count() <= 7
+    assert (simhash(PROMPT) ^ simhash(other)).bit_count() > 16
+
+
+def test_index_is_bounded():
+    """The index evicts the least recently used prompts beyond max_entries."""
+    index = SimilarityIndex(max_entries=2)
+    output = ("", [], 0)
+    index.add("a", "first prompt about payments and ledgers", output)
+    index.add("b", "second prompt about image uploads", output)
+    index.add("c", "third prompt about chat messages", output)
+
+    assert len(index) == 2
+    assert index.lookup("first prompt about payments and ledgers") == (None, None)
+    assert index.lookup("THIRD prompt about chat messages")[0].analysis_id == "c"
+
+
+def test_api_reports_reused_analysis(api_endpoint):
+    """The API names the analysis whose rule output was reused."""
+    prompt = f"{PROMPT}\nRequest {uuid.uuid4()}"
+
+    first = call_api_headers(api_endpoint, prompt)
+    variant = call_api_headers(api_endpoint, prompt.upper())
+
+    assert "x-analysis-reused-from" not in first
+    assert variant["x-analysis-reused-from"] == first["x-analysis-id"]
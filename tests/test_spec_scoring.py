@@ -0,0 +1,110 @@
+"""
+Tests for the fused and batch spec-quality scoring (orchestrator.spec_scoring) against the scalar pipeline functions.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator.pipeline import compute_spec_quality_score, detect_missing_spec_areas
+from orchestrator.spec_kit_adapter import extract_spec_record
+from orchestrator import spec_scoring
+from orchestrator.spec_scoring import (
+    FEATURE_COLUMNS, assess_spec_quality, check_parity, feature_matrix, numpy_available, score_batch,
+)
+
+
+REPO_ROOT = Path(__file__).parent.parent
+CORPUS = sorted(
+    path for directory in ("test_prompts", "prompts") for path in (REPO_ROOT / directory).rglob("*")
+    if path.suffix in (".txt", ".md")
+)
+EDGE_CASES = [
+    "",
+    "   \n  ",
+    "todo",
+    "We will add authentication later. Maybe decide the database later, could be postgres or mongo.",
+    "Use OAuth, PostgreSQL, Kafka, Kubernetes, Terraform and gRPC with S3. Error handling for every call; "
+    "a comprehensive test suite that covers login, token refresh and profile updates.",
+    "Implement login. Implement logout. Create a user. Add an admin. Feature: export.",
+    "Store sessions in a database table; admins sign in through the login flow with MFA.",
+]
+PROMPTS = [path.read_text(encoding="utf-8") for path in CORPUS] + EDGE_CASES
+
+
+def scalar(prompt: str) -> tuple:
+    text = prompt.strip()
+    structure = extract_spec_record(text)
+    warnings = detect_missing_spec_areas(structure)
+    return warnings, compute_spec_quality_score(structure, warnings, text)
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return [scalar(prompt) for prompt in PROMPTS]
+
+
+@pytest.mark.parametrize("use_numpy", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not numpy_available(), reason="NumPy not installed")),
+])
+def test_batch_matches_scalar(expected, use_numpy):
+    results = score_batch(PROMPTS, use_numpy=use_numpy)
+
+    assert len(CORPUS) > 30
+    assert [(result.warnings, result.score) for result in results] == expected
+    assert {score for _, score in expected} != {expected[0][1]}
+
+
+def test_fused_stage_matches_scalar(expected):
+    results = [assess_spec_quality(prompt.strip()) for prompt in PROMPTS]
+
+    assert [(result.warnings, result.score) for result in results] == expected
+    assert [result.structure.as_dict() for result in results] == [extract_spec_record(p.strip()).as_dict() for p in PROMPTS]
+
+
+def test_parity_harness_reports_mismatches(monkeypatch):
+    assert check_parity(PROMPTS) == []
+
+    monkeypatch.setattr(spec_scoring, "score_features", lambda plan, row, warning_count: -1)
+    mismatches = check_parity(EDGE_CASES[:2])
+    assert {(index, name) for index, name, _, _ in mismatches} >= {(0, "fused"), (1, "batch")}
+    assert all(actual[2] == -1 for _, _, _, actual in mismatches)
+
+
+def test_cli_checks_default_corpus():
+    result = subprocess.run(
+        [sys.executable, "-m", "orchestrator.spec_scoring", "--check"],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+
+    assert result.returncode == 0
+    assert f"Checked {len(CORPUS)} prompts: 0 mismatches" in result.stderr
+
+
+def test_feature_matrix_shape():
+    structures = [extract_spec_record(prompt) for prompt in EDGE_CASES]
+    rows = feature_matrix(structures, EDGE_CASES, use_numpy=False)
+
+    assert len(rows) == len(EDGE_CASES) and {len(row) for row in rows} == {len(FEATURE_COLUMNS)}
+    assert score_batch([]) == []
+
+
+def test_cli_scores_jsonl(tmp_path):
+    source = tmp_path / "prompts.jsonl"
+    source.write_text("\n".join(json.dumps({"id": f"p{i}", "prompt": prompt}) for i, prompt in enumerate(EDGE_CASES)))
+    result = subprocess.run(
+        [sys.executable, "-m", "orchestrator.spec_scoring", "--jsonl", str(source)],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+
+    assert result.returncode == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line["source"] for line in lines] == [f"p{i}" for i in range(len(EDGE_CASES))]
+    assert [(line["spec_quality_warnings"], line["spec_quality_score"]) for line in lines] == [scalar(p) for p in EDGE_CASES]
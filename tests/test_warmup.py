@@ -0,0 +1,92 @@
+"""
+Tests for the startup warm-up (orchestrator.warmup) and the /ready endpoint.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import warmup
+from orchestrator.warmup import FAILED, READY, WarmupState, start_warmup, warm_up
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "a.txt").write_text("Build a todo app")
+    (tmp_path / "nested" / "b.md").write_text("Build a chat app")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+    return tmp_path
+
+
+def test_warm_up_primes_corpus(corpus):
+    state = WarmupState()
+    seen = []
+
+    def analyze(prompt):
+        if "chat" in prompt:
+            raise ValueError("rejected")
+        seen.append(prompt)
+
+    warm_up(state, analyze, [str(corpus)])
+
+    assert state.ready
+    assert seen == ["Build a todo app"]
+    report = state.as_dict()
+    assert (report["primed_prompts"], report["failed_prompts"]) == (1, 1)
+    assert set(report["steps_ms"]) == {"rules", "pipeline", "corpus"}
+
+
+def test_failed_warm_up_is_not_ready(monkeypatch):
+    def broken():
+        raise FileNotFoundError("security-check.sh")
+
+    monkeypatch.setattr(warmup, "warm_rules", broken)
+    state = WarmupState()
+    warm_up(state, lambda prompt: None)
+
+    assert state.status == FAILED and not state.ready
+    assert "security-check.sh" in state.as_dict()["error"]
+
+
+def test_disabled_warm_up_is_ready_at_once(monkeypatch):
+    monkeypatch.setenv("WARMUP", "off")
+    state = WarmupState()
+
+    assert start_warmup(state, lambda prompt: None) is None
+    assert state.status == READY
+
+
+def test_warm_state_is_not_warmed_again():
+    """A worker forked from a warmed-up master inherits a ready state."""
+    state = WarmupState()
+    state._set(status=READY)
+
+    assert start_warmup(state, lambda prompt: pytest.fail("warmed up again")) is None
+    assert state.ready
+
+
+def test_api_ready_after_warm_up():
+    """/ready answers 503 until warm-up finishes, then 200 with the warm-up report."""
+    deadline = time.monotonic() + 180
+    while True:
+        result = subprocess.run(
+            ["curl", "-s", "-w", "\n%{http_code}", "http://localhost:8000/ready"],
+            capture_output=True, text=True
+        )
+        body, status = result.stdout.rsplit("\n", 1)
+        assert status in ("200", "503")
+        if status == "200" or time.monotonic() > deadline:
+            break
+        assert json.loads(body)["status"] in ("pending", "running")
+        time.sleep(1)
+
+    report = json.loads(body)
+    assert status == "200" and report["status"] == "ready"
+    assert report["failed_prompts"] == 0
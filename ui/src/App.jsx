@@ -1,5 +1,5 @@
-import React, { useState, useEffect, useRef } from 'react';
-import { analyzePrompt } from './api';
+import React, { useState, useEffect } from 'react';
+import { analyzePrompt, isAbortError } from './api';
 import './App.css';
 
 // Helper function to convert SEC_* codes to human-readable titles
@@ -48,7 +48,6 @@ function App() {
   const [result, setResult] = useState(null);
   const [stage, setStage] = useState('idle'); // 'idle' | 'running_spec' | 'running_security' | 'finalizing' | 'done' | 'error'
   const [showSpecKitDetails, setShowSpecKitDetails] = useState(false);
-  const requestInFlight = useRef(false);
 
   const handleAnalyze = async () => {
     // Validation
@@ -61,37 +60,26 @@ function App() {
     setError(null);
     setResult(null);
     setStage('running_spec');
-    requestInFlight.current = true;
 
     try {
-      // Start the API request
-      const responsePromise = analyzePrompt(prompt);
-      
-      // Simulate pipeline stages for better UX
-      // Stage 1: spec-kit (500-800ms)
-      setTimeout(() => {
-        if (requestInFlight.current && stage !== 'done' && stage !== 'error') {
-          setStage('running_security');
-        }
-      }, 650);
-      
-      // Stage 2: security analysis (additional 500-800ms)
-      setTimeout(() => {
-        if (requestInFlight.current && stage !== 'done' && stage !== 'error') {
-          setStage('finalizing');
-        }
-      }, 1300);
-      
-      // Wait for actual response
-      const response = await responsePromise;
-      requestInFlight.current = false;
+      // Simulate pipeline stages for better UX; the timers stop with the request
+      // (when it settles or a newer one supersedes it)
+      const response = await analyzePrompt(prompt, [
+        // Stage 1: spec-kit (500-800ms)
+        [650, () => setStage('running_security')],
+        // Stage 2: security analysis (additional 500-800ms)
+        [1300, () => setStage('finalizing')],
+      ]);
       setResult(response);
       setStage('done');
+      setLoading(false);
     } catch (err) {
-      requestInFlight.current = false;
+      if (isAbortError(err)) {
+        // Superseded by a newer request, which now owns the loading state
+        return;
+      }
       setError(err.message || 'Failed to analyze prompt. Is the backend running?');
       setStage('error');
-    } finally {
       setLoading(false);
     }
   };
@@ -182,13 +170,11 @@ function App() {
               onChange={(e) => setPrompt(e.target.value)}
               onKeyDown={handleKeyDown}
               placeholder="Enter prompt here…"
-              disabled={loading}
             />
             
             <button
               className="analyze-button"
               onClick={handleAnalyze}
-              disabled={loading}
             >
               {loading ? (
                 <>
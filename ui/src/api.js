@@ -19,26 +19,61 @@ function getBackendURL() {
 
 const API_BASE_URL = getBackendURL();
 
+// Controller for the analysis request currently in flight (if any)
+let pendingAnalysis = null;
+
 /**
- * Analyze a developer prompt for security issues
+ * Analyze a developer prompt for security issues.
+ * Starting a new analysis aborts the previous one if it is still running; the
+ * backend sees the disconnect and stops working on it. The superseded call
+ * rejects with an AbortError (see isAbortError).
  * @param {string} prompt - The developer prompt to analyze
+ * @param {Array<[number, Function]>} [stageTimers] - [delay in ms, callback] pairs
+ *   run while this request is in flight; cleared once it settles or is aborted,
+ *   so a superseded request never updates the progress of the next one
  * @returns {Promise<AnalysisResponse>}
  */
-export async function analyzePrompt(prompt) {
-  const response = await fetch(`${API_BASE_URL}/api/analyze`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-    },
-    body: JSON.stringify({ prompt }),
-  });
-
-  if (!response.ok) {
-    const errorText = await response.text();
-    throw new Error(`API Error (${response.status}): ${errorText}`);
+export async function analyzePrompt(prompt, stageTimers = []) {
+  if (pendingAnalysis) {
+    pendingAnalysis.abort();
   }
+  const controller = new AbortController();
+  pendingAnalysis = controller;
+  const timers = stageTimers.map(([delay, callback]) => setTimeout(callback, delay));
+  const clearTimers = () => timers.forEach(clearTimeout);
+  controller.signal.addEventListener('abort', clearTimers);
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/analyze`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ prompt }),
+      signal: controller.signal,
+    });
 
-  return response.json();
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`API Error (${response.status}): ${errorText}`);
+    }
+
+    return await response.json();
+  } finally {
+    clearTimers();
+    if (pendingAnalysis === controller) {
+      pendingAnalysis = null;
+    }
+  }
+}
+
+/**
+ * Whether an error comes from a request aborted because a newer one replaced it
+ * @param {Error} error
+ * @returns {boolean}
+ */
+export function isAbortError(error) {
+  return error?.name === 'AbortError';
 }
 
 /**